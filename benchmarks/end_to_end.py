@@ -0,0 +1,743 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from dataclasses import dataclass, field
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from benchmarks.suite import format_seconds
+from nix_prefetch_github.hash import (
+    decode_sha256_digest,
+    encode_nix_base32,
+    is_sha1_hash,
+    sha256_digest_to_sri,
+)
+from nix_prefetch_github.nar import hash_tar_archive, make_fixed_output_store_path
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CONCURRENCY = [1, 4, 16]
+DEFAULT_REPOSITORIES = 20
+DEFAULT_BRANCH = "main"
+RELEASES = ["v1.0.0", "v1.1.0", "v2.0.0"]
+# 2024-01-02T03:04:05Z
+COMMIT_TIMESTAMP = 1704164645
+COMMIT_DATE = "2024-01-02T03:04:05Z"
+PROGRAMS = {
+    "nix-prefetch-github": "nix_prefetch_github",
+    "nix-prefetch-github-latest-release": "nix_prefetch_github.cli.fetch_latest_release",
+    "nix-prefetch-github-directory": "nix_prefetch_github.cli.fetch_directory",
+}
+# Variables that would make the programs talk to other servers than
+# the stand-ins or record and replay commands.
+IGNORED_ENVIRONMENT_VARIABLES = {
+    "http_proxy",
+    "https_proxy",
+    "all_proxy",
+    "no_proxy",
+    "github_token",
+    "github_graphql_url",
+    "nix_prefetch_github_record_commands",
+    "nix_prefetch_github_replay_commands",
+}
+SHIM_TEMPLATE = """#!{python}
+import sys
+
+from benchmarks.end_to_end import {function}
+
+sys.exit({function}(sys.argv[1:]))
+"""
+
+
+@dataclass
+class StandInRepository:
+    owner: str
+    name: str
+    # Maps full ref names to commit ids.
+    refs: Dict[str, str]
+    latest_release: str
+
+    @classmethod
+    def generate(cls, number: int) -> StandInRepository:
+        name = f"repository-{number:04}"
+        refs = {f"refs/heads/{DEFAULT_BRANCH}": _commit_id(name, DEFAULT_BRANCH)}
+        for tag in RELEASES:
+            refs[f"refs/tags/{tag}"] = _commit_id(name, tag)
+        return cls(owner="benchmark", name=name, refs=refs, latest_release=RELEASES[-1])
+
+    def resolve(self, revision: str) -> Optional[str]:
+        # Like GitHub the stand-in serves archives of every commit id,
+        # e.g. the commits of the checkouts for
+        # nix-prefetch-github-directory.
+        if is_sha1_hash(revision):
+            return revision
+        for prefix in ["refs/heads/", "refs/tags/"]:
+            if commit := self.refs.get(prefix + revision):
+                return commit
+        return None
+
+
+@dataclass
+class StandInGithub:
+    # Imitates api.github.com, github.com and codeload.github.com with
+    # one local HTTP server each. github.com redirects archive
+    # downloads to codeload like the real one does.
+    repositories: Dict[Tuple[str, str], StandInRepository]
+    api_latency: float = 0
+    github_latency: float = 0
+    codeload_latency: float = 0
+    files: int = 100
+    file_size: int = 4096
+    rate_limit: int = 5000
+    rate_limit_window: float = 3600
+    api_url: str = ""
+    github_url: str = ""
+    codeload_url: str = ""
+    _archives: Dict[str, bytes] = field(default_factory=dict, repr=False)
+    _used_requests: int = 0
+    _reset_at: float = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @contextmanager
+    def serve(self) -> Iterator[StandInGithub]:
+        servers = [
+            ThreadingHTTPServer(("127.0.0.1", 0), partial(handler, self))
+            for handler in [ApiHandler, GithubHandler, CodeloadHandler]
+        ]
+        self.api_url, self.github_url, self.codeload_url = [
+            f"http://127.0.0.1:{server.server_address[1]}" for server in servers
+        ]
+        threads = []
+        for server in servers:
+            server.daemon_threads = True
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            threads.append(thread)
+        try:
+            yield self
+        finally:
+            for server in servers:
+                server.shutdown()
+                server.server_close()
+            for thread in threads:
+                thread.join()
+
+    def get_repository(self, owner: str, name: str) -> Optional[StandInRepository]:
+        return self.repositories.get((owner, name.removesuffix(".git")))
+
+    def get_archive(self, repository: StandInRepository, commit: str) -> bytes:
+        with self._lock:
+            archive = self._archives.get(commit)
+        if archive is None:
+            archive = create_archive(
+                f"{repository.name}-{commit}", commit, self.files, self.file_size
+            )
+            with self._lock:
+                self._archives[commit] = archive
+        return archive
+
+    def claim_quota(self, is_counted: bool = True) -> Tuple[bool, Dict[str, str]]:
+        # Returns whether the request is within the rate limit and the
+        # X-RateLimit-* headers GitHub would send.
+        with self._lock:
+            now = time.time()
+            if now >= self._reset_at:
+                self._reset_at = now + self.rate_limit_window
+                self._used_requests = 0
+            is_allowed = self._used_requests < self.rate_limit
+            if is_allowed and is_counted:
+                self._used_requests += 1
+            headers = {
+                "X-RateLimit-Limit": str(self.rate_limit),
+                "X-RateLimit-Remaining": str(self.rate_limit - self._used_requests),
+                "X-RateLimit-Used": str(self._used_requests),
+                "X-RateLimit-Reset": str(math.ceil(self._reset_at)),
+                "X-RateLimit-Resource": "core",
+            }
+        return is_allowed, headers
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency_attribute = ""
+
+    def __init__(self, stand_in: StandInGithub, *args: Any) -> None:
+        self.stand_in = stand_in
+        super().__init__(*args)
+
+    def do_GET(self) -> None:
+        self.handle_request("GET", b"")
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.handle_request("POST", body)
+
+    def handle_request(self, method: str, body: bytes) -> None:
+        time.sleep(getattr(self.stand_in, self.latency_attribute))
+        url = urllib.parse.urlsplit(self.path)
+        path = [urllib.parse.unquote(part) for part in url.path.split("/") if part]
+        self.route(method, path, url.query, body)
+
+    def route(self, method: str, path: List[str], query: str, body: bytes) -> None:
+        raise NotImplementedError()
+
+    def respond(
+        self,
+        status: int,
+        body: bytes = b"",
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class ApiHandler(StandInHandler):
+    latency_attribute = "api_latency"
+
+    def route(self, method: str, path: List[str], query: str, body: bytes) -> None:
+        if method == "GET" and path == ["rate_limit"]:
+            # Requests to /rate_limit do not count against the quota.
+            _, headers = self.stand_in.claim_quota(is_counted=False)
+            rate = {
+                "limit": int(headers["X-RateLimit-Limit"]),
+                "remaining": int(headers["X-RateLimit-Remaining"]),
+                "used": int(headers["X-RateLimit-Used"]),
+                "reset": int(headers["X-RateLimit-Reset"]),
+            }
+            self.respond_json(200, {"resources": {"core": rate}, "rate": rate}, headers)
+            return
+        document = self.get_document(method, path)
+        if document is None:
+            _, headers = self.stand_in.claim_quota()
+            self.respond_json(404, {"message": "Not Found"}, headers)
+            return
+        etag = '"' + hashlib.sha256(json.dumps(document).encode()).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            # Conditional requests for unchanged documents are free.
+            _, headers = self.stand_in.claim_quota(is_counted=False)
+            self.respond(304, headers=dict(headers, ETag=etag))
+            return
+        is_allowed, headers = self.stand_in.claim_quota()
+        if not is_allowed:
+            self.respond_json(403, {"message": "API rate limit exceeded"}, headers)
+            return
+        self.respond_json(200, document, dict(headers, ETag=etag))
+
+    def get_document(self, method: str, path: List[str]) -> Optional[Any]:
+        if method != "GET" or len(path) != 5 or path[0] != "repos":
+            return None
+        repository = self.stand_in.get_repository(path[1], path[2])
+        if repository is None:
+            return None
+        if path[3:] == ["releases", "latest"]:
+            return {"tag_name": repository.latest_release}
+        if path[3] == "commits" and (commit := repository.resolve(path[4])):
+            return {"sha": commit, "commit": {"committer": {"date": COMMIT_DATE}}}
+        return None
+
+    def respond_json(self, status: int, document: Any, headers: Dict[str, str]) -> None:
+        self.respond(
+            status,
+            json.dumps(document).encode("utf-8"),
+            dict(headers, **{"Content-Type": "application/json; charset=utf-8"}),
+        )
+
+
+class GithubHandler(StandInHandler):
+    latency_attribute = "github_latency"
+
+    def route(self, method: str, path: List[str], query: str, body: bytes) -> None:
+        repository = (
+            self.stand_in.get_repository(path[0], path[1]) if len(path) >= 2 else None
+        )
+        if repository is None:
+            self.respond(404)
+        elif method == "GET" and path[2:] == ["info", "refs"]:
+            if query != "service=git-upload-pack":
+                self.respond(403)
+                return
+            self.respond(
+                200,
+                b"".join(
+                    _encode_packet(line)
+                    for line in ["version 2", "agent=git/stand-in", "ls-refs=unborn"]
+                )
+                + b"0000",
+                {"Content-Type": "application/x-git-upload-pack-advertisement"},
+            )
+        elif method == "POST" and path[2:] == ["git-upload-pack"]:
+            self.list_refs(repository, body)
+        elif (
+            method == "GET"
+            and len(path) == 4
+            and path[2] == "archive"
+            and path[3].endswith(".tar.gz")
+        ):
+            revision = path[3].removesuffix(".tar.gz")
+            self.respond(
+                302,
+                headers={
+                    "Location": f"{self.stand_in.codeload_url}/{repository.owner}/{repository.name}/tar.gz/{revision}"
+                },
+            )
+        else:
+            self.respond(404)
+
+    def list_refs(self, repository: StandInRepository, body: bytes) -> None:
+        arguments = _decode_packets(body)
+        if "command=ls-refs" not in arguments:
+            self.respond(400)
+            return
+        prefixes = [
+            argument.removeprefix("ref-prefix ")
+            for argument in arguments
+            if argument.startswith("ref-prefix ")
+        ]
+        lines: List[str] = []
+        head = f"refs/heads/{DEFAULT_BRANCH}"
+        for ref_name, commit in [("HEAD", repository.refs[head])] + sorted(
+            repository.refs.items()
+        ):
+            if prefixes and not any(ref_name.startswith(prefix) for prefix in prefixes):
+                continue
+            if ref_name == "HEAD" and "symrefs" in arguments:
+                lines.append(f"{commit} HEAD symref-target:{head}")
+            else:
+                lines.append(f"{commit} {ref_name}")
+        self.respond(
+            200,
+            b"".join(_encode_packet(line) for line in lines) + b"0000",
+            {"Content-Type": "application/x-git-upload-pack-result"},
+        )
+
+
+class CodeloadHandler(StandInHandler):
+    latency_attribute = "codeload_latency"
+
+    def route(self, method: str, path: List[str], query: str, body: bytes) -> None:
+        repository = (
+            self.stand_in.get_repository(path[0], path[1]) if len(path) == 4 else None
+        )
+        commit = (
+            repository.resolve(path[3])
+            if repository is not None and path[2] == "tar.gz"
+            else None
+        )
+        if method != "GET" or repository is None or commit is None:
+            self.respond(404)
+            return
+        self.respond(
+            200,
+            self.stand_in.get_archive(repository, commit),
+            {
+                "Content-Type": "application/x-gzip",
+                "Content-Disposition": f"attachment; filename={repository.name}-{path[3]}.tar.gz",
+                "ETag": f'"{commit}"',
+            },
+        )
+
+
+def create_archive(prefix: str, commit: str, files: int, file_size: int) -> bytes:
+    # Archives are laid out like GitHub's: the commit id is stored in
+    # the pax global header and every member has the commit timestamp
+    # as mtime. Random contents keep gzip from compressing them away.
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=COMMIT_TIMESTAMP) as stream:
+        with tarfile.open(
+            fileobj=stream,
+            mode="w",
+            format=tarfile.PAX_FORMAT,
+            pax_headers={"comment": commit},
+        ) as archive:
+            directory = tarfile.TarInfo(prefix)
+            directory.type = tarfile.DIRTYPE
+            directory.mode = 0o775
+            directory.mtime = COMMIT_TIMESTAMP
+            archive.addfile(directory)
+            for number in range(files):
+                content = random.Random(f"{commit}/{number}").randbytes(file_size)
+                member = tarfile.TarInfo(f"{prefix}/file-{number:04}")
+                member.size = len(content)
+                member.mode = 0o664
+                member.mtime = COMMIT_TIMESTAMP
+                archive.addfile(member, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+def nix_prefetch_url_shim(arguments: List[str]) -> int:
+    # Stands in for `nix-prefetch-url --unpack URL --print-path` and
+    # calculates the same hash without nix.
+    urls = [argument for argument in arguments if not argument.startswith("--")]
+    if "--unpack" not in arguments or len(urls) != 1:
+        print(f"Unsupported arguments: {arguments}", file=sys.stderr)
+        return 1
+    (url,) = urls
+    with closing(urllib.request.urlopen(url)) as response:
+        nar_hash = hash_tar_archive(response)
+    print(encode_nix_base32(nar_hash.digest))
+    if "--print-path" in arguments:
+        name = os.path.basename(urllib.parse.urlsplit(url).path)
+        print(make_fixed_output_store_path(name, nar_hash.digest))
+    return 0
+
+
+def nix_shim(arguments: List[str]) -> int:
+    # Stands in for `nix hash to-sri sha256:HASH`.
+    digest = decode_sha256_digest(arguments[-1].removeprefix("sha256:"))
+    if "to-sri" not in arguments or digest is None:
+        print(f"Unsupported arguments: {arguments}", file=sys.stderr)
+        return 1
+    print(sha256_digest_to_sri(digest))
+    return 0
+
+
+def install_shims(directory: str) -> None:
+    for program, function in [
+        ("nix-prefetch-url", "nix_prefetch_url_shim"),
+        ("nix", "nix_shim"),
+    ]:
+        path = os.path.join(directory, program)
+        with open(path, "w") as handle:
+            handle.write(SHIM_TEMPLATE.format(python=sys.executable, function=function))
+        os.chmod(path, 0o755)
+
+
+def create_checkout(directory: str, repository: StandInRepository) -> None:
+    environment = dict(
+        os.environ,
+        GIT_AUTHOR_NAME="benchmark",
+        GIT_AUTHOR_EMAIL="benchmark@example.com",
+        GIT_AUTHOR_DATE=COMMIT_DATE,
+        GIT_COMMITTER_NAME="benchmark",
+        GIT_COMMITTER_EMAIL="benchmark@example.com",
+        GIT_COMMITTER_DATE=COMMIT_DATE,
+    )
+    for command in [
+        ["git", "init", "--quiet", directory],
+        [
+            "git",
+            "-C",
+            directory,
+            "remote",
+            "add",
+            "origin",
+            f"https://github.com/{repository.owner}/{repository.name}.git",
+        ],
+        [
+            "git",
+            "-C",
+            directory,
+            "commit",
+            "--quiet",
+            "--allow-empty",
+            "--message",
+            repository.name,
+        ],
+    ]:
+        subprocess.run(command, env=environment, check=True)
+
+
+def get_environment(
+    stand_in: StandInGithub, bin_directory: str, cache_directory: str
+) -> Dict[str, str]:
+    environment = {
+        name: value
+        for name, value in os.environ.items()
+        if name.lower() not in IGNORED_ENVIRONMENT_VARIABLES
+    }
+    environment.update(
+        PATH=os.pathsep.join([bin_directory, environment.get("PATH", "")]),
+        PYTHONPATH=os.pathsep.join(
+            [REPOSITORY_ROOT] + environment.get("PYTHONPATH", "").split(os.pathsep)
+        ).rstrip(os.pathsep),
+        XDG_CACHE_HOME=cache_directory,
+        GITHUB_API_URL=stand_in.api_url,
+        GITHUB_SERVER_URL=stand_in.github_url,
+        # Programs must not be forwarded to a running daemon.
+        NIX_PREFETCH_GITHUB_SOCKET="",
+    )
+    return environment
+
+
+def get_commands(
+    program: str,
+    repositories: List[StandInRepository],
+    checkouts: Dict[str, str],
+    extra_arguments: List[str],
+) -> List[List[str]]:
+    prefix = [sys.executable, "-m", PROGRAMS[program]]
+    if program == "nix-prefetch-github-directory":
+        return [
+            prefix + ["--directory", checkouts[repository.name]] + extra_arguments
+            for repository in repositories
+        ]
+    return [
+        prefix + [repository.owner, repository.name] + extra_arguments
+        for repository in repositories
+    ]
+
+
+def run_commands(
+    commands: List[List[str]], concurrency: int, environment: Dict[str, str]
+) -> Tuple[List[float], List[str], float]:
+    # Returns the latency of every command, the errors of the commands
+    # that failed and the time it took to run all of them.
+    def run(command: List[str]) -> Tuple[float, Optional[str]]:
+        started_at = time.perf_counter()
+        process = subprocess.run(
+            command,
+            env=environment,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        latency = time.perf_counter() - started_at
+        if process.returncode != 0:
+            return latency, f"{' '.join(command)}: {process.stderr.strip()}"
+        return latency, None
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(run, commands))
+    duration = time.perf_counter() - started_at
+    return (
+        [latency for latency, _ in results],
+        [error for _, error in results if error is not None],
+        duration,
+    )
+
+
+def percentile(values: List[float], percent: float) -> float:
+    # Nearest-rank percentile.
+    ordered = sorted(values)
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+
+def summarize(latencies: List[float], failures: int, duration: float) -> Dict[str, Any]:
+    # "seconds" holds the median so that results can be compared with
+    # `python -m benchmarks.suite compare`.
+    return {
+        "seconds": percentile(latencies, 50),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies),
+        "throughput": len(latencies) / duration,
+        "invocations": len(latencies),
+        "failures": failures,
+    }
+
+
+def run_benchmarks(arguments: argparse.Namespace) -> Tuple[Dict[str, Any], List[str]]:
+    repositories = [
+        StandInRepository.generate(number) for number in range(arguments.repositories)
+    ]
+    stand_in = StandInGithub(
+        repositories={
+            (repository.owner, repository.name): repository
+            for repository in repositories
+        },
+        api_latency=arguments.api_latency,
+        github_latency=arguments.github_latency,
+        codeload_latency=arguments.codeload_latency,
+        files=arguments.files,
+        file_size=arguments.file_size,
+        rate_limit=arguments.rate_limit,
+        rate_limit_window=arguments.rate_limit_window,
+    )
+    results: Dict[str, Any] = dict()
+    errors: List[str] = []
+    with tempfile.TemporaryDirectory() as workspace, stand_in.serve():
+        bin_directory = os.path.join(workspace, "bin")
+        os.mkdir(bin_directory)
+        install_shims(bin_directory)
+        checkouts: Dict[str, str] = dict()
+        if "nix-prefetch-github-directory" in arguments.programs:
+            for repository in repositories:
+                checkouts[repository.name] = os.path.join(
+                    workspace, "checkouts", repository.name
+                )
+                create_checkout(checkouts[repository.name], repository)
+        for program in arguments.programs:
+            commands = get_commands(
+                program, repositories, checkouts, arguments.extra_arguments
+            )
+            for concurrency in arguments.concurrency:
+                name = f"{program}.concurrency_{concurrency}"
+                # Every run starts with an empty cache so that all
+                # requests reach the stand-in servers.
+                environment = get_environment(
+                    stand_in, bin_directory, os.path.join(workspace, "cache", name)
+                )
+                latencies, failures, duration = run_commands(
+                    commands, concurrency, environment
+                )
+                results[name] = summarize(latencies, len(failures), duration)
+                errors += failures
+                print(
+                    f"{name:50} p50 {format_seconds(results[name]['p50'])}"
+                    f" p95 {format_seconds(results[name]['p95'])}"
+                    f" p99 {format_seconds(results[name]['p99'])}"
+                    f" {results[name]['throughput']:8.2f}/s",
+                    file=sys.stderr,
+                )
+    return (
+        {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "repositories": arguments.repositories,
+            "latency": {
+                "api": arguments.api_latency,
+                "github": arguments.github_latency,
+                "codeload": arguments.codeload_latency,
+            },
+            "benchmarks": results,
+        },
+        errors,
+    )
+
+
+def get_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Measure the latency of nix-prefetch-github's programs against local "
+            "stand-ins for GitHub's servers."
+        )
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        default="-",
+        help="File to store the results in. Defaults to stdout.",
+    )
+    parser.add_argument(
+        "--programs",
+        nargs="+",
+        choices=list(PROGRAMS),
+        default=list(PROGRAMS),
+    )
+    parser.add_argument(
+        "--repositories",
+        type=int,
+        default=DEFAULT_REPOSITORIES,
+        help="Number of repositories every program prefetches, defaults to %(default)s",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=DEFAULT_CONCURRENCY,
+        help="Numbers of programs that run at the same time",
+    )
+    parser.add_argument(
+        "--api-latency",
+        type=float,
+        default=0.05,
+        help="Seconds the stand-in for api.github.com waits before it responds",
+    )
+    parser.add_argument(
+        "--github-latency",
+        type=float,
+        default=0.05,
+        help="Seconds the stand-in for github.com waits before it responds",
+    )
+    parser.add_argument(
+        "--codeload-latency",
+        type=float,
+        default=0.1,
+        help="Seconds the stand-in for codeload.github.com waits before it responds",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=int,
+        default=5000,
+        help="Requests to the API stand-in allowed per rate limit window",
+    )
+    parser.add_argument(
+        "--rate-limit-window",
+        type=float,
+        default=3600,
+        help="Seconds until the quota of the API stand-in is reset",
+    )
+    parser.add_argument(
+        "--files", type=int, default=100, help="Number of files in every archive"
+    )
+    parser.add_argument(
+        "--file-size", type=int, default=4096, help="Size of every file in bytes"
+    )
+    parser.add_argument(
+        "--extra-argument",
+        dest="extra_arguments",
+        action="append",
+        default=[],
+        help="Argument that is passed to every program, e.g. --extra-argument=--meta",
+    )
+    return parser
+
+
+def main(args: List[str] = sys.argv[1:]) -> None:
+    arguments = get_argument_parser().parse_args(args)
+    results, errors = run_benchmarks(arguments)
+    output = json.dumps(results, indent=4, sort_keys=True) + "\n"
+    if arguments.output == "-":
+        sys.stdout.write(output)
+    else:
+        with open(arguments.output, "w") as handle:
+            handle.write(output)
+    for error in errors[:5]:
+        print(error, file=sys.stderr)
+    sys.exit(1 if errors else 0)
+
+
+def _commit_id(repository_name: str, ref_name: str) -> str:
+    return hashlib.sha1(f"{repository_name} {ref_name}".encode("utf-8")).hexdigest()
+
+
+def _encode_packet(line: str) -> bytes:
+    data = (line + "\n").encode("utf-8")
+    return f"{len(data) + 4:04x}".encode("ascii") + data
+
+
+def _decode_packets(body: bytes) -> List[str]:
+    # Flush and delimiter packets are skipped.
+    lines: List[str] = []
+    position = 0
+    while position + 4 <= len(body):
+        payload_start = position + 4
+        payload_end = position + int(body[position:payload_start], 16)
+        if payload_end < payload_start:
+            position = payload_start
+            continue
+        lines.append(body[payload_start:payload_end].decode("utf-8").rstrip("\n"))
+        position = payload_end
+    return lines
+
+
+if __name__ == "__main__":
+    main()
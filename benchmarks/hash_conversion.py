@@ -0,0 +1,43 @@
+import argparse
+import shutil
+import timeit
+from logging import getLogger
+
+from nix_prefetch_github.command.command_runner import CommandRunnerImpl
+from nix_prefetch_github.hash_converter import HashConverterImpl
+
+EXAMPLE_HASH = "0mdqa9w1p6cmli6976v4wi0sw9r4p5prkj7lzfd1877wk11c9c73"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare the in process conversion of nix base32 hashes to SRI hashes with the conversion via `nix hash to-sri`."
+    )
+    parser.add_argument("--iterations", type=int, default=10000)
+    parser.add_argument("--subprocess-iterations", type=int, default=20)
+    args = parser.parse_args()
+    converter = HashConverterImpl(command_runner=CommandRunnerImpl(getLogger(__name__)))
+    native_seconds = (
+        timeit.timeit(
+            lambda: converter.convert_sha256_to_sri(EXAMPLE_HASH),
+            number=args.iterations,
+        )
+        / args.iterations
+    )
+    print(f"native:     {native_seconds * 1e6:10.2f} µs per conversion")
+    if shutil.which("nix") is None:
+        print("subprocess: skipped, nix is not available")
+        return
+    subprocess_seconds = (
+        timeit.timeit(
+            lambda: converter._convert_sha256_to_sri_via_nix(EXAMPLE_HASH),
+            number=args.subprocess_iterations,
+        )
+        / args.subprocess_iterations
+    )
+    print(f"subprocess: {subprocess_seconds * 1e6:10.2f} µs per conversion")
+    print(f"speedup:    {subprocess_seconds / native_seconds:10.0f}x")
+
+
+if __name__ == "__main__":
+    main()
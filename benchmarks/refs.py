@@ -0,0 +1,56 @@
+import argparse
+import random
+import sys
+from typing import List
+
+DEFAULT_BRANCH = "main"
+
+
+def generate_git_ls_remote_output(count: int, seed: int = 0) -> str:
+    # Generates the output of `git ls-remote --symref` for a repository
+    # with roughly `count` refs. The mix of branches, annotated and
+    # lightweight tags and pull request refs resembles big real world
+    # repositories like the one in tests/sensu_go_git_ls_remote.txt.
+    generator = random.Random(seed)
+
+    def object_id() -> str:
+        return f"{generator.getrandbits(160):040x}"
+
+    head = object_id()
+    lines = [f"ref: refs/heads/{DEFAULT_BRANCH}\tHEAD", f"{head}\tHEAD"]
+    branches = [DEFAULT_BRANCH] + [
+        branch_name(n) for n in range(max(count // 5 - 1, 0))
+    ]
+    for name in sorted(branches):
+        revision = head if name == DEFAULT_BRANCH else object_id()
+        lines.append(f"{revision}\trefs/heads/{name}")
+    for n in range(count // 4):
+        lines.append(f"{object_id()}\trefs/pull/{n + 1}/head")
+    for name in sorted(tag_name(n) for n in range(max(count - len(lines), 0))):
+        lines.append(f"{object_id()}\trefs/tags/{name}")
+        # Every other tag is an annotated tag.
+        if generator.random() < 0.5:
+            lines.append(f"{object_id()}\trefs/tags/{name}^{{}}")
+    return "\n".join(lines) + "\n"
+
+
+def branch_name(n: int) -> str:
+    return f"feature/branch-{n}"
+
+
+def tag_name(n: int) -> str:
+    return f"v{n // 10000}.{n // 100 % 100}.{n % 100}"
+
+
+def main(args: List[str] = sys.argv[1:]) -> None:
+    parser = argparse.ArgumentParser(
+        description="Print a synthetic `git ls-remote --symref` output."
+    )
+    parser.add_argument("count", type=int, help="Approximate number of refs")
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args(args)
+    sys.stdout.write(generate_git_ls_remote_output(arguments.count, arguments.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from benchmarks.refs import DEFAULT_BRANCH, branch_name, generate_git_ls_remote_output
+from nix_prefetch_github.hash import SriHash, is_sha1_hash
+from nix_prefetch_github.interfaces import (
+    GithubRepository,
+    PrefetchedRepository,
+    PrefetchOptions,
+)
+from nix_prefetch_github.list_remote import ListRemote
+from nix_prefetch_github.presenter.repository_renderer import (
+    JsonRepositoryRenderer,
+    NixRepositoryRenderer,
+)
+from nix_prefetch_github.revision_index import RevisionIndexImpl
+
+BENCHMARKS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCHMARKS_DIRECTORY, "baseline.json")
+SENSU_GO_LS_REMOTE_PATH = os.path.join(
+    os.path.dirname(BENCHMARKS_DIRECTORY), "tests", "sensu_go_git_ls_remote.txt"
+)
+DEFAULT_SIZES = [10000, 100000, 1000000]
+DEFAULT_THRESHOLD = 0.25
+
+Benchmark = Tuple[str, Callable[[], Any]]
+
+
+def get_benchmarks(sizes: List[int]) -> Iterator[Benchmark]:
+    with open(SENSU_GO_LS_REMOTE_PATH) as handle:
+        workloads = [("sensu_go", handle.read(), "master", "5.2.0", "HEAD")]
+    for size in sizes:
+        workloads.append(
+            (
+                f"synthetic_{size}",
+                generate_git_ls_remote_output(size),
+                branch_name(size // 10),
+                "v0.0.1",
+                "HEAD",
+            )
+        )
+    for workload, output, branch, tag, symref in workloads:
+        yield (
+            f"list_remote.parse.{workload}",
+            partial(ListRemote.from_git_ls_remote_output, output),
+        )
+        index = RevisionIndexImpl(ListRemote.from_git_ls_remote_output(output))
+        for kind, name in [
+            ("branch", branch),
+            ("tag", tag),
+            ("symref", symref),
+            ("missing", "does-not-exist"),
+        ]:
+            yield (
+                f"revision_index.lookup_{kind}.{workload}",
+                partial(index.get_revision_by_name, name),
+            )
+    yield (
+        "hash.sri_from_text",
+        lambda: SriHash.from_text(
+            "sha256-Lxl0D9HaTSWr6E1f0zG9rHdS5vL2a8iVz5nQ6u4VSqI=?option"
+        ),
+    )
+    yield (
+        "hash.is_sha1_hash.match",
+        lambda: is_sha1_hash("4840fbf9ebd246d334c11335fc85747013230b05"),
+    )
+    yield ("hash.is_sha1_hash.mismatch", lambda: is_sha1_hash(DEFAULT_BRANCH))
+    repository = PrefetchedRepository(
+        repository=GithubRepository(owner="seppeljordan", name="nix-prefetch-github"),
+        rev="4840fbf9ebd246d334c11335fc85747013230b05",
+        hash_sum="sha256-Lxl0D9HaTSWr6E1f0zG9rHdS5vL2a8iVz5nQ6u4VSqI=",
+        options=PrefetchOptions(fetch_submodules=True),
+        store_path="/nix/store/0a1b2c3d4e5f6g7h8i9j0k1l2m3n4o5p-source",
+    )
+    nix_renderer = NixRepositoryRenderer()
+    json_renderer = JsonRepositoryRenderer()
+    yield (
+        "render.nix",
+        lambda: nix_renderer.render_prefetched_repository(repository),
+    )
+    yield (
+        "render.json",
+        lambda: json_renderer.render_prefetched_repository(repository),
+    )
+
+
+def measure(function: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    # The best of several runs is the least disturbed by other
+    # processes running on the same machine.
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    seconds = min(timer.repeat(repeat=repeat, number=number)) / number
+    return {"seconds": seconds, "number": number}
+
+
+def run_benchmarks(sizes: List[int], repeat: int, pattern: str) -> Dict[str, Any]:
+    results: Dict[str, Any] = dict()
+    for name, function in get_benchmarks(sizes):
+        if pattern not in name:
+            continue
+        results[name] = measure(function, repeat)
+        print(
+            f"{name:50} {format_seconds(results[name]['seconds'])}",
+            file=sys.stderr,
+        )
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "benchmarks": results,
+    }
+
+
+def compare_results(
+    baseline: Dict[str, Any], current: Dict[str, Any], threshold: float
+) -> Tuple[List[str], List[str]]:
+    # Returns a report line for every benchmark both results have in
+    # common and the names of the benchmarks that got slower by more
+    # than the threshold.
+    report: List[str] = []
+    regressions: List[str] = []
+    for name, result in current["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            continue
+        before = baseline["benchmarks"][name]["seconds"]
+        after = result["seconds"]
+        change = after / before - 1
+        is_regression = change > threshold
+        if is_regression:
+            regressions.append(name)
+        report.append(
+            f"{name:50} {format_seconds(before)} -> {format_seconds(after)} "
+            f"{change:+8.1%}{'  REGRESSION' if is_regression else ''}"
+        )
+    return report, regressions
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, factor in [("s ", 1), ("ms", 1e3), ("µs", 1e6)]:
+        if seconds * factor >= 1:
+            return f"{seconds * factor:10.2f} {unit}"
+    return f"{seconds * 1e9:10.2f} ns"
+
+
+def run_command(arguments: argparse.Namespace) -> int:
+    results = run_benchmarks(arguments.sizes, arguments.repeat, arguments.filter)
+    output = json.dumps(results, indent=4, sort_keys=True) + "\n"
+    if arguments.output == "-":
+        sys.stdout.write(output)
+    else:
+        with open(arguments.output, "w") as handle:
+            handle.write(output)
+    return 0
+
+
+def compare_command(arguments: argparse.Namespace) -> int:
+    with open(arguments.baseline) as handle:
+        baseline = json.load(handle)
+    with open(arguments.results) as handle:
+        current = json.load(handle)
+    report, regressions = compare_results(baseline, current, arguments.threshold)
+    for line in report:
+        print(line)
+    if regressions:
+        print(
+            f"{len(regressions)} benchmark(s) regressed by more than {arguments.threshold:.0%}"
+        )
+        return 1
+    return 0
+
+
+def get_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Run micro benchmarks of nix-prefetch-github and compare their results."
+    )
+    subparsers = parser.add_subparsers(required=True)
+    run_parser = subparsers.add_parser(
+        "run", help="Run the benchmarks and store their results as JSON."
+    )
+    run_parser.add_argument(
+        "--output",
+        "-o",
+        default="-",
+        help="File to store the results in. Defaults to stdout.",
+    )
+    run_parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="Number of refs of the synthetic ls-remote outputs",
+    )
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument(
+        "--filter",
+        default="",
+        help="Only run benchmarks whose name contains this string",
+    )
+    run_parser.set_defaults(command=run_command)
+    compare_parser = subparsers.add_parser(
+        "compare",
+        help="Compare benchmark results with a baseline and fail on regressions.",
+    )
+    compare_parser.add_argument("results")
+    compare_parser.add_argument("--baseline", default=BASELINE_PATH)
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Relative slowdown that counts as a regression, defaults to %(default)s",
+    )
+    compare_parser.set_defaults(command=compare_command)
+    return parser
+
+
+def main(args: List[str] = sys.argv[1:]) -> None:
+    arguments = get_argument_parser().parse_args(args)
+    sys.exit(arguments.command(arguments))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from typing import Any, List, Mapping, Optional, Protocol, Tuple
+
+
+@dataclass
+class CacheConfiguration:
+    refresh: bool = False
+    branch_ttl: float = 300
+    tag_ttl: float = 24 * 60 * 60
+    max_entries: int = 1000
+    hash_max_age: float = 90 * 24 * 60 * 60
+    hash_max_entries: int = 100000
+
+
+class CacheManager(Protocol):
+    def set_cache_configuration(self, configuration: CacheConfiguration) -> None: ...
+
+    def get_cache_configuration(self) -> CacheConfiguration: ...
+
+
+@dataclass
+class CacheManagerImpl:
+    configuration: CacheConfiguration = field(default_factory=CacheConfiguration)
+
+    def set_cache_configuration(self, configuration: CacheConfiguration) -> None:
+        self.configuration = configuration
+
+    def get_cache_configuration(self) -> CacheConfiguration:
+        return self.configuration
+
+
+def get_cache_directory(environment: Mapping[str, str]) -> str:
+    if xdg_cache_home := environment.get("XDG_CACHE_HOME"):
+        base_directory = xdg_cache_home
+    else:
+        base_directory = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base_directory, "nix-prefetch-github")
+
+
+@dataclass
+class JsonCacheDirectory:
+    # Every cache entry is stored as a JSON document in its own file.
+    # The modification time of a file doubles as its last access
+    # time which is used to evict the least recently used entries.
+    path: str
+    # The number of entries is only counted once. Afterwards it is
+    # kept up to date by write so that eviction does not have to
+    # look at every entry after each write.
+    _entry_count: Optional[int] = field(default=None, repr=False, compare=False)
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def read(self, key: str) -> Optional[Any]:
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path) as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return document
+
+    def write(self, key: str, document: Any) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        entry_path = self._entry_path(key)
+        is_new_entry = not os.path.exists(entry_path)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "w") as f:
+                # Unlike json.dump, json.dumps uses the C implementation
+                # of the encoder which matters for large documents.
+                f.write(json.dumps(document))
+            os.replace(temporary_path, entry_path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+        if is_new_entry:
+            with self._lock:
+                if self._entry_count is not None:
+                    self._entry_count += 1
+
+    def evict(self, max_entries: int) -> None:
+        with self._lock:
+            if self._entry_count is None:
+                self._entry_count = len(self._list_entries())
+            if self._entry_count <= max_entries:
+                return
+            entries: List[Tuple[float, str]] = []
+            for entry_path in self._list_entries():
+                try:
+                    entries.append((os.stat(entry_path).st_mtime, entry_path))
+                except OSError:
+                    continue
+            entries.sort()
+            # Some room is made for new entries so that a full cache is
+            # not scanned again after every single write.
+            retained_entries = max_entries - max_entries // 10
+            for _, entry_path in entries[: max(len(entries) - retained_entries, 0)]:
+                try:
+                    os.unlink(entry_path)
+                except OSError:
+                    pass
+            self._entry_count = min(len(entries), retained_entries)
+
+    def _list_entries(self) -> List[str]:
+        try:
+            with os.scandir(self.path) as directory:
+                return [
+                    entry.path for entry in directory if entry.name.endswith(".json")
+                ]
+        except OSError:
+            return []
+
+    def _entry_path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.path, f"{digest}.json")
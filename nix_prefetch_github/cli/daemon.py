@@ -0,0 +1,23 @@
+import os
+import sys
+
+from nix_prefetch_github.controller.nix_prefetch_github_daemon_controller import (
+    NixPrefetchGithubDaemonController,
+)
+from nix_prefetch_github.daemon import create_daemon
+from nix_prefetch_github.dependency_injector import DependencyInjector
+
+
+def main() -> None:
+    injector = DependencyInjector()
+    controller = NixPrefetchGithubDaemonController(
+        daemon=create_daemon(injector),
+        logger_manager=injector.get_logger_factory(),
+        environment=os.environ,
+        metrics_manager=injector.get_metrics_file_writer(),
+    )
+    controller.process_arguments(sys.argv[1:])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
 import sys
 
-from nix_prefetch_github.dependency_injector import DependencyInjector
+from nix_prefetch_github.daemon_client import forward_to_daemon
 
 
 def main() -> None:
+    exit_code = forward_to_daemon("nix-prefetch-github", sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
+    # Only import the rest of the program if there is no daemon to
+    # keep the client fast.
+    from nix_prefetch_github.dependency_injector import DependencyInjector
+
     injector = DependencyInjector()
     controller = injector.get_prefetch_github_repository_controller()
     controller.process_arguments(sys.argv[1:])
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import shlex
+import signal
+import time
+from dataclasses import dataclass, field
+from logging import Logger
+from typing import Dict, List, Optional, Tuple
+
+from nix_prefetch_github.interfaces import Metrics, Tracer
+from nix_prefetch_github.metrics import MetricsRegistryImpl
+from nix_prefetch_github.tracing import TracerImpl
+
+
+def default_concurrency_limits() -> Dict[str, int]:
+    return {
+        "git": 16,
+        "nix-prefetch-url": 8,
+        "nix-prefetch-git": 4,
+    }
+
+
+@dataclass
+class AsyncCommandRunnerImpl:
+    # Runs commands without blocking the event loop. The number of
+    # processes running at the same time is limited per program so
+    # that many cheap git calls do not have to wait for expensive nix
+    # calls and vice versa. Every process is started in its own
+    # process group so that a timeout or cancellation also kills the
+    # processes it spawned.
+    logger: Logger
+    tracer: Tracer = field(default_factory=TracerImpl)
+    metrics: Metrics = field(default_factory=MetricsRegistryImpl)
+    concurrency_limits: Dict[str, int] = field(
+        default_factory=default_concurrency_limits
+    )
+    default_concurrency_limit: int = 16
+    # Upper bound for the timeout of every command.
+    timeout: Optional[float] = None
+    _semaphores: Dict[str, asyncio.Semaphore] = field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    async def run_command(
+        self,
+        command: List[str],
+        cwd: Optional[str] = None,
+        environment_variables: Optional[Dict[str, str]] = None,
+        merge_stderr: bool = False,
+        timeout: Optional[float] = None,
+    ) -> Tuple[int, str]:
+        if environment_variables is None:
+            environment_variables = dict()
+        target_environment = dict(os.environ, **environment_variables)
+        program = os.path.basename(command[0])
+        timeout = _min_timeout(timeout, self.timeout)
+        async with self._get_semaphore(program):
+            self.logger.info("Running command: %s", shlex.join(command))
+            started_at = time.monotonic()
+            with self.tracer.span(command[0], "command", argv=command) as span:
+                process = await asyncio.create_subprocess_exec(
+                    *command,
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=(
+                        asyncio.subprocess.STDOUT
+                        if merge_stderr
+                        else asyncio.subprocess.PIPE
+                    ),
+                    cwd=cwd,
+                    env=target_environment,
+                    start_new_session=True,
+                )
+                try:
+                    process_stdout, process_stderr = await asyncio.wait_for(
+                        process.communicate(), timeout
+                    )
+                except TimeoutError:
+                    await self._kill_process_group(process)
+                    span["returncode"] = process.returncode
+                    self.metrics.increment_counter(
+                        "commands_total", command=program, result="timeout"
+                    )
+                    raise TimeoutError(
+                        f"{shlex.join(command)} did not finish within "
+                        f"{timeout:.1f} seconds"
+                    )
+                except BaseException:
+                    await self._kill_process_group(process)
+                    raise
+                span["returncode"] = process.returncode
+        returncode = _returncode(process)
+        self.metrics.observe(
+            "command_duration_seconds", time.monotonic() - started_at, command=program
+        )
+        self.metrics.increment_counter(
+            "commands_total",
+            command=program,
+            result="failure" if returncode else "success",
+        )
+        if merge_stderr:
+            self._log_process_output(process_stdout)
+        else:
+            self._log_process_output(process_stderr)
+        return returncode, process_stdout.decode()
+
+    def _get_semaphore(self, program: str) -> asyncio.Semaphore:
+        if program not in self._semaphores:
+            self._semaphores[program] = asyncio.Semaphore(
+                self.concurrency_limits.get(program, self.default_concurrency_limit)
+            )
+        return self._semaphores[program]
+
+    async def _kill_process_group(self, process: asyncio.subprocess.Process) -> None:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        # Shield the wait so that the child is reaped even if we were
+        # cancelled.
+        await asyncio.shield(process.wait())
+
+    def _log_process_output(self, process_output: Optional[bytes]) -> None:
+        if process_output:
+            self.logger.info(process_output.decode(errors="replace"))
+
+
+def _min_timeout(*timeouts: Optional[float]) -> Optional[float]:
+    return min((timeout for timeout in timeouts if timeout is not None), default=None)
+
+
+def _returncode(process: asyncio.subprocess.Process) -> int:
+    assert process.returncode is not None
+    return process.returncode
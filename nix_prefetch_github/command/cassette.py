@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from logging import Logger
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from nix_prefetch_github.interfaces import CommandRunner
+
+Key = Tuple[Tuple[str, ...], Tuple[Tuple[str, str], ...], bool]
+
+
+class CassetteError(Exception):
+    pass
+
+
+@dataclass
+class CommandRecording:
+    command: List[str]
+    # Only the variables that were set in addition to the environment
+    # of the process are recorded.
+    environment_variables: Dict[str, str]
+    merge_stderr: bool
+    returncode: int
+    stdout: str
+    duration: float
+    cwd: Optional[str] = None
+
+    def key(self) -> Key:
+        return _key(self.command, self.environment_variables, self.merge_stderr)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "command": self.command,
+            "environment": self.environment_variables,
+            "mergeStderr": self.merge_stderr,
+            "returncode": self.returncode,
+            "stdout": self.stdout,
+            "duration": self.duration,
+            "cwd": self.cwd,
+        }
+
+    @classmethod
+    def from_json(cls, document: Any) -> CommandRecording:
+        try:
+            return cls(
+                command=[str(argument) for argument in document["command"]],
+                environment_variables={
+                    str(name): str(value)
+                    for name, value in document.get("environment", {}).items()
+                },
+                merge_stderr=bool(document.get("mergeStderr", False)),
+                returncode=int(document["returncode"]),
+                stdout=str(document["stdout"]),
+                duration=float(document.get("duration", 0)),
+                cwd=document.get("cwd"),
+            )
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            raise CassetteError(f"invalid recording: {e!r}")
+
+
+def read_cassette(path: str) -> List[CommandRecording]:
+    # Cassettes contain one recording per line so that recordings of
+    # concurrent commands can be appended without rewriting the file.
+    recordings: List[CommandRecording] = []
+    with open(path) as handle:
+        for line_number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                recordings.append(CommandRecording.from_json(json.loads(line)))
+            except (ValueError, CassetteError) as e:
+                raise CassetteError(f"{path}, line {line_number}: {e}")
+    return recordings
+
+
+@dataclass
+class RecordingCommandRunner:
+    command_runner: CommandRunner
+    cassette_path: str
+    clock: Callable[[], float] = field(default=time.monotonic)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def run_command(
+        self,
+        command: List[str],
+        cwd: Optional[str] = None,
+        environment_variables: Optional[Dict[str, str]] = None,
+        merge_stderr: bool = False,
+        timeout: Optional[float] = None,
+    ) -> Tuple[int, str]:
+        started_at = self.clock()
+        returncode, stdout = self.command_runner.run_command(
+            command, cwd, environment_variables, merge_stderr, timeout
+        )
+        recording = CommandRecording(
+            command=list(command),
+            environment_variables=dict(environment_variables or {}),
+            merge_stderr=merge_stderr,
+            returncode=returncode,
+            stdout=stdout,
+            duration=self.clock() - started_at,
+            cwd=cwd,
+        )
+        with self._lock:
+            with open(self.cassette_path, "a") as handle:
+                handle.write(json.dumps(recording.to_json()) + "\n")
+        return returncode, stdout
+
+
+@dataclass
+class ReplayingCommandRunner:
+    recordings: List[CommandRecording]
+    logger: Logger
+    # Wait as long as the recorded command took to run so that
+    # benchmarks see the timing of the recorded environment.
+    reproduce_latency: bool = False
+    sleep: Callable[[float], None] = field(default=time.sleep)
+    _replayed: Dict[Key, int] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _index: Dict[Key, List[CommandRecording]] = field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    def __post_init__(self) -> None:
+        for recording in self.recordings:
+            self._index.setdefault(recording.key(), []).append(recording)
+
+    def run_command(
+        self,
+        command: List[str],
+        cwd: Optional[str] = None,
+        environment_variables: Optional[Dict[str, str]] = None,
+        merge_stderr: bool = False,
+        timeout: Optional[float] = None,
+    ) -> Tuple[int, str]:
+        key = _key(command, environment_variables or {}, merge_stderr)
+        candidates = self._index.get(key)
+        if not candidates:
+            raise CassetteError(f"Command was not recorded: {' '.join(command)}")
+        # Recordings of the same command are replayed in the order they
+        # were recorded. The last one is repeated once all were used.
+        with self._lock:
+            index = self._replayed.get(key, 0)
+            self._replayed[key] = index + 1
+        recording = candidates[min(index, len(candidates) - 1)]
+        self.logger.info("Replaying command: %s", " ".join(command))
+        if self.reproduce_latency:
+            self.sleep(recording.duration)
+        return recording.returncode, recording.stdout
+
+
+def _key(
+    command: List[str], environment_variables: Dict[str, str], merge_stderr: bool
+) -> Key:
+    return (tuple(command), tuple(sorted(environment_variables.items())), merge_stderr)
@@ -1,14 +1,21 @@
 import os
 import shlex
 import subprocess
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 from logging import Logger
 from typing import Dict, List, Optional, Tuple
 
+from nix_prefetch_github.interfaces import Metrics, Tracer
+from nix_prefetch_github.metrics import MetricsRegistryImpl
+from nix_prefetch_github.tracing import TracerImpl
+
 
 @dataclass(frozen=True)
 class CommandRunnerImpl:
     logger: Logger
+    tracer: Tracer = field(default_factory=TracerImpl)
+    metrics: Metrics = field(default_factory=MetricsRegistryImpl)
 
     def run_command(
         self,
@@ -16,21 +23,47 @@ class CommandRunnerImpl:
         cwd: Optional[str] = None,
         environment_variables: Optional[Dict[str, str]] = None,
         merge_stderr: bool = False,
+        timeout: Optional[float] = None,
     ) -> Tuple[int, str]:
         if environment_variables is None:
             environment_variables = dict()
         target_environment = dict(os.environ, **environment_variables)
         stderr = subprocess.STDOUT if merge_stderr else subprocess.PIPE
         self.logger.info("Running command: %s", shlex.join(command))
-        process = subprocess.Popen(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=stderr,
-            universal_newlines=True,
-            cwd=cwd,
-            env=target_environment,
+        started_at = time.monotonic()
+        with self.tracer.span(command[0], "command", argv=command) as span:
+            process = subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=stderr,
+                universal_newlines=True,
+                cwd=cwd,
+                env=target_environment,
+            )
+            try:
+                process_stdout, process_stderr = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                span["returncode"] = process.returncode
+                self.metrics.increment_counter(
+                    "commands_total",
+                    command=os.path.basename(command[0]),
+                    result="timeout",
+                )
+                raise TimeoutError(
+                    f"{shlex.join(command)} did not finish within {timeout:.1f} seconds"
+                )
+            span["returncode"] = process.returncode
+        program = os.path.basename(command[0])
+        self.metrics.observe(
+            "command_duration_seconds", time.monotonic() - started_at, command=program
+        )
+        self.metrics.increment_counter(
+            "commands_total",
+            command=program,
+            result="failure" if process.returncode else "success",
         )
-        process_stdout, process_stderr = process.communicate()
         if merge_stderr:
             self._log_process_output(process_stdout)
         else:
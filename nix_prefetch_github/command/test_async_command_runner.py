@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from io import StringIO
+from unittest import TestCase
+
+from nix_prefetch_github.command.async_command_runner import AsyncCommandRunnerImpl
+from nix_prefetch_github.metrics import MetricsRegistryImpl
+from nix_prefetch_github.tracing import TracerImpl
+
+
+class AsyncCommandRunnerTests(TestCase):
+    def setUp(self) -> None:
+        self.stream = StringIO()
+        self.log = logging.getLogger("async_command_runner_test")
+        self.log.setLevel(logging.DEBUG)
+        for handler in self.log.handlers:
+            self.log.removeHandler(handler)
+        self.log.addHandler(logging.StreamHandler(self.stream))
+        self.tracer = TracerImpl()
+        self.metrics = MetricsRegistryImpl()
+        self.command_runner = AsyncCommandRunnerImpl(
+            logger=self.log, tracer=self.tracer, metrics=self.metrics
+        )
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_returncode_and_stdout_are_returned(self) -> None:
+        self.assertEqual(
+            asyncio.run(
+                self.command_runner.run_command(
+                    ["python", "-c", "print('test' 'string'); exit(3)"]
+                )
+            ),
+            (3, "teststring\n"),
+        )
+
+    def test_stderr_is_logged_but_not_returned(self) -> None:
+        _, output = asyncio.run(
+            self.command_runner.run_command(
+                [
+                    "python",
+                    "-c",
+                    "import sys; print('test' 'string', file=sys.stderr)",
+                ]
+            )
+        )
+        self.assertEqual(output, "")
+        self.assertIn("teststring", self.stream.getvalue())
+
+    def test_stderr_can_be_merged_into_stdout(self) -> None:
+        _, output = asyncio.run(
+            self.command_runner.run_command(
+                [
+                    "python",
+                    "-c",
+                    "import sys; print('test' 'string', file=sys.stderr)",
+                ],
+                merge_stderr=True,
+            )
+        )
+        self.assertEqual(output, "teststring\n")
+
+    def test_environment_variables_and_working_directory_are_used(self) -> None:
+        _, output = asyncio.run(
+            self.command_runner.run_command(
+                ["sh", "-c", 'echo "$TEST_VARIABLE $PWD"'],
+                cwd=self.directory.name,
+                environment_variables={"TEST_VARIABLE": "value"},
+            )
+        )
+        self.assertEqual(output, f"value {os.path.realpath(self.directory.name)}\n")
+
+    def test_concurrency_is_limited_per_program(self) -> None:
+        self.command_runner.concurrency_limits = {"sh": 1}
+        log_path = os.path.join(self.directory.name, "log")
+        script = f"echo start >> {log_path}; sleep 0.05; echo end >> {log_path}"
+
+        async def run() -> None:
+            await asyncio.gather(
+                *(
+                    self.command_runner.run_command(["sh", "-c", script])
+                    for _ in range(3)
+                )
+            )
+
+        asyncio.run(run())
+        with open(log_path) as f:
+            self.assertEqual(f.read().split(), ["start", "end"] * 3)
+
+    def test_programs_with_different_names_run_concurrently(self) -> None:
+        self.command_runner.concurrency_limits = {"sh": 1, "python": 1}
+        started = time.monotonic()
+
+        async def run() -> None:
+            await asyncio.gather(
+                self.command_runner.run_command(["sh", "-c", "sleep 0.5"]),
+                self.command_runner.run_command(
+                    ["python", "-c", "import time; time.sleep(0.5)"]
+                ),
+            )
+
+        asyncio.run(run())
+        self.assertLess(time.monotonic() - started, 0.95)
+
+    def test_process_group_is_killed_on_timeout(self) -> None:
+        self.command_runner.timeout = 0.2
+        pid_path = os.path.join(self.directory.name, "pid")
+        started = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            asyncio.run(
+                self.command_runner.run_command(
+                    ["sh", "-c", f"sleep 30 & echo $! > {pid_path}; wait"]
+                )
+            )
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertProcessTerminates(pid_path)
+        self.assertEqual(
+            self.metrics.counters,
+            {("commands_total", (("command", "sh"), ("result", "timeout"))): 1},
+        )
+
+    def test_timeout_can_be_given_per_command(self) -> None:
+        with self.assertRaises(TimeoutError):
+            asyncio.run(
+                self.command_runner.run_command(
+                    ["python", "-c", "import time; time.sleep(60)"], timeout=0.1
+                )
+            )
+
+    def test_commands_are_traced(self) -> None:
+        self.tracer.is_enabled = True
+        command = ["python", "-c", "raise SystemExit(3)"]
+        asyncio.run(self.command_runner.run_command(command))
+        (event,) = self.tracer.events
+        self.assertEqual(event["name"], "python")
+        self.assertEqual(event["args"], {"argv": command, "returncode": 3})
+
+    def test_failed_commands_are_counted(self) -> None:
+        asyncio.run(self.command_runner.run_command(["python", "-c", "pass"]))
+        asyncio.run(
+            self.command_runner.run_command(["python", "-c", "raise SystemExit(1)"])
+        )
+        self.assertEqual(
+            self.metrics.counters,
+            {
+                ("commands_total", (("command", "python"), ("result", "success"))): 1,
+                ("commands_total", (("command", "python"), ("result", "failure"))): 1,
+            },
+        )
+
+    def test_process_group_is_killed_on_cancellation(self) -> None:
+        pid_path = os.path.join(self.directory.name, "pid")
+
+        async def run() -> None:
+            task = asyncio.create_task(
+                self.command_runner.run_command(
+                    ["sh", "-c", f"sleep 30 & echo $! > {pid_path}; wait"]
+                )
+            )
+            while not os.path.exists(pid_path):
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        self.assertProcessTerminates(pid_path)
+
+    def assertProcessTerminates(self, pid_path: str) -> None:
+        for _ in range(100):
+            with open(pid_path) as f:
+                contents = f.read().strip()
+            if contents:
+                break
+            time.sleep(0.01)
+        pid = int(contents)
+        # The killed process might not have been reaped by init yet.
+        for _ in range(200):
+            if not is_running(pid):
+                return
+            time.sleep(0.01)
+        self.fail(f"Process {pid} is still running")
+
+
+def is_running(pid: int) -> bool:
+    if os.path.isdir("/proc"):
+        # Zombie processes still exist until they are reaped.
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                return f.read().split(")")[-1].split()[0] not in ("Z", "X")
+        except FileNotFoundError:
+            return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+import tempfile
+from typing import List
+from unittest import TestCase
+
+from nix_prefetch_github.command.cassette import (
+    CassetteError,
+    CommandRecording,
+    RecordingCommandRunner,
+    ReplayingCommandRunner,
+    read_cassette,
+)
+from nix_prefetch_github.command.command_runner import CommandRunnerImpl
+
+
+class CassetteTests(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.cassette_path = os.path.join(self.directory.name, "commands.jsonl")
+        self.time = 100.0
+        self.recorder = RecordingCommandRunner(
+            command_runner=CommandRunnerImpl(logger=logging.getLogger(__name__)),
+            cassette_path=self.cassette_path,
+            clock=self.clock,
+        )
+        self.sleeps: List[float] = []
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_recorded_command_returns_output_of_command(self) -> None:
+        self.assertEqual(
+            self.recorder.run_command(["python", "-c", "print('output')"]),
+            (0, "output\n"),
+        )
+
+    def test_recording_contains_command_and_its_result(self) -> None:
+        self.recorder.run_command(
+            ["python", "-c", "import os; print(os.environ['VARIABLE'])"],
+            environment_variables={"VARIABLE": "value"},
+        )
+        (recording,) = read_cassette(self.cassette_path)
+        self.assertEqual(
+            recording,
+            CommandRecording(
+                command=["python", "-c", "import os; print(os.environ['VARIABLE'])"],
+                environment_variables={"VARIABLE": "value"},
+                merge_stderr=False,
+                returncode=0,
+                stdout="value\n",
+                duration=0.5,
+            ),
+        )
+
+    def test_replayed_command_returns_recorded_result(self) -> None:
+        self.recorder.run_command(["python", "-c", "print(1); raise SystemExit(2)"])
+        self.assertEqual(
+            self.replayer().run_command(
+                ["python", "-c", "print(1); raise SystemExit(2)"]
+            ),
+            (2, "1\n"),
+        )
+
+    def test_recordings_of_same_command_are_replayed_in_order(self) -> None:
+        self.record(stdout="first")
+        self.record(stdout="second")
+        replayer = self.replayer()
+        self.assertEqual(
+            [replayer.run_command(["command"])[1] for _ in range(3)],
+            ["first", "second", "second"],
+        )
+
+    def test_commands_with_other_environment_are_not_replayed(self) -> None:
+        self.record(stdout="output")
+        with self.assertRaises(CassetteError):
+            self.replayer().run_command(
+                ["command"], environment_variables={"VARIABLE": "value"}
+            )
+
+    def test_latency_is_only_reproduced_if_requested(self) -> None:
+        self.record(stdout="output", duration=2.5)
+        self.replayer().run_command(["command"])
+        self.replayer(reproduce_latency=True).run_command(["command"])
+        self.assertEqual(self.sleeps, [2.5])
+
+    def test_invalid_cassette_is_rejected(self) -> None:
+        with open(self.cassette_path, "w") as f:
+            f.write('{"command": ["command"]}\n')
+        with self.assertRaises(CassetteError):
+            read_cassette(self.cassette_path)
+
+    def clock(self) -> float:
+        self.time += 0.5
+        return self.time
+
+    def record(self, stdout: str, duration: float = 0) -> None:
+        recording = CommandRecording(
+            command=["command"],
+            environment_variables=dict(),
+            merge_stderr=False,
+            returncode=0,
+            stdout=stdout,
+            duration=duration,
+        )
+        with open(self.cassette_path, "a") as f:
+            f.write(json.dumps(recording.to_json()) + "\n")
+
+    def replayer(self, reproduce_latency: bool = False) -> ReplayingCommandRunner:
+        return ReplayingCommandRunner(
+            recordings=read_cassette(self.cassette_path),
+            logger=logging.getLogger(__name__),
+            reproduce_latency=reproduce_latency,
+            sleep=self.sleeps.append,
+        )
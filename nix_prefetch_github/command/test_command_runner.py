@@ -3,6 +3,8 @@ from io import StringIO
 from unittest import TestCase
 
 from nix_prefetch_github.command.command_runner import CommandRunnerImpl
+from nix_prefetch_github.metrics import MetricsRegistryImpl
+from nix_prefetch_github.tracing import TracerImpl
 
 
 class CommandRunnerTests(TestCase):
@@ -14,8 +16,10 @@ class CommandRunnerTests(TestCase):
         for handler in self.log.handlers:
             self.log.removeHandler(handler)
         self.log.addHandler(self.handler)
+        self.tracer = TracerImpl()
+        self.metrics = MetricsRegistryImpl()
         self.command_runner = CommandRunnerImpl(
-            logger=self.log,
+            logger=self.log, tracer=self.tracer, metrics=self.metrics
         )
 
     def test_that_for_command_without_stderr_output_only_command_call_is_logged(
@@ -74,6 +78,32 @@ class CommandRunnerTests(TestCase):
         )
         self.assertNotInLogs("\n\n")
 
+    def test_that_commands_are_killed_after_timeout(self) -> None:
+        with self.assertRaises(TimeoutError):
+            self.command_runner.run_command(
+                command=["python", "-c", "import time; time.sleep(60)"],
+                timeout=0.1,
+            )
+
+    def test_that_commands_are_traced(self) -> None:
+        self.tracer.is_enabled = True
+        command = ["python", "-c", "raise SystemExit(3)"]
+        self.command_runner.run_command(command=command)
+        (event,) = self.tracer.events
+        self.assertEqual(event["name"], "python")
+        self.assertEqual(event["args"], {"argv": command, "returncode": 3})
+
+    def test_that_failed_commands_are_counted(self) -> None:
+        self.command_runner.run_command(command=["python", "-c", "pass"])
+        self.command_runner.run_command(command=["python", "-c", "raise SystemExit(1)"])
+        self.assertEqual(
+            self.metrics.counters,
+            {
+                ("commands_total", (("command", "python"), ("result", "success"))): 1,
+                ("commands_total", (("command", "python"), ("result", "failure"))): 1,
+            },
+        )
+
     def assertInLogs(self, log_output: str) -> None:
         self.stream.seek(0)
         output = self.stream.read()
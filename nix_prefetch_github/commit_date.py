@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from nix_prefetch_github.hash import is_sha1_hash
+from nix_prefetch_github.interfaces import (
+    GithubAPI,
+    GithubRepository,
+    PrefetchedRessource,
+    PrefetchOptions,
+    RenderingFormat,
+    RenderingFormatSelector,
+    UrlHasher,
+)
+
+
+@dataclass
+class CommitDatePrefetcher:
+    # nix-prefetch-url does not report the commit date that the meta
+    # output contains. It is requested from the GitHub API while the
+    # repository is hashed so that the request does not add to the
+    # time that prefetching takes.
+    url_hasher: UrlHasher
+    github_api: GithubAPI
+    rendering_format_selector: RenderingFormatSelector
+
+    def calculate_hash_sum(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+    ) -> Optional[PrefetchedRessource]:
+        if (
+            self.rendering_format_selector.get_rendering_format()
+            != RenderingFormat.meta
+            or not is_sha1_hash(revision)
+            or prefetch_options != PrefetchOptions()
+        ):
+            return self.url_hasher.calculate_hash_sum(
+                repository=repository,
+                revision=revision,
+                prefetch_options=prefetch_options,
+            )
+        executor = ThreadPoolExecutor(max_workers=1)
+        commit_date = executor.submit(
+            self.github_api.get_commit_date, repository, revision
+        )
+        executor.shutdown(wait=False)
+        prefetched_ressource = self.url_hasher.calculate_hash_sum(
+            repository=repository,
+            revision=revision,
+            prefetch_options=prefetch_options,
+        )
+        if prefetched_ressource is None or prefetched_ressource.commit_date:
+            return prefetched_ressource
+        return dataclasses.replace(
+            prefetched_ressource, commit_date=commit_date.result()
+        )
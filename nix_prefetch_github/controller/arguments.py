@@ -3,8 +3,15 @@ import sys
 from logging import WARNING
 from typing import Any, Optional, Type
 
-from nix_prefetch_github.interfaces import PrefetchOptions, RenderingFormat
+from nix_prefetch_github.cache import CacheConfiguration
+from nix_prefetch_github.interfaces import (
+    HashingBackend,
+    PrefetchOptions,
+    RenderingFormat,
+)
 from nix_prefetch_github.logging import LoggingConfiguration
+from nix_prefetch_github.metrics import MetricsConfiguration
+from nix_prefetch_github.retry import RetryConfiguration
 from nix_prefetch_github.version import VERSION_STRING
 
 
@@ -28,6 +35,20 @@ def set_argument(name: str, value: Any) -> Type[argparse.Action]:
     return _SetArgument
 
 
+def set_argument_from_value(name: str) -> Type[argparse.Action]:
+    class _SetArgumentFromValue(argparse.Action):
+        def __call__(
+            self,
+            parser: argparse.ArgumentParser,
+            namespace: argparse.Namespace,
+            values: Any,
+            option_string: Optional[str] = None,
+        ) -> None:
+            setattr(getattr(namespace, self.dest), name, values)
+
+    return _SetArgumentFromValue
+
+
 class increase_log_level(argparse.Action):
     def __init__(
         self, option_strings: Any, dest: Any, nargs: Any = None, **kwargs: Any
@@ -65,6 +86,24 @@ class decrease_log_level(argparse.Action):
 
 
 def get_options_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        add_help=False,
+        parents=[
+            get_prefetch_options_argument_parser(),
+            get_logging_argument_parser(),
+            get_rendering_format_argument_parser(),
+            get_cache_argument_parser(),
+            get_retry_argument_parser(),
+            get_hashing_backend_argument_parser(),
+            get_tracing_argument_parser(),
+            get_metrics_argument_parser(),
+            get_version_argument_parser(),
+        ],
+    )
+    return parser
+
+
+def get_prefetch_options_argument_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(add_help=False)
     parser.add_argument(
         "--fetch-submodules",
@@ -103,6 +142,11 @@ def get_options_argument_parser() -> argparse.ArgumentParser:
         action=set_argument("deep_clone", False),
         help="Don't include the repository history in the output derivation.",
     )
+    return parser
+
+
+def get_logging_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(add_help=False)
     parser.add_argument(
         "--verbose",
         "-v",
@@ -118,6 +162,11 @@ def get_options_argument_parser() -> argparse.ArgumentParser:
         action=decrease_log_level,
         help="Print less information about the programs execution.",
     )
+    return parser
+
+
+def get_rendering_format_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(add_help=False)
     parser.add_argument(
         "--nix",
         dest="rendering_format",
@@ -140,6 +189,123 @@ def get_options_argument_parser() -> argparse.ArgumentParser:
         const=RenderingFormat.meta,
         help="Output the results in JSON format where the arguments to fetchFromGitHub are located under the src key of the resulting json dictionary and meta information about the prefetched repository is located under the meta key of the output.",
     )
+    return parser
+
+
+def get_cache_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument(
+        "--refresh",
+        dest="cache_configuration",
+        default=CacheConfiguration(),
+        action=set_argument("refresh", True),
+        help="Ignore cached git refs and hash sums and query them again. The cache is updated with the results.",
+    )
+    parser.add_argument(
+        "--branch-ttl",
+        dest="cache_configuration",
+        type=float,
+        metavar="SECONDS",
+        action=set_argument_from_value("branch_ttl"),
+        help="Number of seconds that cached branches are considered up to date. Defaults to 300 seconds.",
+    )
+    parser.add_argument(
+        "--tag-ttl",
+        dest="cache_configuration",
+        type=float,
+        metavar="SECONDS",
+        action=set_argument_from_value("tag_ttl"),
+        help="Number of seconds that cached tags are considered up to date. Defaults to one day.",
+    )
+    return parser
+
+
+def get_retry_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument(
+        "--retries",
+        dest="retry_configuration",
+        default=RetryConfiguration(),
+        type=int,
+        metavar="N",
+        action=set_argument_from_value("retries"),
+        help="Number of times requests to GitHub and calls to git and nix-prefetch-url are repeated when they fail because of network errors, server errors or rate limiting. Defaults to 3.",
+    )
+    parser.add_argument(
+        "--retry-deadline",
+        dest="retry_configuration",
+        type=float,
+        metavar="SECONDS",
+        action=set_argument_from_value("deadline"),
+        help="Number of seconds after the start of a prefetch after which failed requests are not repeated anymore. Defaults to 300 seconds.",
+    )
+    return parser
+
+
+def get_hashing_backend_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument(
+        "--hashing-backend",
+        dest="hashing_backend",
+        default=None,
+        type=hashing_backend,
+        metavar="{nix,builtin}",
+        help="Program used to calculate the hash of GitHub's source archives. The nix backend uses nix-prefetch-url and adds the source to the nix store. The builtin backend hashes the archive while it is downloaded without requiring nix. Prefetching with git, e.g. with --fetch-submodules, always uses nix. Defaults to builtin with --meta and to nix otherwise. With the nix backend --meta requests the commit date from the GitHub API.",
+    )
+    return parser
+
+
+def get_hashing_backend(args: argparse.Namespace) -> HashingBackend:
+    if args.hashing_backend is not None:
+        return args.hashing_backend
+    # The builtin backend reads the commit date from the downloaded
+    # archive, so --meta does not need to query the GitHub API.
+    if getattr(args, "rendering_format", None) == RenderingFormat.meta:
+        return HashingBackend.builtin
+    return HashingBackend.nix
+
+
+def hashing_backend(value: str) -> HashingBackend:
+    try:
+        return HashingBackend[value]
+    except KeyError:
+        raise argparse.ArgumentTypeError(f"invalid hashing backend: {value}")
+
+
+def get_tracing_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument(
+        "--trace-file",
+        metavar="PATH",
+        default=None,
+        help="Write the time spent in the individual steps of the program, e.g. resolving the revision, hashing and running external commands, to PATH in the trace event format of Chrome. The trace can be inspected with Perfetto or chrome://tracing.",
+    )
+    return parser
+
+
+def get_metrics_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument(
+        "--metrics-file",
+        dest="metrics_configuration",
+        default=MetricsConfiguration(),
+        metavar="PATH",
+        action=set_argument_from_value("metrics_file"),
+        help="Write metrics like the number of prefetched repositories, their duration and cache hits to PATH in the text format of Prometheus when the program exits. The file is replaced atomically so that it can be read by the textfile collector of the node exporter.",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        dest="metrics_configuration",
+        type=float,
+        metavar="SECONDS",
+        action=set_argument_from_value("interval"),
+        help="Update the metrics file every SECONDS seconds in addition to writing it when the program exits.",
+    )
+    return parser
+
+
+def get_version_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(add_help=False)
     parser.add_argument(
         "--version", action="version", version="%(prog)s " + VERSION_STRING
     )
@@ -0,0 +1,114 @@
+import json
+from typing import Any, Iterator, TextIO, Union
+
+from nix_prefetch_github.interfaces import GithubRepository, PrefetchOptions
+from nix_prefetch_github.use_cases.prefetch_batch import BatchEntry, InvalidBatchEntry
+
+
+class ManifestError(Exception):
+    pass
+
+
+def read_manifest(
+    stream: TextIO, default_options: PrefetchOptions
+) -> Iterator[BatchEntry]:
+    for entry in read_manifest_entries(stream, default_options):
+        if isinstance(entry, InvalidBatchEntry):
+            raise ManifestError(entry.error)
+        yield entry
+
+
+def read_manifest_entries(
+    stream: TextIO, default_options: PrefetchOptions
+) -> Iterator[Union[BatchEntry, InvalidBatchEntry]]:
+    # A manifest is either a single JSON list of entries or a stream
+    # of JSON documents, one per line (NDJSON). NDJSON manifests are
+    # read lazily so that huge manifests do not have to be kept in
+    # memory. Entries that cannot be read are yielded as
+    # InvalidBatchEntry so that the remaining entries can still be
+    # prefetched.
+    skipped_lines = 0
+    first_line = stream.readline()
+    while first_line and not first_line.strip():
+        skipped_lines += 1
+        first_line = stream.readline()
+    if first_line.lstrip().startswith("["):
+        try:
+            documents = json.loads(first_line + stream.read())
+        except json.JSONDecodeError as e:
+            yield InvalidBatchEntry(error=f"Manifest is not valid JSON: {e}")
+            return
+        if not isinstance(documents, list):
+            yield InvalidBatchEntry(error="Manifest must be a JSON list of entries")
+            return
+        for index, document in enumerate(documents):
+            yield _parse_or_invalid(document, default_options, f"entry {index}")
+    else:
+        for line_number, line in enumerate(
+            _prepend(first_line, stream), start=skipped_lines + 1
+        ):
+            if not line.strip():
+                continue
+            try:
+                document = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield InvalidBatchEntry(
+                    error=f"Line {line_number} is not valid JSON: {e}"
+                )
+                continue
+            yield _parse_or_invalid(document, default_options, f"line {line_number}")
+
+
+def parse_manifest_entry(
+    document: Any, default_options: PrefetchOptions, location: str
+) -> BatchEntry:
+    if not isinstance(document, dict):
+        raise ManifestError(f"Manifest {location} must be a JSON object")
+    owner = document.get("owner")
+    repo = document.get("repo")
+    if not isinstance(owner, str) or not isinstance(repo, str):
+        raise ManifestError(
+            f"Manifest {location} must specify `owner` and `repo` as strings"
+        )
+    rev = document.get("rev")
+    if rev is not None and not isinstance(rev, str):
+        raise ManifestError(f"Manifest {location} has a `rev` that is not a string")
+    return BatchEntry(
+        repository=GithubRepository(owner=owner, name=repo),
+        revision=rev,
+        prefetch_options=PrefetchOptions(
+            fetch_submodules=_get_flag(
+                document,
+                "fetchSubmodules",
+                default_options.fetch_submodules,
+                location,
+            ),
+            deep_clone=_get_flag(
+                document, "deepClone", default_options.deep_clone, location
+            ),
+            leave_dot_git=_get_flag(
+                document, "leaveDotGit", default_options.leave_dot_git, location
+            ),
+        ),
+    )
+
+
+def _parse_or_invalid(
+    document: Any, default_options: PrefetchOptions, location: str
+) -> Union[BatchEntry, InvalidBatchEntry]:
+    try:
+        return parse_manifest_entry(document, default_options, location)
+    except ManifestError as e:
+        return InvalidBatchEntry(error=str(e))
+
+
+def _get_flag(document: Any, key: str, default: bool, location: str) -> bool:
+    value = document.get(key, default)
+    if not isinstance(value, bool):
+        raise ManifestError(f"Manifest {location} has a `{key}` that is not a boolean")
+    return value
+
+
+def _prepend(first_line: str, stream: TextIO) -> Iterator[str]:
+    yield first_line
+    yield from stream
@@ -0,0 +1,100 @@
+import argparse
+import sys
+from dataclasses import dataclass
+from typing import List, TextIO
+
+from nix_prefetch_github.cache import CacheManager
+from nix_prefetch_github.controller.arguments import (
+    get_cache_argument_parser,
+    get_hashing_backend,
+    get_hashing_backend_argument_parser,
+    get_logging_argument_parser,
+    get_metrics_argument_parser,
+    get_prefetch_options_argument_parser,
+    get_retry_argument_parser,
+    get_tracing_argument_parser,
+    get_version_argument_parser,
+)
+from nix_prefetch_github.controller.manifest import read_manifest_entries
+from nix_prefetch_github.interfaces import HashingBackendSelector
+from nix_prefetch_github.logging import LoggerManager
+from nix_prefetch_github.metrics import MetricsManager
+from nix_prefetch_github.retry import RetryManager
+from nix_prefetch_github.tracing import TraceManager
+from nix_prefetch_github.use_cases.prefetch_batch import PrefetchBatchUseCase, Request
+
+
+@dataclass
+class PrefetchBatchController:
+    use_case: PrefetchBatchUseCase
+    logger_manager: LoggerManager
+    cache_manager: CacheManager
+    retry_manager: RetryManager
+    hashing_backend_selector: HashingBackendSelector
+    trace_manager: TraceManager
+    metrics_manager: MetricsManager
+
+    def process_arguments(self, arguments: List[str]) -> None:
+        parser = get_argument_parser()
+        args = parser.parse_args(arguments)
+        self.logger_manager.set_logging_configuration(args.logging_configuration)
+        self.cache_manager.set_cache_configuration(args.cache_configuration)
+        self.retry_manager.set_retry_configuration(args.retry_configuration)
+        self.hashing_backend_selector.set_hashing_backend(get_hashing_backend(args))
+        if args.jobs < 1:
+            parser.error("--jobs must be at least 1")
+        with self.metrics_manager.record_metrics(
+            args.metrics_configuration
+        ), self.trace_manager.record_trace(args.trace_file):
+            if args.manifest == "-":
+                self._prefetch_manifest(sys.stdin, args)
+            else:
+                with open(args.manifest) as manifest:
+                    self._prefetch_manifest(manifest, args)
+
+    def _prefetch_manifest(self, manifest: TextIO, args: argparse.Namespace) -> None:
+        # Entries of the manifest that cannot be read are reported like
+        # failed prefetches.
+        self.use_case.prefetch_batch(
+            request=Request(
+                entries=read_manifest_entries(manifest, args.prefetch_options),
+                jobs=args.jobs,
+                latest_release=args.latest_release,
+            )
+        )
+
+
+# Unfortunately this needs to be a free standing function so that
+# sphinx-argparse can generate documentation for it.
+def get_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        "nix-prefetch-github-batch",
+        parents=[
+            get_prefetch_options_argument_parser(),
+            get_logging_argument_parser(),
+            get_cache_argument_parser(),
+            get_retry_argument_parser(),
+            get_hashing_backend_argument_parser(),
+            get_tracing_argument_parser(),
+            get_metrics_argument_parser(),
+            get_version_argument_parser(),
+        ],
+    )
+    parser.add_argument(
+        "manifest",
+        help="Path to a manifest file containing JSON or newline delimited JSON entries with the keys owner, repo and optionally rev, fetchSubmodules, leaveDotGit and deepClone. Options missing from an entry default to the ones given on the command line. Use - to read the manifest from standard input.",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=4,
+        help="Number of repositories that are prefetched concurrently.",
+    )
+    parser.add_argument(
+        "--latest-release",
+        action="store_true",
+        default=False,
+        help="Prefetch entries without a rev at the latest release of their repository instead of the default branch. With GITHUB_TOKEN set, the releases of up to 100 repositories are requested with a single query of GitHub's GraphQL API.",
+    )
+    return parser
@@ -1,9 +1,20 @@
 import argparse
 from typing import List
 
-from nix_prefetch_github.controller.arguments import get_options_argument_parser
-from nix_prefetch_github.interfaces import GithubRepository, RenderingFormatSelector
+from nix_prefetch_github.cache import CacheManager
+from nix_prefetch_github.controller.arguments import (
+    get_hashing_backend,
+    get_options_argument_parser,
+)
+from nix_prefetch_github.interfaces import (
+    GithubRepository,
+    HashingBackendSelector,
+    RenderingFormatSelector,
+)
 from nix_prefetch_github.logging import LoggerManager
+from nix_prefetch_github.metrics import MetricsManager
+from nix_prefetch_github.retry import RetryManager
+from nix_prefetch_github.tracing import TraceManager
 from nix_prefetch_github.use_cases.prefetch_github_repository import (
     PrefetchGithubRepositoryUseCase,
     Request,
@@ -16,23 +27,39 @@ class NixPrefetchGithubController:
         use_case: PrefetchGithubRepositoryUseCase,
         logger_manager: LoggerManager,
         rendering_format_selector: RenderingFormatSelector,
+        cache_manager: CacheManager,
+        retry_manager: RetryManager,
+        hashing_backend_selector: HashingBackendSelector,
+        trace_manager: TraceManager,
+        metrics_manager: MetricsManager,
     ) -> None:
         self._use_case = use_case
         self._logger_manager = logger_manager
         self._rendering_format_selector = rendering_format_selector
+        self._cache_manager = cache_manager
+        self._retry_manager = retry_manager
+        self._hashing_backend_selector = hashing_backend_selector
+        self._trace_manager = trace_manager
+        self._metrics_manager = metrics_manager
 
     def process_arguments(self, arguments: List[str]) -> None:
         parser = get_argument_parser()
         args = parser.parse_args(arguments)
         self._logger_manager.set_logging_configuration(args.logging_configuration)
         self._rendering_format_selector.set_rendering_format(args.rendering_format)
-        self._use_case.prefetch_github_repository(
-            request=Request(
-                repository=GithubRepository(owner=args.owner, name=args.repo),
-                revision=args.rev,
-                prefetch_options=args.prefetch_options,
+        self._cache_manager.set_cache_configuration(args.cache_configuration)
+        self._retry_manager.set_retry_configuration(args.retry_configuration)
+        self._hashing_backend_selector.set_hashing_backend(get_hashing_backend(args))
+        with self._metrics_manager.record_metrics(
+            args.metrics_configuration
+        ), self._trace_manager.record_trace(args.trace_file):
+            self._use_case.prefetch_github_repository(
+                request=Request(
+                    repository=GithubRepository(owner=args.owner, name=args.repo),
+                    revision=args.rev,
+                    prefetch_options=args.prefetch_options,
+                )
             )
-        )
 
 
 # Unfortunately this needs to be a free standing function so that
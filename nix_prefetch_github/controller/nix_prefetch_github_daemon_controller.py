@@ -0,0 +1,50 @@
+import argparse
+from dataclasses import dataclass
+from typing import List, Mapping, Protocol
+
+from nix_prefetch_github.controller.arguments import (
+    get_logging_argument_parser,
+    get_metrics_argument_parser,
+    get_version_argument_parser,
+)
+from nix_prefetch_github.daemon_client import get_daemon_socket_path
+from nix_prefetch_github.logging import LoggerManager
+from nix_prefetch_github.metrics import MetricsManager
+
+
+class Daemon(Protocol):
+    def serve(self, socket_path: str) -> None: ...
+
+
+@dataclass
+class NixPrefetchGithubDaemonController:
+    daemon: Daemon
+    logger_manager: LoggerManager
+    environment: Mapping[str, str]
+    metrics_manager: MetricsManager
+
+    def process_arguments(self, arguments: List[str]) -> None:
+        parser = get_argument_parser()
+        args = parser.parse_args(arguments)
+        self.logger_manager.set_logging_configuration(args.logging_configuration)
+        with self.metrics_manager.record_metrics(args.metrics_configuration):
+            self.daemon.serve(args.socket or get_daemon_socket_path(self.environment))
+
+
+# Unfortunately this needs to be a free standing function so that
+# sphinx-argparse can generate documentation for it.
+def get_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        "nix-prefetch-github-daemon",
+        parents=[
+            get_logging_argument_parser(),
+            get_metrics_argument_parser(),
+            get_version_argument_parser(),
+        ],
+    )
+    parser.add_argument(
+        "--socket",
+        default=None,
+        help="Path of the unix domain socket to listen on. Defaults to the path that nix-prefetch-github connects to.",
+    )
+    return parser
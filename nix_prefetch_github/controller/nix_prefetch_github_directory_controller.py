@@ -2,9 +2,19 @@ import argparse
 from dataclasses import dataclass
 from typing import List, Protocol
 
-from nix_prefetch_github.controller.arguments import get_options_argument_parser
-from nix_prefetch_github.interfaces import RenderingFormatSelector
+from nix_prefetch_github.cache import CacheManager
+from nix_prefetch_github.controller.arguments import (
+    get_hashing_backend,
+    get_options_argument_parser,
+)
+from nix_prefetch_github.interfaces import (
+    HashingBackendSelector,
+    RenderingFormatSelector,
+)
 from nix_prefetch_github.logging import LoggerManager
+from nix_prefetch_github.metrics import MetricsManager
+from nix_prefetch_github.retry import RetryManager
+from nix_prefetch_github.tracing import TraceManager
 from nix_prefetch_github.use_cases.prefetch_directory import (
     PrefetchDirectoryUseCase,
     Request,
@@ -21,6 +31,11 @@ class PrefetchDirectoryController:
     use_case: PrefetchDirectoryUseCase
     environment: ProcessEnvironment
     rendering_format_selector: RenderingFormatSelector
+    cache_manager: CacheManager
+    retry_manager: RetryManager
+    hashing_backend_selector: HashingBackendSelector
+    trace_manager: TraceManager
+    metrics_manager: MetricsManager
 
     def process_arguments(self, arguments: List[str]) -> None:
         parser = get_argument_parser()
@@ -29,15 +44,21 @@ class PrefetchDirectoryController:
             configuration=args.logging_configuration
         )
         self.rendering_format_selector.set_rendering_format(args.rendering_format)
-        self.use_case.prefetch_directory(
-            request=Request(
-                prefetch_options=args.prefetch_options,
-                directory=(
-                    args.directory if args.directory else self.environment.get_cwd()
-                ),
-                remote=args.remote,
+        self.cache_manager.set_cache_configuration(args.cache_configuration)
+        self.retry_manager.set_retry_configuration(args.retry_configuration)
+        self.hashing_backend_selector.set_hashing_backend(get_hashing_backend(args))
+        with self.metrics_manager.record_metrics(
+            args.metrics_configuration
+        ), self.trace_manager.record_trace(args.trace_file):
+            self.use_case.prefetch_directory(
+                request=Request(
+                    prefetch_options=args.prefetch_options,
+                    directory=(
+                        args.directory if args.directory else self.environment.get_cwd()
+                    ),
+                    remote=args.remote,
+                )
             )
-        )
 
 
 # Unfortunately this needs to be a free standing function so that
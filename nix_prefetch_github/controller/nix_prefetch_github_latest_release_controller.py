@@ -1,14 +1,26 @@
 import argparse
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 
-from nix_prefetch_github.controller.arguments import get_options_argument_parser
-from nix_prefetch_github.interfaces import GithubRepository, RenderingFormatSelector
+from nix_prefetch_github.cache import CacheManager
+from nix_prefetch_github.controller.arguments import (
+    get_hashing_backend,
+    get_options_argument_parser,
+)
+from nix_prefetch_github.interfaces import (
+    GithubRepository,
+    HashingBackendSelector,
+    RenderingFormatSelector,
+)
 from nix_prefetch_github.logging import LoggerManager
+from nix_prefetch_github.metrics import MetricsManager
+from nix_prefetch_github.retry import RetryManager
+from nix_prefetch_github.tracing import TraceManager
 from nix_prefetch_github.use_cases.prefetch_latest_release import (
     PrefetchLatestReleaseUseCase,
     Request,
 )
+from nix_prefetch_github.versions import ReleaseSelection, VersionConstraint
 
 
 @dataclass
@@ -16,17 +28,45 @@ class PrefetchLatestReleaseController:
     use_case: PrefetchLatestReleaseUseCase
     logger_manager: LoggerManager
     rendering_format_selector: RenderingFormatSelector
+    cache_manager: CacheManager
+    retry_manager: RetryManager
+    hashing_backend_selector: HashingBackendSelector
+    trace_manager: TraceManager
+    metrics_manager: MetricsManager
 
     def process_arguments(self, arguments: List[str]) -> None:
         parser = get_argument_parser()
         args = parser.parse_args(arguments)
         self.logger_manager.set_logging_configuration(args.logging_configuration)
         self.rendering_format_selector.set_rendering_format(args.rendering_format)
-        self.use_case.prefetch_latest_release(
-            request=Request(
-                repository=GithubRepository(owner=args.owner, name=args.repo),
-                prefetch_options=args.prefetch_options,
+        self.cache_manager.set_cache_configuration(args.cache_configuration)
+        self.retry_manager.set_retry_configuration(args.retry_configuration)
+        self.hashing_backend_selector.set_hashing_backend(get_hashing_backend(args))
+        with self.metrics_manager.record_metrics(
+            args.metrics_configuration
+        ), self.trace_manager.record_trace(args.trace_file):
+            self.use_case.prefetch_latest_release(
+                request=Request(
+                    repository=GithubRepository(owner=args.owner, name=args.repo),
+                    prefetch_options=args.prefetch_options,
+                    release_selection=self._get_release_selection(args),
+                )
             )
+
+    def _get_release_selection(
+        self, args: argparse.Namespace
+    ) -> Optional[ReleaseSelection]:
+        if not (
+            args.from_tags
+            or args.rev_constraint
+            or args.rev_pattern
+            or args.pre_releases
+        ):
+            return None
+        return ReleaseSelection(
+            constraint=args.rev_constraint,
+            pattern=args.rev_pattern,
+            include_pre_releases=args.pre_releases,
         )
 
 
@@ -39,4 +79,34 @@ def get_argument_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument("owner")
     parser.add_argument("repo")
+    parser.add_argument(
+        "--from-tags",
+        action="store_true",
+        default=False,
+        help="Select the tag with the highest version number as the latest release instead of asking the GitHub API for the latest release. This does not count against GitHub's rate limit. Tag names like 1.2.3, v1.2.3, release-1.2.3 and calendar versions like 2024.05.01 are recognized.",
+    )
+    parser.add_argument(
+        "--rev-constraint",
+        type=version_constraint,
+        metavar="CONSTRAINT",
+        help="Only consider tags whose version satisfies the given constraint, e.g. '~1.4', '^1.2', '>=2,<3' or '1.4.*'. A plain version like '1.4' matches every version that starts with it. Implies --from-tags.",
+    )
+    parser.add_argument(
+        "--rev-pattern",
+        metavar="PATTERN",
+        help="Only consider tags that match the given shell style pattern, e.g. 'release-*'. The text in front of the first wildcard is removed from the tag before its version is parsed. Implies --from-tags.",
+    )
+    parser.add_argument(
+        "--pre-releases",
+        action="store_true",
+        default=False,
+        help="Consider pre-releases like 2.0.0-rc1 or 2.0b1, too. Implies --from-tags.",
+    )
     return parser
+
+
+def version_constraint(value: str) -> VersionConstraint:
+    try:
+        return VersionConstraint.from_text(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
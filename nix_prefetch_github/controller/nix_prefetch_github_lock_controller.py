@@ -0,0 +1,156 @@
+import argparse
+import os
+import sys
+from dataclasses import dataclass
+from typing import List, TextIO
+
+from nix_prefetch_github.cache import CacheManager
+from nix_prefetch_github.controller.arguments import (
+    get_cache_argument_parser,
+    get_hashing_backend,
+    get_hashing_backend_argument_parser,
+    get_logging_argument_parser,
+    get_metrics_argument_parser,
+    get_prefetch_options_argument_parser,
+    get_retry_argument_parser,
+    get_tracing_argument_parser,
+    get_version_argument_parser,
+)
+from nix_prefetch_github.controller.manifest import ManifestError, read_manifest
+from nix_prefetch_github.interfaces import GithubRepository, HashingBackendSelector
+from nix_prefetch_github.lockfile import DEFAULT_LOCKFILE_PATH, LockfileError
+from nix_prefetch_github.logging import LoggerManager
+from nix_prefetch_github.metrics import MetricsManager
+from nix_prefetch_github.retry import RetryManager
+from nix_prefetch_github.tracing import TraceManager
+from nix_prefetch_github.use_cases.lock_repositories import (
+    LockRepositoriesUseCase,
+    Request,
+)
+
+
+@dataclass
+class LockController:
+    use_case: LockRepositoriesUseCase
+    logger_manager: LoggerManager
+    cache_manager: CacheManager
+    retry_manager: RetryManager
+    hashing_backend_selector: HashingBackendSelector
+    trace_manager: TraceManager
+    metrics_manager: MetricsManager
+
+    def process_arguments(self, arguments: List[str]) -> None:
+        parser = get_argument_parser()
+        args = parser.parse_args(arguments)
+        self.logger_manager.set_logging_configuration(args.logging_configuration)
+        self.cache_manager.set_cache_configuration(args.cache_configuration)
+        self.retry_manager.set_retry_configuration(args.retry_configuration)
+        self.hashing_backend_selector.set_hashing_backend(get_hashing_backend(args))
+        if args.jobs < 1:
+            parser.error("--jobs must be at least 1")
+        try:
+            with self.metrics_manager.record_metrics(
+                args.metrics_configuration
+            ), self.trace_manager.record_trace(args.trace_file):
+                if args.command == "lock":
+                    self._lock(args)
+                else:
+                    self._update(parser, args)
+        except (LockfileError, ManifestError) as e:
+            parser.error(str(e))
+
+    def _lock(self, args: argparse.Namespace) -> None:
+        if args.manifest == "-":
+            self._lock_manifest(args, sys.stdin)
+        else:
+            with open(args.manifest) as manifest:
+                self._lock_manifest(args, manifest)
+
+    def _lock_manifest(self, args: argparse.Namespace, manifest: TextIO) -> None:
+        # The whole manifest is needed to find out which entries were
+        # removed from it.
+        entries = list(read_manifest(manifest, args.prefetch_options))
+        self.use_case.lock_repositories(
+            Request(lockfile_path=args.lockfile, entries=entries, jobs=args.jobs)
+        )
+
+    def _update(
+        self, parser: argparse.ArgumentParser, args: argparse.Namespace
+    ) -> None:
+        if not os.path.exists(args.lockfile):
+            parser.error(f"Lockfile {args.lockfile} does not exist")
+        self.use_case.lock_repositories(
+            Request(
+                lockfile_path=args.lockfile,
+                entries=None,
+                jobs=args.jobs,
+                repositories=args.repositories,
+            )
+        )
+
+
+def repository(value: str) -> GithubRepository:
+    owner, separator, name = value.partition("/")
+    if not separator or not owner or not name or "/" in name:
+        raise argparse.ArgumentTypeError(f"expected OWNER/REPO, got {value!r}")
+    return GithubRepository(owner=owner, name=name)
+
+
+# Unfortunately this needs to be a free standing function so that
+# sphinx-argparse can generate documentation for it.
+def get_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        "nix-prefetch-github-lock", parents=[get_version_argument_parser()]
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    common_parsers = [
+        get_logging_argument_parser(),
+        get_cache_argument_parser(),
+        get_retry_argument_parser(),
+        get_hashing_backend_argument_parser(),
+        get_tracing_argument_parser(),
+        get_metrics_argument_parser(),
+        get_lockfile_argument_parser(),
+    ]
+    lock_parser = subparsers.add_parser(
+        "lock",
+        parents=[get_prefetch_options_argument_parser()] + common_parsers,
+        help="Lock the repositories of a manifest.",
+        description="Make the lockfile contain exactly the entries of a manifest. Entries that are already locked are only hashed again if their ref points to a different commit now.",
+    )
+    lock_parser.add_argument(
+        "manifest",
+        help="Path to a manifest file in the format of nix-prefetch-github-batch. Use - to read the manifest from standard input.",
+    )
+    update_parser = subparsers.add_parser(
+        "update",
+        parents=common_parsers,
+        help="Update the entries of a lockfile.",
+        description="Resolve the refs of the locked entries again and hash the entries whose ref points to a different commit now.",
+    )
+    update_parser.add_argument(
+        "repositories",
+        nargs="*",
+        type=repository,
+        metavar="OWNER/REPO",
+        help="Only update entries of these repositories. Defaults to all entries.",
+    )
+    return parser
+
+
+def get_lockfile_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument(
+        "--lockfile",
+        "-l",
+        default=DEFAULT_LOCKFILE_PATH,
+        help="Path of the lockfile. Defaults to %(default)s.",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=4,
+        help="Number of repositories that are resolved and hashed concurrently.",
+    )
+    return parser
@@ -0,0 +1,95 @@
+import argparse
+from dataclasses import dataclass
+from typing import List
+
+from nix_prefetch_github.cache import CacheManager
+from nix_prefetch_github.controller.arguments import (
+    get_cache_argument_parser,
+    get_hashing_backend,
+    get_hashing_backend_argument_parser,
+    get_logging_argument_parser,
+    get_metrics_argument_parser,
+    get_retry_argument_parser,
+    get_tracing_argument_parser,
+    get_version_argument_parser,
+)
+from nix_prefetch_github.interfaces import HashingBackendSelector
+from nix_prefetch_github.logging import LoggerManager
+from nix_prefetch_github.metrics import MetricsManager
+from nix_prefetch_github.retry import RetryManager
+from nix_prefetch_github.tracing import TraceManager
+from nix_prefetch_github.use_cases.update_sources import Request, UpdateSourcesUseCase
+
+
+@dataclass
+class UpdateSourcesController:
+    use_case: UpdateSourcesUseCase
+    logger_manager: LoggerManager
+    cache_manager: CacheManager
+    retry_manager: RetryManager
+    hashing_backend_selector: HashingBackendSelector
+    trace_manager: TraceManager
+    metrics_manager: MetricsManager
+
+    def process_arguments(self, arguments: List[str]) -> None:
+        parser = get_argument_parser()
+        args = parser.parse_args(arguments)
+        self.logger_manager.set_logging_configuration(args.logging_configuration)
+        self.cache_manager.set_cache_configuration(args.cache_configuration)
+        self.retry_manager.set_retry_configuration(args.retry_configuration)
+        self.hashing_backend_selector.set_hashing_backend(get_hashing_backend(args))
+        if args.jobs < 1:
+            parser.error("--jobs must be at least 1")
+        with self.metrics_manager.record_metrics(
+            args.metrics_configuration
+        ), self.trace_manager.record_trace(args.trace_file):
+            self.use_case.update_sources(
+                request=Request(
+                    directory=args.directory,
+                    revision=args.rev,
+                    jobs=args.jobs,
+                    dry_run=args.dry_run,
+                )
+            )
+
+
+# Unfortunately this needs to be a free standing function so that
+# sphinx-argparse can generate documentation for it.
+def get_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        "nix-prefetch-github-update",
+        parents=[
+            get_logging_argument_parser(),
+            get_cache_argument_parser(),
+            get_retry_argument_parser(),
+            get_hashing_backend_argument_parser(),
+            get_tracing_argument_parser(),
+            get_metrics_argument_parser(),
+            get_version_argument_parser(),
+        ],
+    )
+    parser.add_argument(
+        "directory",
+        nargs="?",
+        default=".",
+        help="Directory that is searched for nix files with fetchFromGitHub calls. Defaults to the current directory.",
+    )
+    parser.add_argument(
+        "--rev",
+        default=None,
+        help="Branch or tag that calls whose rev is a commit hash are moved to, e.g. HEAD. Without this option such calls keep their commit. Calls that reference a branch or tag by name keep it and only get a new hash.",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=4,
+        help="Number of files that are scanned and repositories that are prefetched concurrently.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        default=False,
+        help="Report the updates without modifying any file.",
+    )
+    return parser
@@ -0,0 +1,104 @@
+from io import StringIO
+from typing import List
+from unittest import TestCase
+
+from nix_prefetch_github.interfaces import GithubRepository, PrefetchOptions
+from nix_prefetch_github.use_cases.prefetch_batch import BatchEntry, InvalidBatchEntry
+
+from .manifest import ManifestError, read_manifest, read_manifest_entries
+
+
+class ReadManifestTests(TestCase):
+    def test_can_read_entries_from_json_list(self) -> None:
+        entries = self.read(
+            '[{"owner": "a", "repo": "b"}, {"owner": "c", "repo": "d", "rev": "v1"}]'
+        )
+        self.assertEqual(
+            [(entry.repository, entry.revision) for entry in entries],
+            [
+                (GithubRepository(owner="a", name="b"), None),
+                (GithubRepository(owner="c", name="d"), "v1"),
+            ],
+        )
+
+    def test_can_read_entries_from_newline_delimited_json(self) -> None:
+        entries = self.read(
+            '{"owner": "a", "repo": "b"}\n\n{"owner": "c", "repo": "d", "rev": "v1"}\n'
+        )
+        self.assertEqual(
+            [(entry.repository, entry.revision) for entry in entries],
+            [
+                (GithubRepository(owner="a", name="b"), None),
+                (GithubRepository(owner="c", name="d"), "v1"),
+            ],
+        )
+
+    def test_json_list_can_be_preceded_by_empty_lines(self) -> None:
+        entries = self.read('\n\n[{"owner": "a", "repo": "b"}]')
+        self.assertEqual(len(entries), 1)
+
+    def test_empty_manifest_yields_no_entries(self) -> None:
+        self.assertEqual(self.read(""), [])
+
+    def test_prefetch_options_are_read_from_entries(self) -> None:
+        entries = self.read(
+            '{"owner": "a", "repo": "b", "fetchSubmodules": true, "leaveDotGit": true, "deepClone": true}'
+        )
+        self.assertEqual(
+            entries[0].prefetch_options,
+            PrefetchOptions(fetch_submodules=True, leave_dot_git=True, deep_clone=True),
+        )
+
+    def test_missing_prefetch_options_default_to_given_options(self) -> None:
+        entries = self.read(
+            '{"owner": "a", "repo": "b", "leaveDotGit": false}',
+            default_options=PrefetchOptions(fetch_submodules=True, leave_dot_git=True),
+        )
+        self.assertEqual(
+            entries[0].prefetch_options,
+            PrefetchOptions(fetch_submodules=True, leave_dot_git=False),
+        )
+
+    def test_entry_without_owner_is_rejected(self) -> None:
+        with self.assertRaises(ManifestError):
+            self.read('{"repo": "b"}')
+
+    def test_entry_with_non_string_rev_is_rejected(self) -> None:
+        with self.assertRaises(ManifestError):
+            self.read('{"owner": "a", "repo": "b", "rev": 1}')
+
+    def test_entry_with_non_boolean_option_is_rejected(self) -> None:
+        with self.assertRaises(ManifestError):
+            self.read('{"owner": "a", "repo": "b", "deepClone": "yes"}')
+
+    def test_invalid_json_line_is_rejected_with_line_number(self) -> None:
+        with self.assertRaisesRegex(ManifestError, "Line 2"):
+            self.read('{"owner": "a", "repo": "b"}\n{"owner": \n')
+
+    def test_entries_before_invalid_line_are_yielded(self) -> None:
+        entries = read_manifest(
+            StringIO('{"owner": "a", "repo": "b"}\ninvalid\n'), PrefetchOptions()
+        )
+        self.assertEqual(next(entries).repository.owner, "a")
+        with self.assertRaises(ManifestError):
+            next(entries)
+
+    def test_entries_after_invalid_line_are_yielded_as_well(self) -> None:
+        entries = list(
+            read_manifest_entries(
+                StringIO('invalid\n{"repo": "b"}\n{"owner": "a", "repo": "b"}\n'),
+                PrefetchOptions(),
+            )
+        )
+        self.assertIsInstance(entries[0], InvalidBatchEntry)
+        self.assertIsInstance(entries[1], InvalidBatchEntry)
+        self.assertIsInstance(entries[2], BatchEntry)
+
+    def test_invalid_json_list_is_yielded_as_single_invalid_entry(self) -> None:
+        (entry,) = read_manifest_entries(StringIO('[{"owner": '), PrefetchOptions())
+        self.assertIsInstance(entry, InvalidBatchEntry)
+
+    def read(
+        self, manifest: str, default_options: PrefetchOptions = PrefetchOptions()
+    ) -> List[BatchEntry]:
+        return list(read_manifest(StringIO(manifest), default_options))
@@ -0,0 +1,130 @@
+import os
+import tempfile
+from logging import INFO
+from typing import List, Union
+from unittest import TestCase
+
+from nix_prefetch_github.interfaces import GithubRepository, PrefetchOptions
+from nix_prefetch_github.metrics import MetricsConfiguration
+from nix_prefetch_github.tests import (
+    FakeCacheManager,
+    FakeHashingBackendSelector,
+    FakeLoggerManager,
+    FakeMetricsManager,
+    FakeRetryManager,
+    FakeTraceManager,
+)
+from nix_prefetch_github.use_cases.prefetch_batch import (
+    BatchEntry,
+    InvalidBatchEntry,
+    Request,
+)
+
+from .nix_prefetch_github_batch_controller import PrefetchBatchController
+
+
+class ControllerTests(TestCase):
+    def setUp(self) -> None:
+        self.logger_manager = FakeLoggerManager()
+        self.cache_manager = FakeCacheManager()
+        self.retry_manager = FakeRetryManager()
+        self.hashing_backend_selector = FakeHashingBackendSelector()
+        self.use_case = FakeUseCase()
+        self.trace_manager = FakeTraceManager()
+        self.metrics_manager = FakeMetricsManager()
+        self.controller = PrefetchBatchController(
+            use_case=self.use_case,
+            logger_manager=self.logger_manager,
+            cache_manager=self.cache_manager,
+            retry_manager=self.retry_manager,
+            hashing_backend_selector=self.hashing_backend_selector,
+            trace_manager=self.trace_manager,
+            metrics_manager=self.metrics_manager,
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.manifest = os.path.join(self.directory.name, "manifest.json")
+        with open(self.manifest, "w") as f:
+            f.write('{"owner": "owner", "repo": "repo", "rev": "v1.0"}\n')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_entries_are_read_from_manifest_file(self) -> None:
+        self.controller.process_arguments([self.manifest])
+        self.assertEqual(
+            self.use_case.entries,
+            [
+                BatchEntry(
+                    repository=GithubRepository(owner="owner", name="repo"),
+                    revision="v1.0",
+                    prefetch_options=PrefetchOptions(),
+                )
+            ],
+        )
+
+    def test_prefetch_options_from_arguments_are_used_as_defaults(self) -> None:
+        self.controller.process_arguments([self.manifest, "--fetch-submodules"])
+        entry = self.use_case.entries[0]
+        assert isinstance(entry, BatchEntry)
+        self.assertEqual(entry.prefetch_options, PrefetchOptions(fetch_submodules=True))
+
+    def test_default_number_of_jobs_is_4(self) -> None:
+        self.controller.process_arguments([self.manifest])
+        self.assertEqual(self.use_case.jobs, 4)
+
+    def test_can_specify_number_of_jobs(self) -> None:
+        self.controller.process_arguments([self.manifest, "--jobs", "16"])
+        self.assertEqual(self.use_case.jobs, 16)
+
+    def test_zero_jobs_are_rejected(self) -> None:
+        with self.assertRaises(SystemExit):
+            self.controller.process_arguments([self.manifest, "-j", "0"])
+
+    def test_latest_release_is_not_requested_by_default(self) -> None:
+        self.controller.process_arguments([self.manifest])
+        self.assertFalse(self.use_case.latest_release)
+
+    def test_can_request_latest_release(self) -> None:
+        self.controller.process_arguments([self.manifest, "--latest-release"])
+        self.assertTrue(self.use_case.latest_release)
+
+    def test_invalid_manifest_entries_are_passed_to_use_case(self) -> None:
+        with open(self.manifest, "w") as f:
+            f.write('{"repo": "repo"}\n')
+        self.controller.process_arguments([self.manifest])
+        self.assertIsInstance(self.use_case.entries[0], InvalidBatchEntry)
+
+    def test_can_set_log_level_with_arguments(self) -> None:
+        self.controller.process_arguments([self.manifest, "-v"])
+        self.logger_manager.assertLoggingConfiguration(lambda c: c.log_level == INFO)
+
+    def test_trace_file_can_be_specified(self) -> None:
+        self.controller.process_arguments([self.manifest, "--trace-file", "trace.json"])
+        self.assertEqual(self.trace_manager.trace_files, ["trace.json"])
+
+    def test_metrics_file_and_interval_can_be_specified(self) -> None:
+        self.controller.process_arguments(
+            [
+                self.manifest,
+                "--metrics-file",
+                "metrics.prom",
+                "--metrics-interval",
+                "15",
+            ]
+        )
+        self.assertEqual(
+            self.metrics_manager.configurations,
+            [MetricsConfiguration(metrics_file="metrics.prom", interval=15)],
+        )
+
+
+class FakeUseCase:
+    def __init__(self) -> None:
+        self.entries: List[Union[BatchEntry, InvalidBatchEntry]] = []
+        self.jobs: int = 0
+        self.latest_release: bool = False
+
+    def prefetch_batch(self, request: Request) -> None:
+        self.entries = list(request.entries)
+        self.jobs = request.jobs
+        self.latest_release = request.latest_release
@@ -7,21 +7,41 @@ from nix_prefetch_github.controller.nix_prefetch_github_controller import (
 )
 from nix_prefetch_github.interfaces import (
     GithubRepository,
+    HashingBackend,
     PrefetchOptions,
     RenderingFormat,
 )
-from nix_prefetch_github.tests import FakeLoggerManager, RenderingFormatSelectorImpl
+from nix_prefetch_github.metrics import MetricsConfiguration
+from nix_prefetch_github.tests import (
+    FakeCacheManager,
+    FakeHashingBackendSelector,
+    FakeLoggerManager,
+    FakeMetricsManager,
+    FakeRetryManager,
+    FakeTraceManager,
+    RenderingFormatSelectorImpl,
+)
 from nix_prefetch_github.use_cases.prefetch_github_repository import Request
 
 
 class ControllerTests(TestCase):
     def setUp(self) -> None:
         self.logger_manager = FakeLoggerManager()
+        self.cache_manager = FakeCacheManager()
+        self.retry_manager = FakeRetryManager()
+        self.hashing_backend_selector = FakeHashingBackendSelector()
         self.rendering_format_selector = RenderingFormatSelectorImpl()
         self.use_case_mock = UseCaseImpl()
+        self.trace_manager = FakeTraceManager()
+        self.metrics_manager = FakeMetricsManager()
         self.controller = NixPrefetchGithubController(
             use_case=self.use_case_mock,
             logger_manager=self.logger_manager,
+            cache_manager=self.cache_manager,
+            retry_manager=self.retry_manager,
+            hashing_backend_selector=self.hashing_backend_selector,
+            trace_manager=self.trace_manager,
+            metrics_manager=self.metrics_manager,
             rendering_format_selector=self.rendering_format_selector,
         )
 
@@ -109,6 +129,80 @@ class ControllerTests(TestCase):
         self.controller.process_arguments(["owner", "repo", "-v"])
         self.logger_manager.assertLoggingConfiguration(lambda c: c.log_level == INFO)
 
+    def test_cached_refs_are_used_by_default(self) -> None:
+        self.controller.process_arguments(["owner", "repo"])
+        self.assertFalse(self.cache_manager.configuration.refresh)
+
+    def test_can_request_refresh_of_cached_refs(self) -> None:
+        self.controller.process_arguments(["owner", "repo", "--refresh"])
+        self.assertTrue(self.cache_manager.configuration.refresh)
+
+    def test_can_specify_time_to_live_for_cached_branches_and_tags(self) -> None:
+        self.controller.process_arguments(
+            ["owner", "repo", "--branch-ttl", "10", "--tag-ttl", "20"]
+        )
+        self.assertEqual(self.cache_manager.configuration.branch_ttl, 10)
+        self.assertEqual(self.cache_manager.configuration.tag_ttl, 20)
+
+    def test_failed_requests_are_retried_three_times_by_default(self) -> None:
+        self.controller.process_arguments(["owner", "repo"])
+        self.assertEqual(self.retry_manager.configuration.retries, 3)
+
+    def test_can_specify_retries_and_retry_deadline(self) -> None:
+        self.controller.process_arguments(
+            ["owner", "repo", "--retries", "0", "--retry-deadline", "30"]
+        )
+        self.assertEqual(self.retry_manager.configuration.retries, 0)
+        self.assertEqual(self.retry_manager.configuration.deadline, 30)
+
+    def test_nix_is_the_default_hashing_backend(self) -> None:
+        self.controller.process_arguments(["owner", "repo"])
+        self.assertEqual(
+            self.hashing_backend_selector.hashing_backend, HashingBackend.nix
+        )
+
+    def test_builtin_is_the_default_hashing_backend_with_meta(self) -> None:
+        self.controller.process_arguments(["owner", "repo", "--meta"])
+        self.assertEqual(
+            self.hashing_backend_selector.hashing_backend, HashingBackend.builtin
+        )
+
+    def test_nix_hashing_backend_can_be_selected_with_meta(self) -> None:
+        self.controller.process_arguments(
+            ["owner", "repo", "--meta", "--hashing-backend", "nix"]
+        )
+        self.assertEqual(
+            self.hashing_backend_selector.hashing_backend, HashingBackend.nix
+        )
+
+    def test_can_select_builtin_hashing_backend(self) -> None:
+        self.controller.process_arguments(
+            ["owner", "repo", "--hashing-backend", "builtin"]
+        )
+        self.assertEqual(
+            self.hashing_backend_selector.hashing_backend, HashingBackend.builtin
+        )
+
+    def test_unknown_hashing_backend_is_rejected(self) -> None:
+        with self.assertRaises(SystemExit):
+            self.controller.process_arguments(
+                ["owner", "repo", "--hashing-backend", "unknown"]
+            )
+
+    def test_no_trace_is_recorded_by_default(self) -> None:
+        self.controller.process_arguments(["owner", "repo"])
+        self.assertEqual(self.trace_manager.trace_files, [None])
+
+    def test_no_metrics_are_written_by_default(self) -> None:
+        self.controller.process_arguments(["owner", "repo"])
+        self.assertEqual(self.metrics_manager.configurations, [MetricsConfiguration()])
+
+    def test_trace_file_can_be_specified(self) -> None:
+        self.controller.process_arguments(
+            ["owner", "repo", "--trace-file", "trace.json"]
+        )
+        self.assertEqual(self.trace_manager.trace_files, ["trace.json"])
+
     def assertPrefetchOptions(self, prefetch_options: PrefetchOptions) -> None:
         assert self.use_case_mock.request
         self.assertEqual(
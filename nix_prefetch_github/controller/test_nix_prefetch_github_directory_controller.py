@@ -3,7 +3,15 @@ from typing import List
 from unittest import TestCase
 
 from nix_prefetch_github.interfaces import RenderingFormat
-from nix_prefetch_github.tests import FakeLoggerManager, RenderingFormatSelectorImpl
+from nix_prefetch_github.tests import (
+    FakeCacheManager,
+    FakeHashingBackendSelector,
+    FakeLoggerManager,
+    FakeMetricsManager,
+    FakeRetryManager,
+    FakeTraceManager,
+    RenderingFormatSelectorImpl,
+)
 from nix_prefetch_github.use_cases.prefetch_directory import Request
 
 from .nix_prefetch_github_directory_controller import PrefetchDirectoryController
@@ -12,11 +20,21 @@ from .nix_prefetch_github_directory_controller import PrefetchDirectoryControlle
 class ControllerTests(TestCase):
     def setUp(self) -> None:
         self.logger_manager = FakeLoggerManager()
+        self.cache_manager = FakeCacheManager()
+        self.retry_manager = FakeRetryManager()
+        self.hashing_backend_selector = FakeHashingBackendSelector()
         self.fake_use_case = FakeUseCase()
         self.environment = FakeEnvironment()
         self.rendering_format_selector = RenderingFormatSelectorImpl()
+        self.trace_manager = FakeTraceManager()
+        self.metrics_manager = FakeMetricsManager()
         self.controller = PrefetchDirectoryController(
             logger_manager=self.logger_manager,
+            cache_manager=self.cache_manager,
+            retry_manager=self.retry_manager,
+            hashing_backend_selector=self.hashing_backend_selector,
+            trace_manager=self.trace_manager,
+            metrics_manager=self.metrics_manager,
             use_case=self.fake_use_case,
             environment=self.environment,
             rendering_format_selector=self.rendering_format_selector,
@@ -1,3 +1,5 @@
+import io
+from contextlib import redirect_stderr
 from logging import INFO, WARNING
 from typing import Callable, Optional, cast
 from unittest import TestCase
@@ -6,18 +8,37 @@ from nix_prefetch_github.controller.nix_prefetch_github_latest_release_controlle
     PrefetchLatestReleaseController,
 )
 from nix_prefetch_github.interfaces import RenderingFormat
-from nix_prefetch_github.tests import FakeLoggerManager, RenderingFormatSelectorImpl
+from nix_prefetch_github.tests import (
+    FakeCacheManager,
+    FakeHashingBackendSelector,
+    FakeLoggerManager,
+    FakeMetricsManager,
+    FakeRetryManager,
+    FakeTraceManager,
+    RenderingFormatSelectorImpl,
+)
 from nix_prefetch_github.use_cases.prefetch_latest_release import Request
+from nix_prefetch_github.versions import ReleaseSelection
 
 
 class ControllerTests(TestCase):
     def setUp(self) -> None:
         self.logger_manager = FakeLoggerManager()
+        self.cache_manager = FakeCacheManager()
+        self.retry_manager = FakeRetryManager()
+        self.hashing_backend_selector = FakeHashingBackendSelector()
         self.rendering_format_selector = RenderingFormatSelectorImpl()
         self.fake_use_case = FakeUseCase()
+        self.trace_manager = FakeTraceManager()
+        self.metrics_manager = FakeMetricsManager()
         self.controller = PrefetchLatestReleaseController(
             use_case=self.fake_use_case,
             logger_manager=self.logger_manager,
+            cache_manager=self.cache_manager,
+            retry_manager=self.retry_manager,
+            hashing_backend_selector=self.hashing_backend_selector,
+            trace_manager=self.trace_manager,
+            metrics_manager=self.metrics_manager,
             rendering_format_selector=self.rendering_format_selector,
         )
 
@@ -61,6 +82,39 @@ class ControllerTests(TestCase):
             RenderingFormat.nix,
         )
 
+    def test_github_api_is_used_by_default(self) -> None:
+        self.controller.process_arguments(["owner", "repo"])
+        self.assertRequest(lambda r: r.release_selection is None)
+
+    def test_from_tags_selects_release_from_tags(self) -> None:
+        self.controller.process_arguments(["owner", "repo", "--from-tags"])
+        self.assertRequest(lambda r: r.release_selection == ReleaseSelection())
+
+    def test_rev_constraint_is_detected_from_arguments(self) -> None:
+        self.controller.process_arguments(
+            ["owner", "repo", "--rev-constraint", ">=2,<3"]
+        )
+        self.assertRequest(
+            lambda r: r.release_selection is not None
+            and r.release_selection.constraint is not None
+            and r.release_selection.constraint.text == ">=2,<3"
+        )
+
+    def test_rev_pattern_and_pre_releases_are_detected_from_arguments(self) -> None:
+        self.controller.process_arguments(
+            ["owner", "repo", "--rev-pattern", "release-*", "--pre-releases"]
+        )
+        self.assertRequest(
+            lambda r: r.release_selection
+            == ReleaseSelection(pattern="release-*", include_pre_releases=True)
+        )
+
+    def test_invalid_rev_constraint_is_rejected(self) -> None:
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            self.controller.process_arguments(
+                ["owner", "repo", "--rev-constraint", "latest"]
+            )
+
     def assertRequest(
         self,
         condition: Optional[Callable[[Request], bool]] = None,
@@ -0,0 +1,110 @@
+import os
+import tempfile
+from typing import Optional
+from unittest import TestCase
+
+from nix_prefetch_github.interfaces import GithubRepository, PrefetchOptions
+from nix_prefetch_github.tests import (
+    FakeCacheManager,
+    FakeHashingBackendSelector,
+    FakeLoggerManager,
+    FakeMetricsManager,
+    FakeRetryManager,
+    FakeTraceManager,
+)
+from nix_prefetch_github.use_cases.lock_repositories import Request
+
+from .nix_prefetch_github_lock_controller import LockController
+
+
+class ControllerTests(TestCase):
+    def setUp(self) -> None:
+        self.use_case = FakeUseCase()
+        self.trace_manager = FakeTraceManager()
+        self.metrics_manager = FakeMetricsManager()
+        self.controller = LockController(
+            use_case=self.use_case,
+            logger_manager=FakeLoggerManager(),
+            cache_manager=FakeCacheManager(),
+            retry_manager=FakeRetryManager(),
+            hashing_backend_selector=FakeHashingBackendSelector(),
+            trace_manager=self.trace_manager,
+            metrics_manager=self.metrics_manager,
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.manifest = os.path.join(self.directory.name, "manifest.json")
+        self.lockfile = os.path.join(self.directory.name, "nix-prefetch-github.lock")
+        with open(self.manifest, "w") as f:
+            f.write('{"owner": "owner", "repo": "repo", "rev": "v1.0"}\n')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_lock_reads_entries_from_manifest(self) -> None:
+        self.controller.process_arguments(["lock", self.manifest])
+        assert self.use_case.request
+        assert self.use_case.request.entries is not None
+        (entry,) = self.use_case.request.entries
+        self.assertEqual(entry.repository, GithubRepository("owner", "repo"))
+        self.assertEqual(entry.revision, "v1.0")
+
+    def test_lock_uses_prefetch_options_as_defaults(self) -> None:
+        self.controller.process_arguments(["lock", self.manifest, "--fetch-submodules"])
+        assert self.use_case.request
+        assert self.use_case.request.entries is not None
+        (entry,) = self.use_case.request.entries
+        self.assertEqual(entry.prefetch_options, PrefetchOptions(fetch_submodules=True))
+
+    def test_lockfile_path_can_be_specified(self) -> None:
+        self.controller.process_arguments(
+            ["lock", self.manifest, "--lockfile", self.lockfile]
+        )
+        assert self.use_case.request
+        self.assertEqual(self.use_case.request.lockfile_path, self.lockfile)
+
+    def test_update_updates_all_entries_by_default(self) -> None:
+        self.create_lockfile()
+        self.controller.process_arguments(["update", "-l", self.lockfile])
+        assert self.use_case.request
+        self.assertIsNone(self.use_case.request.entries)
+        self.assertEqual(self.use_case.request.repositories, [])
+
+    def test_update_can_be_restricted_to_repositories(self) -> None:
+        self.create_lockfile()
+        self.controller.process_arguments(["update", "-l", self.lockfile, "owner/repo"])
+        assert self.use_case.request
+        self.assertEqual(
+            self.use_case.request.repositories, [GithubRepository("owner", "repo")]
+        )
+
+    def test_update_rejects_invalid_repositories(self) -> None:
+        self.create_lockfile()
+        with self.assertRaises(SystemExit):
+            self.controller.process_arguments(["update", "-l", self.lockfile, "repo"])
+
+    def test_update_requires_existing_lockfile(self) -> None:
+        with self.assertRaises(SystemExit):
+            self.controller.process_arguments(["update", "-l", self.lockfile])
+
+    def test_trace_file_can_be_specified_for_update(self) -> None:
+        self.create_lockfile()
+        self.controller.process_arguments(
+            ["update", "-l", self.lockfile, "--trace-file", "trace.json"]
+        )
+        self.assertEqual(self.trace_manager.trace_files, ["trace.json"])
+
+    def test_command_is_required(self) -> None:
+        with self.assertRaises(SystemExit):
+            self.controller.process_arguments([])
+
+    def create_lockfile(self) -> None:
+        with open(self.lockfile, "w") as f:
+            f.write('{"version": 1, "repositories": []}\n')
+
+
+class FakeUseCase:
+    def __init__(self) -> None:
+        self.request: Optional[Request] = None
+
+    def lock_repositories(self, request: Request) -> None:
+        self.request = request
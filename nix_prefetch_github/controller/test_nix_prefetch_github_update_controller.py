@@ -0,0 +1,78 @@
+from logging import INFO
+from typing import Optional
+from unittest import TestCase
+
+from nix_prefetch_github.tests import (
+    FakeCacheManager,
+    FakeHashingBackendSelector,
+    FakeLoggerManager,
+    FakeMetricsManager,
+    FakeRetryManager,
+    FakeTraceManager,
+)
+from nix_prefetch_github.use_cases.update_sources import Request
+
+from .nix_prefetch_github_update_controller import UpdateSourcesController
+
+
+class ControllerTests(TestCase):
+    def setUp(self) -> None:
+        self.logger_manager = FakeLoggerManager()
+        self.use_case = FakeUseCase()
+        self.trace_manager = FakeTraceManager()
+        self.metrics_manager = FakeMetricsManager()
+        self.controller = UpdateSourcesController(
+            use_case=self.use_case,
+            logger_manager=self.logger_manager,
+            cache_manager=FakeCacheManager(),
+            retry_manager=FakeRetryManager(),
+            hashing_backend_selector=FakeHashingBackendSelector(),
+            trace_manager=self.trace_manager,
+            metrics_manager=self.metrics_manager,
+        )
+
+    def test_current_directory_is_updated_by_default(self) -> None:
+        self.controller.process_arguments([])
+        assert self.use_case.request
+        self.assertEqual(self.use_case.request.directory, ".")
+
+    def test_directory_can_be_specified(self) -> None:
+        self.controller.process_arguments(["pkgs"])
+        assert self.use_case.request
+        self.assertEqual(self.use_case.request.directory, "pkgs")
+
+    def test_pinned_commits_keep_their_commit_by_default(self) -> None:
+        self.controller.process_arguments([])
+        assert self.use_case.request
+        self.assertIsNone(self.use_case.request.revision)
+
+    def test_revision_can_be_specified(self) -> None:
+        self.controller.process_arguments(["--rev", "develop"])
+        assert self.use_case.request
+        self.assertEqual(self.use_case.request.revision, "develop")
+
+    def test_dry_run_is_disabled_by_default(self) -> None:
+        self.controller.process_arguments([])
+        assert self.use_case.request
+        self.assertFalse(self.use_case.request.dry_run)
+
+    def test_dry_run_can_be_enabled(self) -> None:
+        self.controller.process_arguments(["--dry-run"])
+        assert self.use_case.request
+        self.assertTrue(self.use_case.request.dry_run)
+
+    def test_zero_jobs_are_rejected(self) -> None:
+        with self.assertRaises(SystemExit):
+            self.controller.process_arguments(["-j", "0"])
+
+    def test_can_set_log_level_with_arguments(self) -> None:
+        self.controller.process_arguments(["-v"])
+        self.logger_manager.assertLoggingConfiguration(lambda c: c.log_level == INFO)
+
+
+class FakeUseCase:
+    def __init__(self) -> None:
+        self.request: Optional[Request] = None
+
+    def update_sources(self, request: Request) -> None:
+        self.request = request
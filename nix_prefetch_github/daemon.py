@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import io
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+import traceback
+from contextlib import contextmanager
+from dataclasses import dataclass
+from logging import Logger
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Protocol,
+    TextIO,
+    cast,
+)
+
+from nix_prefetch_github.cache import JsonCacheDirectory
+from nix_prefetch_github.dependency_injector import DependencyInjector, cached
+from nix_prefetch_github.hash_cache import HashDatabase
+from nix_prefetch_github.http_pool import HttpConnectionPool
+from nix_prefetch_github.logging import LoggerFactoryImpl
+from nix_prefetch_github.metrics import MetricsRegistryImpl
+from nix_prefetch_github.rate_limit import GithubRateLimiter
+
+
+class Controller(Protocol):
+    def process_arguments(self, arguments: List[str]) -> None: ...
+
+
+# Programs that can be run by the daemon. Programs that depend on the
+# working directory or read from stdin are always run by the client
+# itself.
+PROGRAMS: Dict[str, Callable[[DependencyInjector], Controller]] = {
+    "nix-prefetch-github": DependencyInjector.get_prefetch_github_repository_controller,
+    "nix-prefetch-github-latest-release": DependencyInjector.get_prefetch_latest_release_controller,
+}
+
+
+class RequestDependencyInjector(DependencyInjector):
+    # Every request gets its own object graph so that the options,
+    # environment and output of concurrent requests do not interfere
+    # with each other. Everything that stays useful between requests,
+    # like open connections and the caches, comes from the shared
+    # injector of the daemon.
+    def __init__(
+        self,
+        shared_injector: DependencyInjector,
+        environment: Mapping[str, str],
+        working_directory: Optional[str] = None,
+    ) -> None:
+        self._shared_injector = shared_injector
+        self._environment = environment
+        self._working_directory = working_directory
+
+    def get_http_connection_pool(self) -> HttpConnectionPool:
+        return self._shared_injector.get_http_connection_pool()
+
+    def get_hash_database(self) -> HashDatabase:
+        return self._shared_injector.get_hash_database()
+
+    def get_list_remote_cache_directory(self) -> JsonCacheDirectory:
+        return self._shared_injector.get_list_remote_cache_directory()
+
+    def get_github_api_cache_directory(self) -> JsonCacheDirectory:
+        return self._shared_injector.get_github_api_cache_directory()
+
+    def get_environment(self) -> Mapping[str, str]:
+        return self._environment
+
+    def get_github_rate_limiter(self) -> GithubRateLimiter:
+        # Requests of different clients with the same token draw from
+        # the same quota.
+        return self._shared_injector.get_github_rate_limiter_for_token(
+            self.get_environment().get("GITHUB_TOKEN")
+        )
+
+    def get_working_directory(self) -> Optional[str]:
+        # Paths like --trace-file are given relative to the working
+        # directory of the client.
+        return self._working_directory
+
+    @cached
+    def get_metrics_registry(self) -> MetricsRegistryImpl:
+        # The --metrics-file of a request only reports that request.
+        # The daemon collects the metrics of all requests it served.
+        return MetricsRegistryImpl(parent=self._shared_injector.get_metrics_registry())
+
+    @cached
+    def get_logger_factory(self) -> LoggerFactoryImpl:
+        # The root logger belongs to the daemon itself.
+        return LoggerFactoryImpl(logger=Logger("nix-prefetch-github"))
+
+
+@dataclass
+class PrefetchDaemon:
+    injector_factory: Callable[[Mapping[str, str], Optional[str]], DependencyInjector]
+    logger: Logger
+
+    def serve(self, socket_path: str) -> None:
+        server = self.bind(socket_path)
+        self.logger.info("Listening on %s", socket_path)
+        if threading.current_thread() is threading.main_thread():
+            # Shut down cleanly when the service manager stops us.
+            signal.signal(signal.SIGTERM, signal.default_int_handler)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.logger.info("Shutting down")
+        finally:
+            server.server_close()
+            try:
+                os.unlink(socket_path)
+            except OSError:
+                pass
+
+    def bind(self, socket_path: str) -> socketserver.ThreadingUnixStreamServer:
+        os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+        try:
+            os.unlink(socket_path)
+        except FileNotFoundError:
+            pass
+        # Only the user running the daemon may connect to the socket.
+        umask = os.umask(0o177)
+        try:
+            server = socketserver.ThreadingUnixStreamServer(
+                socket_path, self._handler_class()
+            )
+        finally:
+            os.umask(umask)
+        server.daemon_threads = True
+        return server
+
+    def handle_request(self, request: Any) -> Dict[str, Any]:
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        with _redirect_output(stdout, stderr):
+            exit_code = self._run_program(request, stderr)
+        return {
+            "stdout": stdout.getvalue(),
+            "stderr": stderr.getvalue(),
+            "exitCode": exit_code,
+        }
+
+    def _run_program(self, request: Any, stderr: TextIO) -> int:
+        try:
+            program = PROGRAMS[request["program"]]
+            arguments = [str(argument) for argument in request["arguments"]]
+            environment = dict(os.environ, **request.get("environment", {}))
+            working_directory = request.get("workingDirectory")
+            if working_directory is not None:
+                working_directory = str(working_directory)
+        except (KeyError, TypeError) as e:
+            print(f"Invalid request: {e}", file=stderr)
+            return 1
+        self.logger.info("Running %s %s", request["program"], " ".join(arguments))
+        try:
+            program(
+                self.injector_factory(environment, working_directory)
+            ).process_arguments(arguments)
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                return e.code or 0
+            print(e.code, file=stderr)
+            return 1
+        except Exception:
+            self.logger.exception("Request failed")
+            traceback.print_exc(file=stderr)
+            return 1
+        return 0
+
+    def _handler_class(self) -> type:
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                try:
+                    request = json.loads(self.rfile.readline())
+                except ValueError:
+                    return
+                response = daemon.handle_request(request)
+                self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+        return Handler
+
+
+def create_daemon(injector: DependencyInjector) -> PrefetchDaemon:
+    return PrefetchDaemon(
+        injector_factory=lambda environment, working_directory: (
+            RequestDependencyInjector(injector, environment, working_directory)
+        ),
+        logger=injector.get_logger(),
+    )
+
+
+class _ThreadLocalOutput(io.TextIOBase):
+    # Replaces sys.stdout and sys.stderr so that everything a request
+    # prints, including the messages of argparse, ends up in the
+    # response of that request instead of the output of the daemon.
+    def __init__(self, fallback: TextIO) -> None:
+        self.fallback = fallback
+        self.local = threading.local()
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    def _target(self) -> TextIO:
+        target: Optional[TextIO] = getattr(self.local, "stream", None)
+        return self.fallback if target is None else target
+
+
+_install_lock = threading.Lock()
+
+
+@contextmanager
+def _redirect_output(stdout: TextIO, stderr: TextIO) -> Iterator[None]:
+    with _install_lock:
+        if not isinstance(sys.stdout, _ThreadLocalOutput):
+            sys.stdout = cast(TextIO, _ThreadLocalOutput(sys.stdout))
+        if not isinstance(sys.stderr, _ThreadLocalOutput):
+            sys.stderr = cast(TextIO, _ThreadLocalOutput(sys.stderr))
+        outputs = [
+            (cast(_ThreadLocalOutput, sys.stdout), stdout),
+            (cast(_ThreadLocalOutput, sys.stderr), stderr),
+        ]
+    for output, stream in outputs:
+        output.local.stream = stream
+    try:
+        yield
+    finally:
+        for output, _ in outputs:
+            output.local.stream = None
@@ -0,0 +1,62 @@
+import json
+import os
+import socket
+import sys
+from typing import List, Mapping, Optional
+
+from nix_prefetch_github.cache import get_cache_directory
+
+# Environment variables of the client that are relevant to the
+# daemon when it runs a program on behalf of the client.
+FORWARDED_ENVIRONMENT_VARIABLES = [
+    "GITHUB_TOKEN",
+    "GITHUB_API_URL",
+    "GITHUB_GRAPHQL_URL",
+    "GITHUB_SERVER_URL",
+]
+
+
+def get_daemon_socket_path(environment: Mapping[str, str]) -> str:
+    if (socket_path := environment.get("NIX_PREFETCH_GITHUB_SOCKET")) is not None:
+        return socket_path
+    if runtime_directory := environment.get("XDG_RUNTIME_DIR"):
+        return os.path.join(runtime_directory, "nix-prefetch-github", "daemon.sock")
+    return os.path.join(get_cache_directory(environment), "daemon.sock")
+
+
+def forward_to_daemon(
+    program: str,
+    arguments: List[str],
+    environment: Mapping[str, str] = os.environ,
+    working_directory: Optional[str] = None,
+) -> Optional[int]:
+    # Returns the exit code of the program if it was run by the daemon
+    # and None if there is no daemon to run it.
+    socket_path = get_daemon_socket_path(environment)
+    if not socket_path or not os.path.exists(socket_path):
+        return None
+    request = {
+        "program": program,
+        "arguments": arguments,
+        # Relative paths in the arguments refer to the working
+        # directory of the client.
+        "workingDirectory": working_directory or os.getcwd(),
+        "environment": {
+            name: environment[name]
+            for name in FORWARDED_ENVIRONMENT_VARIABLES
+            if name in environment
+        },
+    }
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(socket_path)
+            connection.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with connection.makefile("rb") as response_file:
+                response = json.loads(response_file.readline())
+    except (OSError, ValueError):
+        # The daemon is not running anymore. The caller runs the
+        # program itself.
+        return None
+    sys.stderr.write(response["stderr"])
+    sys.stdout.write(response["stdout"])
+    return response["exitCode"]
@@ -1,98 +1,373 @@
+from __future__ import annotations
+
+import functools
 import os
-from functools import lru_cache
+import sys
+import threading
 from logging import Logger
+from typing import TYPE_CHECKING, Any, Callable, Mapping, Optional, TypeVar, cast
+
+from nix_prefetch_github.functor import lazy
+
+# Modules are only imported once they are needed to keep the startup
+# time of the programs low.
+if TYPE_CHECKING:
+    from nix_prefetch_github.alerter import CliAlerterImpl
+    from nix_prefetch_github.cache import CacheManagerImpl, JsonCacheDirectory
+    from nix_prefetch_github.command.async_command_runner import AsyncCommandRunnerImpl
+    from nix_prefetch_github.command.cassette import (
+        RecordingCommandRunner,
+        ReplayingCommandRunner,
+    )
+    from nix_prefetch_github.command.command_runner import CommandRunnerImpl
+    from nix_prefetch_github.commit_date import CommitDatePrefetcher
+    from nix_prefetch_github.controller.nix_prefetch_github_batch_controller import (
+        PrefetchBatchController,
+    )
+    from nix_prefetch_github.controller.nix_prefetch_github_controller import (
+        NixPrefetchGithubController,
+    )
+    from nix_prefetch_github.controller.nix_prefetch_github_directory_controller import (
+        PrefetchDirectoryController,
+    )
+    from nix_prefetch_github.controller.nix_prefetch_github_latest_release_controller import (
+        PrefetchLatestReleaseController,
+    )
+    from nix_prefetch_github.controller.nix_prefetch_github_lock_controller import (
+        LockController,
+    )
+    from nix_prefetch_github.controller.nix_prefetch_github_update_controller import (
+        UpdateSourcesController,
+    )
+    from nix_prefetch_github.hash_cache import CachingUrlHasher, HashDatabase
+    from nix_prefetch_github.hash_converter import HashConverterImpl
+    from nix_prefetch_github.http_pool import HttpConnectionPool
+    from nix_prefetch_github.interfaces import (
+        CommandRunner,
+        GithubAPI,
+        RepositoryDetector,
+        RevisionIndexFactory,
+    )
+    from nix_prefetch_github.latest_release import TagReleaseResolver
+    from nix_prefetch_github.list_remote_cache import CachingListRemoteFactory
+    from nix_prefetch_github.lockfile import JsonLockfileStore
+    from nix_prefetch_github.logging import LoggerFactoryImpl
+    from nix_prefetch_github.metrics import MetricsFileWriter, MetricsRegistryImpl
+    from nix_prefetch_github.prefetch import AsyncPrefetcherImpl, PrefetcherImpl
+    from nix_prefetch_github.presenter import PresenterImpl
+    from nix_prefetch_github.presenter.batch_presenter import BatchPresenterImpl
+    from nix_prefetch_github.presenter.lock_presenter import LockPresenterImpl
+    from nix_prefetch_github.presenter.repository_renderer import (
+        JsonRepositoryRenderer,
+        MetaRepositoryRenderer,
+        NixRepositoryRenderer,
+        RenderingSelectorImpl,
+    )
+    from nix_prefetch_github.presenter.update_presenter import UpdatePresenterImpl
+    from nix_prefetch_github.process_environment import ProcessEnvironmentImpl
+    from nix_prefetch_github.rate_limit import GithubRateLimiter
+    from nix_prefetch_github.retry import RetryPolicyImpl
+    from nix_prefetch_github.source_tree import (
+        SourceFileEditorImpl,
+        SourceTreeScannerImpl,
+    )
+    from nix_prefetch_github.tracing import TracerImpl
+    from nix_prefetch_github.url_hasher.nix_prefetch import NixPrefetchUrlHasherImpl
+    from nix_prefetch_github.url_hasher.selector import UrlHasherSelectorImpl
+    from nix_prefetch_github.url_hasher.streaming import StreamingUrlHasherImpl
+    from nix_prefetch_github.use_cases.lock_repositories import (
+        LockRepositoriesUseCaseImpl,
+    )
+    from nix_prefetch_github.use_cases.prefetch_batch import PrefetchBatchUseCaseImpl
+    from nix_prefetch_github.use_cases.prefetch_directory import (
+        PrefetchDirectoryUseCaseImpl,
+    )
+    from nix_prefetch_github.use_cases.prefetch_github_repository import (
+        PrefetchGithubRepositoryUseCaseImpl,
+    )
+    from nix_prefetch_github.use_cases.prefetch_latest_release import (
+        PrefetchLatestReleaseUseCaseImpl,
+    )
+    from nix_prefetch_github.use_cases.update_sources import UpdateSourcesUseCaseImpl
+    from nix_prefetch_github.views import CommandLineViewImpl
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def cached(method: F) -> F:
+    # Results are stored on the injector that created them instead of
+    # a global cache, so they live exactly as long as that injector.
+    @functools.wraps(method)
+    def wrapper(self: Any, *args: Any) -> Any:
+        lock = self.__dict__.setdefault("_cache_lock", threading.RLock())
+        cache = self.__dict__.setdefault("_cache", dict())
+        key = (method.__name__,) + args
+        with lock:
+            if key not in cache:
+                cache[key] = method(self, *args)
+            return cache[key]
 
-from nix_prefetch_github.alerter import CliAlerterImpl
-from nix_prefetch_github.command.command_runner import CommandRunnerImpl
-from nix_prefetch_github.controller.nix_prefetch_github_controller import (
-    NixPrefetchGithubController,
-)
-from nix_prefetch_github.controller.nix_prefetch_github_directory_controller import (
-    PrefetchDirectoryController,
-)
-from nix_prefetch_github.controller.nix_prefetch_github_latest_release_controller import (
-    PrefetchLatestReleaseController,
-)
-from nix_prefetch_github.github import GithubAPIImpl
-from nix_prefetch_github.hash_converter import HashConverterImpl
-from nix_prefetch_github.interfaces import (
-    GithubAPI,
-    RepositoryDetector,
-    RevisionIndexFactory,
-)
-from nix_prefetch_github.list_remote_factory import ListRemoteFactoryImpl
-from nix_prefetch_github.logging import LoggerFactoryImpl
-from nix_prefetch_github.prefetch import PrefetcherImpl
-from nix_prefetch_github.presenter import PresenterImpl
-from nix_prefetch_github.presenter.repository_renderer import (
-    JsonRepositoryRenderer,
-    MetaRepositoryRenderer,
-    NixRepositoryRenderer,
-    RenderingSelectorImpl,
-)
-from nix_prefetch_github.process_environment import ProcessEnvironmentImpl
-from nix_prefetch_github.repository_detector import RepositoryDetectorImpl
-from nix_prefetch_github.revision_index_factory import RevisionIndexFactoryImpl
-from nix_prefetch_github.url_hasher.nix_prefetch import NixPrefetchUrlHasherImpl
-from nix_prefetch_github.use_cases.prefetch_directory import (
-    PrefetchDirectoryUseCaseImpl,
-)
-from nix_prefetch_github.use_cases.prefetch_github_repository import (
-    PrefetchGithubRepositoryUseCaseImpl,
-)
-from nix_prefetch_github.use_cases.prefetch_latest_release import (
-    PrefetchLatestReleaseUseCaseImpl,
-)
-from nix_prefetch_github.views import CommandLineViewImpl
+    return cast(F, wrapper)
 
 
 class DependencyInjector:
     def get_alerter(self) -> CliAlerterImpl:
+        from nix_prefetch_github.alerter import CliAlerterImpl
+
         return CliAlerterImpl(
             logger=self.get_logger(),
         )
 
     def get_revision_index_factory(self) -> RevisionIndexFactory:
+        from nix_prefetch_github.revision_index_factory import RevisionIndexFactoryImpl
+
         return RevisionIndexFactoryImpl(self.get_remote_list_factory())
 
     def get_process_environment(self) -> ProcessEnvironmentImpl:
+        from nix_prefetch_github.process_environment import ProcessEnvironmentImpl
+
         return ProcessEnvironmentImpl()
 
-    def get_remote_list_factory(self) -> ListRemoteFactoryImpl:
-        return ListRemoteFactoryImpl(command_runner=self.get_command_runner())
+    def get_remote_list_factory(self) -> CachingListRemoteFactory:
+        from nix_prefetch_github.list_remote_cache import CachingListRemoteFactory
+        from nix_prefetch_github.list_remote_factory import ListRemoteFactoryImpl
+        from nix_prefetch_github.list_remote_http import SmartHttpListRemoteFactory
+
+        return CachingListRemoteFactory(
+            list_remote_factory=SmartHttpListRemoteFactory(
+                connection_pool=self.get_http_connection_pool(),
+                fallback_factory=ListRemoteFactoryImpl(
+                    command_runner=self.get_command_runner(),
+                    retry_policy=self.get_retry_policy(),
+                    server_url=self.get_github_server_url(),
+                ),
+                logger=self.get_logger(),
+                retry_policy=self.get_retry_policy(),
+                base_url=self.get_github_server_url(),
+            ),
+            cache_directory=self.get_list_remote_cache_directory(),
+            cache_manager=self.get_cache_manager(),
+            logger=self.get_logger(),
+            metrics=self.get_metrics_registry(),
+            server_url=self.get_github_server_url(),
+        )
+
+    @cached
+    def get_list_remote_cache_directory(self) -> JsonCacheDirectory:
+        from nix_prefetch_github.cache import JsonCacheDirectory
+
+        return JsonCacheDirectory(os.path.join(self.get_cache_directory(), "ls-remote"))
+
+    @cached
+    def get_github_api_cache_directory(self) -> JsonCacheDirectory:
+        from nix_prefetch_github.cache import JsonCacheDirectory
+
+        return JsonCacheDirectory(
+            os.path.join(self.get_cache_directory(), "github-api")
+        )
+
+    @cached
+    def get_hash_database(self) -> HashDatabase:
+        from nix_prefetch_github.hash_cache import HashDatabase
+
+        return HashDatabase(os.path.join(self.get_cache_directory(), "hashes.sqlite"))
+
+    @cached
+    def get_http_connection_pool(self) -> HttpConnectionPool:
+        from nix_prefetch_github.http_pool import HttpConnectionPool
+
+        return HttpConnectionPool()
+
+    @cached
+    def get_cache_manager(self) -> CacheManagerImpl:
+        from nix_prefetch_github.cache import CacheManagerImpl
+
+        return CacheManagerImpl()
+
+    @cached
+    def get_retry_policy(self) -> RetryPolicyImpl:
+        from nix_prefetch_github.retry import RetryPolicyImpl
+
+        return RetryPolicyImpl(logger=self.get_logger())
+
+    def get_environment(self) -> Mapping[str, str]:
+        return os.environ
+
+    def get_working_directory(self) -> Optional[str]:
+        # Relative paths given as options are resolved against this
+        # directory. None stands for the working directory of the
+        # process.
+        return None
+
+    def get_github_server_url(self) -> str:
+        return (
+            self.get_environment().get("GITHUB_SERVER_URL") or "https://github.com"
+        ).rstrip("/")
+
+    def get_cache_directory(self) -> str:
+        from nix_prefetch_github.cache import get_cache_directory
+
+        return get_cache_directory(os.environ)
 
     def get_view(self) -> CommandLineViewImpl:
+        from nix_prefetch_github.views import CommandLineViewImpl
+
         return CommandLineViewImpl()
 
     def get_nix_prefetch_url_hasher_impl(self) -> NixPrefetchUrlHasherImpl:
+        from nix_prefetch_github.url_hasher.nix_prefetch import NixPrefetchUrlHasherImpl
+
         return NixPrefetchUrlHasherImpl(
             command_runner=self.get_command_runner(),
             logger=self.get_logger(),
             hash_converter=self.get_hash_converter(),
+            retry_policy=self.get_retry_policy(),
+            server_url=self.get_github_server_url(),
+        )
+
+    def get_commit_date_prefetcher(self) -> CommitDatePrefetcher:
+        from nix_prefetch_github.commit_date import CommitDatePrefetcher
+
+        return CommitDatePrefetcher(
+            url_hasher=self.get_nix_prefetch_url_hasher_impl(),
+            github_api=lazy(self.get_github_api),
+            rendering_format_selector=self.get_rendering_format_selector(),
         )
 
     def get_hash_converter(self) -> HashConverterImpl:
-        return HashConverterImpl(command_runner=self.get_command_runner())
+        from nix_prefetch_github.hash_converter import HashConverterImpl
+
+        return HashConverterImpl(
+            command_runner=self.get_command_runner(), tracer=self.get_tracer()
+        )
+
+    def get_streaming_url_hasher_impl(self) -> StreamingUrlHasherImpl:
+        from nix_prefetch_github.url_hasher.streaming import StreamingUrlHasherImpl
+
+        return StreamingUrlHasherImpl(
+            fallback_hasher=self.get_commit_date_prefetcher(),
+            logger=self.get_logger(),
+            retry_policy=self.get_retry_policy(),
+            server_url=self.get_github_server_url(),
+        )
+
+    @cached
+    def get_url_hasher_selector(self) -> UrlHasherSelectorImpl:
+        from nix_prefetch_github.url_hasher.selector import UrlHasherSelectorImpl
+
+        return UrlHasherSelectorImpl(
+            nix_hasher=self.get_commit_date_prefetcher(),
+            builtin_hasher=lazy(self.get_streaming_url_hasher_impl),
+        )
+
+    def get_caching_url_hasher(self) -> CachingUrlHasher:
+        from nix_prefetch_github.hash_cache import CachingUrlHasher
+
+        return CachingUrlHasher(
+            url_hasher=self.get_url_hasher_selector(),
+            database=self.get_hash_database(),
+            cache_manager=self.get_cache_manager(),
+            logger=self.get_logger(),
+            tracer=self.get_tracer(),
+            metrics=self.get_metrics_registry(),
+            server_url=self.get_github_server_url(),
+        )
 
     def get_prefetcher(self) -> PrefetcherImpl:
+        from nix_prefetch_github.prefetch import PrefetcherImpl
+
+        # Revisions that are given as commit hashes never need to be
+        # resolved.
         return PrefetcherImpl(
-            self.get_nix_prefetch_url_hasher_impl(), self.get_revision_index_factory()
+            self.get_caching_url_hasher(),
+            lazy(self.get_revision_index_factory),
+            tracer=self.get_tracer(),
+            metrics=self.get_metrics_registry(),
+            retry_policy=self.get_retry_policy(),
+        )
+
+    @cached
+    def get_async_command_runner(self) -> AsyncCommandRunnerImpl:
+        from nix_prefetch_github.command.async_command_runner import (
+            AsyncCommandRunnerImpl,
+        )
+
+        return AsyncCommandRunnerImpl(
+            logger=self.get_logger(),
+            tracer=self.get_tracer(),
+            metrics=self.get_metrics_registry(),
+        )
+
+    def get_async_prefetcher(self) -> AsyncPrefetcherImpl:
+        from nix_prefetch_github.hash_cache import AsyncCachingUrlHasher
+        from nix_prefetch_github.list_remote_cache import AsyncCachingListRemoteFactory
+        from nix_prefetch_github.list_remote_factory import AsyncListRemoteFactoryImpl
+        from nix_prefetch_github.prefetch import AsyncPrefetcherImpl
+        from nix_prefetch_github.revision_index_factory import (
+            AsyncRevisionIndexFactoryImpl,
+        )
+        from nix_prefetch_github.url_hasher.nix_prefetch import (
+            AsyncNixPrefetchUrlHasherImpl,
+        )
+
+        # The async variants share the caches, the retry policy and the
+        # metrics with the synchronous prefetcher.
+        return AsyncPrefetcherImpl(
+            url_hasher=AsyncCachingUrlHasher(
+                url_hasher=AsyncNixPrefetchUrlHasherImpl(
+                    command_runner=self.get_async_command_runner(),
+                    logger=self.get_logger(),
+                    hash_converter=self.get_hash_converter(),
+                    retry_policy=self.get_retry_policy(),
+                    server_url=self.get_github_server_url(),
+                ),
+                cache=self.get_caching_url_hasher(),
+            ),
+            revision_index_factory=AsyncRevisionIndexFactoryImpl(
+                AsyncCachingListRemoteFactory(
+                    list_remote_factory=AsyncListRemoteFactoryImpl(
+                        command_runner=self.get_async_command_runner(),
+                        retry_policy=self.get_retry_policy(),
+                        server_url=self.get_github_server_url(),
+                    ),
+                    cache=self.get_remote_list_factory(),
+                )
+            ),
+            tracer=self.get_tracer(),
+            metrics=self.get_metrics_registry(),
+            retry_policy=self.get_retry_policy(),
         )
 
     def get_nix_repository_renderer(self) -> NixRepositoryRenderer:
+        from nix_prefetch_github.presenter.repository_renderer import (
+            NixRepositoryRenderer,
+        )
+
         return NixRepositoryRenderer()
 
     def get_json_repository_renderer(self) -> JsonRepositoryRenderer:
+        from nix_prefetch_github.presenter.repository_renderer import (
+            JsonRepositoryRenderer,
+        )
+
         return JsonRepositoryRenderer()
 
     def get_meta_repository_renderer(self) -> MetaRepositoryRenderer:
+        from nix_prefetch_github.presenter.repository_renderer import (
+            MetaRepositoryRenderer,
+        )
+
         return MetaRepositoryRenderer(
-            github_api=self.get_github_api(),
+            github_api=lazy(self.get_github_api),
             json_renderer=self.get_json_repository_renderer(),
         )
 
-    @lru_cache
+    @cached
     def get_rendering_format_selector(self) -> RenderingSelectorImpl:
+        from nix_prefetch_github.presenter.repository_renderer import (
+            RenderingSelectorImpl,
+        )
+
         return RenderingSelectorImpl(
             nix_renderer=self.get_nix_repository_renderer(),
             json_renderer=self.get_json_repository_renderer(),
@@ -100,18 +375,114 @@ class DependencyInjector:
         )
 
     def get_github_api(self) -> GithubAPI:
-        return GithubAPIImpl(logger=self.get_logger(), environment=os.environ)
+        from nix_prefetch_github.github import GithubAPIImpl
+
+        return GithubAPIImpl(
+            logger=self.get_logger(),
+            environment=self.get_environment(),
+            connection_pool=self.get_http_connection_pool(),
+            response_cache=self.get_github_api_cache_directory(),
+            cache_manager=self.get_cache_manager(),
+            rate_limiter=self.get_github_rate_limiter(),
+            retry_policy=self.get_retry_policy(),
+            tracer=self.get_tracer(),
+            metrics=self.get_metrics_registry(),
+        )
+
+    def get_github_rate_limiter(self) -> GithubRateLimiter:
+        return self.get_github_rate_limiter_for_token(
+            self.get_environment().get("GITHUB_TOKEN")
+        )
+
+    @cached
+    def get_github_rate_limiter_for_token(
+        self, token: Optional[str]
+    ) -> GithubRateLimiter:
+        from nix_prefetch_github.rate_limit import GithubRateLimiter
+
+        # GitHub's quota belongs to the token that requests are
+        # authenticated with.
+        return GithubRateLimiter(logger=self.get_logger())
 
     def get_repository_detector(self) -> RepositoryDetector:
+        from nix_prefetch_github.repository_detector import RepositoryDetectorImpl
+
         return RepositoryDetectorImpl(
             command_runner=self.get_command_runner(), logger=self.get_logger()
         )
 
-    def get_command_runner(self) -> CommandRunnerImpl:
-        return CommandRunnerImpl(logger=self.get_logger())
+    def get_command_runner(self) -> CommandRunner:
+        # External commands can be recorded to a cassette file and
+        # replayed from it later, e.g. to run benchmarks on machines
+        # without nix or network access.
+        environment = self.get_environment()
+        if environment.get("NIX_PREFETCH_GITHUB_REPLAY_COMMANDS"):
+            return self.get_replaying_command_runner()
+        if environment.get("NIX_PREFETCH_GITHUB_RECORD_COMMANDS"):
+            return self.get_recording_command_runner()
+        return self.get_command_runner_impl()
+
+    def get_command_runner_impl(self) -> CommandRunnerImpl:
+        from nix_prefetch_github.command.command_runner import CommandRunnerImpl
+
+        return CommandRunnerImpl(
+            logger=self.get_logger(),
+            tracer=self.get_tracer(),
+            metrics=self.get_metrics_registry(),
+        )
+
+    @cached
+    def get_recording_command_runner(self) -> RecordingCommandRunner:
+        from nix_prefetch_github.command.cassette import RecordingCommandRunner
 
-    @lru_cache()
+        return RecordingCommandRunner(
+            command_runner=self.get_command_runner_impl(),
+            cassette_path=self.get_environment()["NIX_PREFETCH_GITHUB_RECORD_COMMANDS"],
+        )
+
+    @cached
+    def get_replaying_command_runner(self) -> ReplayingCommandRunner:
+        from nix_prefetch_github.command.cassette import (
+            ReplayingCommandRunner,
+            read_cassette,
+        )
+
+        environment = self.get_environment()
+        return ReplayingCommandRunner(
+            recordings=read_cassette(
+                environment["NIX_PREFETCH_GITHUB_REPLAY_COMMANDS"]
+            ),
+            logger=self.get_logger(),
+            reproduce_latency=bool(
+                environment.get("NIX_PREFETCH_GITHUB_REPLAY_LATENCY")
+            ),
+        )
+
+    @cached
+    def get_tracer(self) -> TracerImpl:
+        from nix_prefetch_github.tracing import TracerImpl
+
+        return TracerImpl(working_directory=self.get_working_directory())
+
+    @cached
+    def get_metrics_registry(self) -> MetricsRegistryImpl:
+        from nix_prefetch_github.metrics import MetricsRegistryImpl
+
+        return MetricsRegistryImpl()
+
+    def get_metrics_file_writer(self) -> MetricsFileWriter:
+        from nix_prefetch_github.metrics import MetricsFileWriter
+
+        return MetricsFileWriter(
+            registry=self.get_metrics_registry(),
+            logger=self.get_logger(),
+            working_directory=self.get_working_directory(),
+        )
+
+    @cached
     def get_logger_factory(self) -> LoggerFactoryImpl:
+        from nix_prefetch_github.logging import LoggerFactoryImpl
+
         return LoggerFactoryImpl()
 
     def get_logger(self) -> Logger:
@@ -119,21 +490,81 @@ class DependencyInjector:
         return factory.get_logger()
 
     def get_presenter_impl(self) -> PresenterImpl:
+        from nix_prefetch_github.presenter import PresenterImpl
+
         return PresenterImpl(
             view=self.get_view(),
             repository_renderer=self.get_rendering_format_selector(),
         )
 
+    def get_batch_presenter_impl(self) -> BatchPresenterImpl:
+        from nix_prefetch_github.presenter.batch_presenter import BatchPresenterImpl
+
+        return BatchPresenterImpl(
+            output=sys.stdout,
+            view=self.get_view(),
+            json_renderer=self.get_json_repository_renderer(),
+        )
+
+    def get_lock_presenter_impl(self) -> LockPresenterImpl:
+        from nix_prefetch_github.presenter.lock_presenter import LockPresenterImpl
+
+        return LockPresenterImpl(output=sys.stdout, view=self.get_view())
+
+    def get_lockfile_store(self) -> JsonLockfileStore:
+        from nix_prefetch_github.lockfile import JsonLockfileStore
+
+        return JsonLockfileStore()
+
+    def get_update_presenter_impl(self) -> UpdatePresenterImpl:
+        from nix_prefetch_github.presenter.update_presenter import UpdatePresenterImpl
+
+        return UpdatePresenterImpl(output=sys.stdout, view=self.get_view())
+
+    def get_source_tree_scanner(self) -> SourceTreeScannerImpl:
+        from nix_prefetch_github.cache import JsonCacheDirectory
+        from nix_prefetch_github.source_tree import SourceTreeScannerImpl
+
+        return SourceTreeScannerImpl(
+            index_directory=JsonCacheDirectory(
+                os.path.join(self.get_cache_directory(), "update-index")
+            ),
+            logger=self.get_logger(),
+        )
+
+    def get_source_file_editor(self) -> SourceFileEditorImpl:
+        from nix_prefetch_github.source_tree import SourceFileEditorImpl
+
+        return SourceFileEditorImpl()
+
     def get_prefetch_latest_release_use_case(self) -> PrefetchLatestReleaseUseCaseImpl:
+        from nix_prefetch_github.use_cases.prefetch_latest_release import (
+            PrefetchLatestReleaseUseCaseImpl,
+        )
+
         return PrefetchLatestReleaseUseCaseImpl(
             presenter=self.get_presenter_impl(),
             prefetcher=self.get_prefetcher(),
-            github_api=self.get_github_api(),
+            github_api=lazy(self.get_github_api),
+            release_resolver=lazy(self.get_tag_release_resolver),
+            list_remote_factory=lazy(self.get_remote_list_factory),
+        )
+
+    def get_tag_release_resolver(self) -> TagReleaseResolver:
+        from nix_prefetch_github.latest_release import TagReleaseResolver
+
+        return TagReleaseResolver(
+            list_remote_factory=self.get_remote_list_factory(),
+            logger=self.get_logger(),
         )
 
     def get_prefetch_github_repository_use_case(
         self,
     ) -> PrefetchGithubRepositoryUseCaseImpl:
+        from nix_prefetch_github.use_cases.prefetch_github_repository import (
+            PrefetchGithubRepositoryUseCaseImpl,
+        )
+
         return PrefetchGithubRepositoryUseCaseImpl(
             presenter=self.get_presenter_impl(),
             prefetcher=self.get_prefetcher(),
@@ -141,6 +572,10 @@ class DependencyInjector:
         )
 
     def get_prefetch_directory_use_case(self) -> PrefetchDirectoryUseCaseImpl:
+        from nix_prefetch_github.use_cases.prefetch_directory import (
+            PrefetchDirectoryUseCaseImpl,
+        )
+
         return PrefetchDirectoryUseCaseImpl(
             presenter=self.get_presenter_impl(),
             prefetcher=self.get_prefetcher(),
@@ -148,24 +583,139 @@ class DependencyInjector:
             logger=self.get_logger(),
         )
 
+    def get_prefetch_batch_use_case(self) -> PrefetchBatchUseCaseImpl:
+        from nix_prefetch_github.use_cases.prefetch_batch import (
+            PrefetchBatchUseCaseImpl,
+        )
+
+        return PrefetchBatchUseCaseImpl(
+            presenter=self.get_batch_presenter_impl(),
+            prefetcher=self.get_prefetcher(),
+            alerter=self.get_alerter(),
+            logger=self.get_logger(),
+            github_api=lazy(self.get_github_api),
+            github_quota=lazy(self.get_github_rate_limiter),
+        )
+
     def get_prefetch_github_repository_controller(self) -> NixPrefetchGithubController:
+        from nix_prefetch_github.controller.nix_prefetch_github_controller import (
+            NixPrefetchGithubController,
+        )
+
         return NixPrefetchGithubController(
             use_case=self.get_prefetch_github_repository_use_case(),
             logger_manager=self.get_logger_factory(),
             rendering_format_selector=self.get_rendering_format_selector(),
+            cache_manager=self.get_cache_manager(),
+            retry_manager=self.get_retry_policy(),
+            hashing_backend_selector=self.get_url_hasher_selector(),
+            trace_manager=self.get_tracer(),
+            metrics_manager=self.get_metrics_file_writer(),
         )
 
     def get_prefetch_latest_release_controller(self) -> PrefetchLatestReleaseController:
+        from nix_prefetch_github.controller.nix_prefetch_github_latest_release_controller import (
+            PrefetchLatestReleaseController,
+        )
+
         return PrefetchLatestReleaseController(
             use_case=self.get_prefetch_latest_release_use_case(),
             logger_manager=self.get_logger_factory(),
             rendering_format_selector=self.get_rendering_format_selector(),
+            cache_manager=self.get_cache_manager(),
+            retry_manager=self.get_retry_policy(),
+            hashing_backend_selector=self.get_url_hasher_selector(),
+            trace_manager=self.get_tracer(),
+            metrics_manager=self.get_metrics_file_writer(),
         )
 
     def get_prefetch_directory_controller(self) -> PrefetchDirectoryController:
+        from nix_prefetch_github.controller.nix_prefetch_github_directory_controller import (
+            PrefetchDirectoryController,
+        )
+
         return PrefetchDirectoryController(
             logger_manager=self.get_logger_factory(),
             use_case=self.get_prefetch_directory_use_case(),
             environment=self.get_process_environment(),
             rendering_format_selector=self.get_rendering_format_selector(),
+            cache_manager=self.get_cache_manager(),
+            retry_manager=self.get_retry_policy(),
+            hashing_backend_selector=self.get_url_hasher_selector(),
+            trace_manager=self.get_tracer(),
+            metrics_manager=self.get_metrics_file_writer(),
+        )
+
+    def get_prefetch_batch_controller(self) -> PrefetchBatchController:
+        from nix_prefetch_github.controller.nix_prefetch_github_batch_controller import (
+            PrefetchBatchController,
+        )
+
+        return PrefetchBatchController(
+            use_case=self.get_prefetch_batch_use_case(),
+            logger_manager=self.get_logger_factory(),
+            cache_manager=self.get_cache_manager(),
+            retry_manager=self.get_retry_policy(),
+            hashing_backend_selector=self.get_url_hasher_selector(),
+            trace_manager=self.get_tracer(),
+            metrics_manager=self.get_metrics_file_writer(),
+        )
+
+    def get_update_sources_use_case(self) -> UpdateSourcesUseCaseImpl:
+        from nix_prefetch_github.use_cases.update_sources import (
+            UpdateSourcesUseCaseImpl,
+        )
+
+        return UpdateSourcesUseCaseImpl(
+            presenter=self.get_update_presenter_impl(),
+            scanner=self.get_source_tree_scanner(),
+            editor=self.get_source_file_editor(),
+            prefetcher=self.get_prefetcher(),
+            revision_index_factory=self.get_revision_index_factory(),
+            alerter=self.get_alerter(),
+            logger=self.get_logger(),
+        )
+
+    def get_update_sources_controller(self) -> UpdateSourcesController:
+        from nix_prefetch_github.controller.nix_prefetch_github_update_controller import (
+            UpdateSourcesController,
+        )
+
+        return UpdateSourcesController(
+            use_case=self.get_update_sources_use_case(),
+            logger_manager=self.get_logger_factory(),
+            cache_manager=self.get_cache_manager(),
+            retry_manager=self.get_retry_policy(),
+            hashing_backend_selector=self.get_url_hasher_selector(),
+            trace_manager=self.get_tracer(),
+            metrics_manager=self.get_metrics_file_writer(),
+        )
+
+    def get_lock_repositories_use_case(self) -> LockRepositoriesUseCaseImpl:
+        from nix_prefetch_github.use_cases.lock_repositories import (
+            LockRepositoriesUseCaseImpl,
+        )
+
+        return LockRepositoriesUseCaseImpl(
+            presenter=self.get_lock_presenter_impl(),
+            lockfile_store=self.get_lockfile_store(),
+            revision_index_factory=self.get_revision_index_factory(),
+            prefetcher=self.get_prefetcher(),
+            alerter=self.get_alerter(),
+            logger=self.get_logger(),
+        )
+
+    def get_lock_controller(self) -> LockController:
+        from nix_prefetch_github.controller.nix_prefetch_github_lock_controller import (
+            LockController,
+        )
+
+        return LockController(
+            use_case=self.get_lock_repositories_use_case(),
+            logger_manager=self.get_logger_factory(),
+            cache_manager=self.get_cache_manager(),
+            retry_manager=self.get_retry_policy(),
+            hashing_backend_selector=self.get_url_hasher_selector(),
+            trace_manager=self.get_tracer(),
+            metrics_manager=self.get_metrics_file_writer(),
         )
@@ -1,4 +1,5 @@
-from typing import Callable, Optional, TypeVar
+import threading
+from typing import Any, Callable, Optional, TypeVar, cast
 
 T = TypeVar("T")
 U = TypeVar("U")
@@ -9,3 +10,31 @@ def map_or_none(mapping: Callable[[T], U], value: Optional[T]) -> Optional[U]:
         return None
     else:
         return mapping(value)
+
+
+async def to_thread(function: Callable[..., T], *args: Any) -> T:
+    # Runs blocking calls without blocking the event loop. asyncio is
+    # only imported by programs that prefetch asynchronously.
+    import asyncio
+
+    return await asyncio.to_thread(function, *args)
+
+
+def lazy(factory: Callable[[], T]) -> T:
+    # Returns a stand-in that creates the actual object only when one
+    # of its attributes is accessed for the first time.
+    return cast(T, _Lazy(factory))
+
+
+class _Lazy:
+    def __init__(self, factory: Callable[[], Any]) -> None:
+        self._factory = factory
+        self._instance: Any = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return getattr(self._instance, name)
@@ -1,14 +1,30 @@
-import io
+import hashlib
 import json
+import time
+import urllib.parse
 from datetime import datetime
-from http.client import HTTPResponse
-from json.decoder import JSONDecodeError
 from logging import Logger
-from typing import Any, Optional, Protocol
-from urllib.error import HTTPError
-from urllib.request import Request, urlopen
+from typing import Any, Dict, List, Optional, Protocol, Tuple, TypeVar
 
-from nix_prefetch_github.interfaces import GithubRepository
+from nix_prefetch_github.cache import CacheManager, JsonCacheDirectory
+from nix_prefetch_github.http_pool import HttpConnectionPool, HttpResponse
+from nix_prefetch_github.interfaces import (
+    GithubRepository,
+    Metrics,
+    RetryPolicy,
+    Tracer,
+)
+from nix_prefetch_github.rate_limit import GithubRateLimiter
+from nix_prefetch_github.retry import is_transient_http_status
+from nix_prefetch_github.version import VERSION_STRING
+
+_MAX_REDIRECTS = 5
+_MAX_RATE_LIMIT_RETRIES = 3
+# GitHub limits the number of nodes a single GraphQL query may
+# request. 100 repositories per query stay well below that limit.
+_GRAPHQL_BATCH_SIZE = 100
+
+T = TypeVar("T")
 
 
 class Environment(Protocol):
@@ -16,15 +32,33 @@ class Environment(Protocol):
 
 
 class GithubAPIImpl:
-    def __init__(self, logger: Logger, environment: Environment) -> None:
+    def __init__(
+        self,
+        logger: Logger,
+        environment: Environment,
+        connection_pool: HttpConnectionPool,
+        response_cache: JsonCacheDirectory,
+        cache_manager: CacheManager,
+        rate_limiter: GithubRateLimiter,
+        retry_policy: RetryPolicy,
+        tracer: Tracer,
+        metrics: Metrics,
+    ) -> None:
         self.logger = logger
         self._environment = environment
+        self._connection_pool = connection_pool
+        self._response_cache = response_cache
+        self._cache_manager = cache_manager
+        self._rate_limiter = rate_limiter
+        self._retry_policy = retry_policy
+        self._tracer = tracer
+        self._metrics = metrics
 
     def get_tag_of_latest_release(self, repository: GithubRepository) -> Optional[str]:
         self.logger.info(
             f"Query latest release for repository {repository.owner}/{repository.name} from GitHub."
         )
-        url = f"https://api.github.com/repos/{repository.owner}/{repository.name}/releases/latest"
+        url = f"{self._api_url()}/repos/{repository.owner}/{repository.name}/releases/latest"
         response_json = self._request_json_document(url)
         if response_json is None:
             return None
@@ -33,13 +67,84 @@ class GithubAPIImpl:
     def get_commit_date(
         self, repository: GithubRepository, commit_sha1_hash: str
     ) -> Optional[datetime]:
-        url = f"https://api.github.com/repos/{repository.owner}/{repository.name}/commits/{commit_sha1_hash}"
+        url = f"{self._api_url()}/repos/{repository.owner}/{repository.name}/commits/{commit_sha1_hash}"
         response_json = self._request_json_document(url)
         if response_json is None:
             return None
         date_string = response_json.get("commit", {}).get("committer", {}).get("date")
         return self._parse_timestamp(date_string)
 
+    def get_tags_of_latest_releases(
+        self, repositories: List[GithubRepository]
+    ) -> Dict[GithubRepository, Optional[str]]:
+        results: Dict[GithubRepository, Optional[str]] = dict()
+        for chunk in _chunked(list(dict.fromkeys(repositories))):
+            self.logger.info(
+                "Query latest releases for %s repositories from GitHub", len(chunk)
+            )
+            variables: Dict[str, str] = dict()
+            fields: List[str] = []
+            for n, repository in enumerate(chunk):
+                variables[f"owner{n}"] = repository.owner
+                variables[f"name{n}"] = repository.name
+                fields.append(
+                    f"repository(owner: $owner{n}, name: $name{n}) "
+                    "{ latestRelease { tagName } }"
+                )
+            documents = self._query_aliased_fields(fields, variables)
+            if documents is None:
+                self._plan_requests(len(chunk))
+                for repository in chunk:
+                    results[repository] = self.get_tag_of_latest_release(repository)
+                continue
+            for repository, document in zip(chunk, documents):
+                release = (document or {}).get("latestRelease") or {}
+                results[repository] = release.get("tagName")
+        return results
+
+    def get_commit_dates(
+        self, commits: List[Tuple[GithubRepository, str]]
+    ) -> Dict[Tuple[GithubRepository, str], Optional[datetime]]:
+        results: Dict[Tuple[GithubRepository, str], Optional[datetime]] = dict()
+        for chunk in _chunked(list(dict.fromkeys(commits))):
+            variables: Dict[str, str] = dict()
+            fields: List[str] = []
+            for n, (repository, commit_sha1_hash) in enumerate(chunk):
+                variables[f"owner{n}"] = repository.owner
+                variables[f"name{n}"] = repository.name
+                variables[f"commit{n}"] = commit_sha1_hash
+                fields.append(
+                    f"repository(owner: $owner{n}, name: $name{n}) "
+                    f"{{ object(expression: $commit{n}) "
+                    "{ ... on Commit { committedDate } } }"
+                )
+            documents = self._query_aliased_fields(fields, variables)
+            if documents is None:
+                self._plan_requests(len(chunk))
+                for repository, commit_sha1_hash in chunk:
+                    results[(repository, commit_sha1_hash)] = self.get_commit_date(
+                        repository, commit_sha1_hash
+                    )
+                continue
+            for commit, document in zip(chunk, documents):
+                date_string = ((document or {}).get("object") or {}).get(
+                    "committedDate"
+                )
+                results[commit] = (
+                    None if date_string is None else self._parse_timestamp(date_string)
+                )
+        return results
+
+    def _api_url(self) -> str:
+        return (
+            self._environment.get("GITHUB_API_URL") or "https://api.github.com"
+        ).rstrip("/")
+
+    def _graphql_url(self) -> str:
+        return (
+            self._environment.get("GITHUB_GRAPHQL_URL") or f"{self._api_url()}/graphql"
+        )
+
     def _parse_timestamp(self, timestamp: str) -> Optional[datetime]:
         try:
             return datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S%z")
@@ -47,30 +152,272 @@ class GithubAPIImpl:
             self.logger.exception(e)
             return None
 
-    def _request_json_document(self, url: str) -> Optional[Any]:
-        self.logger.debug("GET JSON document from %s", url)
-        request = Request(url)
+    def _query_aliased_fields(
+        self, fields: List[str], variables: Dict[str, str]
+    ) -> Optional[List[Optional[Any]]]:
+        # Every field is queried under its own alias so that many
+        # repositories can be combined into a single query. Fields
+        # that could not be resolved are returned as None. None is
+        # returned if the query failed as a whole.
+        headers = self._get_request_headers()
+        if "Authorization" not in headers:
+            # GitHub's GraphQL API cannot be used without
+            # authentication.
+            return None
+        declarations = ", ".join(f"${name}: String!" for name in variables)
+        selections = " ".join(f"r{n}: {field}" for n, field in enumerate(fields))
+        url = self._graphql_url()
+        self.logger.debug("POST GraphQL query with %s fields to %s", len(fields), url)
+        try:
+            response = self._request(
+                "POST",
+                url,
+                headers=dict(headers, **{"Content-Type": "application/json"}),
+                body=json.dumps(
+                    {
+                        "query": f"query({declarations}) {{ {selections} }}",
+                        "variables": variables,
+                    }
+                ).encode("utf-8"),
+            )
+        except OSError as e:
+            self.logger.error("Could not reach GitHub API at %s: %s", url, e)
+            return None
+        if response.status != 200:
+            self.logger.error(
+                "HTTP Error %s: %s for %s", response.status, response.reason, url
+            )
+            return None
+        try:
+            document = self._decode_json_from_response(response)
+        except ValueError as e:
+            self.logger.error(e)
+            return None
+        if not isinstance(document, dict):
+            self.logger.error("Unexpected GraphQL response from %s", url)
+            return None
+        for error in document.get("errors") or []:
+            self.logger.warning(
+                "GitHub GraphQL API error: %s", (error or {}).get("message")
+            )
+        data = document.get("data")
+        if not isinstance(data, dict):
+            return None
+        return [data.get(f"r{n}") for n in range(len(fields))]
+
+    def _get_request_headers(self) -> Dict[str, str]:
+        headers = {
+            "Accept": "application/vnd.github+json",
+            "User-Agent": f"nix-prefetch-github/{VERSION_STRING.strip()}",
+        }
         environment_variable_name = "GITHUB_TOKEN"
         if api_key := self._environment.get(environment_variable_name):
             self.logger.debug(
                 "Authenticating via GitHub API token from environment variable '%s'",
                 environment_variable_name,
             )
-            request.add_header("Authorization", f"Bearer {api_key}")
+            headers["Authorization"] = f"Bearer {api_key}"
+        return headers
+
+    def _request_json_document(self, url: str) -> Optional[Any]:
+        self.logger.debug("GET JSON document from %s", url)
+        headers = self._get_request_headers()
+        api_key = self._environment.get("GITHUB_TOKEN")
+        # Responses depend on the token that was used for the request.
+        # Only a hash of the token is used so that it is not stored on
+        # disk.
+        cache_key = " ".join(
+            [url, hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()]
+        )
+        cached = self._read_cached_response(cache_key, url)
+        # Conditional requests do not count against GitHub's rate limit
+        # if the document did not change.
+        if cached is not None:
+            if etag := cached.get("etag"):
+                headers["If-None-Match"] = etag
+            if last_modified := cached.get("lastModified"):
+                headers["If-Modified-Since"] = last_modified
         try:
-            with urlopen(request) as response:
-                self.logger.debug(
-                    "Response was %(status)s %(reason)s",
-                    dict(status=response.status, reason=response.reason),
-                )
-                return self._decode_json_from_response(response)
-        except (HTTPError, JSONDecodeError) as e:
+            response = self._get(url, headers)
+        except OSError as e:
+            self.logger.error("Could not reach GitHub API at %s: %s", url, e)
+            return None
+        self.logger.debug(
+            "Response was %(status)s %(reason)s",
+            dict(status=response.status, reason=response.reason),
+        )
+        if response.status == 304 and cached is not None:
+            self._metrics.increment_counter(
+                "cache_requests_total", cache="github_api", result="hit"
+            )
+            return cached["document"]
+        self._metrics.increment_counter(
+            "cache_requests_total", cache="github_api", result="miss"
+        )
+        if response.status != 200:
+            self.logger.error(
+                "HTTP Error %s: %s for %s", response.status, response.reason, url
+            )
+            return None
+        try:
+            document = self._decode_json_from_response(response)
+        except ValueError as e:
             self.logger.error(e)
             return None
-
-    def _decode_json_from_response(self, response: HTTPResponse) -> Any:
-        return json.load(
-            io.TextIOWrapper(
-                response, encoding=response.info().get_content_charset("utf-8")
+        if response.header("etag") or response.header("last-modified"):
+            self._write_cached_response(
+                cache_key,
+                {
+                    "url": url,
+                    "etag": response.header("etag"),
+                    "lastModified": response.header("last-modified"),
+                    "document": document,
+                },
             )
+        return document
+
+    def _plan_requests(self, count: int) -> None:
+        if count < 2:
+            return
+        # Requests to /rate_limit do not count against the quota.
+        url = f"{self._api_url()}/rate_limit"
+        try:
+            response = self._request("GET", url, headers=self._get_request_headers())
+        except OSError as e:
+            self.logger.warning("Could not query rate limit from %s: %s", url, e)
+        else:
+            self._rate_limiter.update(response, is_counted=False)
+            self._record_rate_limit()
+        self._rate_limiter.plan_requests(count)
+
+    def _get(self, url: str, headers: Dict[str, str]) -> HttpResponse:
+        return self._retry_policy.run(
+            f"GET {url}",
+            lambda: self._follow_redirects(url, headers),
+            get_transient_failure=_get_transient_http_failure,
+            is_transient_error=lambda error: isinstance(error, OSError),
         )
+
+    def _follow_redirects(self, url: str, headers: Dict[str, str]) -> HttpResponse:
+        api_origin = _get_origin(url)
+        for _ in range(_MAX_REDIRECTS):
+            if _get_origin(url) == api_origin:
+                response = self._get_rate_limited(url, headers)
+            else:
+                # Only requests to the API count against its quota.
+                response = self._request("GET", url, headers=headers)
+            location = response.header("location")
+            if response.status not in (301, 302, 307, 308) or not location:
+                return response
+            url = urllib.parse.urljoin(url, location)
+            if _get_origin(url) != api_origin:
+                # The token must not be sent to other hosts, e.g. when
+                # an archive is served from a different domain.
+                headers = {
+                    name: value
+                    for name, value in headers.items()
+                    if name.lower() != "authorization"
+                }
+            self.logger.debug("Following redirect to %s", url)
+        return response
+
+    def _get_rate_limited(self, url: str, headers: Dict[str, str]) -> HttpResponse:
+        for _ in range(_MAX_RATE_LIMIT_RETRIES):
+            self._rate_limiter.acquire()
+            response = self._request("GET", url, headers=headers)
+            is_rate_limited = self._rate_limiter.update(response)
+            self._record_rate_limit()
+            if not is_rate_limited:
+                break
+        return response
+
+    def _record_rate_limit(self) -> None:
+        if self._rate_limiter.remaining is not None:
+            self._metrics.set_gauge(
+                "github_api_rate_limit_remaining", self._rate_limiter.remaining
+            )
+        if self._rate_limiter.limit is not None:
+            self._metrics.set_gauge(
+                "github_api_rate_limit_limit", self._rate_limiter.limit
+            )
+
+    def _request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Optional[bytes] = None,
+    ) -> HttpResponse:
+        started_at = time.monotonic()
+        status = "error"
+        try:
+            with self._tracer.span(method, "github", url=url) as span:
+                response = self._connection_pool.request(
+                    method,
+                    url,
+                    headers=headers,
+                    body=body,
+                    timeout=self._retry_policy.remaining_time(),
+                )
+                span["status"] = response.status
+                status = str(response.status)
+                return response
+        finally:
+            self._metrics.observe(
+                "github_api_request_duration_seconds",
+                time.monotonic() - started_at,
+                method=method,
+            )
+            self._metrics.increment_counter(
+                "github_api_requests_total", method=method, status=status
+            )
+
+    def _read_cached_response(self, cache_key: str, url: str) -> Optional[Any]:
+        if self._cache_manager.get_cache_configuration().refresh:
+            return None
+        cached = self._response_cache.read(cache_key)
+        if not isinstance(cached, dict) or cached.get("url") != url:
+            return None
+        return cached
+
+    def _write_cached_response(self, cache_key: str, document: Any) -> None:
+        try:
+            self._response_cache.write(cache_key, document)
+            self._response_cache.evict(
+                self._cache_manager.get_cache_configuration().max_entries
+            )
+        except OSError as e:
+            self.logger.warning("Could not write to GitHub API cache: %s", e)
+
+    def _decode_json_from_response(self, response: HttpResponse) -> Any:
+        return json.loads(response.body.decode(_get_charset(response)))
+
+
+def _get_transient_http_failure(response: HttpResponse) -> Optional[str]:
+    # Rate limited requests were already repeated once the quota was
+    # reset, see _get_rate_limited.
+    if response.status != 429 and is_transient_http_status(response.status):
+        return f"{response.status} {response.reason}"
+    return None
+
+
+def _chunked(items: List[T]) -> List[List[T]]:
+    chunks: List[List[T]] = []
+    while items:
+        chunks.append(items[:_GRAPHQL_BATCH_SIZE])
+        items = items[_GRAPHQL_BATCH_SIZE:]
+    return chunks
+
+
+def _get_charset(response: HttpResponse) -> str:
+    content_type = response.header("content-type") or ""
+    for parameter in content_type.split(";")[1:]:
+        name, _, value = parameter.strip().partition("=")
+        if name.lower() == "charset" and value:
+            return value.strip('"')
+    return "utf-8"
+
+
+def _get_origin(url: str) -> Tuple[str, str]:
+    parsed_url = urllib.parse.urlsplit(url)
+    return parsed_url.scheme, parsed_url.netloc
@@ -1,8 +1,17 @@
 from __future__ import annotations
 
+import base64
+import binascii
 import re
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
+
+NIX_BASE32_ALPHABET = "0123456789abcdfghijklmnpqrsvwxyz"
+SHA256_DIGEST_SIZE = 32
+_NIX_BASE32_CHARACTERS = frozenset(NIX_BASE32_ALPHABET)
+_NIX_BASE32_TO_PYTHON_BASE32 = str.maketrans(
+    NIX_BASE32_ALPHABET, "0123456789abcdefghijklmnopqrstuv"
+)
 
 
 @dataclass
@@ -29,3 +38,50 @@ class SriHash:
 
 def is_sha1_hash(text: str) -> bool:
     return bool(re.match(r"^[0-9a-f]{40}$", text))
+
+
+def encode_nix_base32(digest: bytes) -> str:
+    # Nix interprets the digest as a little endian number and prints
+    # its base32 digits starting with the most significant one.
+    length = (len(digest) * 8 - 1) // 5 + 1
+    number = int.from_bytes(digest, "little")
+    return "".join(
+        NIX_BASE32_ALPHABET[(number >> (5 * n)) & 0x1F]
+        for n in range(length - 1, -1, -1)
+    )
+
+
+def decode_nix_base32(text: str, digest_size: int) -> Optional[bytes]:
+    if len(text) != (digest_size * 8 - 1) // 5 + 1:
+        return None
+    if not _NIX_BASE32_CHARACTERS.issuperset(text):
+        return None
+    number = int(text.translate(_NIX_BASE32_TO_PYTHON_BASE32), 32)
+    if number >> (digest_size * 8):
+        return None
+    return number.to_bytes(digest_size, "little")
+
+
+def decode_sha256_digest(text: str) -> Optional[bytes]:
+    # Nix accepts base16, nix base32 and base64 encoded hashes
+    # wherever a hash is expected. The encoding can be inferred from
+    # the length of the string.
+    if len(text) == SHA256_DIGEST_SIZE * 2:
+        try:
+            return bytes.fromhex(text)
+        except ValueError:
+            return None
+    if len(text) == 52:
+        return decode_nix_base32(text, SHA256_DIGEST_SIZE)
+    if len(text) == 44:
+        try:
+            digest = base64.b64decode(text, validate=True)
+        except binascii.Error:
+            return None
+        if len(digest) == SHA256_DIGEST_SIZE:
+            return digest
+    return None
+
+
+def sha256_digest_to_sri(digest: bytes) -> str:
+    return "sha256-" + base64.b64encode(digest).decode("ascii")
@@ -0,0 +1,413 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from logging import Logger
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from nix_prefetch_github.cache import CacheManager
+from nix_prefetch_github.functor import map_or_none, to_thread
+from nix_prefetch_github.hash import is_sha1_hash
+from nix_prefetch_github.interfaces import (
+    AsyncUrlHasher,
+    GithubRepository,
+    Metrics,
+    PrefetchedRessource,
+    PrefetchOptions,
+    Tracer,
+    UrlHasher,
+)
+from nix_prefetch_github.metrics import MetricsRegistryImpl
+from nix_prefetch_github.tracing import TracerImpl
+
+_SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prefetched_ressources (
+    server_url TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    repo TEXT NOT NULL,
+    revision TEXT NOT NULL,
+    fetch_submodules INTEGER NOT NULL,
+    deep_clone INTEGER NOT NULL,
+    leave_dot_git INTEGER NOT NULL,
+    hash_sum TEXT NOT NULL,
+    store_path TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    size INTEGER,
+    commit_date REAL,
+    in_store INTEGER NOT NULL,
+    PRIMARY KEY (
+        server_url, owner, repo, revision, fetch_submodules, deep_clone,
+        leave_dot_git
+    )
+);
+CREATE INDEX IF NOT EXISTS prefetched_ressources_last_used_at
+    ON prefetched_ressources (last_used_at);
+"""
+
+_KEY_CONDITION = (
+    "server_url = ? AND owner = ? AND repo = ? AND revision = ? "
+    "AND fetch_submodules = ? AND deep_clone = ? AND leave_dot_git = ?"
+)
+
+
+@dataclass
+class HashDatabase:
+    # Connections are kept open between lookups and are shared by all
+    # users of the database, e.g. all requests that the daemon serves.
+    # The schema is only checked when the first connection is opened.
+    path: str
+    max_idle_connections: int = 4
+    _idle_connections: List[sqlite3.Connection] = field(
+        default_factory=list, init=False, repr=False
+    )
+    _is_initialized: bool = field(default=False, init=False, repr=False)
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False
+    )
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self._checkout()
+        try:
+            with connection:
+                yield connection
+        except BaseException:
+            connection.close()
+            raise
+        self._checkin(connection)
+
+    def close(self) -> None:
+        with self._lock:
+            connections = self._idle_connections
+            self._idle_connections = []
+        for connection in connections:
+            connection.close()
+
+    def _checkout(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._idle_connections:
+                return self._idle_connections.pop()
+        directory = os.path.dirname(self.path)
+        if directory:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError as e:
+                raise sqlite3.OperationalError(str(e))
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        try:
+            with self._lock:
+                if not self._is_initialized:
+                    _initialize_database(connection)
+                    self._is_initialized = True
+        except BaseException:
+            connection.close()
+            raise
+        return connection
+
+    def _checkin(self, connection: sqlite3.Connection) -> None:
+        with self._lock:
+            if len(self._idle_connections) < self.max_idle_connections:
+                self._idle_connections.append(connection)
+                return
+        connection.close()
+
+
+@dataclass
+class CachingUrlHasher:
+    url_hasher: UrlHasher
+    database: HashDatabase
+    cache_manager: CacheManager
+    logger: Logger
+    clock: Callable[[], float] = field(default=time.time)
+    tracer: Tracer = field(default_factory=TracerImpl)
+    metrics: Metrics = field(default_factory=MetricsRegistryImpl)
+    server_url: str = "https://github.com"
+    store_path_exists: Callable[[str], bool] = field(default=os.path.exists)
+
+    def calculate_hash_sum(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+    ) -> Optional[PrefetchedRessource]:
+        with self.tracer.span(
+            "calculate hash sum",
+            "hash",
+            repository=f"{repository.owner}/{repository.name}",
+            revision=revision,
+        ) as span:
+            prefetched_ressource, span["cached"] = self._calculate_hash_sum(
+                repository, revision, prefetch_options
+            )
+            return prefetched_ressource
+
+    def _calculate_hash_sum(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+    ) -> Tuple[Optional[PrefetchedRessource], bool]:
+        cached = self.lookup(repository, revision, prefetch_options)
+        if cached is not None:
+            return cached, True
+        started_at = self.clock()
+        prefetched_ressource = self.url_hasher.calculate_hash_sum(
+            repository=repository,
+            revision=revision,
+            prefetch_options=prefetch_options,
+        )
+        if prefetched_ressource is not None:
+            self.store(
+                repository,
+                revision,
+                prefetch_options,
+                prefetched_ressource,
+                duration=self.clock() - started_at,
+            )
+        return prefetched_ressource, False
+
+    def lookup(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+    ) -> Optional[PrefetchedRessource]:
+        # Returns None if the hash sum has to be calculated.
+        if not self._is_cacheable(revision, prefetch_options):
+            return None
+        configuration = self.cache_manager.get_cache_configuration()
+        if not configuration.refresh:
+            if cached := self._lookup(repository, revision, prefetch_options):
+                self.logger.debug(
+                    "Using cached hash sum for %s/%s at %s",
+                    repository.owner,
+                    repository.name,
+                    revision,
+                )
+                self.metrics.increment_counter(
+                    "cache_requests_total", cache="hashes", result="hit"
+                )
+                return cached
+        self.metrics.increment_counter(
+            "cache_requests_total", cache="hashes", result="miss"
+        )
+        return None
+
+    def store(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+        prefetched_ressource: PrefetchedRessource,
+        duration: float,
+    ) -> None:
+        if self._is_cacheable(revision, prefetch_options):
+            self._store(
+                repository, revision, prefetch_options, prefetched_ressource, duration
+            )
+
+    def _is_cacheable(self, revision: str, prefetch_options: PrefetchOptions) -> bool:
+        # Only results for immutable inputs are cached. Branch names
+        # can move and the content of .git directories is not
+        # deterministic.
+        return is_sha1_hash(revision) and prefetch_options.is_safe()
+
+    def _lookup(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+    ) -> Optional[PrefetchedRessource]:
+        key = self._key(repository, revision, prefetch_options)
+        try:
+            with self.database.transaction() as connection:
+                row = connection.execute(
+                    "SELECT hash_sum, store_path, commit_date, size, in_store "
+                    f"FROM prefetched_ressources WHERE {_KEY_CONDITION}",
+                    key,
+                ).fetchone()
+                if row is None:
+                    return None
+                # Store paths that were added to the nix store can be
+                # removed by the garbage collector since.
+                if row[4] and not self.store_path_exists(row[1]):
+                    self.logger.debug(
+                        "Cached store path %s does not exist anymore", row[1]
+                    )
+                    return None
+                connection.execute(
+                    "UPDATE prefetched_ressources SET last_used_at = ? "
+                    f"WHERE {_KEY_CONDITION}",
+                    (self.clock(),) + key,
+                )
+        except sqlite3.Error as e:
+            self.logger.warning("Could not read from hash cache: %s", e)
+            return None
+        return PrefetchedRessource(
+            hash_sum=row[0],
+            store_path=row[1],
+            commit_date=map_or_none(
+                lambda timestamp: datetime.fromtimestamp(timestamp, timezone.utc),
+                row[2],
+            ),
+            nar_size=row[3],
+        )
+
+    def _store(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+        prefetched_ressource: PrefetchedRessource,
+        duration: float,
+    ) -> None:
+        configuration = self.cache_manager.get_cache_configuration()
+        now = self.clock()
+        try:
+            with self.database.transaction() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO prefetched_ressources VALUES "
+                    "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    self._key(repository, revision, prefetch_options)
+                    + (
+                        prefetched_ressource.hash_sum,
+                        prefetched_ressource.store_path,
+                        now,
+                        now,
+                        duration,
+                        prefetched_ressource.nar_size,
+                        map_or_none(
+                            lambda date: date.timestamp(),
+                            prefetched_ressource.commit_date,
+                        ),
+                        # The builtin hashing backend calculates store
+                        # paths without adding them to the store.
+                        self.store_path_exists(prefetched_ressource.store_path),
+                    ),
+                )
+                connection.execute(
+                    "DELETE FROM prefetched_ressources WHERE last_used_at < ?",
+                    (now - configuration.hash_max_age,),
+                )
+                connection.execute(
+                    "DELETE FROM prefetched_ressources WHERE rowid NOT IN "
+                    "(SELECT rowid FROM prefetched_ressources "
+                    "ORDER BY last_used_at DESC LIMIT ?)",
+                    (configuration.hash_max_entries,),
+                )
+        except sqlite3.Error as e:
+            self.logger.warning("Could not write to hash cache: %s", e)
+
+    def _key(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+    ) -> Tuple[str, str, str, str, bool, bool, bool]:
+        return (
+            self.server_url,
+            repository.owner,
+            repository.name,
+            revision,
+            prefetch_options.fetch_submodules,
+            prefetch_options.deep_clone,
+            prefetch_options.leave_dot_git,
+        )
+
+
+@dataclass
+class AsyncCachingUrlHasher:
+    # Shares the hash cache with the synchronous hasher. The database
+    # is accessed from worker threads so that the event loop is not
+    # blocked.
+    url_hasher: AsyncUrlHasher
+    cache: CachingUrlHasher
+
+    async def calculate_hash_sum(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+    ) -> Optional[PrefetchedRessource]:
+        with self.cache.tracer.span(
+            "calculate hash sum",
+            "hash",
+            repository=f"{repository.owner}/{repository.name}",
+            revision=revision,
+        ) as span:
+            cached = await to_thread(
+                self.cache.lookup, repository, revision, prefetch_options
+            )
+            span["cached"] = cached is not None
+            if cached is not None:
+                return cached
+            started_at = self.cache.clock()
+            prefetched_ressource = await self.url_hasher.calculate_hash_sum(
+                repository=repository,
+                revision=revision,
+                prefetch_options=prefetch_options,
+            )
+            if prefetched_ressource is not None:
+                await to_thread(
+                    self.cache.store,
+                    repository,
+                    revision,
+                    prefetch_options,
+                    prefetched_ressource,
+                    self.cache.clock() - started_at,
+                )
+            return prefetched_ressource
+
+
+def _initialize_database(connection: sqlite3.Connection) -> None:
+    # The migration runs in an explicit transaction so that concurrent
+    # processes do not migrate the same database twice.
+    isolation_level = connection.isolation_level
+    connection.isolation_level = None
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        (version,) = connection.execute("PRAGMA user_version").fetchone()
+        if version < _SCHEMA_VERSION:
+            _migrate_database(connection)
+        connection.execute("COMMIT")
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.isolation_level = isolation_level
+
+
+def _migrate_database(connection: sqlite3.Connection) -> None:
+    columns = {
+        row[1] for row in connection.execute("PRAGMA table_info(prefetched_ressources)")
+    }
+    if columns:
+        # Databases created by older versions have no server URL and
+        # possibly no commit date. Their entries were all prefetched
+        # from github.com.
+        connection.execute("DROP INDEX IF EXISTS prefetched_ressources_last_used_at")
+        connection.execute(
+            "ALTER TABLE prefetched_ressources RENAME TO prefetched_ressources_old"
+        )
+    for statement in _SCHEMA.split(";"):
+        if statement.strip():
+            connection.execute(statement)
+    if columns:
+        commit_date = "commit_date" if "commit_date" in columns else "NULL"
+        connection.execute(
+            "INSERT INTO prefetched_ressources SELECT 'https://github.com', owner, "
+            "repo, revision, fetch_submodules, deep_clone, leave_dot_git, hash_sum, "
+            f"store_path, created_at, last_used_at, duration, size, {commit_date}, 1 "
+            "FROM prefetched_ressources_old"
+        )
+        connection.execute("DROP TABLE prefetched_ressources_old")
+    connection.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
@@ -1,14 +1,24 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 
-from nix_prefetch_github.interfaces import CommandRunner
+from nix_prefetch_github.hash import decode_sha256_digest, sha256_digest_to_sri
+from nix_prefetch_github.interfaces import CommandRunner, Tracer
+from nix_prefetch_github.tracing import TracerImpl
 
 
 @dataclass
 class HashConverterImpl:
     command_runner: CommandRunner
+    tracer: Tracer = field(default_factory=TracerImpl)
 
     def convert_sha256_to_sri(self, original: str) -> Optional[str]:
+        with self.tracer.span("convert hash to SRI", "hash") as span:
+            if (digest := decode_sha256_digest(original)) is not None:
+                return sha256_digest_to_sri(digest)
+            span["via_nix"] = True
+            return self._convert_sha256_to_sri_via_nix(original)
+
+    def _convert_sha256_to_sri_via_nix(self, original: str) -> Optional[str]:
         returncode, output = self.command_runner.run_command(
             [
                 "nix",
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import http.client
+import threading
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Tuple
+
+_ConnectionKey = Tuple[str, str, Optional[int]]
+
+
+@dataclass
+class HttpResponse:
+    status: int
+    reason: str
+    headers: Dict[str, str]
+    body: bytes
+
+    def header(self, name: str) -> Optional[str]:
+        return self.headers.get(name.lower())
+
+
+@dataclass
+class HttpConnectionPool:
+    # Keeps idle keep-alive connections around so that consecutive
+    # requests to the same host do not have to establish a new TCP
+    # connection and TLS session every time. Connections are checked
+    # out for the duration of a single request which makes the pool
+    # safe to use from multiple threads.
+    timeout: float = 60
+    max_idle_connections_per_host: int = 8
+    _idle_connections: Dict[_ConnectionKey, List[http.client.HTTPConnection]] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False
+    )
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Mapping[str, str]] = None,
+        body: Optional[bytes] = None,
+        # Limits this request to less than the timeout of the pool.
+        timeout: Optional[float] = None,
+    ) -> HttpResponse:
+        parsed_url = urllib.parse.urlsplit(url)
+        if parsed_url.scheme not in ("http", "https") or not parsed_url.hostname:
+            raise ValueError(f"Unsupported URL: {url}")
+        key = (parsed_url.scheme, parsed_url.hostname, parsed_url.port)
+        target = parsed_url.path or "/"
+        if parsed_url.query:
+            target += "?" + parsed_url.query
+        connection, is_reused = self._checkout(key)
+        self._set_timeout(connection, timeout)
+        try:
+            response = self._send(connection, method, target, headers, body)
+        except (http.client.HTTPException, ConnectionError):
+            connection.close()
+            if not is_reused:
+                raise
+            # The server might have closed an idle connection in the
+            # meantime. This is only detected when we try to use it.
+            connection = self._connect(key)
+            self._set_timeout(connection, timeout)
+            try:
+                response = self._send(connection, method, target, headers, body)
+            except BaseException:
+                connection.close()
+                raise
+        except BaseException:
+            connection.close()
+            raise
+        if response.header("connection") == "close":
+            connection.close()
+        else:
+            self._checkin(key, connection)
+        return response
+
+    def close(self) -> None:
+        with self._lock:
+            connections = [
+                connection
+                for idle_connections in self._idle_connections.values()
+                for connection in idle_connections
+            ]
+            self._idle_connections.clear()
+        for connection in connections:
+            connection.close()
+
+    def _send(
+        self,
+        connection: http.client.HTTPConnection,
+        method: str,
+        target: str,
+        headers: Optional[Mapping[str, str]],
+        body: Optional[bytes],
+    ) -> HttpResponse:
+        connection.request(method, target, body=body, headers=dict(headers or {}))
+        response = connection.getresponse()
+        return HttpResponse(
+            status=response.status,
+            reason=response.reason,
+            headers={name.lower(): value for name, value in response.getheaders()},
+            body=response.read(),
+        )
+
+    def _set_timeout(
+        self, connection: http.client.HTTPConnection, timeout: Optional[float]
+    ) -> None:
+        connection.timeout = (
+            self.timeout if timeout is None else min(self.timeout, timeout)
+        )
+        if connection.sock is not None:
+            connection.sock.settimeout(connection.timeout)
+
+    def _checkout(self, key: _ConnectionKey) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle_connections = self._idle_connections.get(key)
+            if idle_connections:
+                return idle_connections.pop(), True
+        return self._connect(key), False
+
+    def _checkin(
+        self, key: _ConnectionKey, connection: http.client.HTTPConnection
+    ) -> None:
+        with self._lock:
+            idle_connections = self._idle_connections.setdefault(key, [])
+            if len(idle_connections) < self.max_idle_connections_per_host:
+                idle_connections.append(connection)
+                return
+        connection.close()
+
+    def _connect(self, key: _ConnectionKey) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        else:
+            return http.client.HTTPConnection(host, port, timeout=self.timeout)
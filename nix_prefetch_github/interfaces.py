@@ -1,9 +1,29 @@
 from __future__ import annotations
 
 import enum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List, Optional, Protocol, Tuple, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    ContextManager,
+    Dict,
+    List,
+    Optional,
+    Protocol,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from nix_prefetch_github.versions import ReleaseSelection
+
+if TYPE_CHECKING:
+    from nix_prefetch_github.nix_source import Edit, SourceFile
+
+T = TypeVar("T")
 
 
 class Alerter(Protocol):
@@ -21,8 +41,8 @@ class GithubRepository:
     owner: str
     name: str
 
-    def url(self) -> str:
-        return f"https://github.com/{self.owner}/{self.name}.git"
+    def url(self, server_url: str = "https://github.com") -> str:
+        return f"{server_url}/{self.owner}/{self.name}.git"
 
 
 @dataclass
@@ -43,6 +63,9 @@ class HashConverter(Protocol):
 class PrefetchedRessource:
     hash_sum: str
     store_path: str
+    commit_date: Optional[datetime] = None
+    # Size of the NAR serialization if the hasher knows it.
+    nar_size: Optional[int] = None
 
 
 class UrlHasher(Protocol):
@@ -54,6 +77,15 @@ class UrlHasher(Protocol):
     ) -> Optional[PrefetchedRessource]: ...
 
 
+class AsyncUrlHasher(Protocol):
+    async def calculate_hash_sum(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+    ) -> Optional[PrefetchedRessource]: ...
+
+
 class GithubAPI(Protocol):
     def get_tag_of_latest_release(
         self, repository: GithubRepository
@@ -63,10 +95,38 @@ class GithubAPI(Protocol):
         self, repository: GithubRepository, commit_sha1_hash: str
     ) -> Optional[datetime]: ...
 
+    def get_tags_of_latest_releases(
+        self, repositories: List[GithubRepository]
+    ) -> Dict[GithubRepository, Optional[str]]: ...
+
+    def get_commit_dates(
+        self, commits: List[Tuple[GithubRepository, str]]
+    ) -> Dict[Tuple[GithubRepository, str], Optional[datetime]]: ...
+
+
+class GithubQuota(Protocol):
+    # The quota of GitHub's REST API as far as it is known from its
+    # responses.
+    used_requests: int
+    remaining: Optional[int]
+    limit: Optional[int]
+
+
+class LatestReleaseResolver(Protocol):
+    def get_latest_release(
+        self, repository: GithubRepository, selection: ReleaseSelection
+    ) -> Optional[str]: ...
+
 
 class RevisionIndexFactory(Protocol):
     def get_revision_index(
-        self, repository: GithubRepository
+        self, repository: GithubRepository, name: str
+    ) -> Optional[RevisionIndex]: ...
+
+
+class AsyncRevisionIndexFactory(Protocol):
+    async def get_revision_index(
+        self, repository: GithubRepository, name: str
     ) -> Optional[RevisionIndex]: ...
 
 
@@ -87,6 +147,9 @@ class PrefetchedRepository:
     hash_sum: str
     options: PrefetchOptions
     store_path: str
+    # The commit date is only known if the hashing backend could read
+    # it while downloading the repository.
+    commit_date: Optional[datetime] = field(default=None, compare=False)
 
 
 @dataclass
@@ -116,6 +179,15 @@ class Prefetcher(Protocol):
     ) -> PrefetchResult: ...
 
 
+class AsyncPrefetcher(Protocol):
+    async def prefetch_github(
+        self,
+        repository: GithubRepository,
+        rev: Optional[str],
+        prefetch_options: PrefetchOptions,
+    ) -> PrefetchResult: ...
+
+
 class CommandRunner(Protocol):
     def run_command(
         self,
@@ -123,9 +195,65 @@ class CommandRunner(Protocol):
         cwd: Optional[str] = None,
         environment_variables: Optional[Dict[str, str]] = None,
         merge_stderr: bool = False,
+        # The command is killed and TimeoutError is raised if it does not
+        # finish within timeout seconds.
+        timeout: Optional[float] = None,
+    ) -> Tuple[int, str]: ...
+
+
+class Tracer(Protocol):
+    def span(
+        self, name: str, category: str, **args: Any
+    ) -> ContextManager[Dict[str, Any]]: ...
+
+
+class RetryPolicy(Protocol):
+    def deadline(self) -> ContextManager[None]: ...
+
+    def remaining_time(self) -> Optional[float]: ...
+
+    def run(
+        self,
+        description: str,
+        operation: Callable[[], T],
+        get_transient_failure: Callable[[T], Optional[str]] = ...,
+        is_transient_error: Callable[[Exception], bool] = ...,
+    ) -> T: ...
+
+
+class Metrics(Protocol):
+    def increment_counter(self, name: str, value: float = 1, **labels: str) -> None: ...
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None: ...
+
+    def observe(self, name: str, value: float, **labels: str) -> None: ...
+
+
+class AsyncCommandRunner(Protocol):
+    async def run_command(
+        self,
+        command: List[str],
+        cwd: Optional[str] = None,
+        environment_variables: Optional[Dict[str, str]] = None,
+        merge_stderr: bool = False,
+        timeout: Optional[float] = None,
     ) -> Tuple[int, str]: ...
 
 
+class AsyncRetryPolicy(Protocol):
+    def deadline(self) -> ContextManager[None]: ...
+
+    def remaining_time(self) -> Optional[float]: ...
+
+    async def run_async(
+        self,
+        description: str,
+        operation: Callable[[], Awaitable[T]],
+        get_transient_failure: Callable[[T], Optional[str]] = ...,
+        is_transient_error: Callable[[Exception], bool] = ...,
+    ) -> T: ...
+
+
 class RepositoryRenderer(Protocol):
     def render_prefetched_repository(self, repository: PrefetchedRepository) -> str: ...
 
@@ -134,6 +262,97 @@ class Presenter(Protocol):
     def present(self, prefetch_result: PrefetchResult) -> None: ...
 
 
+class BatchPresenter(Protocol):
+    def present_batch_result(
+        self,
+        repository: GithubRepository,
+        revision: Optional[str],
+        prefetch_result: PrefetchResult,
+    ) -> None: ...
+
+    def present_batch_error(
+        self,
+        repository: Optional[GithubRepository],
+        revision: Optional[str],
+        error: str,
+    ) -> None: ...
+
+    def finish_batch(self) -> None: ...
+
+
+@dataclass(frozen=True)
+class LockedRepository:
+    # The ref is the branch, tag or commit that was requested. None
+    # stands for the default branch of the repository.
+    ref: Optional[str]
+    prefetched_repository: PrefetchedRepository
+
+
+@dataclass
+class LockfileChange:
+    class Status(enum.Enum):
+        added = enum.auto()
+        changed = enum.auto()
+        unchanged = enum.auto()
+        removed = enum.auto()
+        failed = enum.auto()
+
+    status: Status
+    repository: GithubRepository
+    ref: Optional[str]
+    rev: Optional[str] = None
+    previous_rev: Optional[str] = None
+    hash_sum: Optional[str] = None
+    previous_hash_sum: Optional[str] = None
+    reason: Optional[str] = None
+
+
+class LockfileStore(Protocol):
+    # Returns None if the lockfile does not exist.
+    def read_lockfile(self, path: str) -> Optional[List[LockedRepository]]: ...
+
+    def write_lockfile(self, path: str, entries: List[LockedRepository]) -> None: ...
+
+
+class LockPresenter(Protocol):
+    def present_lockfile_change(self, change: LockfileChange) -> None: ...
+
+    def finish_lock(self) -> None: ...
+
+
+@dataclass
+class SourceUpdate:
+    class Status(enum.Enum):
+        updated = enum.auto()
+        unchanged = enum.auto()
+        skipped = enum.auto()
+        failed = enum.auto()
+
+    path: str
+    line: int
+    status: Status
+    repository: Optional[GithubRepository] = None
+    rev: Optional[str] = None
+    previous_rev: Optional[str] = None
+    hash_sum: Optional[str] = None
+    previous_hash_sum: Optional[str] = None
+    reason: Optional[str] = None
+
+
+class UpdatePresenter(Protocol):
+    def present_source_update(self, update: SourceUpdate) -> None: ...
+
+    def finish_update(self) -> None: ...
+
+
+class SourceTreeScanner(Protocol):
+    def scan(self, directory: str, jobs: int) -> List[SourceFile]: ...
+
+
+class SourceFileEditor(Protocol):
+    def apply_edits(self, path: str, edits: List[Edit]) -> bool: ...
+
+
 @enum.unique
 class RenderingFormat(enum.Enum):
     nix = enum.auto()
@@ -144,6 +363,18 @@ class RenderingFormat(enum.Enum):
 class RenderingFormatSelector(Protocol):
     def set_rendering_format(self, rendering_format: RenderingFormat) -> None: ...
 
+    def get_rendering_format(self) -> Optional[RenderingFormat]: ...
+
+
+@enum.unique
+class HashingBackend(enum.Enum):
+    nix = enum.auto()
+    builtin = enum.auto()
+
+
+class HashingBackendSelector(Protocol):
+    def set_hashing_backend(self, hashing_backend: HashingBackend) -> None: ...
+
 
 @dataclass
 class ViewModel:
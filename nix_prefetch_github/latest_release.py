@@ -0,0 +1,36 @@
+from dataclasses import dataclass
+from logging import Logger
+from typing import Optional
+
+from nix_prefetch_github.interfaces import GithubRepository
+from nix_prefetch_github.revision_index import RevisionIndexImpl
+from nix_prefetch_github.revision_index_factory import ListRemoteFactory
+from nix_prefetch_github.versions import ReleaseSelection
+
+
+@dataclass
+class TagReleaseResolver:
+    # Selects the latest release from the tags of a repository instead
+    # of asking the GitHub API for it. The tags are listed like all
+    # other refs, so the result is cached for --tag-ttl seconds.
+    list_remote_factory: ListRemoteFactory
+    logger: Logger
+
+    def get_latest_release(
+        self, repository: GithubRepository, selection: ReleaseSelection
+    ) -> Optional[str]:
+        list_remote = self.list_remote_factory.get_list_remote(
+            repository, [f"refs/tags/{selection.pattern or '*'}"]
+        )
+        if list_remote is None:
+            return None
+        tag = selection.select_latest_tag(list_remote.tags)
+        if tag is None:
+            self.logger.error(
+                "No tag of %s/%s matches the requested release",
+                repository.owner,
+                repository.name,
+            )
+            return None
+        self.logger.info("Selected tag %s as latest release", tag)
+        return RevisionIndexImpl(list_remote).get_revision_by_name(tag)
@@ -1,7 +1,17 @@
 from __future__ import annotations
 
+import operator
+import re
+from array import array
+from bisect import bisect_left, bisect_right
 from enum import Enum, unique
-from typing import Dict, Optional
+from itertools import accumulate, islice
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+_HEADS_PREFIX = "refs/heads/"
+_TAGS_PREFIX = "refs/tags/"
+_LOWERCASE_HEX_PATTERN = re.compile("[0-9a-f]*")
+_SAMPLE_INTERVAL = 16
 
 
 @unique
@@ -10,23 +20,174 @@ class RefKind(Enum):
     Tag = 2
 
 
+class RefTable(Mapping[str, str]):
+    # An immutable mapping from ref names to object ids for
+    # repositories with hundreds of thousands of refs. Instead of one
+    # str object per name and object id the sorted names are
+    # concatenated into a single newline separated string that is
+    # searched via bisection and the object ids are packed as binary
+    # digests into a single bytes object. Ref names cannot contain
+    # newlines.
+    def __init__(self, names: List[str], object_ids: List[str]) -> None:
+        # The names are expected to be sorted and unique.
+        self._names = "".join(name + "\n" for name in names)
+        self._offsets = array(
+            "Q", accumulate((len(name) + 1 for name in names), initial=0)
+        )
+        self._length = len(names)
+        # Every few names are kept as separate objects so that most of
+        # the bisection happens in C.
+        self._samples = names[::_SAMPLE_INTERVAL]
+        self._width = 0
+        self._packed = b""
+        self._object_ids: Optional[List[str]] = None
+        if object_ids:
+            width = len(object_ids[0])
+            joined = "".join(object_ids)
+            if (
+                width % 2 == 0
+                and len(joined) == width * len(object_ids)
+                and _LOWERCASE_HEX_PATTERN.fullmatch(joined)
+            ):
+                self._width = width // 2
+                self._packed = bytes.fromhex(joined)
+            else:
+                # Everything that git would not print as an object id
+                # is stored as it is.
+                self._object_ids = object_ids
+
+    @classmethod
+    def from_items(cls, items: List[Tuple[str, str]]) -> RefTable:
+        return cls.from_lists(
+            [name for name, _ in items], [object_id for _, object_id in items]
+        )
+
+    @classmethod
+    def from_lists(cls, names: List[str], object_ids: List[str]) -> RefTable:
+        # Later items take precedence over earlier items with the same
+        # name, like they do when a dict is built from the items. The
+        # output of git ls-remote is sorted already, so sorting is
+        # usually not necessary.
+        if any(map(operator.ge, names, islice(names, 1, None))):
+            items = sorted(dict(zip(names, object_ids)).items())
+            names = [name for name, _ in items]
+            object_ids = [object_id for _, object_id in items]
+        return cls(names=names, object_ids=object_ids)
+
+    @classmethod
+    def from_mapping(cls, mapping: Mapping[str, str]) -> RefTable:
+        if isinstance(mapping, RefTable):
+            return mapping
+        return cls.from_items(list(mapping.items()))
+
+    def items_with_prefix(self, prefix: str) -> Iterator[Tuple[str, str]]:
+        for position in range(self._position(prefix), self._length):
+            name = self._name(position)
+            if not name.startswith(prefix):
+                break
+            yield name, self._object_id(position)
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:  # type: ignore[override]
+        position = self._position(name)
+        if position == self._length or self._name(position) != name:
+            return default
+        return self._object_id(position)
+
+    def __getitem__(self, name: str) -> str:
+        if (object_id := self.get(name)) is None:
+            raise KeyError(name)
+        return object_id
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and self.get(name) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return map(self._name, range(self._length))
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __repr__(self) -> str:
+        return f"RefTable({dict(self)!r})"
+
+    def _position(self, name: str) -> int:
+        # Only the few names between two samples are split off the
+        # concatenated names.
+        sample = bisect_right(self._samples, name) - 1
+        start = sample * _SAMPLE_INTERVAL if sample > 0 else 0
+        end = start + _SAMPLE_INTERVAL
+        if end > self._length:
+            end = self._length
+        if start == end:
+            return start
+        text_start = self._offsets[start]
+        text_end = self._offsets[end] - 1
+        return start + bisect_left(self._names[text_start:text_end].split("\n"), name)
+
+    def _name(self, position: int) -> str:
+        start = self._offsets[position]
+        end = self._offsets[position + 1] - 1
+        return self._names[start:end]
+
+    def _object_id(self, position: int) -> str:
+        if self._object_ids is not None:
+            return self._object_ids[position]
+        start = position * self._width
+        end = start + self._width
+        return self._packed[start:end].hex()
+
+
 class ListRemote:
     def __init__(
         self,
-        symrefs: Dict[str, str] = dict(),
-        heads: Dict[str, str] = dict(),
-        tags: Dict[str, str] = dict(),
+        symrefs: Mapping[str, str] = dict(),
+        heads: Mapping[str, str] = dict(),
+        tags: Mapping[str, str] = dict(),
     ) -> None:
-        self.heads = heads
-        self.symrefs = symrefs
-        self.tags = tags
+        self.heads = RefTable.from_mapping(heads)
+        self.symrefs = dict(symrefs)
+        self.tags = RefTable.from_mapping(tags)
 
     @classmethod
     def from_git_ls_remote_output(constructor, output: str) -> ListRemote:
-        builder = _Builder()
+        symrefs: Dict[str, str] = dict()
+        head_names: List[str] = []
+        head_object_ids: List[str] = []
+        tag_names: List[str] = []
+        tag_object_ids: List[str] = []
+        other_refs: Dict[str, str] = dict()
         for line in output.splitlines():
-            builder.parse_line(line)
-        return builder.to_list_remote()
+            prefix, separator, suffix = line.partition("\t")
+            if not separator or "\t" in suffix:
+                continue
+            if prefix.startswith("ref: "):
+                if branch_name := name_from_ref(prefix.removeprefix("ref: ")):
+                    symrefs[suffix] = branch_name
+            elif suffix.startswith(_HEADS_PREFIX):
+                if name := suffix.removeprefix(_HEADS_PREFIX):
+                    head_names.append(name)
+                    head_object_ids.append(prefix)
+            elif suffix.startswith(_TAGS_PREFIX):
+                if name := suffix.removeprefix(_TAGS_PREFIX):
+                    tag_names.append(name)
+                    tag_object_ids.append(prefix)
+            elif suffix in symrefs or not suffix.startswith("refs/"):
+                # Only refs like HEAD can be the source of a symref.
+                # Pull request refs and the like are not needed.
+                other_refs[suffix] = prefix
+        # When git ls-remote is restricted to HEAD the branch that HEAD
+        # points to is not listed by itself. The commit of HEAD is
+        # its commit, too.
+        listed_branches = set(head_names) if symrefs else set()
+        for ref, branch_name in symrefs.items():
+            if branch_name not in listed_branches and ref in other_refs:
+                head_names.append(branch_name)
+                head_object_ids.append(other_refs[ref])
+        return constructor(
+            symrefs=symrefs,
+            heads=RefTable.from_lists(head_names, head_object_ids),
+            tags=RefTable.from_lists(tag_names, tag_object_ids),
+        )
 
     def branch(self, branch_name: str) -> Optional[str]:
         return self.heads.get(branch_name)
@@ -52,37 +213,22 @@ class ListRemote:
         else:
             return None
 
-
-class _Builder:
-    def __init__(self) -> None:
-        self.symrefs: Dict[str, str] = dict()
-        self.heads: Dict[str, str] = dict()
-        self.tags: Dict[str, str] = dict()
-
-    def parse_line(self, line: str) -> None:
-        try:
-            prefix, suffix = line.split("\t")
-        except ValueError:
-            return
-        if line.startswith("ref: "):
-            ref = prefix[5:]
-            branch_name = name_from_ref(ref)
-            if branch_name:
-                self.symrefs[suffix] = branch_name
-        else:
-            try:
-                kind = kind_from_ref(suffix)
-            except ValueError:
-                return
-            name = name_from_ref(suffix)
-            if name:
-                if kind == RefKind.Head:
-                    self.heads[name] = prefix
-                elif kind == RefKind.Tag:
-                    self.tags[name] = prefix
-
-    def to_list_remote(self) -> ListRemote:
-        return ListRemote(symrefs=self.symrefs, heads=self.heads, tags=self.tags)
+    def refs_with_prefix(self, prefix: str) -> Iterator[Tuple[str, str]]:
+        # Yields the full names and object ids of all branches and tags
+        # whose full name starts with the given prefix, e.g.
+        # refs/tags/v1.
+        for kind_prefix, table in [
+            (_HEADS_PREFIX, self.heads),
+            (_TAGS_PREFIX, self.tags),
+        ]:
+            if prefix.startswith(kind_prefix):
+                name_prefix = prefix.removeprefix(kind_prefix)
+            elif kind_prefix.startswith(prefix):
+                name_prefix = ""
+            else:
+                continue
+            for name, object_id in table.items_with_prefix(name_prefix):
+                yield kind_prefix + name, object_id
 
 
 def name_from_ref(ref: str) -> Optional[str]:
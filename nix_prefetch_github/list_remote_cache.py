@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from logging import Logger
+from typing import Any, Callable, Dict, List, Optional
+
+from nix_prefetch_github.cache import CacheManager, JsonCacheDirectory
+from nix_prefetch_github.functor import to_thread
+from nix_prefetch_github.interfaces import GithubRepository, Metrics
+from nix_prefetch_github.list_remote import ListRemote
+from nix_prefetch_github.metrics import MetricsRegistryImpl
+from nix_prefetch_github.revision_index_factory import (
+    AsyncListRemoteFactory,
+    ListRemoteFactory,
+)
+
+
+@dataclass
+class CachingListRemoteFactory:
+    list_remote_factory: ListRemoteFactory
+    cache_directory: JsonCacheDirectory
+    cache_manager: CacheManager
+    logger: Logger
+    clock: Callable[[], float] = field(default=time.time)
+    metrics: Metrics = field(default_factory=MetricsRegistryImpl)
+    server_url: str = "https://github.com"
+
+    def get_list_remote(
+        self, repository: GithubRepository, ref_patterns: List[str]
+    ) -> Optional[ListRemote]:
+        cached = self.lookup(repository, ref_patterns)
+        if cached is not None:
+            return cached
+        return self._fetch_list_remote(repository, ref_patterns)
+
+    def lookup(
+        self, repository: GithubRepository, ref_patterns: List[str]
+    ) -> Optional[ListRemote]:
+        # Returns None if the refs have to be listed again.
+        configuration = self.cache_manager.get_cache_configuration()
+        key = self._get_cache_key(repository, ref_patterns)
+        if not configuration.refresh:
+            cached = self.cache_directory.read(key)
+            if (
+                cached is not None
+                and cached.get("url") == repository.url(self.server_url)
+                and cached.get("refPatterns") == ref_patterns
+            ):
+                age = self.clock() - cached["fetchedAt"]
+                if age < max(configuration.branch_ttl, configuration.tag_ttl):
+                    self.logger.debug(
+                        "Using cached refs for %s from %d seconds ago", key, age
+                    )
+                    self.metrics.increment_counter(
+                        "cache_requests_total", cache="refs", result="hit"
+                    )
+                    return _ExpiringListRemote(
+                        symrefs=cached["symrefs"],
+                        heads=cached["heads"],
+                        tags=cached["tags"],
+                        branches_are_fresh=age < configuration.branch_ttl,
+                        tags_are_fresh=age < configuration.tag_ttl,
+                        refresh=lambda: self._refresh_list_remote(
+                            repository, ref_patterns
+                        ),
+                    )
+        self.metrics.increment_counter(
+            "cache_requests_total", cache="refs", result="miss"
+        )
+        return None
+
+    def _refresh_list_remote(
+        self, repository: GithubRepository, ref_patterns: List[str]
+    ) -> Optional[ListRemote]:
+        list_remote = self._fetch_list_remote(repository, ref_patterns)
+        if list_remote is None:
+            self.logger.warning(
+                "Could not refresh refs of %s, using cached refs instead",
+                repository.url(self.server_url),
+            )
+        return list_remote
+
+    def _fetch_list_remote(
+        self, repository: GithubRepository, ref_patterns: List[str]
+    ) -> Optional[ListRemote]:
+        list_remote = self.list_remote_factory.get_list_remote(repository, ref_patterns)
+        if list_remote is not None:
+            self.store(repository, ref_patterns, list_remote)
+        return list_remote
+
+    def store(
+        self,
+        repository: GithubRepository,
+        ref_patterns: List[str],
+        list_remote: ListRemote,
+    ) -> None:
+        document: Dict[str, Any] = {
+            "url": repository.url(self.server_url),
+            "refPatterns": ref_patterns,
+            "fetchedAt": self.clock(),
+            "symrefs": list_remote.symrefs,
+            "heads": dict(list_remote.heads),
+            "tags": dict(list_remote.tags),
+        }
+        try:
+            self.cache_directory.write(
+                self._get_cache_key(repository, ref_patterns), document
+            )
+            self.cache_directory.evict(
+                self.cache_manager.get_cache_configuration().max_entries
+            )
+        except OSError as e:
+            self.logger.warning("Could not write to ref cache: %s", e)
+
+    def _get_cache_key(
+        self, repository: GithubRepository, ref_patterns: List[str]
+    ) -> str:
+        return " ".join([repository.url(self.server_url)] + ref_patterns)
+
+
+@dataclass
+class AsyncCachingListRemoteFactory:
+    # Shares the cache with the synchronous factory. Expired refs of a
+    # cached listing are refreshed with the synchronous factory of the
+    # cache, see _ExpiringListRemote.
+    list_remote_factory: AsyncListRemoteFactory
+    cache: CachingListRemoteFactory
+
+    async def get_list_remote(
+        self, repository: GithubRepository, ref_patterns: List[str]
+    ) -> Optional[ListRemote]:
+        cached = await to_thread(self.cache.lookup, repository, ref_patterns)
+        if cached is not None:
+            return cached
+        list_remote = await self.list_remote_factory.get_list_remote(
+            repository, ref_patterns
+        )
+        if list_remote is not None:
+            await to_thread(self.cache.store, repository, ref_patterns, list_remote)
+        return list_remote
+
+
+class _ExpiringListRemote(ListRemote):
+    # Branches and tags expire independently. A lookup that only
+    # consults expired information triggers a refresh of the whole
+    # listing. Names that resolve to a tag that is still fresh are
+    # answered from the cache even when branch information has
+    # expired.
+    def __init__(
+        self,
+        symrefs: Dict[str, str],
+        heads: Dict[str, str],
+        tags: Dict[str, str],
+        branches_are_fresh: bool,
+        tags_are_fresh: bool,
+        refresh: Callable[[], Optional[ListRemote]],
+    ) -> None:
+        super().__init__(symrefs=symrefs, heads=heads, tags=tags)
+        self._branches_are_fresh = branches_are_fresh
+        self._tags_are_fresh = tags_are_fresh
+        self._refresh_function = refresh
+
+    def branch(self, branch_name: str) -> Optional[str]:
+        if not self._branches_are_fresh and not self._is_fresh_tag(branch_name):
+            self._refresh()
+        return super().branch(branch_name)
+
+    def symref(self, ref_name: str) -> Optional[str]:
+        if not self._branches_are_fresh and not self._is_fresh_tag(ref_name):
+            self._refresh()
+        return super().symref(ref_name)
+
+    def tag(self, tag_name: str) -> Optional[str]:
+        if not self._tags_are_fresh:
+            self._refresh()
+        return super().tag(tag_name)
+
+    def _is_fresh_tag(self, name: str) -> bool:
+        if not self._tags_are_fresh:
+            return False
+        if name in self.heads or name in self.symrefs:
+            return False
+        name = name.removeprefix("refs/tags/")
+        return name in self.tags or f"{name}^{{}}" in self.tags
+
+    def _refresh(self) -> None:
+        list_remote = self._refresh_function()
+        if list_remote is not None:
+            self.symrefs = list_remote.symrefs
+            self.heads = list_remote.heads
+            self.tags = list_remote.tags
+        self._branches_are_fresh = True
+        self._tags_are_fresh = True
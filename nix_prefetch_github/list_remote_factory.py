@@ -1,22 +1,94 @@
+import re
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional, Tuple
 
-from nix_prefetch_github.interfaces import CommandRunner, GithubRepository
+from nix_prefetch_github.interfaces import (
+    AsyncCommandRunner,
+    AsyncRetryPolicy,
+    CommandRunner,
+    GithubRepository,
+    RetryPolicy,
+)
 from nix_prefetch_github.list_remote import ListRemote
 
 
 @dataclass(frozen=True)
 class ListRemoteFactoryImpl:
     command_runner: CommandRunner
+    retry_policy: RetryPolicy
+    server_url: str = "https://github.com"
 
-    def get_list_remote(self, repository: GithubRepository) -> Optional[ListRemote]:
-        repository_url = repository.url()
-        returncode, output = self.command_runner.run_command(
-            command=["git", "ls-remote", "--symref", repository_url],
-            environment_variables={"GIT_ASKPASS": "", "GIT_TERMINAL_PROMPT": "0"},
-            merge_stderr=False,
+    def get_list_remote(
+        self, repository: GithubRepository, ref_patterns: List[str]
+    ) -> Optional[ListRemote]:
+        # The error messages of git are needed to tell network errors
+        # apart from missing repositories. Lines without a tab are
+        # ignored when the output is parsed.
+        returncode, output = self.retry_policy.run(
+            f"git ls-remote {repository.url(self.server_url)}",
+            lambda: self.command_runner.run_command(
+                command=_ls_remote_command(repository, ref_patterns, self.server_url),
+                environment_variables=_ENVIRONMENT_VARIABLES,
+                merge_stderr=True,
+                timeout=self.retry_policy.remaining_time(),
+            ),
+            get_transient_failure=_get_transient_git_failure,
         )
         if returncode == 0:
             return ListRemote.from_git_ls_remote_output(output)
         else:
             return None
+
+
+@dataclass(frozen=True)
+class AsyncListRemoteFactoryImpl:
+    command_runner: AsyncCommandRunner
+    retry_policy: AsyncRetryPolicy
+    server_url: str = "https://github.com"
+
+    async def get_list_remote(
+        self, repository: GithubRepository, ref_patterns: List[str]
+    ) -> Optional[ListRemote]:
+        returncode, output = await self.retry_policy.run_async(
+            f"git ls-remote {repository.url(self.server_url)}",
+            lambda: self.command_runner.run_command(
+                command=_ls_remote_command(repository, ref_patterns, self.server_url),
+                environment_variables=_ENVIRONMENT_VARIABLES,
+                merge_stderr=True,
+                timeout=self.retry_policy.remaining_time(),
+            ),
+            get_transient_failure=_get_transient_git_failure,
+        )
+        if returncode == 0:
+            return ListRemote.from_git_ls_remote_output(output)
+        else:
+            return None
+
+
+# git must never ask for credentials since nobody could answer.
+_ENVIRONMENT_VARIABLES = {"GIT_ASKPASS": "", "GIT_TERMINAL_PROMPT": "0"}
+# git exits with 128 for every fatal error. Only network errors and
+# errors of the server are worth another attempt, missing
+# repositories and failed authentication are not.
+_TRANSIENT_GIT_ERROR = re.compile(
+    r"could not resolve host|failed to connect|connection (timed out|refused|reset)"
+    r"|operation timed out|returned error: (429|5\d\d)|rpc failed|early eof"
+    r"|remote end hung up|unexpected disconnect|\bssl\b|\btls\b|gnutls",
+    re.IGNORECASE,
+)
+
+
+def _ls_remote_command(
+    repository: GithubRepository, ref_patterns: List[str], server_url: str
+) -> List[str]:
+    return ["git", "ls-remote", "--symref", repository.url(server_url)] + ref_patterns
+
+
+def _get_transient_git_failure(result: Tuple[int, str]) -> Optional[str]:
+    returncode, output = result
+    if returncode == 0:
+        return None
+    for line in output.splitlines():
+        if _TRANSIENT_GIT_ERROR.search(line):
+            return line.strip()
+    return None
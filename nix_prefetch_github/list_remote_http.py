@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import fnmatch
+import re
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass, field
+from logging import Logger
+from typing import Dict, Iterator, List, Optional
+
+from nix_prefetch_github.http_pool import HttpConnectionPool
+from nix_prefetch_github.interfaces import GithubRepository, RetryPolicy
+from nix_prefetch_github.list_remote import ListRemote
+from nix_prefetch_github.revision_index_factory import ListRemoteFactory
+from nix_prefetch_github.version import VERSION_STRING
+
+_USER_AGENT = f"git/nix-prefetch-github-{VERSION_STRING.strip()}"
+_FLUSH_PACKET = b"0000"
+_DELIMITER_PACKET = b"0001"
+
+
+class GitProtocolError(Exception):
+    pass
+
+
+@dataclass
+class SmartHttpListRemoteFactory:
+    # Lists the refs of a repository with the ls-refs command of git's
+    # protocol version 2 instead of running `git ls-remote`. Only the
+    # refs matching the requested patterns are transferred. The
+    # fallback factory is used for servers that do not speak
+    # protocol version 2, when the server cannot be reached, when a
+    # proxy is configured and for repositories that require
+    # credentials, which only git knows about, e.g. from credential
+    # helpers or .netrc.
+    connection_pool: HttpConnectionPool
+    fallback_factory: ListRemoteFactory
+    logger: Logger
+    retry_policy: RetryPolicy
+    base_url: str = "https://github.com"
+    proxies: Dict[str, str] = field(default_factory=urllib.request.getproxies)
+
+    def get_list_remote(
+        self, repository: GithubRepository, ref_patterns: List[str]
+    ) -> Optional[ListRemote]:
+        repository_url = f"{self.base_url}/{repository.owner}/{repository.name}.git"
+        if self._requires_proxy():
+            return self.fallback_factory.get_list_remote(repository, ref_patterns)
+        try:
+            lines = self._list_refs(repository_url, ref_patterns)
+        except (GitProtocolError, OSError) as e:
+            self.logger.info(
+                "Could not list refs of %s natively, falling back to git: %s",
+                repository_url,
+                e,
+            )
+            return self.fallback_factory.get_list_remote(repository, ref_patterns)
+        return ListRemote.from_git_ls_remote_output("\n".join(lines))
+
+    def _requires_proxy(self) -> bool:
+        parsed_url = urllib.parse.urlsplit(self.base_url)
+        if parsed_url.scheme not in self.proxies and "all" not in self.proxies:
+            return False
+        host = parsed_url.hostname or ""
+        for excluded_host in self.proxies.get("no", "").split(","):
+            excluded_host = excluded_host.strip().lstrip(".")
+            if excluded_host == "*" or (
+                excluded_host
+                and (host == excluded_host or host.endswith("." + excluded_host))
+            ):
+                return False
+        return True
+
+    def _list_refs(self, repository_url: str, ref_patterns: List[str]) -> List[str]:
+        headers = {"Git-Protocol": "version=2", "User-Agent": _USER_AGENT}
+        response = self.connection_pool.request(
+            "GET",
+            f"{repository_url}/info/refs?service=git-upload-pack",
+            headers=headers,
+            timeout=self.retry_policy.remaining_time(),
+        )
+        # GitHub answers requests for private repositories without
+        # credentials with 404.
+        if response.status in (401, 403, 404):
+            raise GitProtocolError(
+                f"Repository requires credentials or does not exist: "
+                f"{response.status} {response.reason}"
+            )
+        if response.status != 200:
+            raise GitProtocolError(
+                f"Unexpected response {response.status} {response.reason}"
+            )
+        capabilities = _read_capability_advertisement(response.body)
+        if "ls-refs" not in capabilities:
+            raise GitProtocolError("Server does not support ls-refs")
+        arguments = [b"peel", b"symrefs"] + [
+            b"ref-prefix " + prefix.encode("utf-8")
+            for prefix in _expand_ref_prefixes(ref_patterns)
+        ]
+        request_body = (
+            _encode_packet(b"command=ls-refs\n")
+            + _encode_packet(b"agent=" + _USER_AGENT.encode("utf-8") + b"\n")
+            + _DELIMITER_PACKET
+            + b"".join(_encode_packet(argument + b"\n") for argument in arguments)
+            + _FLUSH_PACKET
+        )
+        response = self.connection_pool.request(
+            "POST",
+            f"{repository_url}/git-upload-pack",
+            headers=dict(
+                headers,
+                **{
+                    "Content-Type": "application/x-git-upload-pack-request",
+                    "Accept": "application/x-git-upload-pack-result",
+                },
+            ),
+            body=request_body,
+            timeout=self.retry_policy.remaining_time(),
+        )
+        if response.status != 200:
+            raise GitProtocolError(
+                f"Unexpected response {response.status} {response.reason}"
+            )
+        return [
+            line
+            for line in _to_ls_remote_lines(response.body)
+            if _matches_patterns(line.split("\t")[-1], ref_patterns)
+        ]
+
+
+def _read_capability_advertisement(body: bytes) -> List[str]:
+    packets = _decode_packets(body)
+    lines = [packet.decode("utf-8").rstrip("\n") for packet in packets if packet]
+    # Servers may prefix the advertisement with a service announcement
+    # as it is done for protocol version 0.
+    if lines and lines[0].startswith("# service="):
+        lines = lines[1:]
+    if not lines or lines[0] != "version 2":
+        raise GitProtocolError("Server does not support git protocol version 2")
+    return [line.split("=", 1)[0] for line in lines[1:]]
+
+
+def _to_ls_remote_lines(body: bytes) -> Iterator[str]:
+    # Every ref is formatted like git ls-remote --symref formats it so
+    # that it can be parsed with ListRemote.from_git_ls_remote_output.
+    for packet in _decode_packets(body):
+        if not packet:
+            continue
+        object_id, ref_name, *attributes = (
+            packet.decode("utf-8").rstrip("\n").split(" ")
+        )
+        if object_id == "unborn":
+            continue
+        peeled_object_id: Optional[str] = None
+        for attribute in attributes:
+            if attribute.startswith("symref-target:"):
+                target = attribute.removeprefix("symref-target:")
+                yield f"ref: {target}\t{ref_name}"
+            elif attribute.startswith("peeled:"):
+                peeled_object_id = attribute.removeprefix("peeled:")
+        yield f"{object_id}\t{ref_name}"
+        if peeled_object_id is not None:
+            yield f"{peeled_object_id}\t{ref_name}^{{}}"
+
+
+def _decode_packets(body: bytes) -> List[bytes]:
+    # Flush, delimiter and response end packets are returned as empty
+    # packets.
+    packets: List[bytes] = []
+    position = 0
+    while position < len(body):
+        payload_start = position + 4
+        length_field = body[position:payload_start]
+        try:
+            length = int(length_field, 16)
+        except ValueError:
+            raise GitProtocolError(f"Invalid pkt-line length {length_field!r}")
+        if length in (0, 1, 2):
+            packets.append(b"")
+            position = payload_start
+            continue
+        packet_end = position + length
+        if length < 4 or packet_end > len(body):
+            raise GitProtocolError("Truncated pkt-line")
+        packet = body[payload_start:packet_end]
+        if packet.startswith(b"ERR "):
+            raise GitProtocolError(packet[4:].decode("utf-8", "replace").strip())
+        packets.append(packet)
+        position = packet_end
+    return packets
+
+
+def _encode_packet(data: bytes) -> bytes:
+    return f"{len(data) + 4:04x}".encode("ascii") + data
+
+
+def _expand_ref_prefixes(ref_patterns: List[str]) -> List[str]:
+    # Every ref a pattern can refer to according to the rules of git
+    # rev-parse is requested from the server. These are all the refs
+    # RevisionIndexImpl consults. In contrast to the tail matching of
+    # git ls-remote refs like refs/heads/feature/master do not match
+    # the pattern master. Patterns with wildcards like refs/tags/*
+    # request everything up to the first wildcard.
+    prefixes: List[str] = []
+    for pattern in ref_patterns:
+        for candidate in (
+            pattern,
+            f"refs/{pattern}",
+            f"refs/tags/{pattern}",
+            f"refs/heads/{pattern}",
+            f"refs/remotes/{pattern}",
+            f"refs/remotes/{pattern}/HEAD",
+        ):
+            prefix = re.split(r"[*?\[]", candidate, maxsplit=1)[0]
+            if prefix not in prefixes:
+                prefixes.append(prefix)
+    return prefixes
+
+
+def _matches_patterns(ref_name: str, ref_patterns: List[str]) -> bool:
+    # git ls-remote only prints refs whose name ends with one of the
+    # patterns at a path component boundary.
+    if not ref_patterns:
+        return True
+    return any(
+        fnmatch.fnmatchcase("/" + ref_name, "*/" + pattern) for pattern in ref_patterns
+    )
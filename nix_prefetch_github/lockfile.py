@@ -0,0 +1,116 @@
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from nix_prefetch_github.interfaces import (
+    GithubRepository,
+    LockedRepository,
+    PrefetchedRepository,
+    PrefetchOptions,
+)
+
+LOCKFILE_VERSION = 1
+DEFAULT_LOCKFILE_PATH = "nix-prefetch-github.lock"
+
+
+class LockfileError(Exception):
+    pass
+
+
+class JsonLockfileStore:
+    def read_lockfile(self, path: str) -> Optional[List[LockedRepository]]:
+        try:
+            with open(path) as handle:
+                document = json.load(handle)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            raise LockfileError(f"Lockfile {path} is not valid JSON: {e}")
+        if not isinstance(document, dict) or not isinstance(
+            document.get("repositories"), list
+        ):
+            raise LockfileError(f"Lockfile {path} has no list of repositories")
+        if document.get("version") != LOCKFILE_VERSION:
+            raise LockfileError(
+                f"Lockfile {path} has unsupported version {document.get('version')}"
+            )
+        return [
+            _entry_from_json(entry, f"{path}, entry {index}")
+            for index, entry in enumerate(document["repositories"])
+        ]
+
+    def write_lockfile(self, path: str, entries: List[LockedRepository]) -> None:
+        # The output only depends on the entries and not on their order
+        # so that lockfiles produce minimal diffs in version control.
+        document = {
+            "version": LOCKFILE_VERSION,
+            "repositories": [
+                _entry_to_json(entry) for entry in sorted(entries, key=_sort_key)
+            ],
+        }
+        directory = os.path.dirname(os.path.abspath(path))
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=directory, prefix=".", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(file_descriptor, "w") as handle:
+                handle.write(json.dumps(document, indent=2, sort_keys=True) + "\n")
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+
+def _sort_key(entry: LockedRepository) -> Tuple[str, str, str, bool, bool, bool]:
+    repository = entry.prefetched_repository
+    return (
+        repository.repository.owner,
+        repository.repository.name,
+        entry.ref or "",
+        repository.options.fetch_submodules,
+        repository.options.leave_dot_git,
+        repository.options.deep_clone,
+    )
+
+
+def _entry_to_json(entry: LockedRepository) -> Dict[str, Any]:
+    repository = entry.prefetched_repository
+    return {
+        "owner": repository.repository.owner,
+        "repo": repository.repository.name,
+        "ref": entry.ref,
+        "rev": repository.rev,
+        "hash": repository.hash_sum,
+        "storePath": repository.store_path,
+        "fetchSubmodules": repository.options.fetch_submodules,
+        "leaveDotGit": repository.options.leave_dot_git,
+        "deepClone": repository.options.deep_clone,
+    }
+
+
+def _entry_from_json(document: Any, location: str) -> LockedRepository:
+    if not isinstance(document, dict):
+        raise LockfileError(f"Lockfile {location} must be a JSON object")
+    for key in ["owner", "repo", "rev", "hash", "storePath"]:
+        if not isinstance(document.get(key), str):
+            raise LockfileError(f"Lockfile {location} has no string `{key}`")
+    if document.get("ref") is not None and not isinstance(document["ref"], str):
+        raise LockfileError(f"Lockfile {location} has a `ref` that is not a string")
+    for key in ["fetchSubmodules", "leaveDotGit", "deepClone"]:
+        if not isinstance(document.get(key), bool):
+            raise LockfileError(f"Lockfile {location} has no boolean `{key}`")
+    return LockedRepository(
+        ref=document.get("ref"),
+        prefetched_repository=PrefetchedRepository(
+            repository=GithubRepository(owner=document["owner"], name=document["repo"]),
+            rev=document["rev"],
+            hash_sum=document["hash"],
+            store_path=document["storePath"],
+            options=PrefetchOptions(
+                fetch_submodules=document["fetchSubmodules"],
+                leave_dot_git=document["leaveDotGit"],
+                deep_clone=document["deepClone"],
+            ),
+        ),
+    )
@@ -11,7 +11,7 @@ from logging import (
     StreamHandler,
     getLogger,
 )
-from typing import Protocol, TextIO
+from typing import Optional, Protocol, TextIO
 
 
 @dataclass
@@ -45,8 +45,8 @@ class LoggerManager(Protocol):
 
 
 class LoggerFactoryImpl:
-    def __init__(self) -> None:
-        self._logger = getLogger("")
+    def __init__(self, logger: Optional[Logger] = None) -> None:
+        self._logger = getLogger("") if logger is None else logger
 
     def get_logger(self) -> Logger:
         return self._logger
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import math
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from logging import Logger
+from typing import Any, Dict, Iterator, List, Optional, Protocol, Tuple
+
+PREFIX = "nix_prefetch_github_"
+
+# Durations range from cached lookups that take milliseconds to
+# downloads of large repositories that take minutes.
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+DESCRIPTIONS = {
+    "prefetches_total": "Number of prefetched repositories by result.",
+    "prefetch_duration_seconds": "Time it took to prefetch a repository.",
+    "commands_total": "Number of external commands that were run by result.",
+    "command_duration_seconds": "Time it took to run an external command.",
+    "github_api_requests_total": "Number of requests to the GitHub API by status.",
+    "github_api_request_duration_seconds": "Time it took to request the GitHub API.",
+    "github_api_rate_limit_remaining": "Requests to the GitHub API that are left until the quota is reset.",
+    "github_api_rate_limit_limit": "Requests to the GitHub API that are allowed until the quota is reset.",
+    "cache_requests_total": "Number of lookups in the caches by result.",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+@dataclass
+class MetricsConfiguration:
+    metrics_file: Optional[str] = None
+    # Seconds between two updates of the metrics file. The file is only
+    # written once the program exits if no interval is set.
+    interval: Optional[float] = None
+
+
+class MetricsManager(Protocol):
+    def record_metrics(self, configuration: MetricsConfiguration) -> Any: ...
+
+
+@dataclass
+class _Histogram:
+    bucket_counts: List[int] = field(
+        default_factory=lambda: [0 for _ in DURATION_BUCKETS]
+    )
+    count: int = 0
+    total: float = 0
+
+    def observe(self, value: float) -> None:
+        for n, bound in enumerate(DURATION_BUCKETS):
+            if value <= bound:
+                self.bucket_counts[n] += 1
+        self.count += 1
+        self.total += value
+
+
+@dataclass
+class MetricsRegistryImpl:
+    counters: Dict[Tuple[str, Labels], float] = field(default_factory=dict)
+    gauges: Dict[Tuple[str, Labels], float] = field(default_factory=dict)
+    histograms: Dict[Tuple[str, Labels], _Histogram] = field(default_factory=dict)
+    # All metrics are recorded in the parent registry as well, e.g. in
+    # the registry of the daemon that serves the request.
+    parent: Optional[MetricsRegistryImpl] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def increment_counter(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        if self.parent is not None:
+            self.parent.increment_counter(name, value, **labels)
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        with self._lock:
+            self.gauges[(name, _labels(labels))] = value
+        if self.parent is not None:
+            self.parent.set_gauge(name, value, **labels)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self.histograms.setdefault(key, _Histogram()).observe(value)
+        if self.parent is not None:
+            self.parent.observe(name, value, **labels)
+
+    def render(self) -> str:
+        # Renders the metrics in the text format of Prometheus.
+        lines: List[str] = []
+        with self._lock:
+            samples: Dict[Tuple[str, str], List[Tuple[Labels, Any]]] = dict()
+            metrics: List[Tuple[str, Dict[Tuple[str, Labels], Any]]] = [
+                ("counter", self.counters),
+                ("gauge", self.gauges),
+                ("histogram", self.histograms),
+            ]
+            for metric_type, values in metrics:
+                for (name, labels), value in values.items():
+                    samples.setdefault((name, metric_type), []).append((labels, value))
+            for (name, metric_type), metric_samples in sorted(samples.items()):
+                if description := DESCRIPTIONS.get(name):
+                    lines.append(f"# HELP {PREFIX}{name} {description}")
+                lines.append(f"# TYPE {PREFIX}{name} {metric_type}")
+                for labels, value in sorted(metric_samples, key=lambda item: item[0]):
+                    if isinstance(value, _Histogram):
+                        lines += _render_histogram(name, labels, value)
+                    else:
+                        lines.append(_render_sample(name, labels, value))
+        return "".join(line + "\n" for line in lines)
+
+
+@dataclass
+class MetricsFileWriter:
+    registry: MetricsRegistryImpl
+    logger: Logger
+    # Relative metrics files are resolved against this directory
+    # instead of the working directory of the process if it is set.
+    working_directory: Optional[str] = None
+
+    @contextmanager
+    def record_metrics(self, configuration: MetricsConfiguration) -> Iterator[None]:
+        if configuration.metrics_file is None:
+            yield
+            return
+        stopped = threading.Event()
+        writer: Optional[threading.Thread] = None
+        if configuration.interval:
+            writer = threading.Thread(
+                target=self._write_periodically,
+                args=(configuration.metrics_file, configuration.interval, stopped),
+                name="metrics writer",
+                daemon=True,
+            )
+            writer.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            if writer is not None:
+                writer.join()
+            self.write_metrics(configuration.metrics_file)
+
+    def write_metrics(self, metrics_file: str) -> None:
+        # The file is replaced atomically so that the textfile collector
+        # of the node exporter never reads a partially written file.
+        metrics_file = os.path.join(self.working_directory or "", metrics_file)
+        directory = os.path.dirname(os.path.abspath(metrics_file))
+        try:
+            file_descriptor, temporary_path = tempfile.mkstemp(
+                dir=directory, prefix=".", suffix=".tmp"
+            )
+            try:
+                with os.fdopen(file_descriptor, "w") as handle:
+                    handle.write(self.registry.render())
+                os.chmod(temporary_path, 0o644)
+                os.replace(temporary_path, metrics_file)
+            except BaseException:
+                os.unlink(temporary_path)
+                raise
+        except OSError as e:
+            self.logger.warning("Could not write metrics to %s: %s", metrics_file, e)
+
+    def _write_periodically(
+        self, metrics_file: str, interval: float, stopped: threading.Event
+    ) -> None:
+        while not stopped.wait(interval):
+            self.write_metrics(metrics_file)
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+def _render_histogram(name: str, labels: Labels, histogram: _Histogram) -> List[str]:
+    lines = [
+        _render_sample(f"{name}_bucket", labels + (("le", _format(bound)),), count)
+        for bound, count in zip(DURATION_BUCKETS, histogram.bucket_counts)
+    ]
+    lines.append(
+        _render_sample(f"{name}_bucket", labels + (("le", "+Inf"),), histogram.count)
+    )
+    lines.append(_render_sample(f"{name}_sum", labels, histogram.total))
+    lines.append(_render_sample(f"{name}_count", labels, histogram.count))
+    return lines
+
+
+def _render_sample(name: str, labels: Labels, value: float) -> str:
+    if labels:
+        rendered_labels = ",".join(
+            f'{key}="{_escape(label_value)}"' for key, label_value in labels
+        )
+        return f"{PREFIX}{name}{{{rendered_labels}}} {_format(value)}"
+    return f"{PREFIX}{name} {_format(value)}"
+
+
+def _format(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
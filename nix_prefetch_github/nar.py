@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import bisect
+import hashlib
+import io
+import struct
+import tarfile
+from dataclasses import dataclass
+from typing import IO, Any, List, Optional, Protocol, Tuple
+
+from nix_prefetch_github.hash import encode_nix_base32
+
+NIX_STORE_DIRECTORY = "/nix/store"
+_NAR_MAGIC = b"nix-archive-1"
+_CHUNK_SIZE = 64 * 1024
+_SLASH = ord("/")
+
+
+class UnsupportedArchive(Exception):
+    pass
+
+
+@dataclass
+class NarHash:
+    digest: bytes
+    nar_size: int
+    # GitHub stores the commit hash in the pax global header of its
+    # archives and uses the commit timestamp as the mtime of every
+    # member.
+    commit_id: Optional[str] = None
+    commit_timestamp: Optional[int] = None
+
+
+class _Sink(Protocol):
+    def write(self, data: bytes) -> Any: ...
+
+
+class _HashingSink:
+    def __init__(self) -> None:
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes) -> None:
+        self.hash.update(data)
+        self.size += len(data)
+
+
+def hash_tar_archive(stream: IO[bytes]) -> NarHash:
+    # The NAR serialization of the archive's top-level directory is
+    # computed while the archive is being read. No file is written to
+    # disk and only directory entries that cannot be emitted yet are
+    # kept in memory, see _DirectoryWriter.
+    sink = _HashingSink()
+    _write_string(sink, _NAR_MAGIC)
+    try:
+        with tarfile.open(fileobj=stream, mode="r|*") as archive:
+            commit_timestamp = _serialize_archive(archive, sink)
+            commit_id = archive.pax_headers.get("comment")
+    except tarfile.TarError as e:
+        raise UnsupportedArchive(f"Could not read archive: {e}")
+    return NarHash(
+        digest=sink.hash.digest(),
+        nar_size=sink.size,
+        commit_id=commit_id,
+        commit_timestamp=commit_timestamp,
+    )
+
+
+def make_fixed_output_store_path(name: str, nar_digest: bytes) -> str:
+    # This is the store path that `nix-prefetch-url --unpack` and
+    # fetchzip produce for recursive sha256 hashes.
+    fingerprint = f"source:sha256:{nar_digest.hex()}:{NIX_STORE_DIRECTORY}:{name}"
+    digest = hashlib.sha256(fingerprint.encode("utf-8")).digest()
+    compressed = bytearray(20)
+    for index, byte in enumerate(digest):
+        compressed[index % 20] ^= byte
+    return f"{NIX_STORE_DIRECTORY}/{encode_nix_base32(bytes(compressed))}-{name}"
+
+
+def _serialize_archive(archive: tarfile.TarFile, sink: _Sink) -> Optional[int]:
+    # Returns the mtime of the archive's top-level directory.
+    top_level_directory: Optional[bytes] = None
+    mtime: Optional[int] = None
+    stack: List[Tuple[Tuple[bytes, ...], _DirectoryWriter]] = []
+    for member in archive:
+        components = [
+            component
+            for component in member.name.encode("utf-8", "surrogateescape").split(b"/")
+            if component not in (b"", b".")
+        ]
+        if not components:
+            continue
+        if top_level_directory is None:
+            top_level_directory = components[0]
+            mtime = int(member.mtime)
+        elif components[0] != top_level_directory:
+            raise UnsupportedArchive("Archive has more than one top-level entry")
+        path = tuple(components[1:])
+        if not path:
+            if not member.isdir() or stack:
+                raise UnsupportedArchive("Top-level entry must be a single directory")
+            stack.append(((), _DirectoryWriter(sink)))
+            continue
+        if not stack:
+            stack.append(((), _DirectoryWriter(sink)))
+        parent_path = path[:-1]
+        while stack[-1][0] != parent_path[: len(stack[-1][0])]:
+            _close_directory(stack)
+        while len(stack[-1][0]) < len(parent_path):
+            directory_path = parent_path[: len(stack[-1][0]) + 1]
+            _open_directory(stack, directory_path)
+        parent = stack[-1][1]
+        name = path[-1]
+        if member.isdir():
+            _open_directory(stack, path)
+        elif member.isreg():
+            file_object = archive.extractfile(member)
+            assert file_object is not None
+            _write_regular_file(
+                parent.begin_entry(name, is_directory=False),
+                executable=bool(member.mode & 0o100),
+                size=member.size,
+                stream=file_object,
+            )
+            parent.end_entry()
+        elif member.issym():
+            _write_symlink(
+                parent.begin_entry(name, is_directory=False),
+                member.linkname.encode("utf-8", "surrogateescape"),
+            )
+            parent.end_entry()
+        else:
+            raise UnsupportedArchive(
+                f"Archive member {member.name} has an unsupported type"
+            )
+    if not stack:
+        raise UnsupportedArchive("Archive is empty")
+    while stack:
+        _close_directory(stack)
+    return mtime
+
+
+def _open_directory(
+    stack: List[Tuple[Tuple[bytes, ...], _DirectoryWriter]], path: Tuple[bytes, ...]
+) -> None:
+    parent = stack[-1][1]
+    stack.append((path, _DirectoryWriter(parent.begin_entry(path[-1], True))))
+
+
+def _close_directory(stack: List[Tuple[Tuple[bytes, ...], _DirectoryWriter]]) -> None:
+    _, directory = stack.pop()
+    directory.close()
+    if stack:
+        stack[-1][1].end_entry()
+
+
+class _DirectoryWriter:
+    # NAR directories list their entries sorted bytewise by name while
+    # git archives list them in git's tree order, where directory
+    # names compare as if they ended with a slash. Both orders only
+    # disagree for names that continue a sibling directory's name
+    # with a character that sorts before "/", e.g. "foo-bar" and the
+    # directory "foo". Such entries are buffered until the archive has
+    # moved past the position of every directory that could precede
+    # them. Everything else is written straight to the sink.
+    def __init__(self, sink: _Sink) -> None:
+        self.sink = sink
+        self.pending: List[Tuple[bytes, bytes]] = []
+        self.last_git_key: Optional[bytes] = None
+        self.current_entry: Optional[Tuple[bytes, Optional[io.BytesIO]]] = None
+        _write_strings(sink, b"(", b"type", b"directory")
+
+    def begin_entry(self, name: bytes, is_directory: bool) -> _Sink:
+        git_key = name + b"/" if is_directory else name
+        if self.last_git_key is not None and git_key <= self.last_git_key:
+            raise UnsupportedArchive("Archive members are not in git tree order")
+        self.last_git_key = git_key
+        self._flush(final=False)
+        buffer: Optional[io.BytesIO]
+        if (
+            not self.pending or self.pending[0][0] > name
+        ) and not self._may_follow_future_entry(name):
+            sink: _Sink = self.sink
+            buffer = None
+        else:
+            sink = buffer = io.BytesIO()
+        _write_strings(sink, b"entry", b"(", b"name", name, b"node")
+        self.current_entry = (name, buffer)
+        return sink
+
+    def end_entry(self) -> None:
+        assert self.current_entry is not None
+        name, buffer = self.current_entry
+        self.current_entry = None
+        if buffer is None:
+            _write_string(self.sink, b")")
+        else:
+            _write_string(buffer, b")")
+            bisect.insort(self.pending, (name, buffer.getvalue()))
+
+    def close(self) -> None:
+        self._flush(final=True)
+        _write_string(self.sink, b")")
+
+    def _flush(self, final: bool) -> None:
+        while self.pending:
+            name, serialization = self.pending[0]
+            if not final and self._may_follow_future_entry(name):
+                break
+            self.sink.write(serialization)
+            del self.pending[0]
+
+    def _may_follow_future_entry(self, name: bytes) -> bool:
+        assert self.last_git_key is not None
+        for index in range(1, len(name)):
+            if name[index] < _SLASH and name[:index] + b"/" >= self.last_git_key:
+                return True
+        return False
+
+
+def _write_regular_file(
+    sink: _Sink, executable: bool, size: int, stream: IO[bytes]
+) -> None:
+    _write_strings(sink, b"(", b"type", b"regular")
+    if executable:
+        _write_strings(sink, b"executable", b"")
+    _write_string(sink, b"contents")
+    sink.write(struct.pack("<Q", size))
+    remaining = size
+    while remaining:
+        chunk = stream.read(min(remaining, _CHUNK_SIZE))
+        if not chunk:
+            raise UnsupportedArchive("Archive ended unexpectedly")
+        sink.write(chunk)
+        remaining -= len(chunk)
+    sink.write(_padding(size))
+    _write_string(sink, b")")
+
+
+def _write_symlink(sink: _Sink, target: bytes) -> None:
+    _write_strings(sink, b"(", b"type", b"symlink", b"target", target, b")")
+
+
+def _write_strings(sink: _Sink, *strings: bytes) -> None:
+    for string in strings:
+        _write_string(sink, string)
+
+
+def _write_string(sink: _Sink, string: bytes) -> None:
+    sink.write(struct.pack("<Q", len(string)) + string + _padding(len(string)))
+
+
+def _padding(length: int) -> bytes:
+    return b"\0" * (-length % 8)
@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from nix_prefetch_github.interfaces import GithubRepository, PrefetchOptions
+
+FUNCTION_NAME = b"fetchFromGitHub"
+_IDENTIFIER_CHARACTERS = frozenset(
+    b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_'-"
+)
+_WHITESPACE = frozenset(b" \t\r\n")
+_OPENING_BRACKETS = {ord("{"): ord("}"), ord("("): ord(")"), ord("["): ord("]")}
+_OPTIONS = {
+    "fetchSubmodules": "fetch_submodules",
+    "leaveDotGit": "leave_dot_git",
+    "deepClone": "deep_clone",
+}
+
+
+class NixSyntaxError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class NixString:
+    # A string literal without interpolation. start and end are the
+    # byte offsets of the contents of the literal in the file.
+    value: str
+    start: int
+    end: int
+
+
+@dataclass
+class FetchFromGithubCall:
+    line: int
+    strings: Dict[str, NixString] = field(default_factory=dict)
+    # Attributes that are not plain string literals are kept as their
+    # source text, e.g. true or "v${version}".
+    expressions: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def hash_attribute(self) -> Optional[str]:
+        for name in ["hash", "sha256"]:
+            if name in self.strings or name in self.expressions:
+                return name
+        return None
+
+    def repository(self) -> Optional[GithubRepository]:
+        owner = self.strings.get("owner")
+        repo = self.strings.get("repo")
+        if owner is None or repo is None:
+            return None
+        return GithubRepository(owner=owner.value, name=repo.value)
+
+    def prefetch_options(self) -> Optional[PrefetchOptions]:
+        # Returns None if an option is set to anything but a literal
+        # boolean since the hash depends on it.
+        options = PrefetchOptions()
+        for attribute, option in _OPTIONS.items():
+            if attribute in self.strings:
+                return None
+            if (expression := self.expressions.get(attribute)) is None:
+                continue
+            if expression not in ("true", "false"):
+                return None
+            setattr(options, option, expression == "true")
+        return options
+
+
+@dataclass
+class SourceFile:
+    path: str
+    calls: List[FetchFromGithubCall]
+
+
+@dataclass(frozen=True)
+class Edit:
+    start: int
+    end: int
+    old: bytes
+    new: bytes
+
+
+def find_fetch_from_github_calls(source: bytes) -> List[FetchFromGithubCall]:
+    calls: List[FetchFromGithubCall] = []
+    end = 0
+    for position in _find_call_sites(source):
+        if position < end:
+            # The name appears inside of a call that was parsed already.
+            continue
+        end = position + len(FUNCTION_NAME)
+        try:
+            call, end = _parse_call(source, end)
+        except NixSyntaxError:
+            call = None
+        if call is not None:
+            call.line = source.count(b"\n", 0, position) + 1
+            calls.append(call)
+    return calls
+
+
+def _find_call_sites(source: bytes) -> Iterator[int]:
+    # Scans the file from the start so that names inside of comments
+    # and strings spanning multiple lines are not taken for calls.
+    position = 0
+    try:
+        while position < len(source):
+            character = source[position]
+            if character == ord("#") or source.startswith(b"/*", position):
+                position = _skip_trivia(source, position)
+            elif character == ord('"'):
+                position = _skip_string(source, position + 1)
+            elif source.startswith(b"''", position):
+                position = _skip_indented_string(source, position + 2)
+            elif character in _IDENTIFIER_CHARACTERS:
+                identifier_end = position + 1
+                while _is_identifier_at(source, identifier_end):
+                    identifier_end += 1
+                if source[position:identifier_end] == FUNCTION_NAME:
+                    yield position
+                position = identifier_end
+            else:
+                position += 1
+    except NixSyntaxError:
+        return
+
+
+def _parse_call(
+    source: bytes, position: int
+) -> Tuple[Optional[FetchFromGithubCall], int]:
+    position = _skip_trivia(source, position)
+    keyword_end = position + 3
+    if source.startswith(b"rec", position) and not _is_identifier_at(
+        source, keyword_end
+    ):
+        position = _skip_trivia(source, keyword_end)
+    if not source.startswith(b"{", position):
+        return None, position
+    call = FetchFromGithubCall(line=0)
+    position += 1
+    while True:
+        position = _skip_trivia(source, position)
+        if position >= len(source):
+            raise NixSyntaxError("Unterminated attribute set")
+        if source[position] == ord("}"):
+            return call, position + 1
+        name_end = position
+        while name_end < len(source) and (
+            source[name_end] in _IDENTIFIER_CHARACTERS or source[name_end] == ord(".")
+        ):
+            name_end += 1
+        name = source[position:name_end].decode("utf-8", "replace")
+        if not name:
+            raise NixSyntaxError(f"Unexpected character at byte {position}")
+        if name == "inherit":
+            value_end = _skip_expression(source, name_end)
+            # The names follow the optional source of inherit (pkgs).
+            names = source[name_end:value_end].rpartition(b")")[2]
+            for inherited in names.split():
+                inherited_name = inherited.decode("utf-8", "replace")
+                call.expressions[inherited_name] = "inherit " + inherited_name
+            position = value_end + 1
+            continue
+        position = _skip_trivia(source, name_end)
+        if not source.startswith(b"=", position):
+            raise NixSyntaxError(f"Expected = at byte {position}")
+        value_start = _skip_trivia(source, position + 1)
+        value_end = _skip_expression(source, value_start)
+        string = _parse_string_literal(source, value_start)
+        if string is not None and _skip_trivia(source, string.end + 1) == value_end:
+            call.strings[name] = string
+        else:
+            call.expressions[name] = (
+                source[value_start:value_end].decode("utf-8", "replace").strip()
+            )
+        position = value_end + 1
+
+
+def _is_identifier_at(source: bytes, position: int) -> bool:
+    return 0 <= position < len(source) and source[position] in _IDENTIFIER_CHARACTERS
+
+
+def _parse_string_literal(source: bytes, position: int) -> Optional[NixString]:
+    # Only strings without escape sequences and interpolation are
+    # recognized. Everything else is left alone.
+    if not source.startswith(b'"', position):
+        return None
+    start = position + 1
+    end = start
+    while end < len(source):
+        character = source[end]
+        if character == ord('"'):
+            try:
+                value = source[start:end].decode("utf-8")
+            except UnicodeDecodeError:
+                return None
+            return NixString(value=value, start=start, end=end)
+        if character == ord("\\") or source.startswith(b"${", end):
+            return None
+        end += 1
+    return None
+
+
+def _skip_trivia(source: bytes, position: int) -> int:
+    # Skips whitespace and comments.
+    while position < len(source):
+        if source[position] in _WHITESPACE:
+            position += 1
+        elif source[position] == ord("#"):
+            line_end = source.find(b"\n", position)
+            position = len(source) if line_end == -1 else line_end + 1
+        elif source.startswith(b"/*", position):
+            comment_end = source.find(b"*/", position + 2)
+            if comment_end == -1:
+                raise NixSyntaxError("Unterminated comment")
+            position = comment_end + 2
+        else:
+            break
+    return position
+
+
+def _skip_expression(source: bytes, position: int) -> int:
+    # Returns the position of the semicolon that terminates the
+    # expression starting at position.
+    closing: List[int] = []
+    while position < len(source):
+        position = _skip_trivia(source, position)
+        if position >= len(source):
+            break
+        character = source[position]
+        if character == ord(";") and not closing:
+            return position
+        if character == ord('"'):
+            position = _skip_string(source, position + 1)
+        elif source.startswith(b"''", position):
+            position = _skip_indented_string(source, position + 2)
+        elif character in _OPENING_BRACKETS:
+            closing.append(_OPENING_BRACKETS[character])
+            position += 1
+        elif closing and character == closing[-1]:
+            closing.pop()
+            position += 1
+        elif character in (ord("}"), ord(")"), ord("]")):
+            raise NixSyntaxError(f"Unbalanced bracket at byte {position}")
+        else:
+            position += 1
+    raise NixSyntaxError("Unterminated expression")
+
+
+def _skip_string(source: bytes, position: int) -> int:
+    while position < len(source):
+        if source[position] == ord("\\"):
+            position += 2
+        elif source[position] == ord('"'):
+            return position + 1
+        elif source.startswith(b"$$", position):
+            # $${ is a literal ${ and does not start an interpolation.
+            position += 2
+        elif source.startswith(b"${", position):
+            position = _skip_interpolation(source, position + 2)
+        else:
+            position += 1
+    raise NixSyntaxError("Unterminated string")
+
+
+def _skip_indented_string(source: bytes, position: int) -> int:
+    while position < len(source):
+        if source.startswith(b"'''", position) or source.startswith(b"''$", position):
+            position += 3
+        elif source.startswith(b"''\\", position):
+            position += 4
+        elif source.startswith(b"''", position):
+            return position + 2
+        elif source.startswith(b"${", position):
+            position = _skip_interpolation(source, position + 2)
+        else:
+            position += 1
+    raise NixSyntaxError("Unterminated string")
+
+
+def _skip_interpolation(source: bytes, position: int) -> int:
+    depth = 1
+    while position < len(source):
+        position = _skip_trivia(source, position)
+        if position >= len(source):
+            break
+        if source[position] == ord('"'):
+            position = _skip_string(source, position + 1)
+        elif source.startswith(b"''", position):
+            position = _skip_indented_string(source, position + 2)
+        elif source[position] == ord("{"):
+            depth += 1
+            position += 1
+        elif source[position] == ord("}"):
+            depth -= 1
+            position += 1
+            if depth == 0:
+                return position
+        else:
+            position += 1
+    raise NixSyntaxError("Unterminated interpolation")
@@ -1,41 +1,82 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
+from logging import getLogger
 from typing import Optional
 
+from nix_prefetch_github.functor import to_thread
 from nix_prefetch_github.hash import is_sha1_hash
 from nix_prefetch_github.interfaces import (
+    AsyncRetryPolicy,
+    AsyncRevisionIndexFactory,
+    AsyncUrlHasher,
     GithubRepository,
+    Metrics,
     PrefetchedRepository,
     PrefetchFailure,
     PrefetchOptions,
     PrefetchResult,
+    RetryPolicy,
     RevisionIndexFactory,
+    Tracer,
     UrlHasher,
 )
+from nix_prefetch_github.metrics import MetricsRegistryImpl
+from nix_prefetch_github.retry import RetryPolicyImpl
+from nix_prefetch_github.tracing import TracerImpl
 
 
 @dataclass(frozen=True)
 class PrefetcherImpl:
     url_hasher: UrlHasher
     revision_index_factory: RevisionIndexFactory
+    tracer: Tracer = field(default_factory=TracerImpl)
+    metrics: Metrics = field(default_factory=MetricsRegistryImpl)
+    retry_policy: RetryPolicy = field(
+        default_factory=lambda: RetryPolicyImpl(logger=getLogger(__name__))
+    )
 
     def prefetch_github(
         self,
         repository: GithubRepository,
         rev: Optional[str],
         prefetch_options: PrefetchOptions,
+    ) -> PrefetchResult:
+        started_at = time.monotonic()
+        # All retries that are necessary to prefetch a repository share
+        # one deadline.
+        with self.retry_policy.deadline():
+            result = self._prefetch_revision(repository, rev, prefetch_options)
+        _record_prefetch(self.metrics, started_at, result)
+        return result
+
+    def _prefetch_revision(
+        self,
+        repository: GithubRepository,
+        rev: Optional[str],
+        prefetch_options: PrefetchOptions,
     ) -> PrefetchResult:
         revision: Optional[str]
+        # Operations that did not finish before the deadline raise
+        # TimeoutError.
         if rev is not None and self._is_proper_revision_hash(rev):
             revision = rev
         else:
-            revision = self._detect_revision(repository, rev)
+            try:
+                revision = self._detect_revision(repository, rev)
+            except TimeoutError:
+                revision = None
         if revision is None:
             return PrefetchFailure(
                 reason=PrefetchFailure.Reason.unable_to_locate_revision
             )
-        return self._prefetch_github(repository, revision, prefetch_options)
+        try:
+            return self._prefetch_github(repository, revision, prefetch_options)
+        except TimeoutError:
+            return PrefetchFailure(
+                reason=PrefetchFailure.Reason.unable_to_calculate_hash_sum
+            )
 
     def _prefetch_github(
         self,
@@ -58,6 +99,7 @@ class PrefetcherImpl:
             rev=revision,
             options=prefetch_options,
             store_path=prefetched_repo.store_path,
+            commit_date=prefetched_repo.commit_date,
         )
 
     def _is_proper_revision_hash(self, revision: str) -> bool:
@@ -66,12 +108,116 @@ class PrefetcherImpl:
     def _detect_revision(
         self, repository: GithubRepository, revision: Optional[str]
     ) -> Optional[str]:
-        actual_rev: Optional[str]
-        revision_index = self.revision_index_factory.get_revision_index(repository)
-        if revision_index is None:
-            return None
-        if revision is None:
-            actual_rev = revision_index.get_revision_by_name("HEAD")
+        name = "HEAD" if revision is None else revision
+        with self.tracer.span(
+            "detect revision",
+            "revision",
+            repository=f"{repository.owner}/{repository.name}",
+            ref=name,
+        ) as span:
+            revision_index = self.revision_index_factory.get_revision_index(
+                repository, name
+            )
+            if revision_index is None:
+                return None
+            span["revision"] = revision_index.get_revision_by_name(name)
+            return span["revision"]
+
+
+@dataclass(frozen=True)
+class AsyncPrefetcherImpl:
+    # Prefetches without a thread per repository so that many
+    # prefetches can be in flight at once.
+    url_hasher: AsyncUrlHasher
+    revision_index_factory: AsyncRevisionIndexFactory
+    tracer: Tracer = field(default_factory=TracerImpl)
+    metrics: Metrics = field(default_factory=MetricsRegistryImpl)
+    retry_policy: AsyncRetryPolicy = field(
+        default_factory=lambda: RetryPolicyImpl(logger=getLogger(__name__))
+    )
+
+    async def prefetch_github(
+        self,
+        repository: GithubRepository,
+        rev: Optional[str],
+        prefetch_options: PrefetchOptions,
+    ) -> PrefetchResult:
+        started_at = time.monotonic()
+        # Every task has its own deadline.
+        with self.retry_policy.deadline():
+            result = await self._prefetch_revision(repository, rev, prefetch_options)
+        _record_prefetch(self.metrics, started_at, result)
+        return result
+
+    async def _prefetch_revision(
+        self,
+        repository: GithubRepository,
+        rev: Optional[str],
+        prefetch_options: PrefetchOptions,
+    ) -> PrefetchResult:
+        revision: Optional[str]
+        if rev is not None and is_sha1_hash(rev):
+            revision = rev
         else:
-            actual_rev = revision_index.get_revision_by_name(revision)
-        return actual_rev
+            try:
+                revision = await self._detect_revision(repository, rev)
+            except TimeoutError:
+                revision = None
+        if revision is None:
+            return PrefetchFailure(
+                reason=PrefetchFailure.Reason.unable_to_locate_revision
+            )
+        try:
+            prefetched_repo = await self.url_hasher.calculate_hash_sum(
+                repository=repository,
+                revision=revision,
+                prefetch_options=prefetch_options,
+            )
+        except TimeoutError:
+            prefetched_repo = None
+        if prefetched_repo is None:
+            return PrefetchFailure(
+                reason=PrefetchFailure.Reason.unable_to_calculate_hash_sum
+            )
+        return PrefetchedRepository(
+            repository=repository,
+            hash_sum=prefetched_repo.hash_sum,
+            rev=revision,
+            options=prefetch_options,
+            store_path=prefetched_repo.store_path,
+            commit_date=prefetched_repo.commit_date,
+        )
+
+    async def _detect_revision(
+        self, repository: GithubRepository, revision: Optional[str]
+    ) -> Optional[str]:
+        name = "HEAD" if revision is None else revision
+        with self.tracer.span(
+            "detect revision",
+            "revision",
+            repository=f"{repository.owner}/{repository.name}",
+            ref=name,
+        ) as span:
+            revision_index = await self.revision_index_factory.get_revision_index(
+                repository, name
+            )
+            if revision_index is None:
+                return None
+            # Looking up a ref of cached refs that expired lists the refs
+            # again with the synchronous factory of the cache.
+            span["revision"] = await to_thread(
+                revision_index.get_revision_by_name, name
+            )
+            return span["revision"]
+
+
+def _record_prefetch(
+    metrics: Metrics, started_at: float, result: PrefetchResult
+) -> None:
+    metrics.observe("prefetch_duration_seconds", time.monotonic() - started_at)
+    metrics.increment_counter(
+        "prefetches_total",
+        result=(
+            result.reason.name if isinstance(result, PrefetchFailure) else "success"
+        ),
+    )
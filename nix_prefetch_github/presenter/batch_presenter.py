@@ -0,0 +1,78 @@
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, TextIO
+
+from nix_prefetch_github.interfaces import (
+    CommandLineView,
+    GithubRepository,
+    PrefetchedRepository,
+    PrefetchFailure,
+    PrefetchResult,
+    ViewModel,
+)
+from nix_prefetch_github.presenter.repository_renderer import JsonRepositoryRenderer
+
+
+@dataclass
+class BatchPresenterImpl:
+    output: TextIO
+    view: CommandLineView
+    json_renderer: JsonRepositoryRenderer
+    entry_count: int = 0
+    failure_count: int = 0
+
+    def present_batch_result(
+        self,
+        repository: GithubRepository,
+        revision: Optional[str],
+        prefetch_result: PrefetchResult,
+    ) -> None:
+        if isinstance(prefetch_result, PrefetchedRepository):
+            self.entry_count += 1
+            self._write_document(self.json_renderer.render_to_json(prefetch_result))
+        elif isinstance(prefetch_result, PrefetchFailure):
+            self.present_batch_error(
+                repository=repository,
+                revision=revision,
+                error=str(prefetch_result.reason),
+            )
+        else:
+            raise Exception(f"Renderer received unexpected value {prefetch_result}")
+
+    def present_batch_error(
+        self,
+        repository: Optional[GithubRepository],
+        revision: Optional[str],
+        error: str,
+    ) -> None:
+        # The repository is unknown for entries of the manifest that
+        # could not be read.
+        self.entry_count += 1
+        self.failure_count += 1
+        self._write_document(
+            {
+                "owner": repository.owner if repository else None,
+                "repo": repository.name if repository else None,
+                "rev": revision,
+                "error": error,
+            }
+        )
+
+    def _write_document(self, document: Dict[str, Any]) -> None:
+        # Results are flushed right away so that consumers can process
+        # them while the batch is still running.
+        print(json.dumps(document), file=self.output, flush=True)
+
+    def finish_batch(self) -> None:
+        stderr_lines: List[str] = []
+        if self.failure_count:
+            stderr_lines.append(
+                f"Prefetch failed for {self.failure_count} of {self.entry_count} entries"
+            )
+        self.view.render_view_model(
+            ViewModel(
+                exit_code=1 if self.failure_count else 0,
+                stderr_lines=stderr_lines,
+                stdout_lines=[],
+            )
+        )
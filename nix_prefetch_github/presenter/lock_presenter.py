@@ -0,0 +1,53 @@
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, TextIO
+
+from nix_prefetch_github.interfaces import CommandLineView, LockfileChange, ViewModel
+
+
+@dataclass
+class LockPresenterImpl:
+    output: TextIO
+    view: CommandLineView
+    status_counts: Counter = field(default_factory=Counter)
+
+    def present_lockfile_change(self, change: LockfileChange) -> None:
+        self.status_counts[change.status] += 1
+        document: Dict[str, Any] = {
+            "status": change.status.name,
+            "owner": change.repository.owner,
+            "repo": change.repository.name,
+            "ref": change.ref,
+        }
+        for key, value in [
+            ("rev", change.rev),
+            ("hash", change.hash_sum),
+            ("previousRev", change.previous_rev),
+            ("previousHash", change.previous_hash_sum),
+            ("reason", change.reason),
+        ]:
+            if value is not None:
+                document[key] = value
+        print(json.dumps(document), file=self.output, flush=True)
+
+    def finish_lock(self) -> None:
+        stderr_lines: List[str] = [
+            ", ".join(
+                f"{self.status_counts[status]} {status.name}"
+                for status in LockfileChange.Status
+                if status != LockfileChange.Status.failed
+            )
+        ]
+        failure_count = self.status_counts[LockfileChange.Status.failed]
+        if failure_count:
+            stderr_lines.append(
+                f"Lockfile was not written since {failure_count} entries failed"
+            )
+        self.view.render_view_model(
+            ViewModel(
+                exit_code=1 if failure_count else 0,
+                stderr_lines=stderr_lines,
+                stdout_lines=[],
+            )
+        )
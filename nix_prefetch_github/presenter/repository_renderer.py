@@ -61,9 +61,11 @@ class MetaRepositoryRenderer:
     def render_prefetched_repository(self, repository: PrefetchedRepository) -> str:
         src_output = self.json_renderer.render_to_json(repository)
         meta_output: Dict[str, Any] = dict()
-        commit_timestamp = self.github_api.get_commit_date(
-            repository.repository, repository.rev
-        )
+        commit_timestamp = repository.commit_date
+        if commit_timestamp is None:
+            commit_timestamp = self.github_api.get_commit_date(
+                repository.repository, repository.rev
+            )
         meta_output["storePath"] = repository.store_path
         if commit_timestamp:
             meta_output["commitDate"] = commit_timestamp.date().isoformat()
@@ -87,6 +89,9 @@ class RenderingSelectorImpl:
     def set_rendering_format(self, rendering_format: RenderingFormat) -> None:
         self.selected_output_format = rendering_format
 
+    def get_rendering_format(self) -> Optional[RenderingFormat]:
+        return self.selected_output_format
+
     def render_prefetched_repository(self, repository: PrefetchedRepository) -> str:
         if self.selected_output_format == RenderingFormat.nix:
             return self.nix_renderer.render_prefetched_repository(repository)
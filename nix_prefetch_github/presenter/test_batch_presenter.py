@@ -0,0 +1,117 @@
+import json
+from io import StringIO
+from typing import Any, List, Optional
+from unittest import TestCase
+
+from nix_prefetch_github.interfaces import (
+    GithubRepository,
+    PrefetchedRepository,
+    PrefetchFailure,
+    PrefetchOptions,
+    ViewModel,
+)
+
+from .batch_presenter import BatchPresenterImpl
+from .repository_renderer import JsonRepositoryRenderer
+
+
+class BatchPresenterTests(TestCase):
+    def setUp(self) -> None:
+        self.output = StringIO()
+        self.view = FakeView()
+        self.presenter = BatchPresenterImpl(
+            output=self.output,
+            view=self.view,
+            json_renderer=JsonRepositoryRenderer(),
+        )
+        self.repository = GithubRepository(owner="owner", name="repo")
+
+    def test_each_result_is_written_as_single_json_line(self) -> None:
+        self.present_success()
+        self.present_failure()
+        self.assertEqual(len(self.read_documents()), 2)
+
+    def test_successful_result_is_rendered_like_json_output(self) -> None:
+        self.present_success()
+        self.assertEqual(
+            self.read_documents()[0],
+            {"owner": "owner", "repo": "repo", "rev": "abc", "hash": "sha256-test"},
+        )
+
+    def test_failure_contains_requested_revision_and_error(self) -> None:
+        self.present_failure(revision="v1")
+        document = self.read_documents()[0]
+        self.assertEqual(document["rev"], "v1")
+        self.assertEqual(document["error"], "Unable to locate revision")
+
+    def test_error_without_repository_is_written_with_null_values(self) -> None:
+        self.presenter.present_batch_error(
+            repository=None, revision=None, error="Line 2 is not valid JSON"
+        )
+        self.assertEqual(
+            self.read_documents()[0],
+            {
+                "owner": None,
+                "repo": None,
+                "rev": None,
+                "error": "Line 2 is not valid JSON",
+            },
+        )
+
+    def test_exit_code_is_1_if_an_error_was_presented(self) -> None:
+        self.present_success()
+        self.presenter.present_batch_error(
+            repository=self.repository, revision="v1", error="Unexpected error"
+        )
+        self.presenter.finish_batch()
+        assert self.view.model
+        self.assertEqual(self.view.model.exit_code, 1)
+        self.assertIn("1 of 2", self.view.model.stderr_lines[0])
+
+    def test_exit_code_is_0_if_no_entry_failed(self) -> None:
+        self.present_success()
+        self.presenter.finish_batch()
+        assert self.view.model
+        self.assertEqual(self.view.model.exit_code, 0)
+        self.assertFalse(self.view.model.stderr_lines)
+
+    def test_exit_code_is_1_if_any_entry_failed(self) -> None:
+        self.present_success()
+        self.present_failure()
+        self.presenter.finish_batch()
+        assert self.view.model
+        self.assertEqual(self.view.model.exit_code, 1)
+        self.assertIn("1 of 2", self.view.model.stderr_lines[0])
+
+    def present_success(self) -> None:
+        self.presenter.present_batch_result(
+            repository=self.repository,
+            revision=None,
+            prefetch_result=PrefetchedRepository(
+                repository=self.repository,
+                rev="abc",
+                hash_sum="sha256-test",
+                options=PrefetchOptions(),
+                store_path="/nix/store/test",
+            ),
+        )
+
+    def present_failure(self, revision: Optional[str] = None) -> None:
+        self.presenter.present_batch_result(
+            repository=self.repository,
+            revision=revision,
+            prefetch_result=PrefetchFailure(
+                reason=PrefetchFailure.Reason.unable_to_locate_revision
+            ),
+        )
+
+    def read_documents(self) -> List[Any]:
+        return [json.loads(line) for line in self.output.getvalue().splitlines()]
+
+
+class FakeView:
+    def __init__(self) -> None:
+        self.model: Optional[ViewModel] = None
+
+    def render_view_model(self, model: ViewModel) -> None:
+        self.model = model
@@ -0,0 +1,80 @@
+import json
+from io import StringIO
+from typing import Any, List, Optional
+from unittest import TestCase
+
+from nix_prefetch_github.interfaces import GithubRepository, LockfileChange, ViewModel
+
+from .lock_presenter import LockPresenterImpl
+
+
+class LockPresenterTests(TestCase):
+    def setUp(self) -> None:
+        self.output = StringIO()
+        self.view = FakeView()
+        self.presenter = LockPresenterImpl(output=self.output, view=self.view)
+
+    def test_each_change_is_written_as_single_json_line(self) -> None:
+        self.present(LockfileChange.Status.added)
+        self.present(LockfileChange.Status.unchanged)
+        self.assertEqual(len(self.read_documents()), 2)
+
+    def test_changed_entry_contains_new_and_previous_values(self) -> None:
+        self.present(LockfileChange.Status.changed)
+        self.assertEqual(
+            self.read_documents()[0],
+            {
+                "status": "changed",
+                "owner": "owner",
+                "repo": "repo",
+                "ref": "main",
+                "rev": "new-rev",
+                "hash": "new-hash",
+                "previousRev": "old-rev",
+                "previousHash": "old-hash",
+            },
+        )
+
+    def test_summary_counts_changes(self) -> None:
+        self.present(LockfileChange.Status.added)
+        self.present(LockfileChange.Status.added)
+        self.present(LockfileChange.Status.removed)
+        self.presenter.finish_lock()
+        assert self.view.model
+        self.assertEqual(self.view.model.exit_code, 0)
+        self.assertEqual(
+            self.view.model.stderr_lines,
+            ["2 added, 0 changed, 0 unchanged, 1 removed"],
+        )
+
+    def test_exit_code_is_1_if_any_entry_failed(self) -> None:
+        self.present(LockfileChange.Status.added)
+        self.present(LockfileChange.Status.failed)
+        self.presenter.finish_lock()
+        assert self.view.model
+        self.assertEqual(self.view.model.exit_code, 1)
+        self.assertIn("not written", self.view.model.stderr_lines[1])
+
+    def present(self, status: LockfileChange.Status) -> None:
+        self.presenter.present_lockfile_change(
+            LockfileChange(
+                status=status,
+                repository=GithubRepository(owner="owner", name="repo"),
+                ref="main",
+                rev="new-rev",
+                previous_rev="old-rev",
+                hash_sum="new-hash",
+                previous_hash_sum="old-hash",
+            )
+        )
+
+    def read_documents(self) -> List[Any]:
+        return [json.loads(line) for line in self.output.getvalue().splitlines()]
+
+
+class FakeView:
+    def __init__(self) -> None:
+        self.model: Optional[ViewModel] = None
+
+    def render_view_model(self, model: ViewModel) -> None:
+        self.model = model
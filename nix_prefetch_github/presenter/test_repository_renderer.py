@@ -1,4 +1,6 @@
-from typing import List
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
 from unittest import TestCase
 
 from nix_prefetch_github.interfaces import (
@@ -9,6 +11,7 @@ from nix_prefetch_github.interfaces import (
 )
 from nix_prefetch_github.presenter.repository_renderer import (
     JsonRepositoryRenderer,
+    MetaRepositoryRenderer,
     NixRepositoryRenderer,
 )
 
@@ -61,3 +64,66 @@ class GeneralRepositoryRendererTests(TestCase):
             options=PrefetchOptions(leave_dot_git=leave_dot_git, deep_clone=deep_clone),
             store_path=store_path,
         )
+
+
+class MetaRepositoryRendererTests(TestCase):
+    def setUp(self) -> None:
+        self.github_api = FakeGithubAPI()
+        self.renderer = MetaRepositoryRenderer(
+            json_renderer=JsonRepositoryRenderer(), github_api=self.github_api
+        )
+
+    def test_commit_date_of_prefetched_repository_is_rendered(self) -> None:
+        output = json.loads(
+            self.renderer.render_prefetched_repository(
+                self._make_repository(
+                    commit_date=datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+                )
+            )
+        )
+        self.assertEqual(output["meta"]["commitDate"], "2024-01-02")
+        self.assertEqual(output["meta"]["commitTimeOfDay"], "03:04:05")
+        self.assertEqual(self.github_api.requested_commits, [])
+
+    def test_commit_date_is_requested_from_github_if_it_is_unknown(self) -> None:
+        output = json.loads(
+            self.renderer.render_prefetched_repository(self._make_repository())
+        )
+        self.assertEqual(output["meta"]["commitDate"], "2000-01-01")
+        self.assertEqual(self.github_api.requested_commits, ["test"])
+
+    def _make_repository(
+        self, commit_date: Optional[datetime] = None
+    ) -> PrefetchedRepository:
+        return PrefetchedRepository(
+            repository=GithubRepository(owner="test", name="test"),
+            rev="test",
+            hash_sum="test",
+            options=PrefetchOptions(),
+            store_path="/test/store/path",
+            commit_date=commit_date,
+        )
+
+
+class FakeGithubAPI:
+    def __init__(self) -> None:
+        self.requested_commits: List[str] = []
+
+    def get_tag_of_latest_release(self, repository: GithubRepository) -> Optional[str]:
+        return None
+
+    def get_commit_date(
+        self, repository: GithubRepository, commit_sha1_hash: str
+    ) -> Optional[datetime]:
+        self.requested_commits.append(commit_sha1_hash)
+        return datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+    def get_tags_of_latest_releases(
+        self, repositories: List[GithubRepository]
+    ) -> Dict[GithubRepository, Optional[str]]:
+        return {repository: None for repository in repositories}
+
+    def get_commit_dates(
+        self, commits: List[Tuple[GithubRepository, str]]
+    ) -> Dict[Tuple[GithubRepository, str], Optional[datetime]]:
+        return {commit: None for commit in commits}
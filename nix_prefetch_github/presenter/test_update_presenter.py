@@ -0,0 +1,77 @@
+import json
+from io import StringIO
+from typing import Any, List, Optional
+from unittest import TestCase
+
+from nix_prefetch_github.interfaces import GithubRepository, SourceUpdate, ViewModel
+
+from .update_presenter import UpdatePresenterImpl
+
+
+class UpdatePresenterTests(TestCase):
+    def setUp(self) -> None:
+        self.output = StringIO()
+        self.view = FakeView()
+        self.presenter = UpdatePresenterImpl(output=self.output, view=self.view)
+
+    def test_each_update_is_written_as_single_json_line(self) -> None:
+        self.present(SourceUpdate.Status.updated)
+        self.present(SourceUpdate.Status.skipped)
+        self.assertEqual(len(self.read_documents()), 2)
+
+    def test_updated_call_contains_new_and_previous_values(self) -> None:
+        self.present(SourceUpdate.Status.updated)
+        self.assertEqual(
+            self.read_documents()[0],
+            {
+                "path": "default.nix",
+                "line": 3,
+                "status": "updated",
+                "owner": "owner",
+                "repo": "repo",
+                "rev": "new-rev",
+                "hash": "new-hash",
+                "previousRev": "old-rev",
+                "previousHash": "old-hash",
+            },
+        )
+
+    def test_exit_code_is_0_if_no_call_failed(self) -> None:
+        self.present(SourceUpdate.Status.updated)
+        self.present(SourceUpdate.Status.unchanged)
+        self.presenter.finish_update()
+        assert self.view.model
+        self.assertEqual(self.view.model.exit_code, 0)
+        self.assertIn("Updated 1 of 2", self.view.model.stderr_lines[0])
+
+    def test_exit_code_is_1_if_any_call_failed(self) -> None:
+        self.present(SourceUpdate.Status.updated)
+        self.present(SourceUpdate.Status.failed)
+        self.presenter.finish_update()
+        assert self.view.model
+        self.assertEqual(self.view.model.exit_code, 1)
+
+    def present(self, status: SourceUpdate.Status) -> None:
+        self.presenter.present_source_update(
+            SourceUpdate(
+                path="default.nix",
+                line=3,
+                status=status,
+                repository=GithubRepository(owner="owner", name="repo"),
+                rev="new-rev",
+                previous_rev="old-rev",
+                hash_sum="new-hash",
+                previous_hash_sum="old-hash",
+            )
+        )
+
+    def read_documents(self) -> List[Any]:
+        return [json.loads(line) for line in self.output.getvalue().splitlines()]
+
+
+class FakeView:
+    def __init__(self) -> None:
+        self.model: Optional[ViewModel] = None
+
+    def render_view_model(self, model: ViewModel) -> None:
+        self.model = model
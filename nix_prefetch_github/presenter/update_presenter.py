@@ -0,0 +1,53 @@
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, TextIO
+
+from nix_prefetch_github.interfaces import CommandLineView, SourceUpdate, ViewModel
+
+
+@dataclass
+class UpdatePresenterImpl:
+    output: TextIO
+    view: CommandLineView
+    update_count: int = 0
+    call_count: int = 0
+    failure_count: int = 0
+
+    def present_source_update(self, update: SourceUpdate) -> None:
+        self.call_count += 1
+        if update.status == SourceUpdate.Status.updated:
+            self.update_count += 1
+        elif update.status == SourceUpdate.Status.failed:
+            self.failure_count += 1
+        document: Dict[str, Any] = {
+            "path": update.path,
+            "line": update.line,
+            "status": update.status.name,
+        }
+        if update.repository is not None:
+            document["owner"] = update.repository.owner
+            document["repo"] = update.repository.name
+        for key, value in [
+            ("rev", update.rev),
+            ("hash", update.hash_sum),
+            ("previousRev", update.previous_rev),
+            ("previousHash", update.previous_hash_sum),
+            ("reason", update.reason),
+        ]:
+            if value is not None:
+                document[key] = value
+        print(json.dumps(document), file=self.output, flush=True)
+
+    def finish_update(self) -> None:
+        stderr_lines: List[str] = [
+            f"Updated {self.update_count} of {self.call_count} fetchFromGitHub calls"
+        ]
+        if self.failure_count:
+            stderr_lines.append(f"Update failed for {self.failure_count} calls")
+        self.view.render_view_model(
+            ViewModel(
+                exit_code=1 if self.failure_count else 0,
+                stderr_lines=stderr_lines,
+                stdout_lines=[],
+            )
+        )
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from logging import Logger
+from typing import Callable, Optional
+
+from nix_prefetch_github.http_pool import HttpResponse
+
+# GitHub asks clients to wait at least a minute after hitting a
+# secondary rate limit that did not come with a Retry-After header.
+_SECONDARY_RATE_LIMIT_PAUSE = 60
+
+
+@dataclass
+class GithubRateLimiter:
+    # Keeps track of the quota of GitHub's REST API from the
+    # X-RateLimit-* headers of its responses. Requests wait until the
+    # quota is reset instead of failing once it is exhausted. If more
+    # requests are planned than the quota allows they are spread evenly
+    # over the time until the quota is reset.
+    logger: Logger
+    clock: Callable[[], float] = field(default=time.time)
+    sleep: Callable[[float], None] = field(default=time.sleep)
+    limit: Optional[int] = None
+    remaining: Optional[int] = None
+    reset_at: Optional[float] = None
+    used_requests: int = 0
+    planned_requests: int = 0
+    _paused_until: float = 0
+    _next_request_at: float = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def plan_requests(self, count: int) -> None:
+        with self._lock:
+            self.planned_requests += count
+            remaining = self._get_remaining(self.clock())
+        if remaining is None:
+            return
+        if remaining < count:
+            self.logger.warning(
+                "%s requests to the GitHub API are planned but only %s of %s are "
+                "left until %s. Requests are slowed down accordingly.",
+                count,
+                remaining,
+                self.limit,
+                self._format_reset_time(),
+            )
+        else:
+            self.logger.info(
+                "%s requests to the GitHub API are planned, %s of %s are left",
+                count,
+                remaining,
+                self.limit,
+            )
+
+    def acquire(self) -> None:
+        # Blocks until the next request may be sent.
+        with self._lock:
+            now = self.clock()
+            start = max(now, self._paused_until, self._next_request_at)
+            remaining = self._get_remaining(start)
+            if remaining is not None and self.reset_at is not None:
+                if remaining <= 0:
+                    start = self.reset_at
+                elif self.planned_requests > remaining:
+                    self._next_request_at = start + (self.reset_at - start) / remaining
+                # The quota is claimed before the response arrives so that
+                # concurrent requests do not overdraw it.
+                self.remaining = remaining - 1
+            self.planned_requests = max(self.planned_requests - 1, 0)
+        if start - now >= 1:
+            self.logger.info(
+                "Waiting %d seconds for the GitHub API rate limit", start - now
+            )
+        if start > now:
+            self.sleep(start - now)
+
+    def update(self, response: HttpResponse, is_counted: bool = True) -> bool:
+        # Returns True if the request was rejected because of a rate
+        # limit and should be sent again.
+        is_rate_limited = response.status in (403, 429) and (
+            response.header("retry-after") is not None
+            or response.header("x-ratelimit-remaining") == "0"
+        )
+        with self._lock:
+            # Conditional requests that were answered with 304 do not
+            # count against the quota.
+            if is_counted and response.status != 304 and not is_rate_limited:
+                self.used_requests += 1
+            if response.header("x-ratelimit-resource") in (None, "core"):
+                self._read_rate_limit_headers(response)
+            if is_rate_limited:
+                self._paused_until = max(
+                    self._paused_until, self._get_pause_end(response)
+                )
+        if is_rate_limited:
+            self.logger.warning(
+                "GitHub API rate limit exceeded, pausing until %s",
+                datetime.fromtimestamp(self._paused_until).strftime("%H:%M:%S"),
+            )
+        elif self.remaining is not None:
+            self.logger.debug(
+                "Used %s requests of the GitHub API quota, %s of %s are left until %s",
+                self.used_requests,
+                self.remaining,
+                self.limit,
+                self._format_reset_time(),
+            )
+        return is_rate_limited
+
+    def _read_rate_limit_headers(self, response: HttpResponse) -> None:
+        try:
+            limit = response.header("x-ratelimit-limit")
+            remaining = response.header("x-ratelimit-remaining")
+            reset_at = response.header("x-ratelimit-reset")
+            if limit is not None:
+                self.limit = int(limit)
+            if remaining is not None and reset_at is not None:
+                self.remaining = int(remaining)
+                self.reset_at = float(reset_at)
+        except ValueError:
+            pass
+
+    def _get_pause_end(self, response: HttpResponse) -> float:
+        now = self.clock()
+        retry_after = response.header("retry-after")
+        if retry_after is not None:
+            try:
+                return now + max(float(retry_after), 0)
+            except ValueError:
+                pass
+        if self.remaining == 0 and self.reset_at is not None and self.reset_at > now:
+            return self.reset_at
+        return now + _SECONDARY_RATE_LIMIT_PAUSE
+
+    def _get_remaining(self, now: float) -> Optional[int]:
+        # The quota is unknown once its reset time has passed.
+        if self.reset_at is None or now >= self.reset_at:
+            return None
+        return self.remaining
+
+    def _format_reset_time(self) -> str:
+        if self.reset_at is None:
+            return "an unknown time"
+        return datetime.fromtimestamp(self.reset_at).strftime("%H:%M:%S")
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from logging import Logger
+from typing import Awaitable, Callable, Iterator, Optional, Protocol, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class RetryConfiguration:
+    # Number of times a failed operation is repeated.
+    retries: int = 3
+    # Seconds after the start of a prefetch after which failed
+    # operations are not repeated anymore.
+    deadline: Optional[float] = 300
+    initial_delay: float = 1
+    max_delay: float = 30
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class RetryManager(Protocol):
+    def set_retry_configuration(self, configuration: RetryConfiguration) -> None: ...
+
+
+def is_transient_http_status(status: int) -> bool:
+    # Authentication errors and missing repositories do not go away by
+    # asking again.
+    return status == 429 or 500 <= status <= 599
+
+
+def _no_transient_failure(result: object) -> Optional[str]:
+    return None
+
+
+def _is_not_transient(error: Exception) -> bool:
+    return False
+
+
+async def _sleep_async(delay: float) -> None:
+    # asyncio is only imported by programs that prefetch
+    # asynchronously.
+    import asyncio
+
+    await asyncio.sleep(delay)
+
+
+@dataclass
+class RetryPolicyImpl:
+    # Repeats operations that failed for a reason that might go away,
+    # e.g. a network error or a 502 from GitHub. The delay between two
+    # attempts grows exponentially and is chosen randomly up to that
+    # bound so that concurrent prefetches do not retry in lockstep.
+    logger: Logger
+    configuration: RetryConfiguration = field(default_factory=RetryConfiguration)
+    clock: Callable[[], float] = field(default=time.monotonic)
+    sleep: Callable[[float], None] = field(default=time.sleep)
+    random: Callable[[], float] = field(default=random.random)
+    sleep_async: Callable[[float], Awaitable[None]] = field(default=_sleep_async)
+    # Prefetches of a batch run concurrently, each with its own
+    # deadline. Threads and asyncio tasks have their own context.
+    _deadline: ContextVar[Optional[float]] = field(
+        default_factory=lambda: ContextVar("deadline", default=None), repr=False
+    )
+
+    def set_retry_configuration(self, configuration: RetryConfiguration) -> None:
+        self.configuration = configuration
+
+    @contextmanager
+    def deadline(self) -> Iterator[None]:
+        previous_deadline = self._deadline.get()
+        deadline = previous_deadline
+        if self.configuration.deadline is not None:
+            deadline = self.clock() + self.configuration.deadline
+            if previous_deadline is not None:
+                deadline = min(deadline, previous_deadline)
+        token = self._deadline.set(deadline)
+        try:
+            yield
+        finally:
+            self._deadline.reset(token)
+
+    def remaining_time(self) -> Optional[float]:
+        # Seconds until the current deadline. Operations use this as
+        # their timeout so that a hanging attempt cannot outlast it.
+        deadline = self._deadline.get()
+        if deadline is None:
+            return None
+        return max(deadline - self.clock(), 0)
+
+    def run(
+        self,
+        description: str,
+        operation: Callable[[], T],
+        get_transient_failure: Callable[[T], Optional[str]] = _no_transient_failure,
+        is_transient_error: Callable[[Exception], bool] = _is_not_transient,
+    ) -> T:
+        # get_transient_failure returns a description of the failure if
+        # the result of the operation is worth another attempt.
+        attempt = 1
+        while True:
+            self._check_deadline(description)
+            try:
+                result = operation()
+            except Exception as e:
+                delay = self._get_retry_delay_after_error(
+                    description, attempt, e, is_transient_error
+                )
+            else:
+                failure = get_transient_failure(result)
+                if failure is None:
+                    self._log_success(description, attempt)
+                    return result
+                retry_delay = self._get_retry_delay(description, attempt, failure)
+                if retry_delay is None:
+                    return result
+                delay = retry_delay
+            self.sleep(delay)
+            attempt += 1
+
+    async def run_async(
+        self,
+        description: str,
+        operation: Callable[[], Awaitable[T]],
+        get_transient_failure: Callable[[T], Optional[str]] = _no_transient_failure,
+        is_transient_error: Callable[[Exception], bool] = _is_not_transient,
+    ) -> T:
+        # Like run but for coroutines. Waiting for the next attempt does
+        # not block the event loop.
+        attempt = 1
+        while True:
+            self._check_deadline(description)
+            try:
+                result = await operation()
+            except Exception as e:
+                delay = self._get_retry_delay_after_error(
+                    description, attempt, e, is_transient_error
+                )
+            else:
+                failure = get_transient_failure(result)
+                if failure is None:
+                    self._log_success(description, attempt)
+                    return result
+                retry_delay = self._get_retry_delay(description, attempt, failure)
+                if retry_delay is None:
+                    return result
+                delay = retry_delay
+            await self.sleep_async(delay)
+            attempt += 1
+
+    def _check_deadline(self, description: str) -> None:
+        if self.remaining_time() == 0:
+            self.logger.error(
+                "Giving up on %s because the deadline of %s seconds was reached",
+                description,
+                self.configuration.deadline,
+            )
+            raise DeadlineExceeded(
+                f"Deadline of {self.configuration.deadline} seconds was "
+                f"reached before {description}"
+            )
+
+    def _log_success(self, description: str, attempt: int) -> None:
+        if attempt > 1:
+            self.logger.info("%s succeeded after %s attempts", description, attempt)
+
+    def _get_retry_delay_after_error(
+        self,
+        description: str,
+        attempt: int,
+        error: Exception,
+        is_transient_error: Callable[[Exception], bool],
+    ) -> float:
+        # Errors that are not worth another attempt are raised.
+        if not is_transient_error(error):
+            raise error
+        delay = self._get_retry_delay(description, attempt, str(error))
+        if delay is None:
+            raise error
+        return delay
+
+    def _get_retry_delay(
+        self, description: str, attempt: int, failure: str
+    ) -> Optional[float]:
+        # Returns None if the operation should not be attempted again.
+        attempts = self.configuration.retries + 1
+        if attempt >= attempts:
+            if attempts > 1:
+                self.logger.error(
+                    "Giving up on %s after %s attempts: %s",
+                    description,
+                    attempt,
+                    failure,
+                )
+            return None
+        delay = self.random() * min(
+            self.configuration.max_delay,
+            self.configuration.initial_delay * 2 ** (attempt - 1),
+        )
+        deadline = self._deadline.get()
+        if deadline is not None and self.clock() + delay > deadline:
+            self.logger.error(
+                "Giving up on %s after %s attempts because the deadline of "
+                "%s seconds was reached: %s",
+                description,
+                attempt,
+                self.configuration.deadline,
+                failure,
+            )
+            return None
+        self.logger.warning(
+            "Attempt %s of %s at %s failed, retrying in %.1f seconds: %s",
+            attempt,
+            attempts,
+            description,
+            delay,
+            failure,
+        )
+        return delay
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional
 
 from nix_prefetch_github.list_remote import ListRemote
 
@@ -19,3 +19,9 @@ class RevisionIndexImpl:
             or self.remote_list.tag(f"{name}^{{}}")
             or self.remote_list.tag(name)
         )
+
+
+def get_ref_patterns(name: str) -> List[str]:
+    # These patterns make `git ls-remote` transfer only the refs that
+    # get_revision_by_name consults for the given name.
+    return [name, f"refs/heads/{name}", f"refs/tags/{name}", f"refs/tags/{name}^{{}}"]
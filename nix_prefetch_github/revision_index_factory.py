@@ -1,14 +1,23 @@
 from dataclasses import dataclass
-from typing import Optional, Protocol
+from typing import List, Optional, Protocol
 
 from nix_prefetch_github.functor import map_or_none
 from nix_prefetch_github.interfaces import GithubRepository
 from nix_prefetch_github.list_remote import ListRemote
-from nix_prefetch_github.revision_index import RevisionIndexImpl
+from nix_prefetch_github.revision_index import RevisionIndexImpl, get_ref_patterns
 
 
 class ListRemoteFactory(Protocol):
-    def get_list_remote(self, repository: GithubRepository) -> Optional[ListRemote]:
+    def get_list_remote(
+        self, repository: GithubRepository, ref_patterns: List[str]
+    ) -> Optional[ListRemote]:
+        pass
+
+
+class AsyncListRemoteFactory(Protocol):
+    async def get_list_remote(
+        self, repository: GithubRepository, ref_patterns: List[str]
+    ) -> Optional[ListRemote]:
         pass
 
 
@@ -17,8 +26,26 @@ class RevisionIndexFactoryImpl:
     list_remote_factory: ListRemoteFactory
 
     def get_revision_index(
-        self, repository: GithubRepository
+        self, repository: GithubRepository, name: str
+    ) -> Optional[RevisionIndexImpl]:
+        return map_or_none(
+            RevisionIndexImpl,
+            self.list_remote_factory.get_list_remote(
+                repository, get_ref_patterns(name)
+            ),
+        )
+
+
+@dataclass(frozen=True)
+class AsyncRevisionIndexFactoryImpl:
+    list_remote_factory: AsyncListRemoteFactory
+
+    async def get_revision_index(
+        self, repository: GithubRepository, name: str
     ) -> Optional[RevisionIndexImpl]:
         return map_or_none(
-            RevisionIndexImpl, self.list_remote_factory.get_list_remote(repository)
+            RevisionIndexImpl,
+            await self.list_remote_factory.get_list_remote(
+                repository, get_ref_patterns(name)
+            ),
         )
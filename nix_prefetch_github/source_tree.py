@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import itertools
+import mmap
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from logging import Logger
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from nix_prefetch_github.cache import JsonCacheDirectory
+from nix_prefetch_github.nix_source import (
+    FUNCTION_NAME,
+    Edit,
+    FetchFromGithubCall,
+    NixString,
+    SourceFile,
+    find_fetch_from_github_calls,
+)
+
+_INDEX_VERSION = 1
+_CHUNK_SIZE = 256
+# Files that were modified this shortly before a scan might be
+# modified again without a change of their modification time, so they
+# are not remembered.
+_RACY_INTERVAL_NS = 2 * 10**9
+
+
+@dataclass
+class SourceTreeScannerImpl:
+    # Remembers the modification time and size of every nix file
+    # together with the calls found in it, so that unchanged files are
+    # never opened again.
+    index_directory: JsonCacheDirectory
+    logger: Logger
+
+    def scan(self, directory: str, jobs: int) -> List[SourceFile]:
+        root = os.path.abspath(directory)
+        scan_started = time.time_ns()
+        index = self._read_index(root)
+        new_index: Dict[str, Any] = dict()
+        found: Dict[str, List[FetchFromGithubCall]] = dict()
+        candidates: List[Tuple[str, List[int]]] = []
+        for relative_path, signature in _walk_nix_files(root):
+            entry = index.get(relative_path)
+            if entry is not None and entry[:2] == signature:
+                new_index[relative_path] = entry
+                if entry[2]:
+                    found[relative_path] = [_call_from_json(call) for call in entry[2]]
+            else:
+                candidates.append((relative_path, signature))
+        self.logger.debug(
+            f"{len(candidates)} of {len(candidates) + len(new_index)} nix files in {root} changed since the last scan"
+        )
+        # Files are handed to the workers in chunks since submitting
+        # every single file costs more than searching most of them.
+        paths = [os.path.join(root, relative_path) for relative_path, _ in candidates]
+        with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+            results = itertools.chain.from_iterable(
+                executor.map(self._scan_files, _chunks(paths))
+            )
+            for (relative_path, signature), calls in zip(candidates, results):
+                if calls is None:
+                    continue
+                if calls:
+                    found[relative_path] = calls
+                if signature[0] < scan_started - _RACY_INTERVAL_NS:
+                    new_index[relative_path] = signature + [
+                        [_call_to_json(call) for call in calls]
+                    ]
+        if candidates or len(new_index) != len(index):
+            try:
+                self.index_directory.write(
+                    root, {"version": _INDEX_VERSION, "files": new_index}
+                )
+            except OSError as e:
+                self.logger.warning(f"Could not store scan index for {root}: {e}")
+        return [
+            SourceFile(path=os.path.join(root, relative_path), calls=calls)
+            for relative_path, calls in sorted(found.items())
+        ]
+
+    def _read_index(self, root: str) -> Dict[str, Any]:
+        document = self.index_directory.read(root)
+        if not isinstance(document, dict) or document.get("version") != _INDEX_VERSION:
+            return dict()
+        files = document.get("files")
+        return files if isinstance(files, dict) else dict()
+
+    def _scan_files(
+        self, paths: List[str]
+    ) -> List[Optional[List[FetchFromGithubCall]]]:
+        return [self._scan_file(path) for path in paths]
+
+    def _scan_file(self, path: str) -> Optional[List[FetchFromGithubCall]]:
+        # Most files do not mention fetchFromGitHub at all. Searching
+        # the mapped file is much cheaper than reading and tokenizing
+        # it.
+        try:
+            with open(path, "rb") as handle:
+                if os.fstat(handle.fileno()).st_size == 0:
+                    return []
+                with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    if mapped.find(FUNCTION_NAME) == -1:
+                        return []
+                    source = mapped[:]
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not read {path}: {e}")
+            return None
+        return find_fetch_from_github_calls(source)
+
+
+@dataclass
+class SourceFileEditorImpl:
+    def apply_edits(self, path: str, edits: List[Edit]) -> bool:
+        # The file is replaced atomically and only the edited bytes
+        # change. Nothing is written if the file changed since it was
+        # scanned.
+        with open(path, "rb") as handle:
+            source = handle.read()
+        for edit in edits:
+            if not source.startswith(edit.old, edit.start) or (
+                edit.end - edit.start != len(edit.old)
+            ):
+                return False
+        # Edits are applied from the end of the file so that the
+        # offsets of the remaining edits stay valid.
+        fragments: List[bytes] = []
+        end = len(source)
+        for edit in sorted(edits, key=lambda edit: edit.start, reverse=True):
+            start = edit.end
+            fragments += [source[start:end], edit.new]
+            end = edit.start
+        fragments.append(source[:end])
+        source = b"".join(reversed(fragments))
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), prefix=".", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(file_descriptor, "wb") as handle:
+                handle.write(source)
+            os.chmod(temporary_path, os.stat(path).st_mode & 0o7777)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+        return True
+
+
+def _walk_nix_files(root: str) -> Iterator[Tuple[str, List[int]]]:
+    # Hidden directories like .git and symbolic links like the result
+    # links of nix-build are skipped.
+    directories = [""]
+    while directories:
+        relative_directory = directories.pop()
+        try:
+            with os.scandir(os.path.join(root, relative_directory)) as entries:
+                for entry in entries:
+                    relative_path = relative_directory + entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not entry.name.startswith("."):
+                                directories.append(relative_path + os.sep)
+                        elif entry.name.endswith(".nix") and entry.is_file(
+                            follow_symlinks=False
+                        ):
+                            stat = entry.stat(follow_symlinks=False)
+                            yield relative_path, [stat.st_mtime_ns, stat.st_size]
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+
+def _chunks(paths: List[str]) -> Iterator[List[str]]:
+    for start in range(0, len(paths), _CHUNK_SIZE):
+        end = start + _CHUNK_SIZE
+        yield paths[start:end]
+
+
+def _call_to_json(call: FetchFromGithubCall) -> Dict[str, Any]:
+    return {
+        "line": call.line,
+        "strings": {
+            name: [string.value, string.start, string.end]
+            for name, string in call.strings.items()
+        },
+        "expressions": call.expressions,
+    }
+
+
+def _call_from_json(document: Dict[str, Any]) -> FetchFromGithubCall:
+    return FetchFromGithubCall(
+        line=document["line"],
+        strings={
+            name: NixString(value=value, start=start, end=end)
+            for name, (value, start, end) in document["strings"].items()
+        },
+        expressions=document["expressions"],
+    )
@@ -0,0 +1,82 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from nix_prefetch_github.cache import JsonCacheDirectory, get_cache_directory
+
+
+class JsonCacheDirectoryTests(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = JsonCacheDirectory(os.path.join(self.directory.name, "cache"))
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_reading_missing_entry_returns_none(self) -> None:
+        self.assertIsNone(self.cache.read("key"))
+
+    def test_can_read_written_entry(self) -> None:
+        self.cache.write("key", {"a": [1, 2]})
+        self.assertEqual(self.cache.read("key"), {"a": [1, 2]})
+
+    def test_entries_with_different_keys_are_separate(self) -> None:
+        self.cache.write("key 1", 1)
+        self.cache.write("key 2", 2)
+        self.assertEqual(self.cache.read("key 1"), 1)
+        self.assertEqual(self.cache.read("key 2"), 2)
+
+    def test_eviction_removes_least_recently_used_entries(self) -> None:
+        for n in range(3):
+            self.cache.write(f"key {n}", n)
+            self.set_access_time(f"key {n}", n)
+        self.cache.read("key 0")
+        self.cache.evict(max_entries=2)
+        self.assertEqual(self.cache.read("key 0"), 0)
+        self.assertIsNone(self.cache.read("key 1"))
+        self.assertEqual(self.cache.read("key 2"), 2)
+
+    def test_full_cache_is_not_scanned_after_every_write(self) -> None:
+        for n in range(10):
+            self.cache.write(f"key {n}", n)
+            self.set_access_time(f"key {n}", n)
+        self.cache.evict(max_entries=10)
+        self.cache.write("key 10", 10)
+        self.cache.evict(max_entries=10)
+        self.assertEqual(len(os.listdir(self.cache.path)), 9)
+        self.cache.write("key 11", 11)
+        self.cache.evict(max_entries=10)
+        self.assertEqual(len(os.listdir(self.cache.path)), 10)
+
+    def test_overwritten_entries_are_not_counted_twice(self) -> None:
+        self.cache.write("key", 1)
+        self.cache.evict(max_entries=1)
+        self.cache.write("key", 2)
+        self.cache.evict(max_entries=1)
+        self.assertEqual(self.cache.read("key"), 2)
+
+    def test_eviction_of_missing_directory_does_nothing(self) -> None:
+        self.cache.evict(max_entries=0)
+
+    def test_corrupted_entry_is_treated_as_missing(self) -> None:
+        self.cache.write("key", 1)
+        with open(self.cache._entry_path("key"), "w") as f:
+            f.write("{")
+        self.assertIsNone(self.cache.read("key"))
+
+    def set_access_time(self, key: str, timestamp: float) -> None:
+        os.utime(self.cache._entry_path(key), (timestamp, timestamp))
+
+
+class GetCacheDirectoryTests(TestCase):
+    def test_xdg_cache_home_is_respected(self) -> None:
+        self.assertEqual(
+            get_cache_directory({"XDG_CACHE_HOME": "/cache"}),
+            "/cache/nix-prefetch-github",
+        )
+
+    def test_cache_is_located_in_home_directory_by_default(self) -> None:
+        self.assertEqual(
+            get_cache_directory({}),
+            os.path.join(os.path.expanduser("~"), ".cache", "nix-prefetch-github"),
+        )
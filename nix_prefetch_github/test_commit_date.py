@@ -0,0 +1,120 @@
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from unittest import TestCase
+
+from nix_prefetch_github.commit_date import CommitDatePrefetcher
+from nix_prefetch_github.interfaces import (
+    GithubRepository,
+    PrefetchedRessource,
+    PrefetchOptions,
+    RenderingFormat,
+)
+from nix_prefetch_github.tests import RenderingFormatSelectorImpl
+
+COMMIT = "a" * 40
+COMMIT_DATE = datetime(2024, 1, 2, 3, 4, 5)
+
+
+class CommitDatePrefetcherTests(TestCase):
+    def setUp(self) -> None:
+        self.repository = GithubRepository(owner="owner", name="repo")
+        self.github_api = FakeGithubAPI()
+        self.url_hasher = BlockingUrlHasher(self.github_api)
+        self.rendering_format_selector = RenderingFormatSelectorImpl()
+        self.prefetcher = CommitDatePrefetcher(
+            url_hasher=self.url_hasher,
+            github_api=self.github_api,
+            rendering_format_selector=self.rendering_format_selector,
+        )
+
+    def test_commit_date_is_requested_while_hashing_for_meta_output(self) -> None:
+        self.rendering_format_selector.set_rendering_format(RenderingFormat.meta)
+        self.hash(COMMIT)
+        self.assertTrue(self.url_hasher.commit_date_was_requested_while_hashing)
+
+    def test_commit_date_is_not_requested_for_other_formats(self) -> None:
+        self.rendering_format_selector.set_rendering_format(RenderingFormat.json)
+        self.hash(COMMIT)
+        self.assertFalse(self.url_hasher.commit_date_was_requested_while_hashing)
+        self.assertEqual(self.github_api.requests, [])
+
+    def test_commit_date_is_not_requested_for_names_of_refs(self) -> None:
+        self.rendering_format_selector.set_rendering_format(RenderingFormat.meta)
+        self.hash("main")
+        self.assertEqual(self.github_api.requests, [])
+
+    def test_commit_date_is_not_requested_for_git_checkouts(self) -> None:
+        self.rendering_format_selector.set_rendering_format(RenderingFormat.meta)
+        self.hash(COMMIT, PrefetchOptions(fetch_submodules=True))
+        self.assertEqual(self.github_api.requests, [])
+
+    def test_requested_commit_date_is_added_to_ressource(self) -> None:
+        self.rendering_format_selector.set_rendering_format(RenderingFormat.meta)
+        prefetched_ressource = self.hash(COMMIT)
+        assert prefetched_ressource
+        self.assertEqual(prefetched_ressource.commit_date, COMMIT_DATE)
+
+    def test_commit_date_of_hasher_is_preferred(self) -> None:
+        self.rendering_format_selector.set_rendering_format(RenderingFormat.meta)
+        self.url_hasher.commit_date = datetime(2000, 1, 1)
+        prefetched_ressource = self.hash(COMMIT)
+        assert prefetched_ressource
+        self.assertEqual(prefetched_ressource.commit_date, datetime(2000, 1, 1))
+
+    def hash(
+        self, revision: str, prefetch_options: Optional[PrefetchOptions] = None
+    ) -> Optional[PrefetchedRessource]:
+        return self.prefetcher.calculate_hash_sum(
+            repository=self.repository,
+            revision=revision,
+            prefetch_options=prefetch_options or PrefetchOptions(),
+        )
+
+
+class FakeGithubAPI:
+    def __init__(self) -> None:
+        self.requests: List[Tuple[GithubRepository, str]] = []
+        self.requested = threading.Event()
+
+    def get_tag_of_latest_release(self, repository: GithubRepository) -> Optional[str]:
+        return None
+
+    def get_commit_date(
+        self, repository: GithubRepository, commit_sha1_hash: str
+    ) -> Optional[datetime]:
+        self.requests.append((repository, commit_sha1_hash))
+        self.requested.set()
+        return COMMIT_DATE
+
+    def get_tags_of_latest_releases(
+        self, repositories: List[GithubRepository]
+    ) -> Dict[GithubRepository, Optional[str]]:
+        return {repository: None for repository in repositories}
+
+    def get_commit_dates(
+        self, commits: List[Tuple[GithubRepository, str]]
+    ) -> Dict[Tuple[GithubRepository, str], Optional[datetime]]:
+        return {commit: COMMIT_DATE for commit in commits}
+
+
+class BlockingUrlHasher:
+    # Waits a short time for the commit date to be requested to detect
+    # whether both happen at the same time.
+    def __init__(self, github_api: FakeGithubAPI) -> None:
+        self.github_api = github_api
+        self.commit_date_was_requested_while_hashing = False
+        self.commit_date: Optional[datetime] = None
+
+    def calculate_hash_sum(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+    ) -> Optional[PrefetchedRessource]:
+        self.commit_date_was_requested_while_hashing = self.github_api.requested.wait(
+            timeout=0.1
+        )
+        return PrefetchedRessource(
+            hash_sum="hash", store_path="/nix/store/path", commit_date=self.commit_date
+        )
@@ -0,0 +1,277 @@
+import gc
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import weakref
+from contextlib import redirect_stderr, redirect_stdout
+from logging import getLogger
+from typing import Any, Dict, List, Mapping, Optional
+from unittest import TestCase
+
+from nix_prefetch_github.daemon import PrefetchDaemon, RequestDependencyInjector
+from nix_prefetch_github.daemon_client import forward_to_daemon, get_daemon_socket_path
+from nix_prefetch_github.dependency_injector import DependencyInjector
+from nix_prefetch_github.interfaces import (
+    GithubRepository,
+    PrefetchedRessource,
+    PrefetchOptions,
+)
+from nix_prefetch_github.prefetch import PrefetcherImpl
+from nix_prefetch_github.tests import FakeRevisionIndexFactory
+
+REVISION = "4840fbf9ebd246d334c11335fc85747013230b05"
+
+
+class PrefetchDaemonTests(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.directory.name, "daemon.sock")
+        self.shared_injector = DependencyInjector()
+        self.environments: List[Mapping[str, str]] = []
+        self.url_hasher = SlowUrlHasher()
+        self.daemon = PrefetchDaemon(
+            injector_factory=self.create_injector, logger=getLogger(__name__)
+        )
+        self.server = self.daemon.bind(self.socket_path)
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs=dict(poll_interval=0.01)
+        )
+        self.thread.start()
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.directory.cleanup()
+
+    def test_prefetch_result_is_printed_by_client(self) -> None:
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            exit_code = forward_to_daemon(
+                "nix-prefetch-github",
+                ["owner", "repo", "--rev", REVISION],
+                environment={"NIX_PREFETCH_GITHUB_SOCKET": self.socket_path},
+            )
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(json.loads(stdout.getvalue())["hash"], f"sha256-{REVISION}")
+
+    def test_usage_errors_are_returned_to_client(self) -> None:
+        response = self.request(
+            {"program": "nix-prefetch-github", "arguments": ["--unknown-option"]}
+        )
+        self.assertEqual(response["exitCode"], 2)
+        self.assertIn("usage: nix-prefetch-github", response["stderr"])
+        self.assertEqual(response["stdout"], "")
+
+    def test_unknown_programs_are_rejected(self) -> None:
+        response = self.request({"program": "rm", "arguments": ["-rf", "/"]})
+        self.assertEqual(response["exitCode"], 1)
+
+    def test_concurrent_requests_are_handled_in_parallel(self) -> None:
+        self.url_hasher.delay = 0.2
+        revisions = [f"{n:040x}" for n in range(8)]
+        responses: Dict[str, Any] = dict()
+
+        def run(revision: str) -> None:
+            responses[revision] = self.request(
+                {
+                    "program": "nix-prefetch-github",
+                    "arguments": ["owner", "repo", "--rev", revision, "--nix"],
+                }
+            )
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=run, args=(r,)) for r in revisions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLess(time.monotonic() - started, 0.2 * len(revisions))
+        for revision in revisions:
+            self.assertEqual(responses[revision]["exitCode"], 0)
+            self.assertIn(f'rev = "{revision}";', responses[revision]["stdout"])
+
+    def test_forwarded_environment_variables_are_used_by_request(self) -> None:
+        with redirect_stdout(io.StringIO()):
+            forward_to_daemon(
+                "nix-prefetch-github",
+                ["owner", "repo", "--rev", REVISION],
+                environment={
+                    "NIX_PREFETCH_GITHUB_SOCKET": self.socket_path,
+                    "GITHUB_TOKEN": "token",
+                    "UNRELATED": "value",
+                },
+            )
+        self.assertEqual(self.environments[-1]["GITHUB_TOKEN"], "token")
+        self.assertNotEqual(self.environments[-1].get("UNRELATED"), "value")
+
+    def test_relative_paths_are_resolved_against_working_directory_of_client(
+        self,
+    ) -> None:
+        client_directory = os.path.join(self.directory.name, "client")
+        os.mkdir(client_directory)
+        with redirect_stdout(io.StringIO()):
+            exit_code = forward_to_daemon(
+                "nix-prefetch-github",
+                [
+                    "owner",
+                    "repo",
+                    "--rev",
+                    REVISION,
+                    "--trace-file",
+                    "trace.json",
+                    "--metrics-file",
+                    "metrics.prom",
+                ],
+                environment={"NIX_PREFETCH_GITHUB_SOCKET": self.socket_path},
+                working_directory=client_directory,
+            )
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(
+            sorted(os.listdir(client_directory)), ["metrics.prom", "trace.json"]
+        )
+
+    def test_client_does_not_forward_without_daemon(self) -> None:
+        self.assertIsNone(
+            forward_to_daemon(
+                "nix-prefetch-github",
+                ["owner", "repo"],
+                environment={
+                    "NIX_PREFETCH_GITHUB_SOCKET": os.path.join(
+                        self.directory.name, "missing.sock"
+                    )
+                },
+            )
+        )
+
+    def test_client_does_not_forward_to_stale_socket(self) -> None:
+        stale_socket_path = os.path.join(self.directory.name, "stale.sock")
+        stale_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale_socket.bind(stale_socket_path)
+        stale_socket.close()
+        with redirect_stderr(io.StringIO()):
+            self.assertIsNone(
+                forward_to_daemon(
+                    "nix-prefetch-github",
+                    ["owner", "repo"],
+                    environment={"NIX_PREFETCH_GITHUB_SOCKET": stale_socket_path},
+                )
+            )
+
+    def test_socket_is_only_accessible_by_owner(self) -> None:
+        self.assertEqual(os.stat(self.socket_path).st_mode & 0o077, 0)
+
+    def test_request_injectors_share_connection_pool(self) -> None:
+        first = RequestDependencyInjector(self.shared_injector, dict())
+        second = RequestDependencyInjector(self.shared_injector, dict())
+        self.assertIs(
+            first.get_http_connection_pool(), second.get_http_connection_pool()
+        )
+        self.assertIsNot(first.get_cache_manager(), second.get_cache_manager())
+
+    def test_request_injectors_share_caches(self) -> None:
+        first = RequestDependencyInjector(self.shared_injector, dict())
+        second = RequestDependencyInjector(self.shared_injector, dict())
+        self.assertIs(
+            first.get_caching_url_hasher().database,
+            second.get_caching_url_hasher().database,
+        )
+        self.assertIs(
+            first.get_remote_list_factory().cache_directory,
+            second.get_remote_list_factory().cache_directory,
+        )
+        self.assertIs(
+            first.get_github_api_cache_directory(),
+            second.get_github_api_cache_directory(),
+        )
+
+    def test_request_injectors_are_not_kept_alive_by_caching(self) -> None:
+        injector = RequestDependencyInjector(self.shared_injector, dict())
+        injector.get_metrics_registry()
+        injector.get_github_rate_limiter()
+        reference = weakref.ref(injector)
+        del injector
+        gc.collect()
+        self.assertIsNone(reference())
+
+    def test_requests_with_same_token_share_rate_limiter(self) -> None:
+        first = RequestDependencyInjector(self.shared_injector, {"GITHUB_TOKEN": "a"})
+        second = RequestDependencyInjector(self.shared_injector, {"GITHUB_TOKEN": "a"})
+        other = RequestDependencyInjector(self.shared_injector, {"GITHUB_TOKEN": "b"})
+        self.assertIs(first.get_github_rate_limiter(), second.get_github_rate_limiter())
+        self.assertIsNot(
+            first.get_github_rate_limiter(), other.get_github_rate_limiter()
+        )
+
+    def test_metrics_of_request_are_only_reported_by_that_request(self) -> None:
+        first = RequestDependencyInjector(self.shared_injector, dict())
+        second = RequestDependencyInjector(self.shared_injector, dict())
+        first.get_metrics_registry().increment_counter("prefetches_total")
+        self.assertEqual(second.get_metrics_registry().render(), "")
+        self.assertEqual(
+            self.shared_injector.get_metrics_registry().render(),
+            first.get_metrics_registry().render(),
+        )
+
+    def create_injector(
+        self, environment: Mapping[str, str], working_directory: Optional[str]
+    ) -> DependencyInjector:
+        self.environments.append(environment)
+        url_hasher = self.url_hasher
+        revision_index_factory = FakeRevisionIndexFactory()
+
+        class TestInjector(RequestDependencyInjector):
+            def get_prefetcher(self) -> PrefetcherImpl:
+                return PrefetcherImpl(url_hasher, revision_index_factory)
+
+        return TestInjector(self.shared_injector, environment, working_directory)
+
+    def request(self, document: Any) -> Any:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(self.socket_path)
+            connection.sendall(json.dumps(document).encode() + b"\n")
+            with connection.makefile("rb") as response:
+                return json.loads(response.readline())
+
+
+class DaemonSocketPathTests(TestCase):
+    def test_socket_path_can_be_configured(self) -> None:
+        self.assertEqual(
+            get_daemon_socket_path({"NIX_PREFETCH_GITHUB_SOCKET": "/tmp/test.sock"}),
+            "/tmp/test.sock",
+        )
+
+    def test_runtime_directory_is_preferred(self) -> None:
+        self.assertEqual(
+            get_daemon_socket_path(
+                {"XDG_RUNTIME_DIR": "/run/user/1000", "XDG_CACHE_HOME": "/cache"}
+            ),
+            "/run/user/1000/nix-prefetch-github/daemon.sock",
+        )
+
+    def test_cache_directory_is_used_without_runtime_directory(self) -> None:
+        self.assertEqual(
+            get_daemon_socket_path({"XDG_CACHE_HOME": "/cache"}),
+            "/cache/nix-prefetch-github/daemon.sock",
+        )
+
+
+class SlowUrlHasher:
+    def __init__(self) -> None:
+        self.delay = 0.0
+
+    def calculate_hash_sum(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+    ) -> Optional[PrefetchedRessource]:
+        time.sleep(self.delay)
+        return PrefetchedRessource(
+            hash_sum=f"sha256-{revision}",
+            store_path=f"/nix/store/{revision}-source",
+        )
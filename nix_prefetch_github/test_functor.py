@@ -0,0 +1,47 @@
+import asyncio
+import threading
+from typing import List
+from unittest import TestCase
+
+from nix_prefetch_github.functor import lazy, to_thread
+
+
+class LazyTests(TestCase):
+    def setUp(self) -> None:
+        self.created: List[Example] = []
+
+    def test_object_is_not_created_before_it_is_used(self) -> None:
+        lazy(self.create_example)
+        self.assertFalse(self.created)
+
+    def test_attributes_are_taken_from_created_object(self) -> None:
+        example = lazy(self.create_example)
+        self.assertEqual(example.value(), 1)
+        self.assertEqual(example.attribute, "attribute")
+
+    def test_object_is_only_created_once(self) -> None:
+        example = lazy(self.create_example)
+        example.value()
+        example.value()
+        self.assertEqual(len(self.created), 1)
+
+    def create_example(self) -> "Example":
+        example = Example()
+        self.created.append(example)
+        return example
+
+
+class ToThreadTests(TestCase):
+    def test_function_is_called_in_other_thread(self) -> None:
+        thread = asyncio.run(to_thread(threading.current_thread))
+        self.assertIsNot(thread, threading.current_thread())
+
+    def test_arguments_are_passed_to_function(self) -> None:
+        self.assertEqual(asyncio.run(to_thread(max, 1, 3, 2)), 3)
+
+
+class Example:
+    attribute = "attribute"
+
+    def value(self) -> int:
+        return 1
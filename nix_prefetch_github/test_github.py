@@ -1,19 +1,53 @@
+import hashlib
+import json
 import logging
+import os
+import re
+import tempfile
+import threading
 from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Set, Tuple
 from unittest import TestCase
 
 from parameterized import parameterized
 
+from nix_prefetch_github.cache import (
+    CacheConfiguration,
+    CacheManagerImpl,
+    JsonCacheDirectory,
+)
 from nix_prefetch_github.github import GithubAPIImpl
+from nix_prefetch_github.http_pool import HttpConnectionPool
 from nix_prefetch_github.interfaces import GithubRepository
+from nix_prefetch_github.metrics import MetricsRegistryImpl
+from nix_prefetch_github.rate_limit import GithubRateLimiter
+from nix_prefetch_github.retry import RetryPolicyImpl
 from nix_prefetch_github.tests import network
+from nix_prefetch_github.tracing import TracerImpl
 
 
 @network
 class GithubTests(TestCase):
     def setUp(self) -> None:
         self.logger = logging.getLogger()
-        self.api = GithubAPIImpl(logger=self.logger, environment=dict())
+        self.cache_directory = tempfile.TemporaryDirectory()
+        self.connection_pool = HttpConnectionPool()
+        self.api = GithubAPIImpl(
+            logger=self.logger,
+            environment=dict(),
+            connection_pool=self.connection_pool,
+            response_cache=JsonCacheDirectory(self.cache_directory.name),
+            cache_manager=CacheManagerImpl(),
+            rate_limiter=GithubRateLimiter(logger=self.logger),
+            retry_policy=RetryPolicyImpl(logger=self.logger),
+            tracer=TracerImpl(),
+            metrics=MetricsRegistryImpl(),
+        )
+
+    def tearDown(self) -> None:
+        self.connection_pool.close()
+        self.cache_directory.cleanup()
 
     def test_that_for_own_repo_latest_release_is_not_none(self) -> None:
         self.assertIsNotNone(
@@ -50,3 +84,445 @@ class GithubTests(TestCase):
             ),
             expected_datetime,
         )
+
+
+class GithubApiCachingTests(TestCase):
+    def setUp(self) -> None:
+        self.server = FakeGithubApiServer()
+        self.server.start()
+        self.cache_directory = tempfile.TemporaryDirectory()
+        self.connection_pool = HttpConnectionPool()
+        self.cache_manager = CacheManagerImpl()
+        self.environment = {"GITHUB_API_URL": self.server.url}
+        self.tracer = TracerImpl()
+        self.metrics = MetricsRegistryImpl()
+        self.sleeps: List[float] = []
+        self.api = GithubAPIImpl(
+            logger=logging.getLogger(__name__),
+            environment=self.environment,
+            connection_pool=self.connection_pool,
+            response_cache=JsonCacheDirectory(self.cache_directory.name),
+            cache_manager=self.cache_manager,
+            rate_limiter=GithubRateLimiter(logger=logging.getLogger(__name__)),
+            retry_policy=RetryPolicyImpl(
+                logger=logging.getLogger(__name__), sleep=self.sleeps.append
+            ),
+            tracer=self.tracer,
+            metrics=self.metrics,
+        )
+        self.repository = GithubRepository(owner="owner", name="repo")
+
+    def tearDown(self) -> None:
+        self.connection_pool.close()
+        self.server.stop()
+        self.cache_directory.cleanup()
+
+    def test_commit_date_is_parsed(self) -> None:
+        self.assertEqual(
+            self.api.get_commit_date(self.repository, "abc"),
+            datetime(2023, 12, 30, 14, 5, 55, tzinfo=timezone.utc),
+        )
+
+    def test_tag_of_latest_release_is_returned(self) -> None:
+        self.assertEqual(self.api.get_tag_of_latest_release(self.repository), "v1.0")
+
+    def test_cached_response_is_revalidated_with_etag(self) -> None:
+        self.api.get_commit_date(self.repository, "abc")
+        self.assertEqual(
+            self.api.get_commit_date(self.repository, "abc"),
+            datetime(2023, 12, 30, 14, 5, 55, tzinfo=timezone.utc),
+        )
+        self.assertEqual(self.server.statuses, [200, 304])
+        self.assertIsNone(self.server.requests[0].get("If-None-Match"))
+        self.assertEqual(
+            self.server.requests[1].get("If-None-Match"),
+            self.server.etags[0],
+        )
+
+    def test_revalidated_responses_are_counted_as_cache_hits(self) -> None:
+        self.api.get_commit_date(self.repository, "abc")
+        self.api.get_commit_date(self.repository, "abc")
+        self.assertEqual(
+            [
+                self.metrics.counters[
+                    (
+                        "cache_requests_total",
+                        (("cache", "github_api"), ("result", result)),
+                    )
+                ]
+                for result in ["hit", "miss"]
+            ],
+            [1, 1],
+        )
+
+    def test_changed_document_replaces_cached_response(self) -> None:
+        self.api.get_tag_of_latest_release(self.repository)
+        self.server.releases["owner/repo"] = "v2.0"
+        self.assertEqual(self.api.get_tag_of_latest_release(self.repository), "v2.0")
+        self.assertEqual(self.server.statuses, [200, 200])
+
+    def test_refresh_skips_conditional_requests(self) -> None:
+        self.api.get_commit_date(self.repository, "abc")
+        self.cache_manager.set_cache_configuration(CacheConfiguration(refresh=True))
+        self.api.get_commit_date(self.repository, "abc")
+        self.assertEqual(self.server.statuses, [200, 200])
+
+    def test_cached_responses_are_not_shared_between_tokens(self) -> None:
+        self.api.get_commit_date(self.repository, "abc")
+        self.environment["GITHUB_TOKEN"] = "secret"
+        self.api.get_commit_date(self.repository, "abc")
+        self.assertEqual(self.server.statuses, [200, 200])
+        self.assertEqual(self.server.requests[1].get("Authorization"), "Bearer secret")
+        for file_name in os.listdir(self.cache_directory.name):
+            with open(os.path.join(self.cache_directory.name, file_name)) as f:
+                self.assertNotIn("secret", f.read())
+
+    def test_connection_is_reused(self) -> None:
+        self.api.get_commit_date(self.repository, "abc")
+        self.api.get_tag_of_latest_release(self.repository)
+        self.assertEqual(len(self.server.client_addresses), 1)
+
+    def test_redirects_are_followed(self) -> None:
+        self.assertEqual(
+            self.api.get_tag_of_latest_release(
+                GithubRepository(owner="owner", name="renamed")
+            ),
+            "v1.0",
+        )
+
+    def test_token_is_sent_after_redirect_to_same_host(self) -> None:
+        self.environment["GITHUB_TOKEN"] = "secret"
+        self.api.get_tag_of_latest_release(
+            GithubRepository(owner="owner", name="renamed")
+        )
+        self.assertEqual(
+            [request.get("Authorization") for request in self.server.requests],
+            ["Bearer secret", "Bearer secret"],
+        )
+
+    def test_token_is_not_sent_after_redirect_to_other_host(self) -> None:
+        other_server = FakeGithubApiServer()
+        other_server.start()
+        self.addCleanup(other_server.stop)
+        self.server.redirect_url = other_server.url
+        self.environment["GITHUB_TOKEN"] = "secret"
+        self.assertEqual(
+            self.api.get_tag_of_latest_release(
+                GithubRepository(owner="owner", name="renamed")
+            ),
+            "v1.0",
+        )
+        self.assertEqual(self.server.requests[0].get("Authorization"), "Bearer secret")
+        self.assertIsNone(other_server.requests[0].get("Authorization"))
+
+    def test_unknown_resource_results_in_none(self) -> None:
+        self.assertIsNone(
+            self.api.get_commit_date(
+                GithubRepository(owner="owner", name="unknown"), "abc"
+            )
+        )
+
+    def test_rate_limited_request_is_sent_again(self) -> None:
+        self.server.rate_limited_requests = 1
+        self.assertEqual(
+            self.api.get_commit_date(self.repository, "abc"),
+            datetime(2023, 12, 30, 14, 5, 55, tzinfo=timezone.utc),
+        )
+        self.assertEqual(self.server.statuses, [429, 200])
+
+    def test_rate_limited_request_is_given_up_eventually(self) -> None:
+        self.server.rate_limited_requests = 10
+        self.assertIsNone(self.api.get_commit_date(self.repository, "abc"))
+        self.assertEqual(self.server.statuses, [429, 429, 429])
+
+    def test_requests_are_traced(self) -> None:
+        self.tracer.is_enabled = True
+        self.server.rate_limited_requests = 1
+        self.api.get_commit_date(self.repository, "abc")
+        self.assertEqual(
+            [(event["name"], event["args"]["status"]) for event in self.tracer.events],
+            [("GET", 429), ("GET", 200)],
+        )
+
+    def test_unreachable_server_results_in_none(self) -> None:
+        self.server.stop()
+        self.assertIsNone(self.api.get_commit_date(self.repository, "abc"))
+
+    def test_requests_are_repeated_after_server_errors(self) -> None:
+        self.server.failing_statuses = [502, 503]
+        self.assertEqual(
+            self.api.get_commit_date(self.repository, "abc"),
+            datetime(2023, 12, 30, 14, 5, 55, tzinfo=timezone.utc),
+        )
+        self.assertEqual(self.server.statuses, [502, 503, 200])
+        self.assertEqual(len(self.sleeps), 2)
+
+    def test_requests_for_missing_resources_are_not_repeated(self) -> None:
+        self.assertIsNone(self.api.get_commit_date(self.repository, "def"))
+        self.assertEqual(self.server.statuses, [404])
+        self.assertFalse(self.sleeps)
+
+
+class GithubApiBatchTests(TestCase):
+    def setUp(self) -> None:
+        self.server = FakeGithubApiServer()
+        self.server.start()
+        self.cache_directory = tempfile.TemporaryDirectory()
+        self.connection_pool = HttpConnectionPool()
+        self.environment = {"GITHUB_API_URL": self.server.url, "GITHUB_TOKEN": "token"}
+        self.api = GithubAPIImpl(
+            logger=logging.getLogger(__name__),
+            environment=self.environment,
+            connection_pool=self.connection_pool,
+            response_cache=JsonCacheDirectory(self.cache_directory.name),
+            cache_manager=CacheManagerImpl(),
+            rate_limiter=GithubRateLimiter(logger=logging.getLogger(__name__)),
+            retry_policy=RetryPolicyImpl(
+                logger=logging.getLogger(__name__), sleep=lambda _: None
+            ),
+            tracer=TracerImpl(),
+            metrics=MetricsRegistryImpl(),
+        )
+        self.repository = GithubRepository(owner="owner", name="repo")
+        self.unknown_repository = GithubRepository(owner="owner", name="unknown")
+
+    def tearDown(self) -> None:
+        self.connection_pool.close()
+        self.server.stop()
+        self.cache_directory.cleanup()
+
+    def test_latest_releases_are_queried_in_a_single_request(self) -> None:
+        self.assertEqual(
+            self.api.get_tags_of_latest_releases(
+                [self.repository, self.unknown_repository]
+            ),
+            {self.repository: "v1.0", self.unknown_repository: None},
+        )
+        self.assertEqual(len(self.server.graphql_queries), 1)
+        self.assertEqual(self.server.statuses, [200])
+
+    def test_many_repositories_are_split_into_multiple_queries(self) -> None:
+        repositories = [
+            GithubRepository(owner="owner", name=f"repo{n}") for n in range(250)
+        ]
+        for n, repository in enumerate(repositories):
+            self.server.releases[f"owner/{repository.name}"] = f"v{n}"
+        results = self.api.get_tags_of_latest_releases(repositories)
+        self.assertEqual(
+            results,
+            {repository: f"v{n}" for n, repository in enumerate(repositories)},
+        )
+        self.assertEqual(len(self.server.graphql_queries), 3)
+        self.assertEqual(len(self.server.client_addresses), 1)
+
+    def test_commit_dates_are_queried_in_a_single_request(self) -> None:
+        self.assertEqual(
+            self.api.get_commit_dates(
+                [
+                    (self.repository, "abc"),
+                    (self.repository, "def"),
+                    (self.unknown_repository, "abc"),
+                ]
+            ),
+            {
+                (self.repository, "abc"): datetime(
+                    2023, 12, 30, 14, 5, 55, tzinfo=timezone.utc
+                ),
+                (self.repository, "def"): None,
+                (self.unknown_repository, "abc"): None,
+            },
+        )
+        self.assertEqual(len(self.server.graphql_queries), 1)
+
+    def test_rest_api_is_used_without_token(self) -> None:
+        del self.environment["GITHUB_TOKEN"]
+        self.assertEqual(
+            self.api.get_tags_of_latest_releases([self.repository]),
+            {self.repository: "v1.0"},
+        )
+        self.assertFalse(self.server.graphql_queries)
+
+    def test_rate_limit_is_queried_before_rest_api_is_used(self) -> None:
+        del self.environment["GITHUB_TOKEN"]
+        self.api.get_tags_of_latest_releases([self.repository, self.unknown_repository])
+        self.assertEqual(self.server.paths[0], "/rate_limit")
+
+    def test_rest_api_is_used_when_graphql_query_fails(self) -> None:
+        self.server.graphql_status = 502
+        self.assertEqual(
+            self.api.get_commit_dates([(self.repository, "abc")]),
+            {
+                (self.repository, "abc"): datetime(
+                    2023, 12, 30, 14, 5, 55, tzinfo=timezone.utc
+                )
+            },
+        )
+        self.assertEqual(self.server.statuses, [502, 200])
+
+    def test_graphql_url_can_be_configured(self) -> None:
+        self.environment["GITHUB_GRAPHQL_URL"] = f"{self.server.url}/other"
+        self.api.get_tags_of_latest_releases([self.repository])
+        self.assertEqual(self.server.statuses, [404, 200])
+
+
+class FakeGithubApiServer:
+    def __init__(self) -> None:
+        self.releases: Dict[str, str] = {"owner/repo": "v1.0"}
+        self.commit_dates: Dict[Tuple[str, str], str] = {
+            ("owner/repo", "abc"): "2023-12-30T14:05:55Z"
+        }
+        self.graphql_queries: List[str] = []
+        self.graphql_status = 200
+        self.rate_limited_requests = 0
+        # Renamed repositories are redirected to this server if it is
+        # set.
+        self.redirect_url = ""
+        self.failing_statuses: List[int] = []
+        self.requests: List[Dict[str, str]] = []
+        self.paths: List[str] = []
+        self.statuses: List[int] = []
+        self.etags: List[str] = []
+        self.client_addresses: Set[Tuple[str, int]] = set()
+        self.http_server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.url = f"http://127.0.0.1:{self.http_server.server_address[1]}"
+        self.thread = threading.Thread(
+            target=self.http_server.serve_forever, kwargs=dict(poll_interval=0.01)
+        )
+        self.is_running = False
+
+    def start(self) -> None:
+        self.thread.start()
+        self.is_running = True
+
+    def stop(self) -> None:
+        if self.is_running:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+            self.thread.join()
+            self.is_running = False
+
+    def get_document(self, path: str) -> Optional[Any]:
+        _, _, owner, name, *resource = path.split("/")
+        repository = f"{owner}/{name}"
+        if resource == ["releases", "latest"] and repository in self.releases:
+            return {"tag_name": self.releases[repository]}
+        if resource[:1] == ["commits"]:
+            if date := self.commit_dates.get((repository, resource[1])):
+                return {"commit": {"committer": {"date": date}}}
+        return None
+
+    def execute_graphql_query(self, query: str, variables: Dict[str, str]) -> Any:
+        # Only understands the queries GithubAPIImpl sends.
+        self.graphql_queries.append(query)
+        data: Dict[str, Any] = dict()
+        errors: List[Any] = []
+        for match in re.finditer(
+            r"(r\d+): repository\(owner: \$(\w+), name: \$(\w+)\) "
+            r"\{ (?:latestRelease|object\(expression: \$(\w+)\))",
+            query,
+        ):
+            alias, owner, name, commit = match.groups()
+            repository = f"{variables[owner]}/{variables[name]}"
+            if repository not in self.releases:
+                data[alias] = None
+                errors.append(
+                    {
+                        "type": "NOT_FOUND",
+                        "path": [alias],
+                        "message": f"Could not resolve to a Repository with the name '{repository}'.",
+                    }
+                )
+            elif commit is None:
+                data[alias] = {"latestRelease": {"tagName": self.releases[repository]}}
+            else:
+                date = self.commit_dates.get((repository, variables[commit]))
+                data[alias] = {"object": date and {"committedDate": date}}
+        return {"data": data, "errors": errors} if errors else {"data": data}
+
+    def _handler_class(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                server.client_addresses.add(self.client_address)
+                server.requests.append(dict(self.headers.items()))
+                server.paths.append(self.path)
+                if self.path == "/rate_limit":
+                    self.respond(
+                        200,
+                        b"{}",
+                        **{
+                            "X-RateLimit-Limit": "60",
+                            "X-RateLimit-Remaining": "60",
+                            "X-RateLimit-Reset": "9999999999",
+                        },
+                    )
+                    return
+                if server.rate_limited_requests:
+                    server.rate_limited_requests -= 1
+                    self.respond(
+                        429, b'{"message": "rate limited"}', **{"Retry-After": "0"}
+                    )
+                    return
+                if server.failing_statuses:
+                    self.respond(
+                        server.failing_statuses.pop(0), b'{"message": "error"}'
+                    )
+                    return
+                if self.path.startswith("/repos/owner/renamed/"):
+                    self.respond(
+                        301,
+                        b"",
+                        Location=server.redirect_url
+                        + self.path.replace("/renamed/", "/repo/"),
+                    )
+                    return
+                document = server.get_document(self.path)
+                if document is None:
+                    self.respond(404, b'{"message": "Not Found"}')
+                    return
+                body = json.dumps(document).encode()
+                etag = f'"{hashlib.sha256(body).hexdigest()}"'
+                server.etags.append(etag)
+                if self.headers.get("If-None-Match") == etag:
+                    self.respond(304, b"", ETag=etag)
+                else:
+                    self.respond(200, body, ETag=etag)
+
+            def do_POST(self) -> None:
+                server.client_addresses.add(self.client_address)
+                server.requests.append(dict(self.headers.items()))
+                request = json.loads(
+                    self.rfile.read(int(self.headers["Content-Length"]))
+                )
+                if self.path != "/graphql":
+                    self.respond(404, b'{"message": "Not Found"}')
+                    return
+                if server.graphql_status != 200:
+                    self.respond(server.graphql_status, b'{"message": "error"}')
+                    return
+                self.respond(
+                    200,
+                    json.dumps(
+                        server.execute_graphql_query(
+                            request["query"], request["variables"]
+                        )
+                    ).encode(),
+                )
+
+            def respond(self, status: int, body: bytes, **headers: str) -> None:
+                server.statuses.append(status)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        return Handler
@@ -1,6 +1,13 @@
+import hashlib
 from unittest import TestCase
 
-from nix_prefetch_github.hash import SriHash
+from nix_prefetch_github.hash import (
+    SriHash,
+    decode_nix_base32,
+    decode_sha256_digest,
+    encode_nix_base32,
+    sha256_digest_to_sri,
+)
 
 
 class SriHashTests(TestCase):
@@ -65,3 +72,69 @@ class SriHashTests(TestCase):
             with self.subTest(example):
                 with self.assertRaises(ValueError):
                     SriHash.from_text(example)
+
+
+class NixBase32Tests(TestCase):
+    # sha256 of the empty string as printed by `nix-hash --type sha256
+    # --to-base32`
+    empty_string_digest = hashlib.sha256(b"").digest()
+    empty_string_base32 = "0mdqa9w1p6cmli6976v4wi0sw9r4p5prkj7lzfd1877wk11c9c73"
+
+    def test_encode_sha256_of_empty_string(self) -> None:
+        self.assertEqual(
+            encode_nix_base32(self.empty_string_digest), self.empty_string_base32
+        )
+
+    def test_decode_sha256_of_empty_string(self) -> None:
+        self.assertEqual(
+            decode_nix_base32(self.empty_string_base32, 32), self.empty_string_digest
+        )
+
+    def test_decoding_reverses_encoding(self) -> None:
+        for n in range(20):
+            digest = hashlib.sha256(str(n).encode()).digest()
+            with self.subTest(n=n):
+                self.assertEqual(
+                    decode_nix_base32(encode_nix_base32(digest), 32), digest
+                )
+
+    def test_encoding_of_20_byte_digest_has_32_characters(self) -> None:
+        self.assertEqual(len(encode_nix_base32(bytes(20))), 32)
+
+    def test_decoding_string_with_invalid_character_fails(self) -> None:
+        self.assertIsNone(decode_nix_base32("e" * 52, 32))
+
+    def test_decoding_string_with_wrong_length_fails(self) -> None:
+        self.assertIsNone(decode_nix_base32("0" * 51, 32))
+
+    def test_decoding_string_with_overflowing_bits_fails(self) -> None:
+        self.assertIsNone(decode_nix_base32("z" + "0" * 51, 32))
+
+
+class DecodeSha256DigestTests(TestCase):
+    digest = hashlib.sha256(b"").digest()
+
+    def test_can_decode_base16(self) -> None:
+        self.assertEqual(decode_sha256_digest(self.digest.hex()), self.digest)
+
+    def test_can_decode_nix_base32(self) -> None:
+        self.assertEqual(
+            decode_sha256_digest(encode_nix_base32(self.digest)), self.digest
+        )
+
+    def test_can_decode_base64(self) -> None:
+        self.assertEqual(
+            decode_sha256_digest("47DEQpj8HBSa+/TImW+5JCeuQeRkm5NMpJWZG3hSuFU="),
+            self.digest,
+        )
+
+    def test_cannot_decode_garbage(self) -> None:
+        self.assertIsNone(decode_sha256_digest("abc"))
+        self.assertIsNone(decode_sha256_digest("x" * 64))
+        self.assertIsNone(decode_sha256_digest("!" * 44))
+
+    def test_sri_representation_of_digest(self) -> None:
+        self.assertEqual(
+            sha256_digest_to_sri(self.digest),
+            "sha256-47DEQpj8HBSa+/TImW+5JCeuQeRkm5NMpJWZG3hSuFU=",
+        )
@@ -0,0 +1,338 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timezone
+from logging import getLogger
+from typing import List, Optional
+from unittest import TestCase
+
+from nix_prefetch_github.hash_cache import (
+    AsyncCachingUrlHasher,
+    CachingUrlHasher,
+    HashDatabase,
+)
+from nix_prefetch_github.interfaces import (
+    GithubRepository,
+    PrefetchedRessource,
+    PrefetchOptions,
+)
+from nix_prefetch_github.tests import FakeCacheManager
+from nix_prefetch_github.tracing import TracerImpl
+
+
+class CachingUrlHasherTests(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.time = 1000.0
+        self.url_hasher = CountingUrlHasher()
+        self.cache_manager = FakeCacheManager()
+        self.database_path = os.path.join(self.directory.name, "cache", "hashes.sqlite")
+        self.tracer = TracerImpl()
+        self.garbage_collected_paths: List[str] = []
+        self.database = HashDatabase(self.database_path)
+        self.hasher = CachingUrlHasher(
+            url_hasher=self.url_hasher,
+            database=self.database,
+            cache_manager=self.cache_manager,
+            logger=getLogger(__name__),
+            clock=lambda: self.time,
+            tracer=self.tracer,
+            store_path_exists=lambda path: path not in self.garbage_collected_paths,
+        )
+        self.repository = GithubRepository(owner="owner", name="repo")
+        self.revision = "4840fbf9ebd246d334c11335fc85747013230b05"
+
+    def tearDown(self) -> None:
+        self.database.close()
+        self.directory.cleanup()
+
+    def test_first_calculation_is_delegated(self) -> None:
+        result = self.calculate()
+        self.assertEqual(result, PrefetchedRessource("hash-1", "/nix/store/path-1"))
+        self.assertEqual(self.url_hasher.calls, 1)
+
+    def test_second_calculation_is_served_from_cache(self) -> None:
+        self.calculate()
+        self.assertEqual(
+            self.calculate(), PrefetchedRessource("hash-1", "/nix/store/path-1")
+        )
+        self.assertEqual(self.url_hasher.calls, 1)
+
+    def test_spans_tell_whether_hash_sum_was_cached(self) -> None:
+        self.tracer.is_enabled = True
+        self.calculate()
+        self.calculate()
+        self.assertEqual(
+            [event["args"]["cached"] for event in self.tracer.events], [False, True]
+        )
+
+    def test_different_options_are_cached_separately(self) -> None:
+        self.calculate()
+        self.calculate(prefetch_options=PrefetchOptions(fetch_submodules=True))
+        self.assertEqual(self.url_hasher.calls, 2)
+
+    def test_different_repositories_are_cached_separately(self) -> None:
+        self.calculate()
+        self.calculate(repository=GithubRepository(owner="owner", name="other"))
+        self.assertEqual(self.url_hasher.calls, 2)
+
+    def test_revisions_that_are_not_commit_hashes_are_not_cached(self) -> None:
+        self.calculate(revision="master")
+        self.calculate(revision="master")
+        self.assertEqual(self.url_hasher.calls, 2)
+
+    def test_unsafe_prefetch_options_are_not_cached(self) -> None:
+        self.calculate(prefetch_options=PrefetchOptions(leave_dot_git=True))
+        self.calculate(prefetch_options=PrefetchOptions(leave_dot_git=True))
+        self.assertEqual(self.url_hasher.calls, 2)
+
+    def test_failures_are_not_cached(self) -> None:
+        self.url_hasher.fail = True
+        self.assertIsNone(self.calculate())
+        self.url_hasher.fail = False
+        self.assertIsNotNone(self.calculate())
+
+    def test_refresh_bypasses_cache(self) -> None:
+        self.calculate()
+        self.cache_manager.configuration.refresh = True
+        result = self.calculate()
+        assert result
+        self.assertEqual(result.hash_sum, "hash-2")
+
+    def test_entries_unused_for_longer_than_max_age_are_evicted(self) -> None:
+        self.cache_manager.configuration.hash_max_age = 100
+        self.calculate()
+        self.time += 200
+        self.calculate(revision="0" * 40)
+        self.calculate()
+        self.assertEqual(self.url_hasher.calls, 3)
+
+    def test_least_recently_used_entries_are_evicted_when_cache_is_full(
+        self,
+    ) -> None:
+        self.cache_manager.configuration.hash_max_entries = 2
+        self.calculate(revision="0" * 40)
+        self.time += 1
+        self.calculate(revision="1" * 40)
+        self.time += 1
+        self.calculate(revision="0" * 40)
+        self.time += 1
+        self.calculate(revision="2" * 40)
+        self.assertEqual(self.url_hasher.calls, 3)
+        self.calculate(revision="0" * 40)
+        self.assertEqual(self.url_hasher.calls, 3)
+        self.calculate(revision="1" * 40)
+        self.assertEqual(self.url_hasher.calls, 4)
+
+    def test_duration_of_calculation_is_recorded(self) -> None:
+        self.url_hasher.on_call = lambda: self.advance_time(5)
+        self.calculate()
+        with sqlite3.connect(self.database_path) as connection:
+            (duration,) = connection.execute(
+                "SELECT duration FROM prefetched_ressources"
+            ).fetchone()
+        self.assertEqual(duration, 5)
+
+    def test_nar_size_reported_by_hasher_is_recorded(self) -> None:
+        self.url_hasher.nar_size = 5
+        self.calculate()
+        with sqlite3.connect(self.database_path) as connection:
+            (size,) = connection.execute(
+                "SELECT size FROM prefetched_ressources"
+            ).fetchone()
+        self.assertEqual(size, 5)
+
+    def test_garbage_collected_store_path_is_calculated_again(self) -> None:
+        self.calculate()
+        self.garbage_collected_paths.append("/nix/store/path-1")
+        self.assertEqual(
+            self.calculate(), PrefetchedRessource("hash-2", "/nix/store/path-2")
+        )
+
+    def test_store_paths_that_were_never_in_store_are_served_from_cache(
+        self,
+    ) -> None:
+        self.garbage_collected_paths.append("/nix/store/path-1")
+        self.calculate()
+        self.calculate()
+        self.assertEqual(self.url_hasher.calls, 1)
+
+    def test_repositories_on_different_servers_are_cached_separately(self) -> None:
+        self.calculate()
+        self.hasher.server_url = "https://github.example.com"
+        self.calculate()
+        self.assertEqual(self.url_hasher.calls, 2)
+
+    def test_commit_date_is_cached(self) -> None:
+        commit_date = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        self.url_hasher.commit_date = commit_date
+        self.calculate()
+        cached = self.calculate()
+        assert cached
+        self.assertEqual(cached.commit_date, commit_date)
+
+    def test_entries_of_databases_without_server_url_are_kept(self) -> None:
+        os.makedirs(os.path.dirname(self.database_path))
+        with sqlite3.connect(self.database_path) as connection:
+            connection.execute(
+                "CREATE TABLE prefetched_ressources (owner TEXT NOT NULL, "
+                "repo TEXT NOT NULL, revision TEXT NOT NULL, "
+                "fetch_submodules INTEGER NOT NULL, deep_clone INTEGER NOT NULL, "
+                "leave_dot_git INTEGER NOT NULL, hash_sum TEXT NOT NULL, "
+                "store_path TEXT NOT NULL, created_at REAL NOT NULL, "
+                "last_used_at REAL NOT NULL, duration REAL NOT NULL, size INTEGER, "
+                "commit_date REAL, PRIMARY KEY (owner, repo, revision, "
+                "fetch_submodules, deep_clone, leave_dot_git))"
+            )
+            connection.execute(
+                "INSERT INTO prefetched_ressources VALUES "
+                "(?, ?, ?, 0, 0, 0, 'hash-0', '/nix/store/path-0', 0, 0, 0, NULL, NULL)",
+                ("owner", "repo", self.revision),
+            )
+        self.assertEqual(
+            self.calculate(), PrefetchedRessource("hash-0", "/nix/store/path-0")
+        )
+        self.assertEqual(self.url_hasher.calls, 0)
+
+    def test_databases_without_commit_date_column_are_migrated(self) -> None:
+        os.makedirs(os.path.dirname(self.database_path))
+        with sqlite3.connect(self.database_path) as connection:
+            connection.execute(
+                "CREATE TABLE prefetched_ressources (owner TEXT NOT NULL, "
+                "repo TEXT NOT NULL, revision TEXT NOT NULL, "
+                "fetch_submodules INTEGER NOT NULL, deep_clone INTEGER NOT NULL, "
+                "leave_dot_git INTEGER NOT NULL, hash_sum TEXT NOT NULL, "
+                "store_path TEXT NOT NULL, created_at REAL NOT NULL, "
+                "last_used_at REAL NOT NULL, duration REAL NOT NULL, size INTEGER, "
+                "PRIMARY KEY (owner, repo, revision, fetch_submodules, deep_clone, "
+                "leave_dot_git))"
+            )
+        self.calculate()
+        self.assertEqual(
+            self.calculate(), PrefetchedRessource("hash-1", "/nix/store/path-1")
+        )
+        self.assertEqual(self.url_hasher.calls, 1)
+
+    def test_unusable_cache_location_falls_back_to_calculation(self) -> None:
+        blocking_file = os.path.join(self.directory.name, "file")
+        open(blocking_file, "w").close()
+        self.hasher.database = HashDatabase(
+            os.path.join(blocking_file, "hashes.sqlite")
+        )
+        self.assertIsNotNone(self.calculate())
+        self.assertIsNotNone(self.calculate())
+        self.assertEqual(self.url_hasher.calls, 2)
+
+    def test_connections_are_reused(self) -> None:
+        self.calculate()
+        self.calculate()
+        self.assertEqual(len(self.database._idle_connections), 1)
+
+    def test_databases_are_shared_between_hashers(self) -> None:
+        self.calculate()
+        other_url_hasher = CountingUrlHasher()
+        other_hasher = CachingUrlHasher(
+            url_hasher=other_url_hasher,
+            database=self.database,
+            cache_manager=self.cache_manager,
+            logger=getLogger(__name__),
+            clock=lambda: self.time,
+            store_path_exists=lambda path: True,
+        )
+        other_hasher.calculate_hash_sum(
+            repository=self.repository,
+            revision=self.revision,
+            prefetch_options=PrefetchOptions(),
+        )
+        self.assertEqual(other_url_hasher.calls, 0)
+
+    def advance_time(self, seconds: float) -> None:
+        self.time += seconds
+
+    def calculate(
+        self,
+        repository: Optional[GithubRepository] = None,
+        revision: Optional[str] = None,
+        prefetch_options: PrefetchOptions = PrefetchOptions(),
+    ) -> Optional[PrefetchedRessource]:
+        return self.hasher.calculate_hash_sum(
+            repository=repository or self.repository,
+            revision=revision or self.revision,
+            prefetch_options=prefetch_options,
+        )
+
+
+class AsyncCachingUrlHasherTests(CachingUrlHasherTests):
+    def setUp(self) -> None:
+        super().setUp()
+        self.async_hasher = AsyncCachingUrlHasher(
+            url_hasher=AsyncUrlHasherAdapter(self.url_hasher), cache=self.hasher
+        )
+
+    def test_hash_sums_calculated_synchronously_are_served_from_cache(self) -> None:
+        self.hasher.calculate_hash_sum(
+            repository=self.repository,
+            revision=self.revision,
+            prefetch_options=PrefetchOptions(),
+        )
+        self.assertEqual(
+            self.calculate(), PrefetchedRessource("hash-1", "/nix/store/path-1")
+        )
+        self.assertEqual(self.url_hasher.calls, 1)
+
+    def calculate(
+        self,
+        repository: Optional[GithubRepository] = None,
+        revision: Optional[str] = None,
+        prefetch_options: PrefetchOptions = PrefetchOptions(),
+    ) -> Optional[PrefetchedRessource]:
+        return asyncio.run(
+            self.async_hasher.calculate_hash_sum(
+                repository=repository or self.repository,
+                revision=revision or self.revision,
+                prefetch_options=prefetch_options,
+            )
+        )
+
+
+class AsyncUrlHasherAdapter:
+    def __init__(self, url_hasher: "CountingUrlHasher") -> None:
+        self.url_hasher = url_hasher
+
+    async def calculate_hash_sum(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+    ) -> Optional[PrefetchedRessource]:
+        return self.url_hasher.calculate_hash_sum(
+            repository, revision, prefetch_options
+        )
+
+
+class CountingUrlHasher:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.fail = False
+        self.store_path: Optional[str] = None
+        self.commit_date: Optional[datetime] = None
+        self.nar_size: Optional[int] = None
+        self.on_call = lambda: None
+
+    def calculate_hash_sum(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+    ) -> Optional[PrefetchedRessource]:
+        self.calls += 1
+        self.on_call()
+        if self.fail:
+            return None
+        return PrefetchedRessource(
+            hash_sum=f"hash-{self.calls}",
+            store_path=self.store_path or f"/nix/store/path-{self.calls}",
+            commit_date=self.commit_date,
+            nar_size=self.nar_size,
+        )
@@ -1,4 +1,5 @@
 from logging import getLogger
+from typing import Dict, List, Optional, Tuple
 from unittest import TestCase
 
 from nix_prefetch_github.command.command_runner import CommandRunnerImpl
@@ -23,3 +24,56 @@ class HashConverterTests(TestCase):
             )
             == "sha256-B5AlNwg6kbcaqUiQEC6jslCRKVpErXLMsKC+b9aPlrM="
         )
+
+
+class NativeHashConversionTests(TestCase):
+    def setUp(self) -> None:
+        self.command_runner = FakeCommandRunner()
+        self.hash_converter = HashConverterImpl(command_runner=self.command_runner)
+
+    def test_nix_base32_hash_is_converted_without_running_nix(self) -> None:
+        self.assertEqual(
+            self.hash_converter.convert_sha256_to_sri(
+                "0mdqa9w1p6cmli6976v4wi0sw9r4p5prkj7lzfd1877wk11c9c73"
+            ),
+            "sha256-47DEQpj8HBSa+/TImW+5JCeuQeRkm5NMpJWZG3hSuFU=",
+        )
+        self.assertFalse(self.command_runner.commands)
+
+    def test_base64_hash_is_converted_without_running_nix(self) -> None:
+        self.assertEqual(
+            self.hash_converter.convert_sha256_to_sri(
+                "B5AlNwg6kbcaqUiQEC6jslCRKVpErXLMsKC+b9aPlrM="
+            ),
+            "sha256-B5AlNwg6kbcaqUiQEC6jslCRKVpErXLMsKC+b9aPlrM=",
+        )
+        self.assertFalse(self.command_runner.commands)
+
+    def test_nix_is_used_for_hashes_that_cannot_be_decoded(self) -> None:
+        self.command_runner.output = "sha256-converted\n"
+        self.assertEqual(
+            self.hash_converter.convert_sha256_to_sri("abc"), "sha256-converted"
+        )
+        self.assertEqual(self.command_runner.commands[0][0], "nix")
+
+    def test_failure_of_nix_results_in_none(self) -> None:
+        self.command_runner.returncode = 1
+        self.assertIsNone(self.hash_converter.convert_sha256_to_sri("abc"))
+
+
+class FakeCommandRunner:
+    def __init__(self) -> None:
+        self.commands: List[List[str]] = []
+        self.returncode = 0
+        self.output = ""
+
+    def run_command(
+        self,
+        command: List[str],
+        cwd: Optional[str] = None,
+        environment_variables: Optional[Dict[str, str]] = None,
+        merge_stderr: bool = False,
+        timeout: Optional[float] = None,
+    ) -> Tuple[int, str]:
+        self.commands.append(command)
+        return self.returncode, self.output
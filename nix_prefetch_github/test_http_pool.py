@@ -0,0 +1,71 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+from unittest import TestCase
+
+from nix_prefetch_github.http_pool import HttpConnectionPool
+
+
+class HttpConnectionPoolTests(TestCase):
+    def setUp(self) -> None:
+        self.client_addresses: List[Tuple[str, int]] = []
+        self.close_after_response = False
+        self.http_server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.url = f"http://127.0.0.1:{self.http_server.server_address[1]}"
+        self.thread = threading.Thread(
+            target=self.http_server.serve_forever, kwargs=dict(poll_interval=0.01)
+        )
+        self.thread.start()
+        self.pool = HttpConnectionPool()
+
+    def tearDown(self) -> None:
+        self.pool.close()
+        self.http_server.shutdown()
+        self.http_server.server_close()
+        self.thread.join()
+
+    def test_response_is_returned(self) -> None:
+        response = self.pool.request("GET", f"{self.url}/path?query=1")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.body, b"/path?query=1")
+        self.assertEqual(response.header("Content-Type"), "text/plain")
+
+    def test_connection_is_reused(self) -> None:
+        self.pool.request("GET", f"{self.url}/1")
+        self.pool.request("GET", f"{self.url}/2")
+        self.assertEqual(len(set(self.client_addresses)), 1)
+
+    def test_connection_closed_by_server_is_replaced(self) -> None:
+        self.close_after_response = True
+        self.pool.request("GET", f"{self.url}/1")
+        self.close_after_response = False
+        response = self.pool.request("GET", f"{self.url}/2")
+        self.assertEqual(response.body, b"/2")
+        self.assertEqual(len(set(self.client_addresses)), 2)
+
+    def test_unsupported_urls_are_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            self.pool.request("GET", "ftp://example.com/file")
+
+    def _handler_class(self) -> type:
+        test = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                test.client_addresses.append(self.client_address)
+                # Simulate a server that silently drops idle
+                # connections.
+                self.close_connection = test.close_after_response
+                body = self.path.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        return Handler
@@ -0,0 +1,76 @@
+from logging import getLogger
+from typing import List, Optional
+from unittest import TestCase
+
+from nix_prefetch_github.interfaces import GithubRepository
+from nix_prefetch_github.latest_release import TagReleaseResolver
+from nix_prefetch_github.list_remote import ListRemote
+from nix_prefetch_github.versions import ReleaseSelection, VersionConstraint
+
+LS_REMOTE_OUTPUT = """b12ab7fe187924d8536d27b2ddf3bcccd2612b32	refs/tags/v1.0.0
+cffdbcb3351f500b5ca8867a65261443b576b215	refs/tags/v1.1.0
+0b63b78df5e5e17fa46cbdd8aac2b56e8622e5d3	refs/tags/v1.1.0^{}
+9ce3bcc3610ffeb36f53bc690682f48c8d311764	refs/tags/v2.0.0-rc1
+"""
+
+
+class TagReleaseResolverTests(TestCase):
+    def setUp(self) -> None:
+        self.list_remote_factory = FakeListRemoteFactory()
+        self.resolver = TagReleaseResolver(
+            list_remote_factory=self.list_remote_factory, logger=getLogger(__name__)
+        )
+        self.repository = GithubRepository(owner="owner", name="repo")
+
+    def test_annotated_tags_resolve_to_peeled_commit(self) -> None:
+        self.assertEqual(
+            self.resolver.get_latest_release(self.repository, ReleaseSelection()),
+            "0b63b78df5e5e17fa46cbdd8aac2b56e8622e5d3",
+        )
+
+    def test_constraint_is_respected(self) -> None:
+        self.assertEqual(
+            self.resolver.get_latest_release(
+                self.repository,
+                ReleaseSelection(constraint=VersionConstraint.from_text("<1.1")),
+            ),
+            "b12ab7fe187924d8536d27b2ddf3bcccd2612b32",
+        )
+
+    def test_only_tags_are_listed(self) -> None:
+        self.resolver.get_latest_release(self.repository, ReleaseSelection())
+        self.assertEqual(self.list_remote_factory.ref_patterns, ["refs/tags/*"])
+
+    def test_pattern_restricts_listed_tags(self) -> None:
+        self.resolver.get_latest_release(
+            self.repository, ReleaseSelection(pattern="release-*")
+        )
+        self.assertEqual(self.list_remote_factory.ref_patterns, ["refs/tags/release-*"])
+
+    def test_none_is_returned_when_no_tag_matches(self) -> None:
+        self.assertIsNone(
+            self.resolver.get_latest_release(
+                self.repository,
+                ReleaseSelection(constraint=VersionConstraint.from_text(">=3")),
+            )
+        )
+
+    def test_none_is_returned_when_tags_cannot_be_listed(self) -> None:
+        self.list_remote_factory.output = None
+        self.assertIsNone(
+            self.resolver.get_latest_release(self.repository, ReleaseSelection())
+        )
+
+
+class FakeListRemoteFactory:
+    def __init__(self) -> None:
+        self.output: Optional[str] = LS_REMOTE_OUTPUT
+        self.ref_patterns: List[str] = []
+
+    def get_list_remote(
+        self, repository: GithubRepository, ref_patterns: List[str]
+    ) -> Optional[ListRemote]:
+        self.ref_patterns = ref_patterns
+        if self.output is None:
+            return None
+        return ListRemote.from_git_ls_remote_output(self.output)
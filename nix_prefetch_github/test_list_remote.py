@@ -1,6 +1,7 @@
 from unittest import TestCase
 
-from nix_prefetch_github.list_remote import ListRemote
+from nix_prefetch_github.list_remote import ListRemote, RefTable
+from nix_prefetch_github.revision_index import RevisionIndexImpl
 
 
 class ListRemoteTests(TestCase):
@@ -59,3 +60,127 @@ cffdbcb3351f500b5ca8867a65261443b576b215	refs/tags/v2.0
 
     def test_full_ref_name_returns_none_for_invalid_refs(self) -> None:
         assert self.remote_list.full_ref_name("blabla") is None
+
+
+class FilteredListRemoteTests(TestCase):
+    def test_head_resolves_to_branch_when_only_head_is_listed(self) -> None:
+        remote_list = ListRemote.from_git_ls_remote_output(
+            "ref: refs/heads/main\tHEAD\n"
+            "9ce3bcc3610ffeb36f53bc690682f48c8d311764\tHEAD\n"
+        )
+        self.assertEqual(
+            RevisionIndexImpl(remote_list).get_revision_by_name("HEAD"),
+            "9ce3bcc3610ffeb36f53bc690682f48c8d311764",
+        )
+
+    def test_listed_branch_takes_precedence_over_head(self) -> None:
+        remote_list = ListRemote.from_git_ls_remote_output(
+            "ref: refs/heads/main\tHEAD\n"
+            "9ce3bcc3610ffeb36f53bc690682f48c8d311764\tHEAD\n"
+            "c4e967f4a80e0c030364884e92f2c3cc39ae3ef2\trefs/heads/main\n"
+        )
+        self.assertEqual(
+            remote_list.branch("main"), "c4e967f4a80e0c030364884e92f2c3cc39ae3ef2"
+        )
+
+    def test_symbolic_refs_of_branches_are_not_listed_as_branches(self) -> None:
+        remote_list = ListRemote.from_git_ls_remote_output(
+            "ref: refs/heads/main\trefs/heads/default\n"
+            "9ce3bcc3610ffeb36f53bc690682f48c8d311764\trefs/heads/main\n"
+        )
+        self.assertEqual(remote_list.symref("refs/heads/default"), "main")
+        self.assertIsNone(remote_list.branch("default"))
+
+
+class RefPrefixTests(TestCase):
+    def setUp(self) -> None:
+        self.remote_list = ListRemote.from_git_ls_remote_output(
+            "9ce3bcc3610ffeb36f53bc690682f48c8d311764\trefs/heads/master\n"
+            "c4e967f4a80e0c030364884e92f2c3cc39ae3ef2\trefs/heads/release/1.0\n"
+            "1234567789473873487438239389538913598723\trefs/heads/release/2.0\n"
+            "b12ab7fe187924d8536d27b2ddf3bcccd2612b32\trefs/tags/v1.3\n"
+            "cffdbcb3351f500b5ca8867a65261443b576b215\trefs/tags/v2.0\n"
+            "0b63b78df5e5e17fa46cbdd8aac2b56e8622e5d3\trefs/tags/v2.0^{}\n"
+        )
+
+    def test_branches_with_prefix_are_found(self) -> None:
+        self.assertEqual(
+            list(self.remote_list.refs_with_prefix("refs/heads/release/")),
+            [
+                ("refs/heads/release/1.0", "c4e967f4a80e0c030364884e92f2c3cc39ae3ef2"),
+                ("refs/heads/release/2.0", "1234567789473873487438239389538913598723"),
+            ],
+        )
+
+    def test_tags_with_prefix_are_found(self) -> None:
+        self.assertEqual(
+            [name for name, _ in self.remote_list.refs_with_prefix("refs/tags/v2")],
+            ["refs/tags/v2.0", "refs/tags/v2.0^{}"],
+        )
+
+    def test_prefix_of_ref_kind_matches_all_refs_of_that_kind(self) -> None:
+        self.assertEqual(len(list(self.remote_list.refs_with_prefix("refs/t"))), 3)
+        self.assertEqual(len(list(self.remote_list.refs_with_prefix("refs/"))), 6)
+
+    def test_unknown_prefix_matches_nothing(self) -> None:
+        self.assertEqual(list(self.remote_list.refs_with_prefix("refs/pull/")), [])
+
+
+class RefTableTests(TestCase):
+    def test_table_equals_dict_with_same_items(self) -> None:
+        items = {
+            "master": "9ce3bcc3610ffeb36f53bc690682f48c8d311764",
+            "develop": "c4e967f4a80e0c030364884e92f2c3cc39ae3ef2",
+        }
+        self.assertEqual(RefTable.from_mapping(items), items)
+
+    def test_later_items_take_precedence(self) -> None:
+        table = RefTable.from_items(
+            [
+                ("master", "9ce3bcc3610ffeb36f53bc690682f48c8d311764"),
+                ("master", "c4e967f4a80e0c030364884e92f2c3cc39ae3ef2"),
+            ]
+        )
+        self.assertEqual(len(table), 1)
+        self.assertEqual(table["master"], "c4e967f4a80e0c030364884e92f2c3cc39ae3ef2")
+
+    def test_unsorted_items_can_be_looked_up(self) -> None:
+        table = RefTable.from_items(
+            [
+                ("v2.0", "cffdbcb3351f500b5ca8867a65261443b576b215"),
+                ("v1.0", "b12ab7fe187924d8536d27b2ddf3bcccd2612b32"),
+            ]
+        )
+        self.assertEqual(list(table), ["v1.0", "v2.0"])
+        self.assertEqual(table["v2.0"], "cffdbcb3351f500b5ca8867a65261443b576b215")
+
+    def test_sha256_object_ids_are_supported(self) -> None:
+        object_id = "ab" * 32
+        self.assertEqual(RefTable.from_items([("main", object_id)])["main"], object_id)
+
+    def test_arbitrary_values_are_preserved(self) -> None:
+        table = RefTable.from_items([("main", "main-1"), ("v1", "ABCDEF")])
+        self.assertEqual(table, {"main": "main-1", "v1": "ABCDEF"})
+
+    def test_missing_names_are_not_found(self) -> None:
+        table = RefTable.from_items([("b", "9ce3bcc3610ffeb36f53bc690682f48c8d311764")])
+        self.assertNotIn("a", table)
+        self.assertNotIn("c", table)
+        self.assertIsNone(table.get("a"))
+
+    def test_empty_table_contains_nothing(self) -> None:
+        table = RefTable.from_items([])
+        self.assertEqual(len(table), 0)
+        self.assertIsNone(table.get("main"))
+        self.assertEqual(list(table.items_with_prefix("")), [])
+
+    def test_lookups_work_in_tables_spanning_many_samples(self) -> None:
+        items = [(f"branch-{n:04}", f"{n:040x}") for n in range(1000)]
+        table = RefTable.from_items(items)
+        for name, object_id in items:
+            self.assertEqual(table[name], object_id)
+        self.assertEqual(
+            [name for name, _ in table.items_with_prefix("branch-099")],
+            [f"branch-099{n}" for n in range(10)],
+        )
+        self.assertNotIn("branch-0999a", table)
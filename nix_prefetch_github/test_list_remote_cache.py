@@ -0,0 +1,235 @@
+import asyncio
+import os
+import tempfile
+from logging import getLogger
+from typing import List, Optional
+from unittest import TestCase
+
+from nix_prefetch_github.cache import JsonCacheDirectory
+from nix_prefetch_github.interfaces import GithubRepository
+from nix_prefetch_github.list_remote import ListRemote
+from nix_prefetch_github.list_remote_cache import (
+    AsyncCachingListRemoteFactory,
+    CachingListRemoteFactory,
+)
+from nix_prefetch_github.revision_index import RevisionIndexImpl, get_ref_patterns
+from nix_prefetch_github.tests import FakeCacheManager
+
+
+class CachingListRemoteFactoryTests(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.time = 1000.0
+        self.underlying_factory = FakeListRemoteFactory()
+        self.cache_directory = JsonCacheDirectory(
+            os.path.join(self.directory.name, "ls-remote")
+        )
+        self.cache_manager = FakeCacheManager()
+        self.cache_manager.configuration.branch_ttl = 60
+        self.cache_manager.configuration.tag_ttl = 3600
+        self.factory = CachingListRemoteFactory(
+            list_remote_factory=self.underlying_factory,
+            cache_directory=self.cache_directory,
+            cache_manager=self.cache_manager,
+            logger=getLogger(__name__),
+            clock=lambda: self.time,
+        )
+        self.repository = GithubRepository(owner="owner", name="repo")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_first_lookup_queries_remote(self) -> None:
+        self.assertEqual(self.resolve("master"), "master-1")
+        self.assertEqual(self.underlying_factory.calls, 1)
+
+    def test_second_lookup_within_branch_ttl_is_served_from_cache(self) -> None:
+        self.resolve("master")
+        self.underlying_factory.set_master("master-2")
+        self.time += 30
+        self.assertEqual(self.resolve("master"), "master-1")
+        self.assertEqual(self.underlying_factory.calls, 1)
+
+    def test_cache_is_shared_between_factory_instances(self) -> None:
+        self.resolve("master")
+        other_factory = CachingListRemoteFactory(
+            list_remote_factory=self.underlying_factory,
+            cache_directory=JsonCacheDirectory(
+                os.path.join(self.directory.name, "ls-remote")
+            ),
+            cache_manager=self.cache_manager,
+            logger=getLogger(__name__),
+            clock=lambda: self.time,
+        )
+        list_remote = other_factory.get_list_remote(
+            self.repository, get_ref_patterns("master")
+        )
+        assert list_remote
+        self.assertEqual(
+            RevisionIndexImpl(list_remote).get_revision_by_name("master"), "master-1"
+        )
+        self.assertEqual(self.underlying_factory.calls, 1)
+
+    def test_branch_lookup_after_branch_ttl_queries_remote_again(self) -> None:
+        self.resolve("master")
+        self.underlying_factory.set_master("master-2")
+        self.time += 120
+        self.assertEqual(self.resolve("master"), "master-2")
+        self.assertEqual(self.underlying_factory.calls, 2)
+
+    def test_head_lookup_after_branch_ttl_queries_remote_again(self) -> None:
+        self.resolve("HEAD")
+        self.underlying_factory.set_master("master-2")
+        self.time += 120
+        self.assertEqual(self.resolve("HEAD"), "master-2")
+
+    def test_tag_lookup_after_branch_ttl_but_within_tag_ttl_is_served_from_cache(
+        self,
+    ) -> None:
+        self.resolve("v1.0")
+        self.time += 120
+        self.assertEqual(self.resolve("v1.0"), "v1.0-commit")
+        self.assertEqual(self.underlying_factory.calls, 1)
+
+    def test_unknown_name_after_branch_ttl_queries_remote_again(self) -> None:
+        self.resolve("new-branch")
+        self.time += 120
+        self.underlying_factory.heads["new-branch"] = "new"
+        self.assertEqual(self.resolve("new-branch"), "new")
+
+    def test_different_names_are_cached_separately(self) -> None:
+        self.resolve("master")
+        self.resolve("v1.0")
+        self.assertEqual(
+            self.underlying_factory.requested_ref_patterns,
+            [get_ref_patterns("master"), get_ref_patterns("v1.0")],
+        )
+        self.resolve("master")
+        self.resolve("v1.0")
+        self.assertEqual(self.underlying_factory.calls, 2)
+
+    def test_tag_lookup_after_tag_ttl_queries_remote_again(self) -> None:
+        self.resolve("v1.0")
+        self.time += 7200
+        self.resolve("v1.0")
+        self.assertEqual(self.underlying_factory.calls, 2)
+
+    def test_refresh_bypasses_cache(self) -> None:
+        self.resolve("master")
+        self.underlying_factory.set_master("master-2")
+        self.cache_manager.configuration.refresh = True
+        self.assertEqual(self.resolve("master"), "master-2")
+
+    def test_refreshed_refs_are_written_to_cache(self) -> None:
+        self.resolve("master")
+        self.underlying_factory.set_master("master-2")
+        self.cache_manager.configuration.refresh = True
+        self.resolve("master")
+        self.cache_manager.configuration.refresh = False
+        self.assertEqual(self.resolve("master"), "master-2")
+        self.assertEqual(self.underlying_factory.calls, 2)
+
+    def test_failed_remote_query_is_not_cached(self) -> None:
+        self.underlying_factory.fail = True
+        self.assertIsNone(
+            self.factory.get_list_remote(self.repository, get_ref_patterns("master"))
+        )
+        self.underlying_factory.fail = False
+        self.assertEqual(self.resolve("master"), "master-1")
+
+    def test_stale_refs_are_used_if_refresh_fails(self) -> None:
+        self.resolve("master")
+        self.time += 120
+        self.underlying_factory.fail = True
+        self.assertEqual(self.resolve("master"), "master-1")
+
+    def test_least_recently_used_repositories_are_evicted(self) -> None:
+        self.cache_manager.configuration.max_entries = 1
+        self.resolve("master")
+        for entry in os.scandir(self.cache_directory.path):
+            os.utime(entry.path, (0, 0))
+        self.resolve("master", GithubRepository(owner="owner", name="other"))
+        self.resolve("master")
+        self.assertEqual(self.underlying_factory.calls, 3)
+
+    def test_repositories_on_different_servers_are_cached_separately(
+        self,
+    ) -> None:
+        self.resolve("master")
+        enterprise_factory = CachingListRemoteFactory(
+            list_remote_factory=self.underlying_factory,
+            cache_directory=self.cache_directory,
+            cache_manager=self.cache_manager,
+            logger=getLogger(__name__),
+            clock=lambda: self.time,
+            server_url="https://github.example.com",
+        )
+        enterprise_factory.get_list_remote(self.repository, get_ref_patterns("master"))
+        self.assertEqual(self.underlying_factory.calls, 2)
+
+    def resolve(
+        self, name: str, repository: Optional[GithubRepository] = None
+    ) -> Optional[str]:
+        list_remote = self.factory.get_list_remote(
+            repository or self.repository, get_ref_patterns(name)
+        )
+        assert list_remote
+        return RevisionIndexImpl(list_remote).get_revision_by_name(name)
+
+
+class AsyncCachingListRemoteFactoryTests(CachingListRemoteFactoryTests):
+    def setUp(self) -> None:
+        super().setUp()
+        self.async_factory = AsyncCachingListRemoteFactory(
+            list_remote_factory=AsyncListRemoteFactoryAdapter(self.underlying_factory),
+            cache=self.factory,
+        )
+
+    def test_refs_listed_synchronously_are_served_from_cache(self) -> None:
+        self.factory.get_list_remote(self.repository, get_ref_patterns("master"))
+        self.assertEqual(self.resolve("master"), "master-1")
+        self.assertEqual(self.underlying_factory.calls, 1)
+
+    def resolve(
+        self, name: str, repository: Optional[GithubRepository] = None
+    ) -> Optional[str]:
+        list_remote = asyncio.run(
+            self.async_factory.get_list_remote(
+                repository or self.repository, get_ref_patterns(name)
+            )
+        )
+        assert list_remote
+        return RevisionIndexImpl(list_remote).get_revision_by_name(name)
+
+
+class AsyncListRemoteFactoryAdapter:
+    def __init__(self, list_remote_factory: "FakeListRemoteFactory") -> None:
+        self.list_remote_factory = list_remote_factory
+
+    async def get_list_remote(
+        self, repository: GithubRepository, ref_patterns: List[str]
+    ) -> Optional[ListRemote]:
+        return self.list_remote_factory.get_list_remote(repository, ref_patterns)
+
+
+class FakeListRemoteFactory:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.requested_ref_patterns: List[List[str]] = []
+        self.fail = False
+        self.heads = {"master": "master-1"}
+        self.tags = {"v1.0": "v1.0-tag", "v1.0^{}": "v1.0-commit"}
+
+    def set_master(self, revision: str) -> None:
+        self.heads["master"] = revision
+
+    def get_list_remote(
+        self, repository: GithubRepository, ref_patterns: List[str]
+    ) -> Optional[ListRemote]:
+        self.calls += 1
+        self.requested_ref_patterns.append(ref_patterns)
+        if self.fail:
+            return None
+        return ListRemote(
+            symrefs={"HEAD": "master"}, heads=dict(self.heads), tags=dict(self.tags)
+        )
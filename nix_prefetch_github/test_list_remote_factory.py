@@ -1,9 +1,16 @@
+import asyncio
 from logging import getLogger
+from typing import Dict, List, Optional, Tuple
 from unittest import TestCase
 
 from nix_prefetch_github.command.command_runner import CommandRunnerImpl
 from nix_prefetch_github.interfaces import GithubRepository
-from nix_prefetch_github.list_remote_factory import ListRemoteFactoryImpl
+from nix_prefetch_github.list_remote_factory import (
+    AsyncListRemoteFactoryImpl,
+    ListRemoteFactoryImpl,
+)
+from nix_prefetch_github.retry import RetryPolicyImpl
+from nix_prefetch_github.revision_index import get_ref_patterns
 from nix_prefetch_github.tests import network
 
 
@@ -11,25 +18,184 @@ from nix_prefetch_github.tests import network
 class RemoteListFactoryTests(TestCase):
     def setUp(self) -> None:
         self.factory = ListRemoteFactoryImpl(
-            command_runner=CommandRunnerImpl(getLogger(__name__))
+            command_runner=CommandRunnerImpl(getLogger(__name__)),
+            retry_policy=RetryPolicyImpl(logger=getLogger(__name__)),
         )
 
     def test_for_non_existing_repo_we_get_none(self) -> None:
         repository = GithubRepository(
             owner="seppeljordan", name="repo_does_not_exist_12653"
         )
-        remote_list = self.factory.get_list_remote(repository)
+        remote_list = self.factory.get_list_remote(repository, get_ref_patterns("v2.3"))
         self.assertIsNone(remote_list)
 
     def test_for_existing_repository_we_get_truthy_value(self) -> None:
         repository = GithubRepository(owner="seppeljordan", name="nix-prefetch-github")
-        remote_list = self.factory.get_list_remote(repository)
+        remote_list = self.factory.get_list_remote(repository, get_ref_patterns("v2.3"))
         self.assertTrue(remote_list)
 
     def test_get_correct_reference_for_version_v2_3(self) -> None:
         repository = GithubRepository(owner="seppeljordan", name="nix-prefetch-github")
-        remote_list = self.factory.get_list_remote(repository)
+        remote_list = self.factory.get_list_remote(repository, get_ref_patterns("v2.3"))
         assert remote_list
         self.assertEqual(
             remote_list.tag("v2.3"), "e632ce77435a4ab269c227c3ebcbaeaf746f8627"
         )
+
+
+class ListRemoteFactoryTests(TestCase):
+    def setUp(self) -> None:
+        self.command_runner = FakeCommandRunner()
+        self.sleeps: List[float] = []
+        self.retry_policy = RetryPolicyImpl(
+            logger=getLogger(__name__), sleep=self.sleeps.append
+        )
+        self.factory = ListRemoteFactoryImpl(
+            command_runner=self.command_runner, retry_policy=self.retry_policy
+        )
+        self.repository = GithubRepository(owner="owner", name="repo")
+
+    def test_ref_patterns_are_passed_to_git_ls_remote(self) -> None:
+        self.factory.get_list_remote(self.repository, ["HEAD", "refs/heads/HEAD"])
+        self.assertEqual(
+            self.command_runner.commands,
+            [
+                [
+                    "git",
+                    "ls-remote",
+                    "--symref",
+                    "https://github.com/owner/repo.git",
+                    "HEAD",
+                    "refs/heads/HEAD",
+                ]
+            ],
+        )
+
+    def test_failing_git_ls_remote_results_in_none(self) -> None:
+        self.command_runner.returncode = 128
+        self.assertIsNone(self.factory.get_list_remote(self.repository, ["HEAD"]))
+
+    def test_git_ls_remote_is_repeated_after_network_errors(self) -> None:
+        self.command_runner.returncode = 128
+        self.command_runner.output = (
+            "fatal: unable to access 'https://github.com/owner/repo.git/': "
+            "Could not resolve host: github.com\n"
+        )
+        self.assertIsNone(self.factory.get_list_remote(self.repository, ["HEAD"]))
+        self.assertEqual(len(self.command_runner.commands), 4)
+        self.assertEqual(len(self.sleeps), 3)
+
+    def test_git_ls_remote_is_not_repeated_for_missing_repositories(self) -> None:
+        self.command_runner.returncode = 128
+        self.command_runner.output = (
+            "remote: Repository not found.\n"
+            "fatal: repository 'https://github.com/owner/repo.git/' not found\n"
+        )
+        self.assertIsNone(self.factory.get_list_remote(self.repository, ["HEAD"]))
+        self.assertEqual(len(self.command_runner.commands), 1)
+
+    def test_refs_are_listed_from_configured_server(self) -> None:
+        factory = ListRemoteFactoryImpl(
+            command_runner=self.command_runner,
+            retry_policy=self.retry_policy,
+            server_url="http://localhost:8080",
+        )
+        factory.get_list_remote(self.repository, ["HEAD"])
+        self.assertEqual(
+            self.command_runner.commands[0][3], "http://localhost:8080/owner/repo.git"
+        )
+
+
+class AsyncListRemoteFactoryTests(TestCase):
+    def setUp(self) -> None:
+        self.command_runner = FakeAsyncCommandRunner()
+        self.sleeps: List[float] = []
+        self.factory = AsyncListRemoteFactoryImpl(
+            command_runner=self.command_runner,
+            retry_policy=RetryPolicyImpl(
+                logger=getLogger(__name__), sleep_async=self.sleep
+            ),
+        )
+        self.repository = GithubRepository(owner="owner", name="repo")
+
+    def test_output_of_git_ls_remote_is_parsed(self) -> None:
+        self.command_runner.output = (
+            "ref: refs/heads/master\tHEAD\n"
+            "9ce3bcc3610ffeb36f53bc690682f48c8d311764\tHEAD\n"
+        )
+        list_remote = asyncio.run(
+            self.factory.get_list_remote(self.repository, ["HEAD"])
+        )
+        assert list_remote
+        self.assertEqual(
+            list_remote.branch("master"), "9ce3bcc3610ffeb36f53bc690682f48c8d311764"
+        )
+        self.assertEqual(
+            self.command_runner.commands,
+            [
+                [
+                    "git",
+                    "ls-remote",
+                    "--symref",
+                    "https://github.com/owner/repo.git",
+                    "HEAD",
+                ]
+            ],
+        )
+
+    def test_failing_git_ls_remote_results_in_none(self) -> None:
+        self.command_runner.returncode = 128
+        self.assertIsNone(
+            asyncio.run(self.factory.get_list_remote(self.repository, ["HEAD"]))
+        )
+
+    def test_git_ls_remote_is_repeated_after_network_errors(self) -> None:
+        self.command_runner.returncode = 128
+        self.command_runner.output = (
+            "fatal: unable to access 'https://github.com/owner/repo.git/': "
+            "Could not resolve host: github.com\n"
+        )
+        self.assertIsNone(
+            asyncio.run(self.factory.get_list_remote(self.repository, ["HEAD"]))
+        )
+        self.assertEqual(len(self.command_runner.commands), 4)
+        self.assertEqual(len(self.sleeps), 3)
+
+    async def sleep(self, delay: float) -> None:
+        self.sleeps.append(delay)
+
+
+class FakeCommandRunner:
+    def __init__(self) -> None:
+        self.commands: List[List[str]] = []
+        self.returncode = 0
+        self.output = ""
+
+    def run_command(
+        self,
+        command: List[str],
+        cwd: Optional[str] = None,
+        environment_variables: Optional[Dict[str, str]] = None,
+        merge_stderr: bool = False,
+        timeout: Optional[float] = None,
+    ) -> Tuple[int, str]:
+        self.commands.append(command)
+        return self.returncode, self.output
+
+
+class FakeAsyncCommandRunner:
+    def __init__(self) -> None:
+        self.commands: List[List[str]] = []
+        self.returncode = 0
+        self.output = ""
+
+    async def run_command(
+        self,
+        command: List[str],
+        cwd: Optional[str] = None,
+        environment_variables: Optional[Dict[str, str]] = None,
+        merge_stderr: bool = False,
+        timeout: Optional[float] = None,
+    ) -> Tuple[int, str]:
+        self.commands.append(command)
+        return self.returncode, self.output
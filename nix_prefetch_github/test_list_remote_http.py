@@ -0,0 +1,343 @@
+import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging import getLogger
+from typing import Dict, List, Optional, Set, Tuple
+from unittest import TestCase
+
+from parameterized import parameterized
+
+from nix_prefetch_github.http_pool import HttpConnectionPool
+from nix_prefetch_github.interfaces import GithubRepository
+from nix_prefetch_github.list_remote import ListRemote
+from nix_prefetch_github.list_remote_http import SmartHttpListRemoteFactory
+from nix_prefetch_github.retry import RetryPolicyImpl
+from nix_prefetch_github.revision_index import RevisionIndexImpl, get_ref_patterns
+
+# Recorded from `git ls-remote --symref` of a small repository
+RECORDED_REFS = """ref: refs/heads/master	HEAD
+9ce3bcc3610ffeb36f53bc690682f48c8d311764	HEAD
+c4e967f4a80e0c030364884e92f2c3cc39ae3ef2	refs/heads/feature/master
+9ce3bcc3610ffeb36f53bc690682f48c8d311764	refs/heads/master
+ac17b18f3ba68bcea84b563523dfe82729e49aa8	refs/heads/v1
+f7e74db312def6d0e57028b2b630962c768eeb9f	refs/pull/1/head
+b12ab7fe187924d8536d27b2ddf3bcccd2612b32	refs/tags/light
+cffdbcb3351f500b5ca8867a65261443b576b215	refs/tags/v1
+0b63b78df5e5e17fa46cbdd8aac2b56e8622e5d3	refs/tags/v1^{}
+"""
+
+
+class SmartHttpListRemoteFactoryTests(TestCase):
+    def setUp(self) -> None:
+        self.server = FakeGitServer(RECORDED_REFS)
+        self.server.start()
+        self.fallback_factory = FakeListRemoteFactory()
+        self.connection_pool = HttpConnectionPool()
+        self.factory = SmartHttpListRemoteFactory(
+            connection_pool=self.connection_pool,
+            fallback_factory=self.fallback_factory,
+            logger=getLogger(__name__),
+            retry_policy=RetryPolicyImpl(logger=getLogger(__name__)),
+            base_url=self.server.url,
+            proxies=dict(),
+        )
+        self.repository = GithubRepository(owner="owner", name="repo")
+
+    def tearDown(self) -> None:
+        self.connection_pool.close()
+        self.server.stop()
+
+    def test_head_is_resolved_to_commit_of_default_branch(self) -> None:
+        self.assertEqual(
+            self.resolve("HEAD"), "9ce3bcc3610ffeb36f53bc690682f48c8d311764"
+        )
+
+    def test_branch_is_resolved(self) -> None:
+        self.assertEqual(
+            self.resolve("master"), "9ce3bcc3610ffeb36f53bc690682f48c8d311764"
+        )
+
+    def test_annotated_tag_is_resolved_to_peeled_commit(self) -> None:
+        self.assertEqual(
+            self.resolve("refs/tags/v1"), "cffdbcb3351f500b5ca8867a65261443b576b215"
+        )
+        self.assertEqual(self.resolve("v1"), "ac17b18f3ba68bcea84b563523dfe82729e49aa8")
+
+    def test_server_is_asked_for_requested_refs_only(self) -> None:
+        self.resolve("master")
+        self.assertIn("refs/heads/master", self.server.requested_ref_prefixes)
+        self.assertNotIn("refs/pull/", self.server.requested_ref_prefixes)
+
+    def test_result_equals_parsed_ls_remote_output(self) -> None:
+        for name in ["HEAD", "v1", "light", "unknown"]:
+            with self.subTest(name=name):
+                list_remote = self.factory.get_list_remote(
+                    self.repository, get_ref_patterns(name)
+                )
+                expected = ListRemote.from_git_ls_remote_output(
+                    "\n".join(
+                        line
+                        for line in RECORDED_REFS.splitlines()
+                        if matches_ls_remote_patterns(line, get_ref_patterns(name))
+                    )
+                )
+                assert list_remote
+                self.assertListRemoteEqual(list_remote, expected)
+
+    def test_names_resolve_like_with_git_ls_remote(self) -> None:
+        # git ls-remote also lists refs like refs/heads/feature/master
+        # for the name master. Those are never consulted to resolve a
+        # name and are not requested from the server.
+        for name in ["HEAD", "master", "v1", "refs/tags/v1", "light", "unknown"]:
+            with self.subTest(name=name):
+                output = subprocess.run(
+                    [
+                        "git",
+                        "-c",
+                        "protocol.version=2",
+                        "ls-remote",
+                        "--symref",
+                        f"{self.server.url}/owner/repo.git",
+                    ]
+                    + get_ref_patterns(name),
+                    capture_output=True,
+                    check=True,
+                    text=True,
+                ).stdout
+                self.assertEqual(
+                    self.resolve(name),
+                    RevisionIndexImpl(
+                        ListRemote.from_git_ls_remote_output(output)
+                    ).get_revision_by_name(name),
+                )
+
+    def test_wildcard_patterns_list_all_matching_refs(self) -> None:
+        list_remote = self.factory.get_list_remote(self.repository, ["refs/tags/*"])
+        assert list_remote
+        self.assertEqual(list(list_remote.tags), ["light", "v1", "v1^{}"])
+        self.assertEqual(len(list_remote.heads), 0)
+        self.assertIn("refs/tags/", self.server.requested_ref_prefixes)
+
+    def test_connection_is_reused_for_multiple_repositories(self) -> None:
+        self.resolve("HEAD")
+        self.resolve("HEAD", GithubRepository(owner="owner", name="other"))
+        self.assertEqual(len(self.server.client_addresses), 1)
+
+    @parameterized.expand([(401,), (403,), (404,)])
+    def test_fallback_is_used_for_repositories_that_require_credentials(
+        self, status: int
+    ) -> None:
+        self.server.known_repositories = set()
+        self.server.unknown_repository_status = status
+        self.assertIs(
+            self.factory.get_list_remote(self.repository, get_ref_patterns("HEAD")),
+            self.fallback_factory.list_remote,
+        )
+        self.assertEqual(self.fallback_factory.calls, 1)
+
+    def test_fallback_is_used_for_servers_without_protocol_version_2(self) -> None:
+        self.server.supports_protocol_version_2 = False
+        self.assertIs(
+            self.factory.get_list_remote(self.repository, get_ref_patterns("HEAD")),
+            self.fallback_factory.list_remote,
+        )
+
+    def test_fallback_is_used_when_server_is_unreachable(self) -> None:
+        self.server.stop()
+        self.assertIs(
+            self.factory.get_list_remote(self.repository, get_ref_patterns("HEAD")),
+            self.fallback_factory.list_remote,
+        )
+
+    def test_fallback_is_used_when_a_proxy_is_configured(self) -> None:
+        self.factory.proxies = {"http": "http://proxy.example:3128"}
+        self.assertIs(
+            self.factory.get_list_remote(self.repository, get_ref_patterns("HEAD")),
+            self.fallback_factory.list_remote,
+        )
+        self.assertFalse(self.server.client_addresses)
+
+    def test_proxy_is_ignored_for_excluded_hosts(self) -> None:
+        self.factory.proxies = {
+            "http": "http://proxy.example:3128",
+            "no": "127.0.0.1",
+        }
+        self.assertEqual(
+            self.resolve("HEAD"), "9ce3bcc3610ffeb36f53bc690682f48c8d311764"
+        )
+
+    def resolve(
+        self, name: str, repository: Optional[GithubRepository] = None
+    ) -> Optional[str]:
+        list_remote = self.factory.get_list_remote(
+            repository or self.repository, get_ref_patterns(name)
+        )
+        assert list_remote
+        return RevisionIndexImpl(list_remote).get_revision_by_name(name)
+
+    def assertListRemoteEqual(self, actual: ListRemote, expected: ListRemote) -> None:
+        self.assertEqual(actual.symrefs, expected.symrefs)
+        self.assertEqual(actual.heads, expected.heads)
+        self.assertEqual(actual.tags, expected.tags)
+
+
+def matches_ls_remote_patterns(line: str, patterns: List[str]) -> bool:
+    ref_name = line.split("\t")[-1]
+    return any(
+        ("/" + ref_name).endswith("/" + pattern) or ref_name == pattern
+        for pattern in patterns
+    )
+
+
+class FakeListRemoteFactory:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.list_remote = ListRemote()
+
+    def get_list_remote(
+        self, repository: GithubRepository, ref_patterns: List[str]
+    ) -> Optional[ListRemote]:
+        self.calls += 1
+        return self.list_remote
+
+
+class FakeGitServer:
+    # Speaks just enough of git's smart HTTP protocol to answer
+    # ls-refs requests from the given `git ls-remote --symref` output.
+    def __init__(self, ls_remote_output: str) -> None:
+        self.refs: Dict[str, Tuple[str, List[str]]] = dict()
+        for line in ls_remote_output.splitlines():
+            value, ref_name = line.split("\t")
+            if value.startswith("ref: "):
+                self.refs.setdefault(ref_name, ("", []))[1].append(
+                    "symref-target:" + value.removeprefix("ref: ")
+                )
+            elif ref_name.endswith("^{}"):
+                self.refs[ref_name[:-3]][1].append("peeled:" + value)
+            else:
+                attributes = self.refs.get(ref_name, ("", []))[1]
+                self.refs[ref_name] = (value, attributes)
+        self.known_repositories = {"/owner/repo.git", "/owner/other.git"}
+        self.supports_protocol_version_2 = True
+        self.unknown_repository_status = 404
+        self.requested_ref_prefixes: List[str] = []
+        self.client_addresses: Set[Tuple[str, int]] = set()
+        self.http_server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.url = f"http://127.0.0.1:{self.http_server.server_address[1]}"
+        self.thread = threading.Thread(
+            target=self.http_server.serve_forever, kwargs=dict(poll_interval=0.01)
+        )
+        self.is_running = False
+
+    def start(self) -> None:
+        self.thread.start()
+        self.is_running = True
+
+    def stop(self) -> None:
+        if self.is_running:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+            self.thread.join()
+            self.is_running = False
+
+    def list_refs(self, request: bytes) -> bytes:
+        arguments = [packet.decode().rstrip("\n") for packet in decode_packets(request)]
+        prefixes = [
+            argument.removeprefix("ref-prefix ")
+            for argument in arguments
+            if argument.startswith("ref-prefix ")
+        ]
+        self.requested_ref_prefixes += prefixes
+        response = b""
+        for ref_name, (object_id, attributes) in sorted(self.refs.items()):
+            if prefixes and not any(ref_name.startswith(p) for p in prefixes):
+                continue
+            if "symrefs" not in arguments:
+                attributes = [a for a in attributes if not a.startswith("symref")]
+            if "peel" not in arguments:
+                attributes = [a for a in attributes if not a.startswith("peeled")]
+            response += encode_packet(
+                " ".join([object_id, ref_name] + attributes) + "\n"
+            )
+        return response + b"0000"
+
+    def _handler_class(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                server.client_addresses.add(self.client_address)
+                path, _, query = self.path.partition("?")
+                repository = path.removesuffix("/info/refs")
+                if repository not in server.known_repositories:
+                    self.respond(
+                        server.unknown_repository_status, "text/plain", b"not found"
+                    )
+                elif (
+                    server.supports_protocol_version_2
+                    and "version=2" in self.headers.get("Git-Protocol", "")
+                ):
+                    self.respond(
+                        200,
+                        "application/x-git-upload-pack-advertisement",
+                        b"".join(
+                            encode_packet(line)
+                            for line in [
+                                "version 2\n",
+                                "agent=git/fake\n",
+                                "ls-refs=unborn\n",
+                                "fetch=shallow\n",
+                                "object-format=sha1\n",
+                            ]
+                        )
+                        + b"0000",
+                    )
+                else:
+                    self.respond(
+                        200,
+                        "application/x-git-upload-pack-advertisement",
+                        encode_packet("# service=git-upload-pack\n")
+                        + b"0000"
+                        + encode_packet(
+                            "9ce3bcc3610ffeb36f53bc690682f48c8d311764 HEAD\0\n"
+                        )
+                        + b"0000",
+                    )
+
+            def do_POST(self) -> None:
+                server.client_addresses.add(self.client_address)
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                self.respond(
+                    200, "application/x-git-upload-pack-result", server.list_refs(body)
+                )
+
+            def respond(self, status: int, content_type: str, body: bytes) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        return Handler
+
+
+def encode_packet(line: str) -> bytes:
+    data = line.encode()
+    return f"{len(data) + 4:04x}".encode() + data
+
+
+def decode_packets(body: bytes) -> List[bytes]:
+    packets = []
+    while body:
+        length = int(body[:4], 16)
+        if length < 4:
+            body = body[4:]
+            continue
+        packets.append(body[4:length])
+        body = body[length:]
+    return packets
@@ -0,0 +1,92 @@
+import json
+import os
+from tempfile import TemporaryDirectory
+from typing import Optional
+from unittest import TestCase
+
+from nix_prefetch_github.interfaces import (
+    GithubRepository,
+    LockedRepository,
+    PrefetchedRepository,
+    PrefetchOptions,
+)
+from nix_prefetch_github.lockfile import JsonLockfileStore, LockfileError
+
+
+class JsonLockfileStoreTests(TestCase):
+    def setUp(self) -> None:
+        self.directory = TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "nix-prefetch-github.lock")
+        self.store = JsonLockfileStore()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_that_missing_lockfile_is_read_as_none(self) -> None:
+        self.assertIsNone(self.store.read_lockfile(self.path))
+
+    def test_that_written_entries_can_be_read(self) -> None:
+        entries = [
+            self.make_entry(name="a", ref="main"),
+            self.make_entry(name="b", ref=None, fetch_submodules=True),
+        ]
+        self.store.write_lockfile(self.path, entries)
+        self.assertEqual(self.store.read_lockfile(self.path), entries)
+
+    def test_that_output_does_not_depend_on_order_of_entries(self) -> None:
+        entries = [self.make_entry(name=name) for name in ["c", "a", "b"]]
+        self.store.write_lockfile(self.path, entries)
+        first_output = self.read_file()
+        self.store.write_lockfile(self.path, list(reversed(entries)))
+        self.assertEqual(self.read_file(), first_output)
+        self.assertEqual(
+            [entry["repo"] for entry in json.loads(first_output)["repositories"]],
+            ["a", "b", "c"],
+        )
+
+    def test_that_no_temporary_files_are_left_behind(self) -> None:
+        self.store.write_lockfile(self.path, [self.make_entry()])
+        self.assertEqual(os.listdir(self.directory.name), ["nix-prefetch-github.lock"])
+
+    def test_that_invalid_json_is_rejected(self) -> None:
+        self.write_file("{")
+        with self.assertRaises(LockfileError):
+            self.store.read_lockfile(self.path)
+
+    def test_that_unknown_version_is_rejected(self) -> None:
+        self.write_file('{"version": 2, "repositories": []}')
+        with self.assertRaises(LockfileError):
+            self.store.read_lockfile(self.path)
+
+    def test_that_entries_without_hash_are_rejected(self) -> None:
+        self.store.write_lockfile(self.path, [self.make_entry()])
+        document = json.loads(self.read_file())
+        del document["repositories"][0]["hash"]
+        self.write_file(json.dumps(document))
+        with self.assertRaises(LockfileError):
+            self.store.read_lockfile(self.path)
+
+    def make_entry(
+        self,
+        name: str = "repo",
+        ref: Optional[str] = "main",
+        fetch_submodules: bool = False,
+    ) -> LockedRepository:
+        return LockedRepository(
+            ref=ref,
+            prefetched_repository=PrefetchedRepository(
+                repository=GithubRepository(owner="owner", name=name),
+                rev="1" * 40,
+                hash_sum="sha256-test",
+                options=PrefetchOptions(fetch_submodules=fetch_submodules),
+                store_path="/nix/store/test-source",
+            ),
+        )
+
+    def read_file(self) -> str:
+        with open(self.path) as handle:
+            return handle.read()
+
+    def write_file(self, content: str) -> None:
+        with open(self.path, "w") as handle:
+            handle.write(content)
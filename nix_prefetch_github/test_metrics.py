@@ -0,0 +1,124 @@
+import logging
+import os
+import tempfile
+import threading
+from unittest import TestCase
+
+from nix_prefetch_github.metrics import (
+    MetricsConfiguration,
+    MetricsFileWriter,
+    MetricsRegistryImpl,
+)
+
+
+class MetricsRegistryTests(TestCase):
+    def setUp(self) -> None:
+        self.registry = MetricsRegistryImpl()
+
+    def test_nothing_is_rendered_without_metrics(self) -> None:
+        self.assertEqual(self.registry.render(), "")
+
+    def test_counters_are_summed_up_per_labels(self) -> None:
+        self.registry.increment_counter("prefetches_total", result="success")
+        self.registry.increment_counter("prefetches_total", result="success")
+        self.registry.increment_counter("prefetches_total", result="failure")
+        self.assertEqual(
+            self.registry.render(),
+            "# HELP nix_prefetch_github_prefetches_total Number of prefetched repositories by result.\n"
+            "# TYPE nix_prefetch_github_prefetches_total counter\n"
+            'nix_prefetch_github_prefetches_total{result="failure"} 1\n'
+            'nix_prefetch_github_prefetches_total{result="success"} 2\n',
+        )
+
+    def test_gauge_is_set_to_last_value(self) -> None:
+        self.registry.set_gauge("github_api_rate_limit_remaining", 10)
+        self.registry.set_gauge("github_api_rate_limit_remaining", 9)
+        self.assertIn(
+            "nix_prefetch_github_github_api_rate_limit_remaining 9\n",
+            self.registry.render(),
+        )
+
+    def test_histogram_buckets_are_cumulative(self) -> None:
+        self.registry.observe("command_duration_seconds", 0.3, command="git")
+        self.registry.observe("command_duration_seconds", 400, command="git")
+        rendered = self.registry.render()
+        self.assertIn(
+            "# TYPE nix_prefetch_github_command_duration_seconds histogram\n", rendered
+        )
+        for line in [
+            'nix_prefetch_github_command_duration_seconds_bucket{command="git",le="0.25"} 0\n',
+            'nix_prefetch_github_command_duration_seconds_bucket{command="git",le="0.5"} 1\n',
+            'nix_prefetch_github_command_duration_seconds_bucket{command="git",le="300"} 1\n',
+            'nix_prefetch_github_command_duration_seconds_bucket{command="git",le="+Inf"} 2\n',
+            'nix_prefetch_github_command_duration_seconds_sum{command="git"} 400.3\n',
+            'nix_prefetch_github_command_duration_seconds_count{command="git"} 2\n',
+        ]:
+            self.assertIn(line, rendered)
+
+    def test_metrics_are_recorded_in_parent_registry(self) -> None:
+        parent = MetricsRegistryImpl()
+        registry = MetricsRegistryImpl(parent=parent)
+        registry.increment_counter("prefetches_total", result="success")
+        registry.set_gauge("github_api_rate_limit_remaining", 9)
+        registry.observe("command_duration_seconds", 0.3, command="git")
+        self.assertEqual(registry.render(), parent.render())
+
+    def test_label_values_are_escaped(self) -> None:
+        self.registry.increment_counter("commands_total", command='a "b"\\c')
+        self.assertIn(
+            'nix_prefetch_github_commands_total{command="a \\"b\\"\\\\c"} 1\n',
+            self.registry.render(),
+        )
+
+
+class MetricsFileWriterTests(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.metrics_file = os.path.join(self.directory.name, "metrics.prom")
+        self.registry = MetricsRegistryImpl()
+        self.writer = MetricsFileWriter(
+            registry=self.registry, logger=logging.getLogger(__name__)
+        )
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_nothing_is_written_without_metrics_file(self) -> None:
+        with self.writer.record_metrics(MetricsConfiguration()):
+            self.registry.increment_counter("prefetches_total")
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_metrics_are_written_at_exit(self) -> None:
+        with self.assertRaises(SystemExit):
+            with self.writer.record_metrics(
+                MetricsConfiguration(metrics_file=self.metrics_file)
+            ):
+                self.registry.increment_counter("prefetches_total")
+                raise SystemExit(0)
+        with open(self.metrics_file) as f:
+            self.assertIn("nix_prefetch_github_prefetches_total 1\n", f.read())
+        self.assertEqual(os.listdir(self.directory.name), ["metrics.prom"])
+
+    def test_metrics_are_written_periodically(self) -> None:
+        written = threading.Event()
+        write_metrics = self.writer.write_metrics
+
+        def write_and_notify(metrics_file: str) -> None:
+            write_metrics(metrics_file)
+            written.set()
+
+        self.writer.write_metrics = write_and_notify  # type: ignore
+        with self.writer.record_metrics(
+            MetricsConfiguration(metrics_file=self.metrics_file, interval=0.01)
+        ):
+            self.registry.increment_counter("prefetches_total")
+            self.assertTrue(written.wait(timeout=5))
+            self.assertTrue(os.path.exists(self.metrics_file))
+
+    def test_failure_to_write_is_logged(self) -> None:
+        metrics_file = os.path.join(self.directory.name, "missing", "metrics.prom")
+        with self.assertLogs(__name__, level="WARNING"):
+            with self.writer.record_metrics(
+                MetricsConfiguration(metrics_file=metrics_file)
+            ):
+                pass
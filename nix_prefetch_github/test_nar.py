@@ -0,0 +1,218 @@
+import hashlib
+import io
+import os
+import random
+import struct
+import tarfile
+from tempfile import TemporaryDirectory
+from typing import Callable, List
+from unittest import TestCase
+
+from parameterized import parameterized
+
+from nix_prefetch_github.hash import decode_sha256_digest
+from nix_prefetch_github.nar import (
+    UnsupportedArchive,
+    hash_tar_archive,
+    make_fixed_output_store_path,
+)
+
+
+def git_order(directory: str) -> List[str]:
+    def sort_key(name: str) -> str:
+        path = os.path.join(directory, name)
+        if os.path.isdir(path) and not os.path.islink(path):
+            return name + "/"
+        return name
+
+    return sorted(os.listdir(directory), key=sort_key)
+
+
+class HashTarArchiveTests(TestCase):
+    def setUp(self) -> None:
+        self.temporary_directory = TemporaryDirectory()
+        self.tree = os.path.join(self.temporary_directory.name, "repo-1234")
+        os.mkdir(self.tree)
+
+    def tearDown(self) -> None:
+        self.temporary_directory.cleanup()
+
+    def test_hash_of_flat_directory_matches_nar_serialization(self) -> None:
+        self.create_file("README.md", b"hello world\n")
+        self.create_file("setup.py", b"")
+        self.assertHashMatchesTree()
+
+    def test_executable_bit_is_respected(self) -> None:
+        self.create_file("run.sh", b"#!/bin/sh\n", mode=0o755)
+        self.create_file("data", b"1234", mode=0o644)
+        self.assertHashMatchesTree()
+
+    def test_symlinks_are_respected(self) -> None:
+        self.create_file("target", b"content")
+        os.symlink("target", os.path.join(self.tree, "link"))
+        os.symlink("does/not/exist", os.path.join(self.tree, "dangling"))
+        self.assertHashMatchesTree()
+
+    def test_nested_and_empty_directories_are_respected(self) -> None:
+        self.create_file("src/package/__init__.py", b"")
+        self.create_file("src/package/module.py", b"x = 1\n")
+        self.create_directory("src/empty")
+        self.create_file("tests/test_module.py", b"assert True\n")
+        self.assertHashMatchesTree()
+
+    def test_entries_that_sort_differently_in_git_and_nar_are_reordered(
+        self,
+    ) -> None:
+        self.create_file("foo/bar", b"1")
+        self.create_file("foo-bar", b"2")
+        self.create_file("foo.txt", b"3")
+        self.create_file("foo-dir/nested/file", b"4")
+        self.create_file("foo0", b"5")
+        self.create_file("fo", b"6")
+        self.create_file("foo!/x", b"7")
+        self.create_file("fooa", b"8")
+        self.assertHashMatchesTree()
+
+    def test_large_files_are_hashed_correctly(self) -> None:
+        self.create_file("large", random.Random(0).randbytes(300 * 1024 + 3))
+        self.assertHashMatchesTree()
+
+    @parameterized.expand([(seed,) for seed in range(20)])
+    def test_hash_of_random_trees_matches_nar_serialization(self, seed: int) -> None:
+        generator = random.Random(seed)
+        self.create_random_tree(generator, self.tree, depth=3)
+        self.assertHashMatchesTree()
+
+    def test_archives_not_in_git_order_are_rejected(self) -> None:
+        self.create_file("a", b"")
+        self.create_file("b", b"")
+        archive = self.create_archive(
+            ordering=lambda directory: sorted(os.listdir(directory), reverse=True)
+        )
+        with self.assertRaises(UnsupportedArchive):
+            hash_tar_archive(archive)
+
+    def test_archives_with_multiple_top_level_entries_are_rejected(self) -> None:
+        self.create_file("a", b"")
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode="w:gz") as tar:
+            tar.add(self.tree, arcname="first")
+            tar.add(self.tree, arcname="second")
+        archive.seek(0)
+        with self.assertRaises(UnsupportedArchive):
+            hash_tar_archive(archive)
+
+    def test_invalid_archives_are_rejected(self) -> None:
+        with self.assertRaises(UnsupportedArchive):
+            hash_tar_archive(io.BytesIO(b"this is not an archive"))
+
+    def test_nar_size_is_reported(self) -> None:
+        self.create_file("file", b"content")
+        nar_hash = hash_tar_archive(self.create_archive())
+        self.assertEqual(nar_hash.nar_size, len(serialize_path(self.tree)))
+
+    def create_file(self, path: str, content: bytes, mode: int = 0o644) -> None:
+        full_path = os.path.join(self.tree, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb") as f:
+            f.write(content)
+        os.chmod(full_path, mode)
+
+    def create_directory(self, path: str) -> None:
+        os.makedirs(os.path.join(self.tree, path))
+
+    def create_random_tree(
+        self, generator: random.Random, directory: str, depth: int
+    ) -> None:
+        names = {
+            "".join(generator.choice("ab-.0_") for _ in range(generator.randint(1, 3)))
+            for _ in range(generator.randint(1, 6))
+        } - {".", ".."}
+        for name in names:
+            path = os.path.join(directory, name)
+            if depth and generator.random() < 0.4:
+                os.mkdir(path)
+                self.create_random_tree(generator, path, depth - 1)
+            else:
+                with open(path, "wb") as f:
+                    f.write(name.encode() * generator.randint(0, 3))
+                if generator.random() < 0.3:
+                    os.chmod(path, 0o755)
+
+    def create_archive(
+        self, ordering: Callable[[str], List[str]] = git_order
+    ) -> io.BytesIO:
+        # GitHub's archives are created by git archive which lists the
+        # entries of every directory in git's tree order.
+        archive = io.BytesIO()
+        with tarfile.open(
+            fileobj=archive, mode="w:gz", format=tarfile.PAX_FORMAT
+        ) as tar:
+            self.add_to_archive(tar, self.tree, "repo-1234", ordering)
+        archive.seek(0)
+        return archive
+
+    def add_to_archive(
+        self,
+        tar: tarfile.TarFile,
+        path: str,
+        name: str,
+        ordering: Callable[[str], List[str]],
+    ) -> None:
+        tar.add(path, arcname=name, recursive=False)
+        if os.path.isdir(path) and not os.path.islink(path):
+            for entry in ordering(path):
+                self.add_to_archive(
+                    tar, os.path.join(path, entry), f"{name}/{entry}", ordering
+                )
+
+    def assertHashMatchesTree(self) -> None:
+        nar_hash = hash_tar_archive(self.create_archive())
+        self.assertEqual(
+            nar_hash.digest, hashlib.sha256(serialize_path(self.tree)).digest()
+        )
+
+
+class MakeFixedOutputStorePathTests(TestCase):
+    def test_store_path_matches_the_one_from_nix_prefetch_url(self) -> None:
+        digest = decode_sha256_digest("JFC1+y+FMs2TwWjJxlAKAyDbSLFBE9J65myp7+slp50=")
+        assert digest
+        self.assertEqual(
+            make_fixed_output_store_path(
+                "9578399cadb1cb2b252438cf14663333e8c3ee00.tar.gz", digest
+            ),
+            "/nix/store/6wv3zc015amj7mc9krffskj447xyajf6-9578399cadb1cb2b252438cf14663333e8c3ee00.tar.gz",
+        )
+
+
+def serialize_path(path: str) -> bytes:
+    return nar_string(b"nix-archive-1") + serialize_node(path)
+
+
+def serialize_node(path: str) -> bytes:
+    if os.path.islink(path):
+        return nar_strings(
+            b"(", b"type", b"symlink", b"target", os.fsencode(os.readlink(path)), b")"
+        )
+    elif os.path.isdir(path):
+        serialization = nar_strings(b"(", b"type", b"directory")
+        for name in sorted(os.listdir(os.fsencode(path))):
+            serialization += nar_strings(b"entry", b"(", b"name", name, b"node")
+            serialization += serialize_node(os.path.join(path, os.fsdecode(name)))
+            serialization += nar_string(b")")
+        return serialization + nar_string(b")")
+    else:
+        serialization = nar_strings(b"(", b"type", b"regular")
+        if os.stat(path).st_mode & 0o100:
+            serialization += nar_strings(b"executable", b"")
+        with open(path, "rb") as f:
+            serialization += nar_strings(b"contents", f.read(), b")")
+        return serialization
+
+
+def nar_strings(*strings: bytes) -> bytes:
+    return b"".join(nar_string(string) for string in strings)
+
+
+def nar_string(string: bytes) -> bytes:
+    return struct.pack("<Q", len(string)) + string + b"\0" * (-len(string) % 8)
@@ -0,0 +1,142 @@
+from unittest import TestCase
+
+from nix_prefetch_github.interfaces import GithubRepository, PrefetchOptions
+from nix_prefetch_github.nix_source import find_fetch_from_github_calls
+
+EXAMPLE = b"""{ lib, stdenv, fetchFromGitHub }:
+stdenv.mkDerivation rec {
+  pname = "example";
+  version = "1.0";
+  src = fetchFromGitHub {
+    owner = "seppeljordan";
+    repo = "nix-prefetch-github";
+    rev = "v${version}"; # the release
+    hash = "sha256-Lxl0D9HaTSWr6E1f0zG9rHdS5vL2a8iVz5nQ6u4VSqI=";
+    fetchSubmodules = true;
+    postFetch = ''
+      echo "}" ${lib.escapeShellArg "{"}
+    '';
+  };
+}
+"""
+
+
+class FindFetchFromGithubCallsTests(TestCase):
+    def test_that_files_without_calls_have_no_calls(self) -> None:
+        self.assertEqual(find_fetch_from_github_calls(b"{ a = 1; }"), [])
+
+    def test_that_function_arguments_are_not_calls(self) -> None:
+        self.assertEqual(
+            find_fetch_from_github_calls(b"{ fetchFromGitHub, lib }: { }"), []
+        )
+
+    def test_that_call_is_found_with_line_number(self) -> None:
+        calls = find_fetch_from_github_calls(EXAMPLE)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0].line, 5)
+
+    def test_that_repository_is_read_from_call(self) -> None:
+        (call,) = find_fetch_from_github_calls(EXAMPLE)
+        self.assertEqual(
+            call.repository(),
+            GithubRepository(owner="seppeljordan", name="nix-prefetch-github"),
+        )
+
+    def test_that_interpolated_strings_are_expressions(self) -> None:
+        (call,) = find_fetch_from_github_calls(EXAMPLE)
+        self.assertNotIn("rev", call.strings)
+        self.assertEqual(call.expressions["rev"], '"v${version}"')
+
+    def test_that_string_offsets_point_to_string_contents(self) -> None:
+        (call,) = find_fetch_from_github_calls(EXAMPLE)
+        start = call.strings["hash"].start
+        end = call.strings["hash"].end
+        self.assertEqual(EXAMPLE[start:end].decode(), call.strings["hash"].value)
+
+    def test_that_boolean_options_are_read(self) -> None:
+        (call,) = find_fetch_from_github_calls(EXAMPLE)
+        self.assertEqual(
+            call.prefetch_options(), PrefetchOptions(fetch_submodules=True)
+        )
+
+    def test_that_non_literal_options_yield_no_prefetch_options(self) -> None:
+        (call,) = find_fetch_from_github_calls(
+            b'fetchFromGitHub { owner = "a"; repo = "b"; deepClone = !x; }'
+        )
+        self.assertIsNone(call.prefetch_options())
+
+    def test_that_inherited_attributes_are_expressions(self) -> None:
+        (call,) = find_fetch_from_github_calls(
+            b'fetchFromGitHub { inherit (src) owner repo; rev = "a"; }'
+        )
+        self.assertIsNone(call.repository())
+        self.assertIn("owner", call.expressions)
+        self.assertIn("repo", call.expressions)
+
+    def test_that_sha256_is_recognized_as_hash_attribute(self) -> None:
+        (call,) = find_fetch_from_github_calls(
+            b'pkgs.fetchFromGitHub rec { owner = "a"; repo = "b"; sha256 = "c"; }'
+        )
+        self.assertEqual(call.hash_attribute, "sha256")
+
+    def test_that_commented_calls_are_ignored(self) -> None:
+        self.assertEqual(
+            find_fetch_from_github_calls(b'# fetchFromGitHub { owner = "a"; }\n'), []
+        )
+
+    def test_that_number_sign_in_string_does_not_start_comment(self) -> None:
+        (call,) = find_fetch_from_github_calls(
+            b'url = "https://x/#a"; src = fetchFromGitHub { owner = "a"; };\n'
+        )
+        self.assertEqual(call.strings["owner"].value, "a")
+
+    def test_that_calls_after_comment_on_same_line_are_ignored(self) -> None:
+        self.assertEqual(
+            find_fetch_from_github_calls(
+                b'url = "https://x/"; # fetchFromGitHub { owner = "a"; }\n'
+            ),
+            [],
+        )
+
+    def test_that_calls_inside_strings_are_ignored(self) -> None:
+        self.assertEqual(
+            find_fetch_from_github_calls(b'x = "fetchFromGitHub { owner = a; }";'), []
+        )
+
+    def test_that_calls_inside_multi_line_comments_are_ignored(self) -> None:
+        self.assertEqual(
+            find_fetch_from_github_calls(
+                b'/* old source:\n  src = fetchFromGitHub { owner = "a"; };\n*/\n'
+            ),
+            [],
+        )
+
+    def test_that_calls_inside_multi_line_indented_strings_are_ignored(
+        self,
+    ) -> None:
+        self.assertEqual(
+            find_fetch_from_github_calls(
+                b"x = ''\n  src = fetchFromGitHub { owner = \"a\"; };\n'';\n"
+            ),
+            [],
+        )
+
+    def test_that_escaped_interpolation_does_not_hide_following_calls(
+        self,
+    ) -> None:
+        (call,) = find_fetch_from_github_calls(
+            b'x = "$${"; src = fetchFromGitHub { owner = "a"; };\n'
+        )
+        self.assertEqual(call.strings["owner"].value, "a")
+
+    def test_that_multiple_calls_are_found(self) -> None:
+        calls = find_fetch_from_github_calls(
+            b'[\n(fetchFromGitHub { repo = "a"; })\n(fetchFromGitHub { repo = "b"; })\n]'
+        )
+        self.assertEqual([call.strings["repo"].value for call in calls], ["a", "b"])
+        self.assertEqual([call.line for call in calls], [2, 3])
+
+    def test_that_unterminated_calls_are_ignored(self) -> None:
+        self.assertEqual(
+            find_fetch_from_github_calls(b'fetchFromGitHub { owner = "a'), []
+        )
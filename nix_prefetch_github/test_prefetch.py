@@ -1,9 +1,15 @@
+import asyncio
 from typing import Callable, Optional, cast
 from unittest import TestCase
 
-from nix_prefetch_github.interfaces import GithubRepository, PrefetchOptions
+from nix_prefetch_github.interfaces import (
+    GithubRepository,
+    PrefetchedRessource,
+    PrefetchOptions,
+)
 from nix_prefetch_github.list_remote import ListRemote
 from nix_prefetch_github.prefetch import (
+    AsyncPrefetcherImpl,
     PrefetchedRepository,
     PrefetcherImpl,
     PrefetchFailure,
@@ -52,6 +58,16 @@ class PrefetcherTests(TestCase):
             lambda f: f.reason == PrefetchFailure.Reason.unable_to_calculate_hash_sum,
         )
 
+    def test_hashing_that_does_not_finish_before_the_deadline_fails(self) -> None:
+        def time_out(*args: object, **kwargs: object) -> None:
+            raise TimeoutError()
+
+        self.url_hasher.calculate_hash_sum = time_out  # type: ignore
+        self.assertFailure(
+            self.prefetch_repository(),
+            lambda f: f.reason == PrefetchFailure.Reason.unable_to_calculate_hash_sum,
+        )
+
     def test_can_prefetch_revision_by_its_sha1_id(self) -> None:
         expected_revision = "4840fbf9ebd246d334c11335fc85747013230b05"
         self.assertSuccess(
@@ -101,3 +117,46 @@ class PrefetcherTests(TestCase):
         options: PrefetchOptions = PrefetchOptions(),
     ) -> PrefetchResult:
         return self.prefetcher.prefetch_github(self.repository, revision, options)
+
+
+class AsyncPrefetcherTests(PrefetcherTests):
+    def setUp(self) -> None:
+        super().setUp()
+        self.async_prefetcher = AsyncPrefetcherImpl(
+            AsyncUrlHasherAdapter(self.url_hasher),
+            AsyncRevisionIndexFactoryAdapter(self.revision_index_factory),
+        )
+
+    def prefetch_repository(
+        self,
+        revision: Optional[str] = None,
+        options: PrefetchOptions = PrefetchOptions(),
+    ) -> PrefetchResult:
+        return asyncio.run(
+            self.async_prefetcher.prefetch_github(self.repository, revision, options)
+        )
+
+
+class AsyncUrlHasherAdapter:
+    def __init__(self, url_hasher: FakeUrlHasher) -> None:
+        self.url_hasher = url_hasher
+
+    async def calculate_hash_sum(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+    ) -> Optional[PrefetchedRessource]:
+        return self.url_hasher.calculate_hash_sum(
+            repository, revision, prefetch_options
+        )
+
+
+class AsyncRevisionIndexFactoryAdapter:
+    def __init__(self, revision_index_factory: FakeRevisionIndexFactory) -> None:
+        self.revision_index_factory = revision_index_factory
+
+    async def get_revision_index(
+        self, repository: GithubRepository, name: str
+    ) -> Optional[RevisionIndexImpl]:
+        return self.revision_index_factory.get_revision_index(repository, name)
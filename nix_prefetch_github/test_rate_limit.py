@@ -0,0 +1,114 @@
+import logging
+from typing import Dict, List
+from unittest import TestCase
+
+from nix_prefetch_github.http_pool import HttpResponse
+from nix_prefetch_github.rate_limit import GithubRateLimiter
+
+
+class GithubRateLimiterTests(TestCase):
+    def setUp(self) -> None:
+        self.time = 1000.0
+        self.sleeps: List[float] = []
+        self.rate_limiter = GithubRateLimiter(
+            logger=logging.getLogger(__name__),
+            clock=lambda: self.time,
+            sleep=self.sleep,
+        )
+
+    def test_requests_are_not_delayed_without_known_quota(self) -> None:
+        self.rate_limiter.acquire()
+        self.rate_limiter.acquire()
+        self.assertEqual(self.sleeps, [])
+
+    def test_requests_wait_for_reset_when_quota_is_exhausted(self) -> None:
+        self.update(remaining=1, reset_at=1100)
+        self.rate_limiter.acquire()
+        self.rate_limiter.acquire()
+        self.assertEqual(self.sleeps, [100])
+
+    def test_quota_is_unknown_after_reset(self) -> None:
+        self.update(remaining=0, reset_at=1100)
+        self.time = 1100
+        self.rate_limiter.acquire()
+        self.assertEqual(self.sleeps, [])
+
+    def test_planned_requests_within_quota_are_not_delayed(self) -> None:
+        self.update(remaining=10, reset_at=1100)
+        self.rate_limiter.plan_requests(10)
+        for _ in range(10):
+            self.rate_limiter.acquire()
+        self.assertEqual(self.sleeps, [])
+
+    def test_planned_requests_exceeding_quota_are_spread_until_reset(self) -> None:
+        self.update(remaining=4, reset_at=1100)
+        self.rate_limiter.plan_requests(8)
+        for _ in range(4):
+            self.rate_limiter.acquire()
+        self.assertEqual(self.sleeps, [25, 25, 25])
+
+    def test_rate_limited_response_pauses_for_retry_after(self) -> None:
+        should_retry = self.rate_limiter.update(
+            make_response(429, {"retry-after": "30"})
+        )
+        self.assertTrue(should_retry)
+        self.rate_limiter.acquire()
+        self.assertEqual(self.sleeps, [30])
+
+    def test_exhausted_quota_pauses_until_reset(self) -> None:
+        should_retry = self.rate_limiter.update(
+            make_response(
+                403,
+                {
+                    "x-ratelimit-limit": "60",
+                    "x-ratelimit-remaining": "0",
+                    "x-ratelimit-reset": "1500",
+                },
+            )
+        )
+        self.assertTrue(should_retry)
+        self.rate_limiter.acquire()
+        self.assertEqual(self.sleeps, [500])
+
+    def test_forbidden_response_without_rate_limit_is_not_retried(self) -> None:
+        self.assertFalse(self.rate_limiter.update(make_response(403, {})))
+
+    def test_only_requests_that_count_against_quota_are_counted(self) -> None:
+        self.rate_limiter.update(make_response(200, {}))
+        self.rate_limiter.update(make_response(304, {}))
+        self.rate_limiter.update(make_response(200, {}), is_counted=False)
+        self.assertEqual(self.rate_limiter.used_requests, 1)
+
+    def test_quota_of_other_resources_is_ignored(self) -> None:
+        self.rate_limiter.update(
+            make_response(
+                200,
+                {
+                    "x-ratelimit-resource": "graphql",
+                    "x-ratelimit-remaining": "0",
+                    "x-ratelimit-reset": "1100",
+                },
+            )
+        )
+        self.rate_limiter.acquire()
+        self.assertEqual(self.sleeps, [])
+
+    def update(self, remaining: int, reset_at: float) -> None:
+        self.rate_limiter.update(
+            make_response(
+                200,
+                {
+                    "x-ratelimit-limit": "60",
+                    "x-ratelimit-remaining": str(remaining),
+                    "x-ratelimit-reset": str(reset_at),
+                },
+            )
+        )
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.time += seconds
+
+
+def make_response(status: int, headers: Dict[str, str]) -> HttpResponse:
+    return HttpResponse(status=status, reason="", headers=headers, body=b"")
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+from typing import List, Optional
+from unittest import TestCase
+
+from nix_prefetch_github.retry import (
+    DeadlineExceeded,
+    RetryConfiguration,
+    RetryPolicyImpl,
+    is_transient_http_status,
+)
+
+
+class RetryPolicyTests(TestCase):
+    def setUp(self) -> None:
+        self.time = 1000.0
+        self.sleeps: List[float] = []
+        self.attempts = 0
+        self.retry_policy = RetryPolicyImpl(
+            logger=logging.getLogger(__name__),
+            configuration=RetryConfiguration(
+                retries=3, deadline=None, initial_delay=1, max_delay=30
+            ),
+            clock=lambda: self.time,
+            sleep=self.sleep,
+            random=lambda: 1.0,
+            sleep_async=self.sleep_async,
+        )
+
+    def test_successful_operation_is_run_once(self) -> None:
+        self.assertEqual(self.run_operation(failures=0), "result")
+        self.assertEqual(self.attempts, 1)
+        self.assertEqual(self.sleeps, [])
+
+    def test_transient_failures_are_retried_with_exponential_backoff(self) -> None:
+        self.assertEqual(self.run_operation(failures=3), "result")
+        self.assertEqual(self.attempts, 4)
+        self.assertEqual(self.sleeps, [1, 2, 4])
+
+    def test_last_result_is_returned_when_retries_are_exhausted(self) -> None:
+        self.assertEqual(self.run_operation(failures=10), "failure")
+        self.assertEqual(self.attempts, 4)
+
+    def test_delay_is_bounded_by_max_delay(self) -> None:
+        self.retry_policy.configuration.retries = 10
+        self.retry_policy.configuration.max_delay = 5
+        self.run_operation(failures=10)
+        self.assertEqual(max(self.sleeps), 5)
+
+    def test_delay_is_chosen_randomly_up_to_the_backoff(self) -> None:
+        self.retry_policy.random = lambda: 0.25
+        self.run_operation(failures=3)
+        self.assertEqual(self.sleeps, [0.25, 0.5, 1])
+
+    def test_operations_are_not_retried_without_retries(self) -> None:
+        self.retry_policy.set_retry_configuration(RetryConfiguration(retries=0))
+        self.assertEqual(self.run_operation(failures=1), "failure")
+        self.assertEqual(self.attempts, 1)
+
+    def test_transient_errors_are_retried(self) -> None:
+        def operation() -> str:
+            self.attempts += 1
+            if self.attempts < 3:
+                raise ConnectionResetError()
+            return "result"
+
+        self.assertEqual(
+            self.retry_policy.run(
+                "operation",
+                operation,
+                is_transient_error=lambda e: isinstance(e, OSError),
+            ),
+            "result",
+        )
+        self.assertEqual(self.attempts, 3)
+
+    def test_other_errors_are_raised_immediately(self) -> None:
+        def operation() -> str:
+            self.attempts += 1
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            self.retry_policy.run(
+                "operation",
+                operation,
+                is_transient_error=lambda e: isinstance(e, OSError),
+            )
+        self.assertEqual(self.attempts, 1)
+
+    def test_last_error_is_raised_when_retries_are_exhausted(self) -> None:
+        def operation() -> str:
+            self.attempts += 1
+            raise ConnectionResetError()
+
+        with self.assertRaises(ConnectionResetError):
+            self.retry_policy.run(
+                "operation",
+                operation,
+                is_transient_error=lambda e: isinstance(e, OSError),
+            )
+        self.assertEqual(self.attempts, 4)
+
+    def test_no_retry_is_started_that_would_end_after_the_deadline(self) -> None:
+        self.retry_policy.configuration.deadline = 2.5
+        with self.retry_policy.deadline():
+            self.assertEqual(self.run_operation(failures=10), "failure")
+        self.assertEqual(self.sleeps, [1])
+
+    def test_deadline_only_applies_within_its_context(self) -> None:
+        self.retry_policy.configuration.deadline = 2.5
+        with self.retry_policy.deadline():
+            pass
+        self.run_operation(failures=3)
+        self.assertEqual(self.sleeps, [1, 2, 4])
+
+    def test_nested_deadline_does_not_extend_outer_deadline(self) -> None:
+        self.retry_policy.configuration.deadline = 2.5
+        with self.retry_policy.deadline():
+            self.time += 2
+            with self.retry_policy.deadline():
+                self.run_operation(failures=10)
+        self.assertEqual(self.sleeps, [])
+
+    def test_remaining_time_is_counted_down_to_zero(self) -> None:
+        self.retry_policy.configuration.deadline = 2.5
+        self.assertIsNone(self.retry_policy.remaining_time())
+        with self.retry_policy.deadline():
+            self.time += 2
+            self.assertEqual(self.retry_policy.remaining_time(), 0.5)
+            self.time += 1
+            self.assertEqual(self.retry_policy.remaining_time(), 0)
+
+    def test_operations_are_not_started_after_the_deadline(self) -> None:
+        self.retry_policy.configuration.deadline = 2.5
+        with self.retry_policy.deadline():
+            self.time += 3
+            with self.assertLogs(__name__, level="ERROR"):
+                with self.assertRaises(DeadlineExceeded):
+                    self.run_operation(failures=0)
+        self.assertEqual(self.attempts, 0)
+
+    def test_coroutines_are_retried_without_blocking(self) -> None:
+        async def operation() -> str:
+            self.attempts += 1
+            return "failure" if self.attempts <= 2 else "result"
+
+        result = asyncio.run(
+            self.retry_policy.run_async(
+                "operation",
+                operation,
+                get_transient_failure=lambda result: (
+                    "operation failed" if result == "failure" else None
+                ),
+            )
+        )
+        self.assertEqual(result, "result")
+        self.assertEqual(self.sleeps, [1, 2])
+
+    def test_transient_errors_of_coroutines_are_retried(self) -> None:
+        async def operation() -> str:
+            self.attempts += 1
+            if self.attempts < 3:
+                raise ConnectionResetError()
+            return "result"
+
+        self.assertEqual(
+            asyncio.run(
+                self.retry_policy.run_async(
+                    "operation",
+                    operation,
+                    is_transient_error=lambda e: isinstance(e, OSError),
+                )
+            ),
+            "result",
+        )
+        self.assertEqual(self.attempts, 3)
+
+    def test_concurrent_tasks_have_their_own_deadline(self) -> None:
+        self.retry_policy.configuration.deadline = 10
+        remaining_times: List[Optional[float]] = []
+
+        async def prefetch(started_after: float) -> None:
+            self.time += started_after
+            with self.retry_policy.deadline():
+                await asyncio.sleep(0)
+                remaining_times.append(self.retry_policy.remaining_time())
+
+        async def run() -> None:
+            await asyncio.gather(prefetch(0), prefetch(4))
+
+        asyncio.run(run())
+        self.assertEqual(remaining_times, [6, 10])
+
+    def test_retries_are_logged(self) -> None:
+        with self.assertLogs(__name__, level="WARNING") as logs:
+            self.run_operation(failures=1)
+        self.assertIn("Attempt 1 of 4 at operation failed", logs.output[0])
+
+    def test_rate_limiting_and_server_errors_are_transient(self) -> None:
+        self.assertTrue(is_transient_http_status(429))
+        self.assertTrue(is_transient_http_status(502))
+        self.assertFalse(is_transient_http_status(401))
+        self.assertFalse(is_transient_http_status(404))
+
+    def run_operation(self, failures: int) -> str:
+        def operation() -> str:
+            self.attempts += 1
+            return "failure" if self.attempts <= failures else "result"
+
+        def get_transient_failure(result: str) -> Optional[str]:
+            return "operation failed" if result == "failure" else None
+
+        return self.retry_policy.run(
+            "operation", operation, get_transient_failure=get_transient_failure
+        )
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.time += seconds
+
+    async def sleep_async(self, seconds: float) -> None:
+        self.sleep(seconds)
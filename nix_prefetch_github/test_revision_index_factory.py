@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from unittest import TestCase
 
 from nix_prefetch_github.interfaces import GithubRepository
@@ -10,8 +10,12 @@ from nix_prefetch_github.revision_index_factory import RevisionIndexFactoryImpl
 class FakeListRemoteFactory:
     def __init__(self) -> None:
         self.remote: Optional[ListRemote] = None
+        self.ref_patterns: Optional[List[str]] = None
 
-    def get_list_remote(self, repository: GithubRepository) -> Optional[ListRemote]:
+    def get_list_remote(
+        self, repository: GithubRepository, ref_patterns: List[str]
+    ) -> Optional[ListRemote]:
+        self.ref_patterns = ref_patterns
         return self.remote
 
 
@@ -29,7 +33,7 @@ class RevisionIndexFactoryTests(TestCase):
     ) -> None:
         self.set_list_remote(None)
         self.assertIsNone(
-            self.revision_index_factory.get_revision_index(self.repository)
+            self.revision_index_factory.get_revision_index(self.repository, "HEAD")
         )
 
     def test_list_remote_facory_returns_a_remote_then_revision_index_factory_returns_a_revision(
@@ -37,6 +41,14 @@ class RevisionIndexFactoryTests(TestCase):
     ) -> None:
         self.set_list_remote(ListRemote())
         self.assertIsInstance(
-            self.revision_index_factory.get_revision_index(self.repository),
+            self.revision_index_factory.get_revision_index(self.repository, "HEAD"),
             RevisionIndexImpl,
         )
+
+    def test_only_refs_matching_the_requested_name_are_listed(self) -> None:
+        self.set_list_remote(ListRemote())
+        self.revision_index_factory.get_revision_index(self.repository, "v1.0")
+        self.assertEqual(
+            self.list_remote_factory.ref_patterns,
+            ["v1.0", "refs/heads/v1.0", "refs/tags/v1.0", "refs/tags/v1.0^{}"],
+        )
@@ -0,0 +1,135 @@
+import os
+import stat
+from logging import getLogger
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from nix_prefetch_github.cache import JsonCacheDirectory
+from nix_prefetch_github.nix_source import Edit
+from nix_prefetch_github.source_tree import SourceFileEditorImpl, SourceTreeScannerImpl
+
+CALL = b'fetchFromGitHub { owner = "a"; repo = "b"; rev = "c"; hash = "d"; }'
+
+
+class SourceTreeScannerTests(TestCase):
+    def setUp(self) -> None:
+        self.temporary_directory = TemporaryDirectory()
+        self.root = os.path.join(self.temporary_directory.name, "root")
+        os.mkdir(self.root)
+        self.scanner = SourceTreeScannerImpl(
+            index_directory=JsonCacheDirectory(
+                os.path.join(self.temporary_directory.name, "index")
+            ),
+            logger=getLogger(__name__),
+        )
+
+    def tearDown(self) -> None:
+        self.temporary_directory.cleanup()
+
+    def test_that_calls_in_nested_nix_files_are_found(self) -> None:
+        self.write_file("pkgs/a/default.nix", CALL)
+        self.write_file("pkgs/b/default.nix", b"{ }")
+        source_files = self.scanner.scan(self.root, jobs=2)
+        self.assertEqual(
+            [source_file.path for source_file in source_files],
+            [os.path.join(self.root, "pkgs/a/default.nix")],
+        )
+
+    def test_that_other_files_and_hidden_directories_are_ignored(self) -> None:
+        self.write_file("README.md", CALL)
+        self.write_file(".git/default.nix", CALL)
+        self.assertEqual(self.scanner.scan(self.root, jobs=1), [])
+
+    def test_that_unchanged_files_are_not_read_again(self) -> None:
+        self.write_file("default.nix", CALL, age=60)
+        first_scan = self.scanner.scan(self.root, jobs=1)
+        # Content of the same size with the same modification time is
+        # indistinguishable from the original file.
+        self.replace_content("default.nix", CALL.replace(b'"a"', b'"x"'))
+        self.assertEqual(self.scanner.scan(self.root, jobs=1), first_scan)
+
+    def test_that_modified_files_are_read_again(self) -> None:
+        self.write_file("default.nix", b"{ }", age=60)
+        self.scanner.scan(self.root, jobs=1)
+        self.write_file("default.nix", CALL, age=30)
+        self.assertEqual(len(self.scanner.scan(self.root, jobs=1)), 1)
+
+    def test_that_deleted_files_are_forgotten(self) -> None:
+        self.write_file("default.nix", CALL, age=60)
+        self.scanner.scan(self.root, jobs=1)
+        os.unlink(os.path.join(self.root, "default.nix"))
+        self.assertEqual(self.scanner.scan(self.root, jobs=1), [])
+
+    def test_that_recently_modified_files_are_not_remembered(self) -> None:
+        self.write_file("default.nix", CALL)
+        self.scanner.scan(self.root, jobs=1)
+        self.replace_content("default.nix", CALL.replace(b'"a"', b'"x"'))
+        (source_file,) = self.scanner.scan(self.root, jobs=1)
+        self.assertEqual(source_file.calls[0].strings["owner"].value, "x")
+
+    def write_file(self, relative_path: str, content: bytes, age: int = 0) -> None:
+        path = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as handle:
+            handle.write(content)
+        if age:
+            stat_result = os.stat(path)
+            os.utime(
+                path,
+                ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns - age * 10**9),
+            )
+
+    def replace_content(self, relative_path: str, content: bytes) -> None:
+        path = os.path.join(self.root, relative_path)
+        stat_result = os.stat(path)
+        self.write_file(relative_path, content)
+        os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+
+
+class SourceFileEditorTests(TestCase):
+    def setUp(self) -> None:
+        self.temporary_directory = TemporaryDirectory()
+        self.path = os.path.join(self.temporary_directory.name, "default.nix")
+        with open(self.path, "wb") as handle:
+            handle.write(b'rev = "old"; hash = "abc";')
+        os.chmod(self.path, 0o640)
+        self.editor = SourceFileEditorImpl()
+
+    def tearDown(self) -> None:
+        self.temporary_directory.cleanup()
+
+    def test_that_edits_are_applied(self) -> None:
+        self.assertTrue(
+            self.editor.apply_edits(
+                self.path,
+                [
+                    Edit(start=7, end=10, old=b"old", new=b"newer"),
+                    Edit(start=21, end=24, old=b"abc", new=b"d"),
+                ],
+            )
+        )
+        self.assertEqual(self.read_file(), b'rev = "newer"; hash = "d";')
+
+    def test_that_file_mode_is_kept(self) -> None:
+        self.editor.apply_edits(
+            self.path, [Edit(start=7, end=10, old=b"old", new=b"x")]
+        )
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o640)
+
+    def test_that_nothing_is_written_if_file_changed(self) -> None:
+        self.assertFalse(
+            self.editor.apply_edits(
+                self.path, [Edit(start=7, end=10, old=b"new", new=b"x")]
+            )
+        )
+        self.assertEqual(self.read_file(), b'rev = "old"; hash = "abc";')
+
+    def test_that_no_temporary_files_are_left_behind(self) -> None:
+        self.editor.apply_edits(
+            self.path, [Edit(start=7, end=10, old=b"old", new=b"x")]
+        )
+        self.assertEqual(os.listdir(self.temporary_directory.name), ["default.nix"])
+
+    def read_file(self) -> bytes:
+        with open(self.path, "rb") as handle:
+            return handle.read()
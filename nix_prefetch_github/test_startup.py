@@ -0,0 +1,68 @@
+import subprocess
+import sys
+from typing import Dict, List
+from unittest import TestCase
+
+# Building the object graph for a program must not import modules
+# that are only needed for some invocations.
+STARTUP_SCRIPT = """
+from nix_prefetch_github.dependency_injector import DependencyInjector
+DependencyInjector().get_prefetch_github_repository_controller()
+"""
+
+DEFERRED_MODULES = [
+    "asyncio",
+    "http.client",
+    "nix_prefetch_github.github",
+    "nix_prefetch_github.list_remote_http",
+    "nix_prefetch_github.url_hasher.streaming",
+    "tarfile",
+    "urllib.request",
+]
+
+# The number of imported modules is used as a budget instead of the
+# measured time since it does not depend on the speed of the machine.
+# This number includes the modules python imports on startup.
+MAX_IMPORTED_MODULES = 165
+
+
+class StartupTests(TestCase):
+    def setUp(self) -> None:
+        self.import_times = measure_import_times(STARTUP_SCRIPT)
+
+    def test_optional_modules_are_not_imported_on_startup(self) -> None:
+        for module in DEFERRED_MODULES:
+            with self.subTest(module=module):
+                self.assertNotIn(module, self.import_times)
+
+    def test_number_of_imported_modules_stays_within_budget(self) -> None:
+        self.assertLessEqual(
+            len(self.import_times),
+            MAX_IMPORTED_MODULES,
+            msg="\n".join(
+                f"{time:>8} us {module}"
+                for module, time in sorted(
+                    self.import_times.items(), key=lambda item: item[1]
+                )
+            ),
+        )
+
+
+def measure_import_times(script: str) -> Dict[str, int]:
+    # Returns the import time of every imported module in
+    # microseconds as reported by `python -X importtime`.
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    import_times: Dict[str, int] = dict()
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields: List[str] = line.removeprefix("import time:").split("|")
+        if not fields[0].strip().isdigit():
+            continue
+        import_times[fields[2].strip()] = int(fields[0])
+    return import_times
@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict
+from unittest import TestCase
+
+from nix_prefetch_github.tracing import TracerImpl
+
+
+class TracerTests(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.trace_file = os.path.join(self.directory.name, "trace.json")
+        self.tracer = TracerImpl()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_spans_are_not_recorded_without_trace_file(self) -> None:
+        with self.tracer.record_trace(None):
+            with self.tracer.span("span", "test"):
+                pass
+        self.assertEqual(self.tracer.events, [])
+        self.assertFalse(os.path.exists(self.trace_file))
+
+    def test_span_is_written_as_complete_event(self) -> None:
+        with self.tracer.record_trace(self.trace_file):
+            with self.tracer.span("span", "test", key="value"):
+                pass
+        (event,) = self.read_events(phase="X")
+        self.assertEqual(event["name"], "span")
+        self.assertEqual(event["cat"], "test")
+        self.assertEqual(event["args"], {"key": "value"})
+        self.assertEqual(event["pid"], os.getpid())
+        self.assertGreaterEqual(event["dur"], 0)
+
+    def test_arguments_can_be_added_to_open_span(self) -> None:
+        with self.tracer.record_trace(self.trace_file):
+            with self.tracer.span("span", "test") as span:
+                span["result"] = 1
+        (event,) = self.read_events(phase="X")
+        self.assertEqual(event["args"], {"result": 1})
+
+    def test_nested_spans_are_contained_in_outer_span(self) -> None:
+        with self.tracer.record_trace(self.trace_file):
+            with self.tracer.span("outer", "test"):
+                with self.tracer.span("inner", "test"):
+                    pass
+        inner, outer = self.read_events(phase="X")
+        self.assertGreaterEqual(inner["ts"], outer["ts"])
+        self.assertLessEqual(inner["ts"] + inner["dur"], outer["ts"] + outer["dur"])
+
+    def test_spans_of_threads_are_recorded_with_thread_names(self) -> None:
+        def work() -> None:
+            with self.tracer.span("work", "test"):
+                pass
+
+        with self.tracer.record_trace(self.trace_file):
+            thread = threading.Thread(target=work, name="worker")
+            thread.start()
+            thread.join()
+        (event,) = self.read_events(phase="X")
+        (metadata,) = self.read_events(phase="M")
+        self.assertEqual(event["tid"], metadata["tid"])
+        self.assertEqual(metadata["args"], {"name": "worker"})
+
+    def test_trace_is_written_if_program_exits(self) -> None:
+        with self.assertRaises(SystemExit):
+            with self.tracer.record_trace(self.trace_file):
+                with self.tracer.span("span", "test"):
+                    raise SystemExit(1)
+        self.assertEqual(len(self.read_events(phase="X")), 1)
+
+    def test_spans_are_not_recorded_after_trace_was_written(self) -> None:
+        with self.tracer.record_trace(self.trace_file):
+            pass
+        with self.tracer.span("span", "test"):
+            pass
+        self.assertEqual(self.tracer.events, [])
+
+    def read_events(self, phase: str) -> Any:
+        with open(self.trace_file) as f:
+            document: Dict[str, Any] = json.load(f)
+        return [event for event in document["traceEvents"] if event["ph"] == phase]
@@ -0,0 +1,161 @@
+from typing import List, Optional
+from unittest import TestCase
+
+from nix_prefetch_github.versions import (
+    ReleaseSelection,
+    Version,
+    VersionConstraint,
+)
+
+TAGS = [
+    "v1.3.0",
+    "v1.4.0",
+    "v1.4.7",
+    "v1.5.0-rc1",
+    "v1.5.0",
+    "v2.0.0",
+    "v2.1.0",
+    "v2.1.0^{}",
+    "release-2.3",
+    "v3.0.0-beta.1",
+    "nightly",
+]
+
+
+class VersionTests(TestCase):
+    def test_common_prefixes_are_removed(self) -> None:
+        for tag in ["1.2.3", "v1.2.3", "release-1.2.3", "version-1.2.3"]:
+            with self.subTest(tag=tag):
+                version = Version.from_tag(tag)
+                assert version
+                self.assertEqual(version.release, (1, 2, 3))
+
+    def test_tags_without_version_are_ignored(self) -> None:
+        for tag in ["nightly", "latest", "pkg-1.0"]:
+            with self.subTest(tag=tag):
+                self.assertIsNone(Version.from_tag(tag))
+
+    def test_calendar_versions_are_recognized(self) -> None:
+        for tag in ["2024.05.01", "2024-05-01", "v2024.5.1"]:
+            with self.subTest(tag=tag):
+                version = Version.from_tag(tag)
+                assert version
+                self.assertEqual(version.release, (2024, 5, 1))
+
+    def test_pre_releases_are_recognized(self) -> None:
+        for tag in ["1.0.0-rc1", "1.0.0-rc.1", "1.0b2", "2.0.0-alpha", "1.0.dev3"]:
+            with self.subTest(tag=tag):
+                version = Version.from_tag(tag)
+                assert version
+                self.assertTrue(version.is_pre_release)
+
+    def test_build_metadata_and_post_releases_are_not_pre_releases(self) -> None:
+        for tag in ["1.0.0+build.5", "1.0.0-1", "1.2-alpine"]:
+            with self.subTest(tag=tag):
+                version = Version.from_tag(tag)
+                assert version
+                self.assertFalse(version.is_pre_release)
+
+    def test_versions_are_ordered(self) -> None:
+        ordered = [
+            "1.0.0-alpha",
+            "1.0.0-rc.2",
+            "1.0.0-rc.10",
+            "1.0",
+            "1.0.0-1",
+            "1.0.1",
+            "1.2",
+            "1.10",
+            "2.0.0",
+        ]
+        self.assertEqual(
+            sorted(ordered[::-1], key=lambda tag: self.version(tag).sort_key()),
+            ordered,
+        )
+
+    def test_trailing_zeros_do_not_change_order(self) -> None:
+        self.assertEqual(
+            self.version("1.2").sort_key(), self.version("1.2.0").sort_key()
+        )
+
+    def version(self, tag: str) -> Version:
+        version = Version.from_tag(tag)
+        assert version
+        return version
+
+
+class VersionConstraintTests(TestCase):
+    def test_constraints_select_expected_tag(self) -> None:
+        expected = {
+            "~1.4": "v1.4.7",
+            "~1": "v1.5.0",
+            "~=1.4": "v1.5.0",
+            "^1.2": "v1.5.0",
+            ">=2,<3": "release-2.3",
+            ">= 2, < 2.3": "v2.1.0",
+            "1.4": "v1.4.7",
+            "1.4.*": "v1.4.7",
+            "==2.1": "v2.1.0",
+            "<=1.4.7": "v1.4.7",
+            ">2.1": "release-2.3",
+            "!=2.3, <3": "v2.1.0",
+            ">=4": None,
+        }
+        for constraint, tag in expected.items():
+            with self.subTest(constraint=constraint):
+                self.assertEqual(self.select(TAGS, constraint=constraint), tag)
+
+    def test_upper_bound_excludes_pre_releases_of_bound(self) -> None:
+        self.assertEqual(
+            self.select(
+                ["1.9.0", "2.0.0-rc1"], constraint="<2", include_pre_releases=True
+            ),
+            "1.9.0",
+        )
+
+    def test_caret_for_zero_major_versions_keeps_minor_version(self) -> None:
+        self.assertEqual(self.select(["0.2.1", "0.2.5", "0.3.0"], "^0.2"), "0.2.5")
+
+    def test_invalid_constraints_are_rejected(self) -> None:
+        for constraint in ["", ">=", "abc", "~=1", "~1.x", ">=1.0-rc1"]:
+            with self.subTest(constraint=constraint):
+                with self.assertRaises(ValueError):
+                    VersionConstraint.from_text(constraint)
+
+    def select(
+        self,
+        tags: List[str],
+        constraint: Optional[str] = None,
+        include_pre_releases: bool = False,
+    ) -> Optional[str]:
+        return ReleaseSelection(
+            constraint=(
+                None if constraint is None else VersionConstraint.from_text(constraint)
+            ),
+            include_pre_releases=include_pre_releases,
+        ).select_latest_tag(tags)
+
+
+class ReleaseSelectionTests(TestCase):
+    def test_highest_final_release_is_selected_by_default(self) -> None:
+        self.assertEqual(ReleaseSelection().select_latest_tag(TAGS), "release-2.3")
+
+    def test_pre_releases_can_be_included(self) -> None:
+        self.assertEqual(
+            ReleaseSelection(include_pre_releases=True).select_latest_tag(TAGS),
+            "v3.0.0-beta.1",
+        )
+
+    def test_pattern_restricts_tags(self) -> None:
+        self.assertEqual(
+            ReleaseSelection(pattern="v*").select_latest_tag(TAGS), "v2.1.0"
+        )
+
+    def test_literal_beginning_of_pattern_is_removed_before_parsing(self) -> None:
+        tags = ["pkg-a-1.0", "pkg-a-1.2", "pkg-b-2.0"]
+        self.assertEqual(
+            ReleaseSelection(pattern="pkg-a-*").select_latest_tag(tags), "pkg-a-1.2"
+        )
+
+    def test_no_tag_is_selected_without_versions(self) -> None:
+        self.assertIsNone(ReleaseSelection().select_latest_tag(["nightly", "main"]))
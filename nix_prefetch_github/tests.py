@@ -1,15 +1,20 @@
+from contextlib import contextmanager
 from os import getenv
-from typing import Callable, Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from unittest import TestCase, skipIf
 
+from nix_prefetch_github.cache import CacheConfiguration
 from nix_prefetch_github.interfaces import (
     CommandRunner,
     GithubRepository,
+    HashingBackend,
     PrefetchedRessource,
     PrefetchOptions,
     RenderingFormat,
 )
 from nix_prefetch_github.logging import LoggingConfiguration
+from nix_prefetch_github.metrics import MetricsConfiguration
+from nix_prefetch_github.retry import RetryConfiguration
 from nix_prefetch_github.revision_index import RevisionIndexImpl
 
 _disabled_tests = set(filter(bool, getenv("DISABLED_TESTS", "").split(" ")))
@@ -49,7 +54,7 @@ class FakeRevisionIndexFactory:
         self.revision_index: Optional[RevisionIndexImpl] = None
 
     def get_revision_index(
-        self, repository: GithubRepository
+        self, repository: GithubRepository, name: str
     ) -> Optional[RevisionIndexImpl]:
         return self.revision_index
 
@@ -82,10 +87,11 @@ class CommandRunnerTestImpl:
         cwd: Optional[str] = None,
         environment_variables: Optional[Dict[str, str]] = None,
         merge_stderr: bool = False,
+        timeout: Optional[float] = None,
     ) -> Tuple[int, str]:
         self.commands_issued.append(list(command))
         return self.command_runner.run_command(
-            command, cwd, environment_variables, merge_stderr
+            command, cwd, environment_variables, merge_stderr, timeout
         )
 
 
@@ -95,3 +101,53 @@ class RenderingFormatSelectorImpl:
 
     def set_rendering_format(self, rendering_format: RenderingFormat) -> None:
         self.selected_output_format = rendering_format
+
+    def get_rendering_format(self) -> Optional[RenderingFormat]:
+        return self.selected_output_format
+
+
+class FakeCacheManager:
+    def __init__(self) -> None:
+        self.configuration = CacheConfiguration()
+
+    def set_cache_configuration(self, configuration: CacheConfiguration) -> None:
+        self.configuration = configuration
+
+    def get_cache_configuration(self) -> CacheConfiguration:
+        return self.configuration
+
+
+class FakeRetryManager:
+    def __init__(self) -> None:
+        self.configuration = RetryConfiguration()
+
+    def set_retry_configuration(self, configuration: RetryConfiguration) -> None:
+        self.configuration = configuration
+
+
+class FakeHashingBackendSelector:
+    def __init__(self) -> None:
+        self.hashing_backend: Optional[HashingBackend] = None
+
+    def set_hashing_backend(self, hashing_backend: HashingBackend) -> None:
+        self.hashing_backend = hashing_backend
+
+
+class FakeTraceManager:
+    def __init__(self) -> None:
+        self.trace_files: List[Optional[str]] = []
+
+    @contextmanager
+    def record_trace(self, trace_file: Optional[str]) -> Iterator[None]:
+        self.trace_files.append(trace_file)
+        yield
+
+
+class FakeMetricsManager:
+    def __init__(self) -> None:
+        self.configurations: List[MetricsConfiguration] = []
+
+    @contextmanager
+    def record_metrics(self, configuration: MetricsConfiguration) -> Iterator[None]:
+        self.configurations.append(configuration)
+        yield
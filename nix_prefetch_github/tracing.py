@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Protocol
+
+
+class TraceManager(Protocol):
+    def record_trace(self, trace_file: Optional[str]) -> Any: ...
+
+
+@dataclass
+class TracerImpl:
+    # Records spans as trace events in the format of Chrome's
+    # about:tracing, which Perfetto can open as well. Spans are only
+    # recorded while a trace file is set so that tracing costs next to
+    # nothing otherwise.
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    is_enabled: bool = False
+    # Relative trace files are resolved against this directory instead
+    # of the working directory of the process if it is set.
+    working_directory: Optional[str] = None
+    _thread_names: Dict[int, str] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @contextmanager
+    def span(self, name: str, category: str, **args: Any) -> Iterator[Dict[str, Any]]:
+        # The yielded dictionary can be used to add arguments to the
+        # span that are only known once it finished.
+        if not self.is_enabled:
+            yield args
+            return
+        started_at = time.perf_counter_ns()
+        try:
+            yield args
+        finally:
+            finished_at = time.perf_counter_ns()
+            thread = threading.current_thread()
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": started_at / 1000,
+                "dur": (finished_at - started_at) / 1000,
+                "pid": os.getpid(),
+                "tid": thread.ident,
+                "args": args,
+            }
+            with self._lock:
+                self.events.append(event)
+                if thread.ident is not None:
+                    self._thread_names[thread.ident] = thread.name
+
+    @contextmanager
+    def record_trace(self, trace_file: Optional[str]) -> Iterator[None]:
+        if trace_file is None:
+            yield
+            return
+        self.is_enabled = True
+        try:
+            yield
+        finally:
+            self.is_enabled = False
+            self.write_trace(trace_file)
+
+    def write_trace(self, trace_file: str) -> None:
+        with self._lock:
+            events = list(self.events)
+            thread_names = dict(self._thread_names)
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "tid": thread_id,
+                "args": {"name": thread_name},
+            }
+            for thread_id, thread_name in thread_names.items()
+        ]
+        document = {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+        trace_file = os.path.join(self.working_directory or "", trace_file)
+        directory = os.path.dirname(os.path.abspath(trace_file))
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=directory, prefix=".", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(file_descriptor, "w") as handle:
+                handle.write(json.dumps(document, default=str))
+            os.replace(temporary_path, trace_file)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
@@ -1,14 +1,19 @@
 import json
+import re
 from dataclasses import dataclass
+from datetime import datetime, timezone
 from logging import Logger
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from nix_prefetch_github.interfaces import (
+    AsyncCommandRunner,
+    AsyncRetryPolicy,
     CommandRunner,
     GithubRepository,
     HashConverter,
     PrefetchedRessource,
     PrefetchOptions,
+    RetryPolicy,
 )
 
 
@@ -17,6 +22,8 @@ class NixPrefetchUrlHasherImpl:
     command_runner: CommandRunner
     logger: Logger
     hash_converter: HashConverter
+    retry_policy: RetryPolicy
+    server_url: str = "https://github.com"
 
     def calculate_hash_sum(
         self,
@@ -36,14 +43,24 @@ class NixPrefetchUrlHasherImpl:
     def fetch_url(
         self, repository: GithubRepository, revision: str
     ) -> Optional[PrefetchedRessource]:
-        repo_url = f"https://github.com/{repository.owner}/{repository.name}/archive/{revision}.tar.gz"
-        _, output = self.command_runner.run_command(
-            ["nix-prefetch-url", "--unpack", repo_url, "--print-path"],
+        command = _nix_prefetch_url_command(repository, revision, self.server_url)
+        # nix-prefetch-url reports why a download failed only on
+        # stderr.
+        returncode, output = self.retry_policy.run(
+            " ".join(command[:3]),
+            lambda: self.command_runner.run_command(
+                command,
+                merge_stderr=True,
+                timeout=self.retry_policy.remaining_time(),
+            ),
+            get_transient_failure=_get_transient_nix_prefetch_url_failure,
         )
-        try:
-            hash_sum, store_path = output.splitlines()
-        except ValueError:
+        if returncode != 0:
             return None
+        parsed_output = _parse_nix_prefetch_url_output(output)
+        if parsed_output is None:
+            return None
+        hash_sum, store_path = parsed_output
         sri_hash = self.calculate_sri_representation(hash_sum.strip())
         if not sri_hash:
             return None
@@ -59,13 +76,12 @@ class NixPrefetchUrlHasherImpl:
         revision: str,
         prefetch_options: PrefetchOptions,
     ) -> Optional[PrefetchedRessource]:
-        repo_url = f"https://github.com/{repository.owner}/{repository.name}.git"
-        command = (
-            ["nix-prefetch-git"]
-            + self.prefetch_git_options(prefetch_options)
-            + [repo_url, revision]
+        _, output = self.command_runner.run_command(
+            _nix_prefetch_git_command(
+                repository, revision, prefetch_options, self.server_url
+            ),
+            timeout=self.retry_policy.remaining_time(),
         )
-        _, output = self.command_runner.run_command(command)
         command_output_json = json.loads(output)
         sri_hash = self.calculate_sri_representation(command_output_json["sha256"])
         if not sri_hash:
@@ -74,6 +90,7 @@ class NixPrefetchUrlHasherImpl:
             return PrefetchedRessource(
                 hash_sum=sri_hash,
                 store_path=command_output_json["path"],
+                commit_date=_parse_commit_date(command_output_json),
             )
 
     def calculate_sri_representation(self, sha256: str) -> Optional[str]:
@@ -83,11 +100,159 @@ class NixPrefetchUrlHasherImpl:
         return options == PrefetchOptions()
 
     def prefetch_git_options(self, prefetch_options: PrefetchOptions) -> List[str]:
-        options: List[str] = []
-        if prefetch_options.deep_clone:
-            options.append("--deepClone")
-        if prefetch_options.leave_dot_git or prefetch_options.deep_clone:
-            options.append("--leave-dotGit")
-        if prefetch_options.fetch_submodules:
-            options.append("--fetch-submodules")
-        return options
+        return _prefetch_git_options(prefetch_options)
+
+
+@dataclass(frozen=True)
+class AsyncNixPrefetchUrlHasherImpl:
+    command_runner: AsyncCommandRunner
+    logger: Logger
+    hash_converter: HashConverter
+    retry_policy: AsyncRetryPolicy
+    server_url: str = "https://github.com"
+
+    async def calculate_hash_sum(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+    ) -> Optional[PrefetchedRessource]:
+        if prefetch_options == PrefetchOptions():
+            return await self.fetch_url(repository=repository, revision=revision)
+        else:
+            return await self.fetch_git(
+                repository=repository,
+                revision=revision,
+                prefetch_options=prefetch_options,
+            )
+
+    async def fetch_url(
+        self, repository: GithubRepository, revision: str
+    ) -> Optional[PrefetchedRessource]:
+        command = _nix_prefetch_url_command(repository, revision, self.server_url)
+        returncode, output = await self.retry_policy.run_async(
+            " ".join(command[:3]),
+            lambda: self.command_runner.run_command(
+                command,
+                merge_stderr=True,
+                timeout=self.retry_policy.remaining_time(),
+            ),
+            get_transient_failure=_get_transient_nix_prefetch_url_failure,
+        )
+        if returncode != 0:
+            return None
+        parsed_output = _parse_nix_prefetch_url_output(output)
+        if parsed_output is None:
+            return None
+        hash_sum, store_path = parsed_output
+        sri_hash = self.hash_converter.convert_sha256_to_sri(hash_sum.strip())
+        if not sri_hash:
+            return None
+        else:
+            return PrefetchedRessource(
+                hash_sum=sri_hash,
+                store_path=store_path,
+            )
+
+    async def fetch_git(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+    ) -> Optional[PrefetchedRessource]:
+        _, output = await self.command_runner.run_command(
+            _nix_prefetch_git_command(
+                repository, revision, prefetch_options, self.server_url
+            ),
+            timeout=self.retry_policy.remaining_time(),
+        )
+        try:
+            command_output_json = json.loads(output)
+        except ValueError:
+            return None
+        sri_hash = self.hash_converter.convert_sha256_to_sri(
+            command_output_json["sha256"]
+        )
+        if not sri_hash:
+            return None
+        else:
+            return PrefetchedRessource(
+                hash_sum=sri_hash,
+                store_path=command_output_json["path"],
+                commit_date=_parse_commit_date(command_output_json),
+            )
+
+
+# Errors of curl as nix reports them.
+_TRANSIENT_NIX_PREFETCH_URL_ERROR = re.compile(
+    r"http error (429|5\d\d)|couldn't resolve|couldn't connect|timeout was reached"
+    r"|timed out|connection reset|failure when receiving data|recv failure"
+    r"|send failure|ssl connect error|transfer closed|empty reply from server",
+    re.IGNORECASE,
+)
+
+
+def _nix_prefetch_url_command(
+    repository: GithubRepository, revision: str, server_url: str
+) -> List[str]:
+    repo_url = (
+        f"{server_url}/{repository.owner}/{repository.name}/archive/{revision}.tar.gz"
+    )
+    return ["nix-prefetch-url", "--unpack", repo_url, "--print-path"]
+
+
+def _parse_nix_prefetch_url_output(output: str) -> Optional[Tuple[str, str]]:
+    # The hash and the store path are printed last, after messages
+    # like "path is '/nix/store/...'" if stderr is part of the output.
+    try:
+        hash_sum, store_path = output.splitlines()[-2:]
+    except ValueError:
+        return None
+    return hash_sum, store_path
+
+
+def _get_transient_nix_prefetch_url_failure(
+    result: Tuple[int, str],
+) -> Optional[str]:
+    # Missing archives, e.g. of mistyped revisions or private
+    # repositories, and failed authentication are not retried.
+    returncode, output = result
+    if returncode == 0:
+        return None
+    for line in output.splitlines():
+        if _TRANSIENT_NIX_PREFETCH_URL_ERROR.search(line):
+            return line.strip()
+    return None
+
+
+def _parse_commit_date(output: Dict[str, Any]) -> Optional[datetime]:
+    # nix-prefetch-git reports the committer date in the committer's
+    # timezone.
+    try:
+        return datetime.fromisoformat(output["date"]).astimezone(timezone.utc)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _nix_prefetch_git_command(
+    repository: GithubRepository,
+    revision: str,
+    prefetch_options: PrefetchOptions,
+    server_url: str,
+) -> List[str]:
+    return (
+        ["nix-prefetch-git"]
+        + _prefetch_git_options(prefetch_options)
+        + [repository.url(server_url), revision]
+    )
+
+
+def _prefetch_git_options(prefetch_options: PrefetchOptions) -> List[str]:
+    options: List[str] = []
+    if prefetch_options.deep_clone:
+        options.append("--deepClone")
+    if prefetch_options.leave_dot_git or prefetch_options.deep_clone:
+        options.append("--leave-dotGit")
+    if prefetch_options.fetch_submodules:
+        options.append("--fetch-submodules")
+    return options
@@ -0,0 +1,36 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from nix_prefetch_github.interfaces import (
+    GithubRepository,
+    HashingBackend,
+    PrefetchedRessource,
+    PrefetchOptions,
+    UrlHasher,
+)
+
+
+@dataclass
+class UrlHasherSelectorImpl:
+    nix_hasher: UrlHasher
+    builtin_hasher: UrlHasher
+    hashing_backend: HashingBackend = HashingBackend.nix
+
+    def set_hashing_backend(self, hashing_backend: HashingBackend) -> None:
+        self.hashing_backend = hashing_backend
+
+    def calculate_hash_sum(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+    ) -> Optional[PrefetchedRessource]:
+        if self.hashing_backend == HashingBackend.builtin:
+            hasher = self.builtin_hasher
+        else:
+            hasher = self.nix_hasher
+        return hasher.calculate_hash_sum(
+            repository=repository,
+            revision=revision,
+            prefetch_options=prefetch_options,
+        )
@@ -0,0 +1,112 @@
+import urllib.error
+import urllib.request
+import zlib
+from contextlib import closing
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from logging import Logger
+from typing import IO, Callable, Optional
+
+from nix_prefetch_github.hash import is_sha1_hash, sha256_digest_to_sri
+from nix_prefetch_github.interfaces import (
+    GithubRepository,
+    PrefetchedRessource,
+    PrefetchOptions,
+    RetryPolicy,
+    UrlHasher,
+)
+from nix_prefetch_github.nar import (
+    NarHash,
+    UnsupportedArchive,
+    hash_tar_archive,
+    make_fixed_output_store_path,
+)
+from nix_prefetch_github.retry import is_transient_http_status
+
+
+@dataclass
+class StreamingUrlHasherImpl:
+    # Calculates the hash of GitHub's archive tarballs without nix by
+    # serializing the tarball's contents to NAR while downloading it.
+    # Prefetch options that require a git checkout are handled by the
+    # fallback hasher.
+    fallback_hasher: UrlHasher
+    logger: Logger
+    retry_policy: RetryPolicy
+    open_url: Callable[[str, Optional[float]], IO[bytes]] = field(
+        default=lambda url, timeout: _open_url(url, timeout)
+    )
+    server_url: str = "https://github.com"
+
+    def calculate_hash_sum(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+    ) -> Optional[PrefetchedRessource]:
+        if prefetch_options != PrefetchOptions():
+            return self.fallback_hasher.calculate_hash_sum(
+                repository=repository,
+                revision=revision,
+                prefetch_options=prefetch_options,
+            )
+        url = f"{self.server_url}/{repository.owner}/{repository.name}/archive/{revision}.tar.gz"
+        self.logger.info("Hashing %s", url)
+        try:
+            nar_hash = self.retry_policy.run(
+                f"download of {url}",
+                lambda: self._hash_archive(url),
+                is_transient_error=_is_transient_download_error,
+            )
+        except UnsupportedArchive as e:
+            self.logger.warning(
+                "Could not hash %s without nix, falling back to nix: %s", url, e
+            )
+            return self.fallback_hasher.calculate_hash_sum(
+                repository=repository,
+                revision=revision,
+                prefetch_options=prefetch_options,
+            )
+        except (OSError, EOFError, zlib.error) as e:
+            self.logger.error("Could not download %s: %s", url, e)
+            return None
+        if (
+            is_sha1_hash(revision)
+            and nar_hash.commit_id is not None
+            and nar_hash.commit_id != revision
+        ):
+            self.logger.error(
+                "Archive %s belongs to commit %s instead", url, nar_hash.commit_id
+            )
+            return None
+        return PrefetchedRessource(
+            hash_sum=sha256_digest_to_sri(nar_hash.digest),
+            store_path=make_fixed_output_store_path(
+                f"{revision}.tar.gz", nar_hash.digest
+            ),
+            commit_date=(
+                None
+                if nar_hash.commit_timestamp is None
+                else datetime.fromtimestamp(nar_hash.commit_timestamp, timezone.utc)
+            ),
+            nar_size=nar_hash.nar_size,
+        )
+
+    def _hash_archive(self, url: str) -> NarHash:
+        with closing(
+            self.open_url(url, self.retry_policy.remaining_time())
+        ) as response:
+            return hash_tar_archive(response)
+
+
+def _open_url(url: str, timeout: Optional[float]) -> IO[bytes]:
+    if timeout is None:
+        return urllib.request.urlopen(url)
+    return urllib.request.urlopen(url, timeout=timeout)
+
+
+def _is_transient_download_error(error: Exception) -> bool:
+    # Truncated downloads show up as errors of the decompression.
+    if isinstance(error, urllib.error.HTTPError):
+        return is_transient_http_status(error.code)
+    return isinstance(error, (OSError, EOFError, zlib.error))
@@ -1,4 +1,8 @@
+import asyncio
+import json
+from datetime import datetime, timezone
 from logging import getLogger
+from typing import Dict, List, Optional, Tuple
 from unittest import TestCase
 
 from parameterized import parameterized
@@ -6,8 +10,12 @@ from parameterized import parameterized
 from nix_prefetch_github.command.command_runner import CommandRunnerImpl
 from nix_prefetch_github.hash_converter import HashConverterImpl
 from nix_prefetch_github.interfaces import GithubRepository, PrefetchOptions
+from nix_prefetch_github.retry import RetryPolicyImpl
 from nix_prefetch_github.tests import CommandRunnerTestImpl, network
-from nix_prefetch_github.url_hasher.nix_prefetch import NixPrefetchUrlHasherImpl
+from nix_prefetch_github.url_hasher.nix_prefetch import (
+    AsyncNixPrefetchUrlHasherImpl,
+    NixPrefetchUrlHasherImpl,
+)
 
 
 @network
@@ -21,6 +29,7 @@ class UrlHasherTests(TestCase):
             command_runner=self.command_runner,
             logger=getLogger(),
             hash_converter=hash_converter,
+            retry_policy=RetryPolicyImpl(logger=getLogger(__name__)),
         )
         self.repository = GithubRepository(
             owner="git-up",
@@ -117,3 +126,266 @@ class UrlHasherTests(TestCase):
             prefetch_options=prefetch_options,
         )
         assert prefetched_repo
+
+
+class NixPrefetchUrlRetryTests(TestCase):
+    def setUp(self) -> None:
+        self.command_runner = FakeCommandRunner()
+        self.sleeps: List[float] = []
+        self.hasher = NixPrefetchUrlHasherImpl(
+            command_runner=self.command_runner,
+            logger=getLogger(__name__),
+            hash_converter=HashConverterImpl(command_runner=self.command_runner),
+            retry_policy=RetryPolicyImpl(
+                logger=getLogger(__name__), sleep=self.sleeps.append
+            ),
+        )
+        self.repository = GithubRepository(owner="owner", name="repo")
+
+    def test_nix_prefetch_url_is_repeated_after_server_errors(self) -> None:
+        self.command_runner.results = [
+            (
+                1,
+                "error: unable to download "
+                "'https://github.com/owner/repo/archive/abc.tar.gz': "
+                "HTTP error 503\n",
+            ),
+            (
+                0,
+                "path is '/nix/store/d9bp6cchg2scyjfqnpxh7ghmw6fjmxvf-abc.tar.gz'\n"
+                "0b0f7jdc4wigkpvf3ld9sxa7iglfjwi1b8zq0bcwnwqn1jg32cl4\n"
+                "/nix/store/d9bp6cchg2scyjfqnpxh7ghmw6fjmxvf-abc.tar.gz\n",
+            ),
+        ]
+        prefetched_repo = self.hasher.calculate_hash_sum(
+            self.repository, "abc", PrefetchOptions()
+        )
+        assert prefetched_repo
+        self.assertEqual(
+            prefetched_repo.store_path,
+            "/nix/store/d9bp6cchg2scyjfqnpxh7ghmw6fjmxvf-abc.tar.gz",
+        )
+        self.assertEqual(len(self.command_runner.commands), 2)
+        self.assertEqual(len(self.sleeps), 1)
+
+    def test_nix_prefetch_url_is_not_repeated_for_missing_archives(self) -> None:
+        self.command_runner.results = [
+            (
+                1,
+                "error: unable to download "
+                "'https://github.com/owner/repo/archive/abc.tar.gz': "
+                "HTTP error 404\n",
+            )
+        ]
+        self.assertIsNone(
+            self.hasher.calculate_hash_sum(self.repository, "abc", PrefetchOptions())
+        )
+        self.assertEqual(len(self.command_runner.commands), 1)
+
+    def test_nix_prefetch_url_is_not_repeated_after_all_retries_failed(self) -> None:
+        self.command_runner.results = [
+            (1, "error: unable to download '...': Couldn't resolve host name (6)\n")
+        ]
+        self.assertIsNone(
+            self.hasher.calculate_hash_sum(self.repository, "abc", PrefetchOptions())
+        )
+        self.assertEqual(len(self.command_runner.commands), 4)
+
+
+class NixPrefetchGitTests(TestCase):
+    def setUp(self) -> None:
+        self.command_runner = FakeCommandRunner()
+        self.hasher = NixPrefetchUrlHasherImpl(
+            command_runner=self.command_runner,
+            logger=getLogger(__name__),
+            hash_converter=HashConverterImpl(
+                command_runner=CommandRunnerImpl(getLogger(__name__))
+            ),
+            retry_policy=RetryPolicyImpl(logger=getLogger(__name__)),
+            server_url="http://localhost:8080",
+        )
+        self.repository = GithubRepository(owner="owner", name="repo")
+        self.command_runner.results = [
+            (
+                0,
+                json.dumps(
+                    {
+                        "sha256": "0b0f7jdc4wigkpvf3ld9sxa7iglfjwi1b8zq0bcwnwqn1jg32cl4",
+                        "path": "/nix/store/5zb52kqrzvyc2na8lprv8vnky5fjw8f3-repo-abc",
+                        "date": "2024-01-02T05:04:05+02:00",
+                    }
+                ),
+            )
+        ]
+
+    def test_repository_is_fetched_from_configured_server(self) -> None:
+        self.hasher.calculate_hash_sum(
+            self.repository, "abc", PrefetchOptions(leave_dot_git=True)
+        )
+        self.assertEqual(
+            self.command_runner.commands,
+            [
+                [
+                    "nix-prefetch-git",
+                    "--leave-dotGit",
+                    "http://localhost:8080/owner/repo.git",
+                    "abc",
+                ]
+            ],
+        )
+
+    def test_commit_date_is_read_from_nix_prefetch_git_output(self) -> None:
+        prefetched_repo = self.hasher.calculate_hash_sum(
+            self.repository, "abc", PrefetchOptions(leave_dot_git=True)
+        )
+        assert prefetched_repo
+        self.assertEqual(
+            prefetched_repo.commit_date,
+            datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        )
+
+
+class AsyncNixPrefetchUrlHasherTests(TestCase):
+    def setUp(self) -> None:
+        self.command_runner = FakeAsyncCommandRunner()
+        self.sleeps: List[float] = []
+        self.hasher = AsyncNixPrefetchUrlHasherImpl(
+            command_runner=self.command_runner,
+            logger=getLogger(__name__),
+            hash_converter=HashConverterImpl(
+                command_runner=CommandRunnerImpl(getLogger(__name__))
+            ),
+            retry_policy=RetryPolicyImpl(
+                logger=getLogger(__name__), sleep_async=self.sleep
+            ),
+        )
+        self.repository = GithubRepository(owner="owner", name="repo")
+
+    def test_nix_prefetch_url_output_is_converted_to_sri_hash(self) -> None:
+        self.command_runner.results = [
+            (
+                0,
+                "0b0f7jdc4wigkpvf3ld9sxa7iglfjwi1b8zq0bcwnwqn1jg32cl4\n"
+                "/nix/store/d9bp6cchg2scyjfqnpxh7ghmw6fjmxvf-abc.tar.gz\n",
+            )
+        ]
+        prefetched_repo = asyncio.run(
+            self.hasher.calculate_hash_sum(self.repository, "abc", PrefetchOptions())
+        )
+        assert prefetched_repo
+        self.assertEqual(
+            prefetched_repo.store_path,
+            "/nix/store/d9bp6cchg2scyjfqnpxh7ghmw6fjmxvf-abc.tar.gz",
+        )
+        self.assertTrue(prefetched_repo.hash_sum.startswith("sha256-"))
+        self.assertEqual(
+            self.command_runner.commands,
+            [
+                [
+                    "nix-prefetch-url",
+                    "--unpack",
+                    "https://github.com/owner/repo/archive/abc.tar.gz",
+                    "--print-path",
+                ]
+            ],
+        )
+
+    def test_nix_prefetch_url_is_repeated_after_server_errors(self) -> None:
+        self.command_runner.results = [
+            (
+                1,
+                "error: unable to download "
+                "'https://github.com/owner/repo/archive/abc.tar.gz': "
+                "HTTP error 503\n",
+            ),
+            (
+                0,
+                "0b0f7jdc4wigkpvf3ld9sxa7iglfjwi1b8zq0bcwnwqn1jg32cl4\n"
+                "/nix/store/d9bp6cchg2scyjfqnpxh7ghmw6fjmxvf-abc.tar.gz\n",
+            ),
+        ]
+        prefetched_repo = asyncio.run(
+            self.hasher.calculate_hash_sum(self.repository, "abc", PrefetchOptions())
+        )
+        assert prefetched_repo
+        self.assertEqual(len(self.command_runner.commands), 2)
+        self.assertEqual(len(self.sleeps), 1)
+
+    def test_failing_nix_prefetch_url_results_in_none(self) -> None:
+        self.command_runner.results = [(1, "error: HTTP error 404\n")]
+        self.assertIsNone(
+            asyncio.run(
+                self.hasher.calculate_hash_sum(
+                    self.repository, "abc", PrefetchOptions()
+                )
+            )
+        )
+        self.assertEqual(len(self.command_runner.commands), 1)
+
+    def test_commit_date_is_read_from_nix_prefetch_git_output(self) -> None:
+        self.command_runner.results = [
+            (
+                0,
+                json.dumps(
+                    {
+                        "sha256": "0b0f7jdc4wigkpvf3ld9sxa7iglfjwi1b8zq0bcwnwqn1jg32cl4",
+                        "path": "/nix/store/5zb52kqrzvyc2na8lprv8vnky5fjw8f3-repo-abc",
+                        "date": "2024-01-02T05:04:05+02:00",
+                    }
+                ),
+            )
+        ]
+        prefetched_repo = asyncio.run(
+            self.hasher.calculate_hash_sum(
+                self.repository, "abc", PrefetchOptions(leave_dot_git=True)
+            )
+        )
+        assert prefetched_repo
+        self.assertEqual(
+            prefetched_repo.commit_date,
+            datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        )
+        self.assertEqual(self.command_runner.commands[0][0], "nix-prefetch-git")
+
+    async def sleep(self, delay: float) -> None:
+        self.sleeps.append(delay)
+
+
+class FakeCommandRunner:
+    def __init__(self) -> None:
+        self.commands: List[List[str]] = []
+        # The last result is repeated once all others were returned.
+        self.results: List[Tuple[int, str]] = [(0, "")]
+
+    def run_command(
+        self,
+        command: List[str],
+        cwd: Optional[str] = None,
+        environment_variables: Optional[Dict[str, str]] = None,
+        merge_stderr: bool = False,
+        timeout: Optional[float] = None,
+    ) -> Tuple[int, str]:
+        self.commands.append(command)
+        if len(self.results) > 1:
+            return self.results.pop(0)
+        return self.results[0]
+
+
+class FakeAsyncCommandRunner:
+    def __init__(self) -> None:
+        self.commands: List[List[str]] = []
+        # The last result is repeated once all others were returned.
+        self.results: List[Tuple[int, str]] = [(0, "")]
+
+    async def run_command(
+        self,
+        command: List[str],
+        cwd: Optional[str] = None,
+        environment_variables: Optional[Dict[str, str]] = None,
+        merge_stderr: bool = False,
+        timeout: Optional[float] = None,
+    ) -> Tuple[int, str]:
+        self.commands.append(command)
+        if len(self.results) > 1:
+            return self.results.pop(0)
+        return self.results[0]
@@ -0,0 +1,210 @@
+import hashlib
+import io
+import tarfile
+import urllib.error
+from datetime import datetime, timezone
+from logging import getLogger
+from typing import IO, Dict, List, Optional
+from unittest import TestCase
+
+from nix_prefetch_github.hash import sha256_digest_to_sri
+from nix_prefetch_github.interfaces import (
+    GithubRepository,
+    PrefetchedRessource,
+    PrefetchOptions,
+)
+from nix_prefetch_github.nar import make_fixed_output_store_path
+from nix_prefetch_github.retry import RetryPolicyImpl
+from nix_prefetch_github.tests import FakeUrlHasher
+from nix_prefetch_github.url_hasher.streaming import StreamingUrlHasherImpl
+
+COMMIT_TIMESTAMP = int(datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc).timestamp())
+
+
+class StreamingUrlHasherTests(TestCase):
+    def setUp(self) -> None:
+        self.fallback_hasher = FakeUrlHasher()
+        self.fallback_hasher.hash_sum = "sha256-fallback"
+        self.fallback_hasher.store_path = "/nix/store/fallback"
+        self.requested_urls: List[str] = []
+        self.archive = create_archive({"README": b"hello\n"})
+        self.download_errors: List[Exception] = []
+        self.sleeps: List[float] = []
+        self.timeouts: List[Optional[float]] = []
+        self.time = 1000.0
+        self.retry_policy = RetryPolicyImpl(
+            logger=getLogger(__name__),
+            sleep=self.sleeps.append,
+            clock=lambda: self.time,
+        )
+        self.hasher = StreamingUrlHasherImpl(
+            fallback_hasher=self.fallback_hasher,
+            logger=getLogger(__name__),
+            retry_policy=self.retry_policy,
+            open_url=self.open_url,
+        )
+        self.repository = GithubRepository(owner="owner", name="repo")
+        self.revision = "5a1dfa807759c39e3df891b6b46dfb2cf776c6ef"
+
+    def test_archive_of_revision_is_downloaded(self) -> None:
+        self.calculate_hash_sum()
+        self.assertEqual(
+            self.requested_urls,
+            [
+                "https://github.com/owner/repo/archive/5a1dfa807759c39e3df891b6b46dfb2cf776c6ef.tar.gz"
+            ],
+        )
+
+    def test_hash_sum_is_the_nar_hash_of_the_archive_contents(self) -> None:
+        digest = hashlib.sha256(
+            nar_strings(
+                b"nix-archive-1",
+                b"(",
+                b"type",
+                b"directory",
+                b"entry",
+                b"(",
+                b"name",
+                b"README",
+                b"node",
+                b"(",
+                b"type",
+                b"regular",
+                b"contents",
+                b"hello\n",
+                b")",
+                b")",
+                b")",
+            )
+        ).digest()
+        prefetched_ressource = self.calculate_hash_sum()
+        assert prefetched_ressource
+        self.assertEqual(prefetched_ressource.hash_sum, sha256_digest_to_sri(digest))
+        self.assertEqual(
+            prefetched_ressource.store_path,
+            make_fixed_output_store_path(f"{self.revision}.tar.gz", digest),
+        )
+
+    def test_nar_size_is_reported(self) -> None:
+        prefetched_ressource = self.calculate_hash_sum()
+        assert prefetched_ressource
+        self.assertGreater(prefetched_ressource.nar_size or 0, len(b"hello\n"))
+
+    def test_fallback_hasher_is_used_for_git_checkouts(self) -> None:
+        prefetched_ressource = self.calculate_hash_sum(
+            PrefetchOptions(fetch_submodules=True)
+        )
+        assert prefetched_ressource
+        self.assertEqual(prefetched_ressource.hash_sum, "sha256-fallback")
+        self.assertFalse(self.requested_urls)
+
+    def test_fallback_hasher_is_used_for_unsupported_archives(self) -> None:
+        self.archive = b"not an archive"
+        prefetched_ressource = self.calculate_hash_sum()
+        assert prefetched_ressource
+        self.assertEqual(prefetched_ressource.hash_sum, "sha256-fallback")
+
+    def test_commit_date_is_read_from_archive(self) -> None:
+        prefetched_ressource = self.calculate_hash_sum()
+        assert prefetched_ressource
+        self.assertEqual(
+            prefetched_ressource.commit_date,
+            datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        )
+
+    def test_archive_of_matching_commit_is_accepted(self) -> None:
+        self.archive = create_archive({"README": b"hello\n"}, commit_id=self.revision)
+        self.assertIsNotNone(self.calculate_hash_sum())
+
+    def test_archive_of_other_commit_results_in_no_hash_sum(self) -> None:
+        self.archive = create_archive({"README": b"hello\n"}, commit_id="0" * 40)
+        self.assertIsNone(self.calculate_hash_sum())
+
+    def test_archive_is_downloaded_from_configured_server(self) -> None:
+        self.hasher.server_url = "http://localhost:8080"
+        self.calculate_hash_sum()
+        self.assertEqual(
+            self.requested_urls,
+            [
+                "http://localhost:8080/owner/repo/archive/5a1dfa807759c39e3df891b6b46dfb2cf776c6ef.tar.gz"
+            ],
+        )
+
+    def test_download_errors_result_in_no_hash_sum(self) -> None:
+        def failing_open_url(url: str, timeout: Optional[float]) -> IO[bytes]:
+            raise OSError("connection refused")
+
+        self.hasher.open_url = failing_open_url
+        self.assertIsNone(self.calculate_hash_sum())
+
+    def test_download_is_repeated_after_server_errors(self) -> None:
+        self.download_errors = [self.http_error(503), self.http_error(502)]
+        self.assertIsNotNone(self.calculate_hash_sum())
+        self.assertEqual(len(self.requested_urls), 3)
+        self.assertEqual(len(self.sleeps), 2)
+
+    def test_download_timeout_is_the_remaining_time_until_the_deadline(
+        self,
+    ) -> None:
+        self.calculate_hash_sum()
+        with self.retry_policy.deadline():
+            self.calculate_hash_sum()
+        self.assertIsNone(self.timeouts[0])
+        self.assertEqual(self.timeouts[1], 300)
+
+    def test_download_is_not_repeated_if_archive_does_not_exist(self) -> None:
+        self.download_errors = [self.http_error(404)]
+        self.assertIsNone(self.calculate_hash_sum())
+        self.assertEqual(len(self.requested_urls), 1)
+
+    def calculate_hash_sum(
+        self, prefetch_options: PrefetchOptions = PrefetchOptions()
+    ) -> Optional[PrefetchedRessource]:
+        return self.hasher.calculate_hash_sum(
+            repository=self.repository,
+            revision=self.revision,
+            prefetch_options=prefetch_options,
+        )
+
+    def open_url(self, url: str, timeout: Optional[float]) -> IO[bytes]:
+        self.requested_urls.append(url)
+        self.timeouts.append(timeout)
+        if self.download_errors:
+            raise self.download_errors.pop(0)
+        return io.BytesIO(self.archive)
+
+    def http_error(self, status: int) -> urllib.error.HTTPError:
+        return urllib.error.HTTPError(
+            "https://github.com", status, "error", hdrs=None, fp=None  # type: ignore
+        )
+
+
+def create_archive(files: Dict[str, bytes], commit_id: Optional[str] = None) -> bytes:
+    # Mimics GitHub's archives, which store the commit hash in a pax
+    # global header and the commit timestamp as mtime of every member.
+    archive = io.BytesIO()
+    with tarfile.open(
+        fileobj=archive,
+        mode="w:gz",
+        format=tarfile.PAX_FORMAT,
+        pax_headers={"comment": commit_id} if commit_id else None,
+    ) as tar:
+        directory = tarfile.TarInfo("repo-5a1dfa8")
+        directory.type = tarfile.DIRTYPE
+        directory.mode = 0o755
+        directory.mtime = COMMIT_TIMESTAMP
+        tar.addfile(directory)
+        for name, content in sorted(files.items()):
+            member = tarfile.TarInfo(f"repo-5a1dfa8/{name}")
+            member.size = len(content)
+            member.mode = 0o644
+            member.mtime = COMMIT_TIMESTAMP
+            tar.addfile(member, io.BytesIO(content))
+    return archive.getvalue()
+
+
+def nar_strings(*strings: bytes) -> bytes:
+    return b"".join(
+        len(string).to_bytes(8, "little") + string + b"\0" * (-len(string) % 8)
+        for string in strings
+    )
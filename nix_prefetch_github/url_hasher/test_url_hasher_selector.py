@@ -0,0 +1,38 @@
+from typing import Optional
+from unittest import TestCase
+
+from nix_prefetch_github.interfaces import (
+    GithubRepository,
+    HashingBackend,
+    PrefetchOptions,
+)
+from nix_prefetch_github.tests import FakeUrlHasher
+from nix_prefetch_github.url_hasher.selector import UrlHasherSelectorImpl
+
+
+class UrlHasherSelectorTests(TestCase):
+    def setUp(self) -> None:
+        self.nix_hasher = FakeUrlHasher()
+        self.nix_hasher.hash_sum = "sha256-nix"
+        self.nix_hasher.store_path = "/nix/store/nix"
+        self.builtin_hasher = FakeUrlHasher()
+        self.builtin_hasher.hash_sum = "sha256-builtin"
+        self.builtin_hasher.store_path = "/nix/store/builtin"
+        self.selector = UrlHasherSelectorImpl(
+            nix_hasher=self.nix_hasher, builtin_hasher=self.builtin_hasher
+        )
+
+    def test_nix_hasher_is_used_by_default(self) -> None:
+        self.assertEqual(self.calculate_hash_sum(), "sha256-nix")
+
+    def test_builtin_hasher_is_used_when_selected(self) -> None:
+        self.selector.set_hashing_backend(HashingBackend.builtin)
+        self.assertEqual(self.calculate_hash_sum(), "sha256-builtin")
+
+    def calculate_hash_sum(self) -> Optional[str]:
+        prefetched_ressource = self.selector.calculate_hash_sum(
+            repository=GithubRepository(owner="owner", name="repo"),
+            revision="master",
+            prefetch_options=PrefetchOptions(),
+        )
+        return prefetched_ressource.hash_sum if prefetched_ressource else None
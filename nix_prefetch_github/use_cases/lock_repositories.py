@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from logging import Logger
+from typing import Dict, Iterable, List, Optional, Protocol, Tuple
+
+from nix_prefetch_github.hash import is_sha1_hash
+from nix_prefetch_github.interfaces import (
+    Alerter,
+    GithubRepository,
+    LockedRepository,
+    LockfileChange,
+    LockfileStore,
+    LockPresenter,
+    Prefetcher,
+    PrefetchFailure,
+    PrefetchOptions,
+    PrefetchResult,
+    RevisionIndexFactory,
+)
+from nix_prefetch_github.use_cases.prefetch_batch import BatchEntry
+
+Key = Tuple[GithubRepository, Optional[str], Tuple[bool, bool, bool]]
+
+
+class LockRepositoriesUseCase(Protocol):
+    def lock_repositories(self, request: Request) -> None: ...
+
+
+@dataclass
+class Request:
+    lockfile_path: str
+    # The lockfile is made to contain exactly these entries. If no
+    # entries are given the entries of the lockfile are updated.
+    entries: Optional[Iterable[BatchEntry]]
+    jobs: int
+    # Restricts an update to these repositories. All other entries are
+    # kept as they are.
+    repositories: List[GithubRepository] = field(default_factory=list)
+
+
+@dataclass
+class LockRepositoriesUseCaseImpl:
+    presenter: LockPresenter
+    lockfile_store: LockfileStore
+    revision_index_factory: RevisionIndexFactory
+    prefetcher: Prefetcher
+    alerter: Alerter
+    logger: Logger
+
+    def lock_repositories(self, request: Request) -> None:
+        previous_entries = self.lockfile_store.read_lockfile(request.lockfile_path)
+        previous = {_entry_key(entry): entry for entry in previous_entries or []}
+        kept: Dict[Key, LockedRepository] = dict()
+        targets: Dict[Key, BatchEntry] = dict()
+        if request.entries is None:
+            for key, entry in previous.items():
+                repository = entry.prefetched_repository.repository
+                if request.repositories and repository not in request.repositories:
+                    kept[key] = entry
+                else:
+                    targets[key] = BatchEntry(
+                        repository=repository,
+                        revision=entry.ref,
+                        prefetch_options=entry.prefetched_repository.options,
+                    )
+        else:
+            for batch_entry in request.entries:
+                targets[_batch_entry_key(batch_entry)] = batch_entry
+        with ThreadPoolExecutor(max_workers=max(request.jobs, 1)) as executor:
+            futures: List[Future[PrefetchResult]] = [
+                executor.submit(self._lock_entry, batch_entry, previous.get(key))
+                for key, batch_entry in targets.items()
+            ]
+        changes: List[LockfileChange] = []
+        entries = list(kept.values())
+        for (key, batch_entry), future in zip(targets.items(), futures):
+            previous_entry = previous.get(key)
+            change = LockfileChange(
+                status=LockfileChange.Status.failed,
+                repository=batch_entry.repository,
+                ref=batch_entry.revision,
+            )
+            if previous_entry is not None:
+                change.previous_rev = previous_entry.prefetched_repository.rev
+                change.previous_hash_sum = previous_entry.prefetched_repository.hash_sum
+            try:
+                result = future.result()
+            except Exception as e:
+                # A single broken entry must not abort the whole lock.
+                self.logger.exception(
+                    "Locking %s failed unexpectedly", batch_entry.repository.url()
+                )
+                change.reason = f"Unexpected error: {e}"
+                changes.append(change)
+                continue
+            if isinstance(result, PrefetchFailure):
+                change.reason = str(result.reason)
+            else:
+                entries.append(
+                    LockedRepository(
+                        ref=batch_entry.revision, prefetched_repository=result
+                    )
+                )
+                change.rev = result.rev
+                change.hash_sum = result.hash_sum
+                if previous_entry is None:
+                    change.status = LockfileChange.Status.added
+                elif previous_entry.prefetched_repository == result:
+                    change.status = LockfileChange.Status.unchanged
+                else:
+                    change.status = LockfileChange.Status.changed
+            changes.append(change)
+        for key, previous_entry in previous.items():
+            if key not in targets and key not in kept:
+                changes.append(
+                    LockfileChange(
+                        status=LockfileChange.Status.removed,
+                        repository=previous_entry.prefetched_repository.repository,
+                        ref=previous_entry.ref,
+                        previous_rev=previous_entry.prefetched_repository.rev,
+                        previous_hash_sum=previous_entry.prefetched_repository.hash_sum,
+                    )
+                )
+        # The lockfile is only replaced if every entry could be locked,
+        # so that it never contains a mix of old and new entries.
+        is_complete = all(
+            change.status != LockfileChange.Status.failed for change in changes
+        )
+        is_modified = previous_entries is None or any(
+            change.status != LockfileChange.Status.unchanged for change in changes
+        )
+        if is_complete and is_modified:
+            self.lockfile_store.write_lockfile(request.lockfile_path, entries)
+        for change in changes:
+            self.presenter.present_lockfile_change(change)
+        self.presenter.finish_lock()
+
+    def _lock_entry(
+        self, entry: BatchEntry, previous_entry: Optional[LockedRepository]
+    ) -> PrefetchResult:
+        # Refs are resolved first since that is cheap. Only entries
+        # whose commit moved need to be downloaded and hashed.
+        commit = self._resolve(entry)
+        if commit is None:
+            return PrefetchFailure(
+                reason=PrefetchFailure.Reason.unable_to_locate_revision
+            )
+        if (
+            previous_entry is not None
+            and previous_entry.prefetched_repository.rev == commit
+        ):
+            return previous_entry.prefetched_repository
+        if not entry.prefetch_options.is_safe():
+            self.alerter.alert_user_about_unsafe_prefetch_options(
+                entry.prefetch_options
+            )
+        return self.prefetcher.prefetch_github(
+            repository=entry.repository,
+            rev=commit,
+            prefetch_options=entry.prefetch_options,
+        )
+
+    def _resolve(self, entry: BatchEntry) -> Optional[str]:
+        if entry.revision is not None and is_sha1_hash(entry.revision):
+            return entry.revision
+        name = entry.revision or "HEAD"
+        revision_index = self.revision_index_factory.get_revision_index(
+            entry.repository, name
+        )
+        if revision_index is None:
+            return None
+        return revision_index.get_revision_by_name(name)
+
+
+def _entry_key(entry: LockedRepository) -> Key:
+    return _key(
+        entry.prefetched_repository.repository,
+        entry.ref,
+        entry.prefetched_repository.options,
+    )
+
+
+def _batch_entry_key(entry: BatchEntry) -> Key:
+    return _key(entry.repository, entry.revision, entry.prefetch_options)
+
+
+def _key(
+    repository: GithubRepository, ref: Optional[str], options: PrefetchOptions
+) -> Key:
+    return (
+        repository,
+        ref,
+        (options.fetch_submodules, options.leave_dot_git, options.deep_clone),
+    )
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import dataclasses
+import itertools
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from logging import Logger
+from typing import Dict, Iterable, Iterator, List, Optional, Protocol, Union
+
+from nix_prefetch_github.interfaces import (
+    Alerter,
+    BatchPresenter,
+    GithubAPI,
+    GithubQuota,
+    GithubRepository,
+    Prefetcher,
+    PrefetchOptions,
+    PrefetchResult,
+)
+
+# GitHub is asked for the latest releases of this many entries of a
+# manifest at once.
+_RELEASE_QUERY_SIZE = 100
+
+
+class PrefetchBatchUseCase(Protocol):
+    def prefetch_batch(self, request: Request) -> None: ...
+
+
+@dataclass
+class BatchEntry:
+    repository: GithubRepository
+    revision: Optional[str]
+    prefetch_options: PrefetchOptions
+
+
+@dataclass
+class InvalidBatchEntry:
+    # An entry of the manifest that could not be read or whose
+    # revision could not be determined.
+    error: str
+    repository: Optional[GithubRepository] = None
+
+
+@dataclass
+class Request:
+    entries: Iterable[Union[BatchEntry, InvalidBatchEntry]]
+    jobs: int
+    # Entries without a revision are prefetched at the latest release
+    # of their repository instead of the default branch.
+    latest_release: bool = False
+
+
+@dataclass
+class PrefetchBatchUseCaseImpl:
+    presenter: BatchPresenter
+    prefetcher: Prefetcher
+    alerter: Alerter
+    logger: Logger
+    github_api: GithubAPI
+    github_quota: GithubQuota
+
+    def prefetch_batch(self, request: Request) -> None:
+        # We only keep a bounded number of entries in flight so that
+        # memory consumption does not grow with the size of the
+        # manifest.
+        max_pending = max(request.jobs, 1) * 2
+        pending: Dict[Future[PrefetchResult], BatchEntry] = dict()
+        entries = request.entries
+        used_requests = 0
+        if request.latest_release:
+            used_requests = self.github_quota.used_requests
+            entries = self._resolve_latest_releases(entries)
+        with ThreadPoolExecutor(max_workers=max(request.jobs, 1)) as executor:
+            for entry in entries:
+                if isinstance(entry, InvalidBatchEntry):
+                    self.presenter.present_batch_error(
+                        repository=entry.repository, revision=None, error=entry.error
+                    )
+                    continue
+                if len(pending) >= max_pending:
+                    self._present_finished_entries(pending)
+                pending[executor.submit(self._prefetch_entry, entry)] = entry
+            while pending:
+                self._present_finished_entries(pending)
+        self.presenter.finish_batch()
+        if request.latest_release:
+            self._log_quota_summary(self.github_quota.used_requests - used_requests)
+
+    def _log_quota_summary(self, used_requests: int) -> None:
+        if self.github_quota.remaining is None:
+            self.logger.info("Used %s requests of the GitHub API quota", used_requests)
+        else:
+            self.logger.info(
+                "Used %s requests of the GitHub API quota, %s of %s are left",
+                used_requests,
+                self.github_quota.remaining,
+                self.github_quota.limit,
+            )
+
+    def _resolve_latest_releases(
+        self, entries: Iterable[Union[BatchEntry, InvalidBatchEntry]]
+    ) -> Iterator[Union[BatchEntry, InvalidBatchEntry]]:
+        # The latest releases of many repositories are requested from
+        # GitHub at once while the manifest is still read lazily.
+        iterator = iter(entries)
+        while chunk := list(itertools.islice(iterator, _RELEASE_QUERY_SIZE)):
+            repositories: List[GithubRepository] = [
+                entry.repository
+                for entry in chunk
+                if isinstance(entry, BatchEntry) and entry.revision is None
+            ]
+            tags = (
+                self.github_api.get_tags_of_latest_releases(repositories)
+                if repositories
+                else dict()
+            )
+            for entry in chunk:
+                if isinstance(entry, InvalidBatchEntry) or entry.revision is not None:
+                    yield entry
+                elif (tag := tags.get(entry.repository)) is None:
+                    yield InvalidBatchEntry(
+                        error="Unable to locate latest release",
+                        repository=entry.repository,
+                    )
+                else:
+                    yield dataclasses.replace(entry, revision=tag)
+
+    def _present_finished_entries(
+        self, pending: Dict[Future[PrefetchResult], BatchEntry]
+    ) -> None:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            entry = pending.pop(future)
+            try:
+                prefetch_result = future.result()
+            except Exception as e:
+                # A single broken entry must not abort the whole batch.
+                self.logger.exception(
+                    "Prefetching %s failed unexpectedly", entry.repository.url()
+                )
+                self.presenter.present_batch_error(
+                    repository=entry.repository,
+                    revision=entry.revision,
+                    error=f"Unexpected error: {e}",
+                )
+            else:
+                self.presenter.present_batch_result(
+                    repository=entry.repository,
+                    revision=entry.revision,
+                    prefetch_result=prefetch_result,
+                )
+
+    def _prefetch_entry(self, entry: BatchEntry) -> PrefetchResult:
+        if not entry.prefetch_options.is_safe():
+            self.alerter.alert_user_about_unsafe_prefetch_options(
+                entry.prefetch_options
+            )
+        return self.prefetcher.prefetch_github(
+            repository=entry.repository,
+            rev=entry.revision,
+            prefetch_options=entry.prefetch_options,
+        )
@@ -1,15 +1,21 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Protocol
+from typing import Optional, Protocol
 
 from nix_prefetch_github.interfaces import (
     GithubAPI,
     GithubRepository,
+    LatestReleaseResolver,
     Prefetcher,
+    PrefetchFailure,
     PrefetchOptions,
     Presenter,
 )
+from nix_prefetch_github.revision_index import RevisionIndexImpl
+from nix_prefetch_github.revision_index_factory import ListRemoteFactory
+from nix_prefetch_github.versions import ReleaseSelection
 
 
 class PrefetchLatestReleaseUseCase(Protocol):
@@ -20,6 +26,9 @@ class PrefetchLatestReleaseUseCase(Protocol):
 class Request:
     repository: GithubRepository
     prefetch_options: PrefetchOptions
+    # The latest release is selected from the tags of the repository
+    # if this is set. Otherwise GitHub's latest release is used.
+    release_selection: Optional[ReleaseSelection] = None
 
 
 @dataclass
@@ -27,12 +36,45 @@ class PrefetchLatestReleaseUseCaseImpl:
     presenter: Presenter
     prefetcher: Prefetcher
     github_api: GithubAPI
+    release_resolver: LatestReleaseResolver
+    list_remote_factory: ListRemoteFactory
 
     def prefetch_latest_release(self, request: Request) -> None:
-        revision = self.github_api.get_tag_of_latest_release(request.repository)
+        revision: Optional[str]
+        if request.release_selection is None:
+            revision = self._get_latest_release_from_github(request.repository)
+        else:
+            revision = self.release_resolver.get_latest_release(
+                request.repository, request.release_selection
+            )
+            if revision is None:
+                self.presenter.present(
+                    PrefetchFailure(
+                        reason=PrefetchFailure.Reason.unable_to_locate_revision
+                    )
+                )
+                return
         prefetch_result = self.prefetcher.prefetch_github(
             repository=request.repository,
             rev=revision,
             prefetch_options=request.prefetch_options,
         )
         self.presenter.present(prefetch_result)
+
+    def _get_latest_release_from_github(
+        self, repository: GithubRepository
+    ) -> Optional[str]:
+        # The tags are listed while the GitHub API is asked for the
+        # latest release so that the tag can be resolved to a commit
+        # without waiting for another request.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            list_remote = executor.submit(
+                self.list_remote_factory.get_list_remote,
+                repository,
+                ["refs/tags/*"],
+            )
+            tag = self.github_api.get_tag_of_latest_release(repository)
+            tags = list_remote.result()
+        if tag is None or tags is None:
+            return tag
+        return RevisionIndexImpl(tags).get_revision_by_name(tag) or tag
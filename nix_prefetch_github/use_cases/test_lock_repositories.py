@@ -0,0 +1,251 @@
+import logging
+from typing import Dict, List, Optional
+from unittest import TestCase
+
+from nix_prefetch_github.interfaces import (
+    GithubRepository,
+    LockedRepository,
+    LockfileChange,
+    PrefetchedRepository,
+    PrefetchedRessource,
+    PrefetchOptions,
+)
+from nix_prefetch_github.list_remote import ListRemote
+from nix_prefetch_github.prefetch import PrefetcherImpl
+from nix_prefetch_github.revision_index import RevisionIndexImpl
+from nix_prefetch_github.tests import FakeRevisionIndexFactory
+from nix_prefetch_github.use_cases.lock_repositories import (
+    LockRepositoriesUseCaseImpl,
+    Request,
+)
+from nix_prefetch_github.use_cases.prefetch_batch import BatchEntry
+
+OLD_COMMIT = "1" * 40
+NEW_COMMIT = "2" * 40
+LOCKFILE = "nix-prefetch-github.lock"
+
+
+class LockRepositoriesUseCaseTests(TestCase):
+    def setUp(self) -> None:
+        self.lockfile_store = FakeLockfileStore()
+        self.url_hasher = FakeUrlHasher()
+        self.presenter = FakeLockPresenter()
+        self.alerter = FakeAlerter()
+        self.revision_index_factory = FakeRevisionIndexFactory()
+        self.set_branch_commit(NEW_COMMIT)
+        self.use_case = LockRepositoriesUseCaseImpl(
+            presenter=self.presenter,
+            lockfile_store=self.lockfile_store,
+            revision_index_factory=self.revision_index_factory,
+            prefetcher=PrefetcherImpl(
+                url_hasher=self.url_hasher,
+                revision_index_factory=self.revision_index_factory,
+            ),
+            alerter=self.alerter,
+            logger=logging.getLogger(__name__),
+        )
+
+    def test_that_new_entries_are_hashed_and_added(self) -> None:
+        self.lock([self.make_batch_entry()])
+        self.assertEqual(self.url_hasher.revisions, [NEW_COMMIT])
+        self.assertEqual(self.statuses(), [LockfileChange.Status.added])
+        entries = self.lockfile_store.entries[LOCKFILE]
+        self.assertEqual(entries[0].ref, "main")
+        self.assertEqual(entries[0].prefetched_repository.rev, NEW_COMMIT)
+        self.assertEqual(
+            entries[0].prefetched_repository.hash_sum, f"sha256-{NEW_COMMIT}"
+        )
+
+    def test_that_default_branch_is_resolved_without_ref(self) -> None:
+        self.lock([self.make_batch_entry(ref=None)])
+        self.assertEqual(self.url_hasher.revisions, [NEW_COMMIT])
+
+    def test_that_entries_whose_commit_did_not_move_are_not_hashed(self) -> None:
+        self.lockfile_store.entries[LOCKFILE] = [self.make_locked_entry(NEW_COMMIT)]
+        self.lock([self.make_batch_entry()])
+        self.assertEqual(self.url_hasher.revisions, [])
+        self.assertEqual(self.statuses(), [LockfileChange.Status.unchanged])
+
+    def test_that_unchanged_lockfile_is_not_written(self) -> None:
+        self.lockfile_store.entries[LOCKFILE] = [self.make_locked_entry(NEW_COMMIT)]
+        self.lock([self.make_batch_entry()])
+        self.assertEqual(self.lockfile_store.write_count, 0)
+
+    def test_that_entries_whose_commit_moved_are_hashed_again(self) -> None:
+        self.lockfile_store.entries[LOCKFILE] = [self.make_locked_entry(OLD_COMMIT)]
+        self.update()
+        self.assertEqual(self.url_hasher.revisions, [NEW_COMMIT])
+        (change,) = self.presenter.changes
+        self.assertEqual(change.status, LockfileChange.Status.changed)
+        self.assertEqual(change.previous_rev, OLD_COMMIT)
+        self.assertEqual(change.rev, NEW_COMMIT)
+
+    def test_that_entries_missing_from_manifest_are_removed(self) -> None:
+        self.lockfile_store.entries[LOCKFILE] = [
+            self.make_locked_entry(NEW_COMMIT, name="old")
+        ]
+        self.lock([self.make_batch_entry(name="new")])
+        self.assertCountEqual(
+            self.statuses(),
+            [LockfileChange.Status.added, LockfileChange.Status.removed],
+        )
+        self.assertEqual(
+            [
+                entry.prefetched_repository.repository.name
+                for entry in self.lockfile_store.entries[LOCKFILE]
+            ],
+            ["new"],
+        )
+
+    def test_that_update_can_be_restricted_to_repositories(self) -> None:
+        self.lockfile_store.entries[LOCKFILE] = [
+            self.make_locked_entry(OLD_COMMIT, name="a"),
+            self.make_locked_entry(OLD_COMMIT, name="b"),
+        ]
+        self.update(repositories=[GithubRepository(owner="owner", name="a")])
+        self.assertEqual(len(self.url_hasher.revisions), 1)
+        self.assertEqual(len(self.lockfile_store.entries[LOCKFILE]), 2)
+        self.assertEqual(self.statuses(), [LockfileChange.Status.changed])
+
+    def test_that_commit_refs_are_not_resolved(self) -> None:
+        self.revision_index_factory.revision_index = None
+        self.lock([self.make_batch_entry(ref=OLD_COMMIT)])
+        self.assertEqual(self.url_hasher.revisions, [OLD_COMMIT])
+
+    def test_that_lockfile_is_not_written_if_any_entry_failed(self) -> None:
+        self.lockfile_store.entries[LOCKFILE] = [self.make_locked_entry(OLD_COMMIT)]
+        self.lock(
+            [self.make_batch_entry(), self.make_batch_entry(ref="does-not-exist")]
+        )
+        self.assertEqual(self.lockfile_store.write_count, 0)
+        self.assertIn(LockfileChange.Status.failed, self.statuses())
+
+    def test_that_failed_hashing_is_reported(self) -> None:
+        self.url_hasher.fail = True
+        self.lock([self.make_batch_entry()])
+        self.assertEqual(self.statuses(), [LockfileChange.Status.failed])
+
+    def test_that_unexpected_errors_fail_only_the_affected_entry(self) -> None:
+        self.url_hasher.raise_for = "broken"
+        with self.assertLogs(level="ERROR"):
+            self.lock([self.make_batch_entry(), self.make_batch_entry(name="broken")])
+        self.assertEqual(
+            self.statuses(),
+            [LockfileChange.Status.added, LockfileChange.Status.failed],
+        )
+        self.assertEqual(self.lockfile_store.write_count, 0)
+        self.assertEqual(self.presenter.finished_after, 2)
+
+    def test_that_lock_is_finished(self) -> None:
+        self.lock([self.make_batch_entry()])
+        self.assertEqual(self.presenter.finished_after, 1)
+
+    def test_that_user_is_alerted_about_unsafe_options(self) -> None:
+        self.lock(
+            [self.make_batch_entry(prefetch_options=PrefetchOptions(deep_clone=True))]
+        )
+        self.assertEqual(self.alerter.alert_count, 1)
+
+    def lock(self, entries: List[BatchEntry]) -> None:
+        self.use_case.lock_repositories(
+            Request(lockfile_path=LOCKFILE, entries=entries, jobs=2)
+        )
+
+    def update(self, repositories: List[GithubRepository] = []) -> None:
+        self.use_case.lock_repositories(
+            Request(
+                lockfile_path=LOCKFILE,
+                entries=None,
+                jobs=2,
+                repositories=repositories,
+            )
+        )
+
+    def set_branch_commit(self, commit: str) -> None:
+        self.revision_index_factory.revision_index = RevisionIndexImpl(
+            ListRemote(symrefs={"HEAD": "main"}, heads={"main": commit})
+        )
+
+    def statuses(self) -> List[LockfileChange.Status]:
+        return [change.status for change in self.presenter.changes]
+
+    def make_batch_entry(
+        self,
+        name: str = "repo",
+        ref: Optional[str] = "main",
+        prefetch_options: PrefetchOptions = PrefetchOptions(),
+    ) -> BatchEntry:
+        return BatchEntry(
+            repository=GithubRepository(owner="owner", name=name),
+            revision=ref,
+            prefetch_options=prefetch_options,
+        )
+
+    def make_locked_entry(self, commit: str, name: str = "repo") -> LockedRepository:
+        return LockedRepository(
+            ref="main",
+            prefetched_repository=PrefetchedRepository(
+                repository=GithubRepository(owner="owner", name=name),
+                rev=commit,
+                hash_sum=f"sha256-{commit}",
+                options=PrefetchOptions(),
+                store_path=f"/nix/store/{commit}-source",
+            ),
+        )
+
+
+class FakeLockfileStore:
+    def __init__(self) -> None:
+        self.entries: Dict[str, List[LockedRepository]] = dict()
+        self.write_count = 0
+
+    def read_lockfile(self, path: str) -> Optional[List[LockedRepository]]:
+        return self.entries.get(path)
+
+    def write_lockfile(self, path: str, entries: List[LockedRepository]) -> None:
+        self.write_count += 1
+        self.entries[path] = entries
+
+
+class FakeUrlHasher:
+    def __init__(self) -> None:
+        self.revisions: List[str] = []
+        self.fail = False
+        self.raise_for: Optional[str] = None
+
+    def calculate_hash_sum(
+        self,
+        repository: GithubRepository,
+        revision: str,
+        prefetch_options: PrefetchOptions,
+    ) -> Optional[PrefetchedRessource]:
+        self.revisions.append(revision)
+        if repository.name == self.raise_for:
+            raise RuntimeError("broken")
+        if self.fail:
+            return None
+        return PrefetchedRessource(
+            hash_sum=f"sha256-{revision}", store_path=f"/nix/store/{revision}-source"
+        )
+
+
+class FakeLockPresenter:
+    def __init__(self) -> None:
+        self.changes: List[LockfileChange] = []
+        self.finished_after: Optional[int] = None
+
+    def present_lockfile_change(self, change: LockfileChange) -> None:
+        self.changes.append(change)
+
+    def finish_lock(self) -> None:
+        self.finished_after = len(self.changes)
+
+
+class FakeAlerter:
+    def __init__(self) -> None:
+        self.alert_count = 0
+
+    def alert_user_about_unsafe_prefetch_options(
+        self, prefetch_options: PrefetchOptions
+    ) -> None:
+        self.alert_count += 1
@@ -0,0 +1,315 @@
+import logging
+from datetime import datetime
+from threading import Barrier
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from unittest import TestCase
+
+from nix_prefetch_github.interfaces import (
+    GithubRepository,
+    PrefetchedRepository,
+    PrefetchFailure,
+    PrefetchOptions,
+    PrefetchResult,
+)
+from nix_prefetch_github.use_cases.prefetch_batch import (
+    BatchEntry,
+    InvalidBatchEntry,
+    PrefetchBatchUseCaseImpl,
+    Request,
+)
+
+
+class PrefetchBatchUseCaseTests(TestCase):
+    def setUp(self) -> None:
+        self.prefetcher = FakePrefetcher()
+        self.presenter = FakeBatchPresenter()
+        self.alerter = FakeAlerter()
+        self.github_api = FakeGithubAPI()
+        self.github_quota = FakeGithubQuota()
+        self.use_case = PrefetchBatchUseCaseImpl(
+            presenter=self.presenter,
+            prefetcher=self.prefetcher,
+            alerter=self.alerter,
+            logger=logging.getLogger(__name__),
+            github_api=self.github_api,
+            github_quota=self.github_quota,
+        )
+
+    def test_that_every_entry_is_presented(self) -> None:
+        entries = [self.make_entry(name=f"repo-{n}") for n in range(10)]
+        self.use_case.prefetch_batch(Request(entries=entries, jobs=3))
+        self.assertCountEqual(
+            [repository.name for repository, _, _ in self.presenter.results],
+            [f"repo-{n}" for n in range(10)],
+        )
+
+    def test_that_batch_is_finished_after_all_entries_were_presented(self) -> None:
+        self.use_case.prefetch_batch(
+            Request(entries=[self.make_entry(), self.make_entry()], jobs=1)
+        )
+        self.assertEqual(self.presenter.finished_after, 2)
+
+    def test_that_empty_batch_is_finished(self) -> None:
+        self.use_case.prefetch_batch(Request(entries=[], jobs=1))
+        self.assertEqual(self.presenter.finished_after, 0)
+
+    def test_that_requested_revision_is_passed_to_prefetcher(self) -> None:
+        self.use_case.prefetch_batch(
+            Request(entries=[self.make_entry(revision="v1.0")], jobs=1)
+        )
+        self.assertEqual(self.prefetcher.revisions, ["v1.0"])
+
+    def test_that_failures_are_presented_with_requested_revision(self) -> None:
+        self.prefetcher.failing_revisions = ["does-not-exist"]
+        self.use_case.prefetch_batch(
+            Request(entries=[self.make_entry(revision="does-not-exist")], jobs=1)
+        )
+        _, revision, result = self.presenter.results[0]
+        self.assertEqual(revision, "does-not-exist")
+        self.assertIsInstance(result, PrefetchFailure)
+
+    def test_that_unexpected_errors_are_presented_as_failures(self) -> None:
+        self.prefetcher.raising_revisions = ["broken"]
+        with self.assertLogs(__name__):
+            self.use_case.prefetch_batch(
+                Request(
+                    entries=[self.make_entry(revision="broken"), self.make_entry()],
+                    jobs=2,
+                )
+            )
+        self.assertEqual(len(self.presenter.results), 1)
+        ((repository, revision, error),) = self.presenter.errors
+        self.assertEqual(repository, GithubRepository(owner="owner", name="name"))
+        self.assertEqual(revision, "broken")
+        self.assertIn("broken entry", error)
+        self.assertEqual(self.presenter.finished_after, 1)
+
+    def test_that_invalid_entries_are_presented_as_failures(self) -> None:
+        self.use_case.prefetch_batch(
+            Request(
+                entries=[InvalidBatchEntry(error="invalid"), self.make_entry()],
+                jobs=1,
+            )
+        )
+        self.assertEqual(self.presenter.errors, [(None, None, "invalid")])
+        self.assertEqual(len(self.presenter.results), 1)
+
+    def test_that_entries_are_prefetched_concurrently(self) -> None:
+        self.prefetcher.barrier = Barrier(3, timeout=5)
+        entries = [self.make_entry(name=f"repo-{n}") for n in range(3)]
+        self.use_case.prefetch_batch(Request(entries=entries, jobs=3))
+        self.assertEqual(len(self.presenter.results), 3)
+
+    def test_that_entries_are_consumed_lazily(self) -> None:
+        consumed: List[int] = []
+
+        def entries() -> Iterator[BatchEntry]:
+            for n in range(100):
+                consumed.append(n)
+                self.assertLessEqual(len(consumed) - len(self.presenter.results), 5)
+                yield self.make_entry(name=f"repo-{n}")
+
+        self.use_case.prefetch_batch(Request(entries=entries(), jobs=2))
+        self.assertEqual(len(self.presenter.results), 100)
+
+    def test_that_latest_releases_are_not_queried_by_default(self) -> None:
+        self.use_case.prefetch_batch(Request(entries=[self.make_entry()], jobs=1))
+        self.assertEqual(self.prefetcher.revisions, [None])
+        self.assertEqual(self.github_api.queries, [])
+
+    def test_that_entries_without_revision_are_prefetched_at_latest_release(
+        self,
+    ) -> None:
+        self.use_case.prefetch_batch(
+            Request(entries=[self.make_entry()], jobs=1, latest_release=True)
+        )
+        self.assertEqual(self.prefetcher.revisions, ["name-release"])
+
+    def test_that_requested_revisions_are_kept_with_latest_release(self) -> None:
+        self.use_case.prefetch_batch(
+            Request(
+                entries=[self.make_entry(revision="v1.0")],
+                jobs=1,
+                latest_release=True,
+            )
+        )
+        self.assertEqual(self.prefetcher.revisions, ["v1.0"])
+        self.assertEqual(self.github_api.queries, [])
+
+    def test_that_latest_releases_of_many_entries_are_queried_at_once(self) -> None:
+        entries = [self.make_entry(name=f"repo-{n}") for n in range(150)]
+        self.use_case.prefetch_batch(
+            Request(entries=entries, jobs=4, latest_release=True)
+        )
+        self.assertEqual([len(query) for query in self.github_api.queries], [100, 50])
+        self.assertEqual(len(self.presenter.results), 150)
+
+    def test_that_entries_without_release_are_presented_as_failures(self) -> None:
+        self.github_api.repositories_without_release = ["no-release"]
+        self.use_case.prefetch_batch(
+            Request(
+                entries=[self.make_entry(name="no-release"), self.make_entry()],
+                jobs=1,
+                latest_release=True,
+            )
+        )
+        ((repository, revision, _),) = self.presenter.errors
+        self.assertEqual(repository, GithubRepository(owner="owner", name="no-release"))
+        self.assertIsNone(revision)
+        self.assertEqual(self.prefetcher.revisions, ["name-release"])
+
+    def test_that_used_quota_is_logged_after_latest_releases(self) -> None:
+        self.github_quota.used_requests = 10
+        self.github_api.on_query = lambda: self.github_quota.use_requests(3)
+        with self.assertLogs(__name__, level="INFO") as logs:
+            self.use_case.prefetch_batch(
+                Request(entries=[self.make_entry()], jobs=1, latest_release=True)
+            )
+        self.assertIn(
+            "Used 3 requests of the GitHub API quota, 57 of 60 are left",
+            logs.output[-1],
+        )
+
+    def test_that_quota_is_not_logged_without_latest_releases(self) -> None:
+        with self.assertNoLogs(__name__, level="INFO"):
+            self.use_case.prefetch_batch(Request(entries=[self.make_entry()], jobs=1))
+
+    def test_that_user_is_alerted_about_unsafe_options(self) -> None:
+        self.use_case.prefetch_batch(
+            Request(
+                entries=[
+                    self.make_entry(prefetch_options=PrefetchOptions(deep_clone=True))
+                ],
+                jobs=1,
+            )
+        )
+        self.assertEqual(self.alerter.alert_count, 1)
+
+    def test_that_user_is_not_alerted_about_safe_options(self) -> None:
+        self.use_case.prefetch_batch(Request(entries=[self.make_entry()], jobs=1))
+        self.assertEqual(self.alerter.alert_count, 0)
+
+    def make_entry(
+        self,
+        name: str = "name",
+        revision: Optional[str] = None,
+        prefetch_options: PrefetchOptions = PrefetchOptions(),
+    ) -> BatchEntry:
+        return BatchEntry(
+            repository=GithubRepository(owner="owner", name=name),
+            revision=revision,
+            prefetch_options=prefetch_options,
+        )
+
+
+class FakePrefetcher:
+    def __init__(self) -> None:
+        self.revisions: List[Optional[str]] = []
+        self.failing_revisions: List[str] = []
+        self.raising_revisions: List[str] = []
+        self.barrier: Optional[Barrier] = None
+
+    def prefetch_github(
+        self,
+        repository: GithubRepository,
+        rev: Optional[str],
+        prefetch_options: PrefetchOptions,
+    ) -> PrefetchResult:
+        self.revisions.append(rev)
+        if self.barrier is not None:
+            self.barrier.wait()
+        if rev in self.raising_revisions:
+            raise ValueError("broken entry")
+        if rev in self.failing_revisions:
+            return PrefetchFailure(
+                reason=PrefetchFailure.Reason.unable_to_locate_revision
+            )
+        return PrefetchedRepository(
+            repository=repository,
+            rev="",
+            hash_sum="",
+            options=prefetch_options,
+            store_path="",
+        )
+
+
+class FakeBatchPresenter:
+    def __init__(self) -> None:
+        self.results: List[Tuple[GithubRepository, Optional[str], PrefetchResult]] = []
+        self.errors: List[Tuple[Optional[GithubRepository], Optional[str], str]] = []
+        self.finished_after: Optional[int] = None
+
+    def present_batch_result(
+        self,
+        repository: GithubRepository,
+        revision: Optional[str],
+        prefetch_result: PrefetchResult,
+    ) -> None:
+        self.results.append((repository, revision, prefetch_result))
+
+    def present_batch_error(
+        self,
+        repository: Optional[GithubRepository],
+        revision: Optional[str],
+        error: str,
+    ) -> None:
+        self.errors.append((repository, revision, error))
+
+    def finish_batch(self) -> None:
+        self.finished_after = len(self.results)
+
+
+class FakeAlerter:
+    def __init__(self) -> None:
+        self.alert_count = 0
+
+    def alert_user_about_unsafe_prefetch_options(
+        self, prefetch_options: PrefetchOptions
+    ) -> None:
+        self.alert_count += 1
+
+
+class FakeGithubAPI:
+    def __init__(self) -> None:
+        self.queries: List[List[GithubRepository]] = []
+        self.repositories_without_release: List[str] = []
+        self.on_query: Callable[[], None] = lambda: None
+
+    def get_tag_of_latest_release(self, repository: GithubRepository) -> Optional[str]:
+        return self.get_tags_of_latest_releases([repository])[repository]
+
+    def get_commit_date(
+        self, repository: GithubRepository, commit_sha1_hash: str
+    ) -> Optional[datetime]:
+        return None
+
+    def get_tags_of_latest_releases(
+        self, repositories: List[GithubRepository]
+    ) -> Dict[GithubRepository, Optional[str]]:
+        self.queries.append(repositories)
+        self.on_query()
+        return {
+            repository: (
+                None
+                if repository.name in self.repositories_without_release
+                else f"{repository.name}-release"
+            )
+            for repository in repositories
+        }
+
+    def get_commit_dates(
+        self, commits: List[Tuple[GithubRepository, str]]
+    ) -> Dict[Tuple[GithubRepository, str], Optional[datetime]]:
+        return {commit: None for commit in commits}
+
+
+class FakeGithubQuota:
+    def __init__(self) -> None:
+        self.used_requests = 0
+        self.remaining: Optional[int] = None
+        self.limit: Optional[int] = None
+
+    def use_requests(self, count: int) -> None:
+        self.used_requests += count
+        self.limit = 60
+        self.remaining = self.limit - count
@@ -0,0 +1,153 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from unittest import TestCase
+
+from nix_prefetch_github.interfaces import (
+    GithubRepository,
+    PrefetchedRepository,
+    PrefetchFailure,
+    PrefetchOptions,
+    PrefetchResult,
+)
+from nix_prefetch_github.list_remote import ListRemote
+from nix_prefetch_github.use_cases.prefetch_latest_release import (
+    PrefetchLatestReleaseUseCaseImpl,
+    Request,
+)
+from nix_prefetch_github.versions import ReleaseSelection
+
+
+class UseCaseTests(TestCase):
+    def setUp(self) -> None:
+        self.presenter = FakePresenter()
+        self.prefetcher = FakePrefetcher()
+        self.github_api = FakeGithubAPI()
+        self.release_resolver = FakeLatestReleaseResolver()
+        self.list_remote_factory = FakeListRemoteFactory()
+        self.use_case = PrefetchLatestReleaseUseCaseImpl(
+            presenter=self.presenter,
+            prefetcher=self.prefetcher,
+            github_api=self.github_api,
+            release_resolver=self.release_resolver,
+            list_remote_factory=self.list_remote_factory,
+        )
+
+    def test_latest_release_from_github_is_prefetched_by_default(self) -> None:
+        self.use_case.prefetch_latest_release(self.make_request())
+        self.assertEqual(self.prefetcher.revisions, ["v1.0-commit"])
+
+    def test_tags_are_listed_for_latest_release_from_github(self) -> None:
+        self.use_case.prefetch_latest_release(self.make_request())
+        self.assertEqual(self.list_remote_factory.ref_patterns, [["refs/tags/*"]])
+
+    def test_tag_is_prefetched_by_name_if_tags_cannot_be_listed(self) -> None:
+        self.list_remote_factory.list_remote = None
+        self.use_case.prefetch_latest_release(self.make_request())
+        self.assertEqual(self.prefetcher.revisions, ["v1.0"])
+
+    def test_tag_is_prefetched_by_name_if_it_is_not_listed(self) -> None:
+        self.list_remote_factory.list_remote = ListRemote()
+        self.use_case.prefetch_latest_release(self.make_request())
+        self.assertEqual(self.prefetcher.revisions, ["v1.0"])
+
+    def test_github_api_is_not_used_when_releases_are_selected_from_tags(
+        self,
+    ) -> None:
+        self.use_case.prefetch_latest_release(
+            self.make_request(release_selection=ReleaseSelection())
+        )
+        self.assertEqual(self.prefetcher.revisions, ["resolved-commit"])
+        self.assertEqual(self.github_api.calls, 0)
+
+    def test_failure_is_presented_when_no_tag_matches(self) -> None:
+        self.release_resolver.revision = None
+        self.use_case.prefetch_latest_release(
+            self.make_request(release_selection=ReleaseSelection())
+        )
+        self.assertEqual(self.prefetcher.revisions, [])
+        self.assertIsInstance(self.presenter.results[-1], PrefetchFailure)
+
+    def make_request(
+        self, release_selection: Optional[ReleaseSelection] = None
+    ) -> Request:
+        return Request(
+            repository=GithubRepository(owner="owner", name="repo"),
+            prefetch_options=PrefetchOptions(),
+            release_selection=release_selection,
+        )
+
+
+class FakeGithubAPI:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def get_tag_of_latest_release(self, repository: GithubRepository) -> Optional[str]:
+        self.calls += 1
+        return "v1.0"
+
+    def get_commit_date(
+        self, repository: GithubRepository, commit_sha1_hash: str
+    ) -> Optional[datetime]:
+        return None
+
+    def get_tags_of_latest_releases(
+        self, repositories: List[GithubRepository]
+    ) -> Dict[GithubRepository, Optional[str]]:
+        return {repository: "v1.0" for repository in repositories}
+
+    def get_commit_dates(
+        self, commits: List[Tuple[GithubRepository, str]]
+    ) -> Dict[Tuple[GithubRepository, str], Optional[datetime]]:
+        return {commit: None for commit in commits}
+
+
+class FakeListRemoteFactory:
+    def __init__(self) -> None:
+        self.list_remote: Optional[ListRemote] = ListRemote(
+            tags={"v1.0": "v1.0-tag", "v1.0^{}": "v1.0-commit"}
+        )
+        self.ref_patterns: List[List[str]] = []
+
+    def get_list_remote(
+        self, repository: GithubRepository, ref_patterns: List[str]
+    ) -> Optional[ListRemote]:
+        self.ref_patterns.append(ref_patterns)
+        return self.list_remote
+
+
+class FakeLatestReleaseResolver:
+    def __init__(self) -> None:
+        self.revision: Optional[str] = "resolved-commit"
+
+    def get_latest_release(
+        self, repository: GithubRepository, selection: ReleaseSelection
+    ) -> Optional[str]:
+        return self.revision
+
+
+class FakePrefetcher:
+    def __init__(self) -> None:
+        self.revisions: List[Optional[str]] = []
+
+    def prefetch_github(
+        self,
+        repository: GithubRepository,
+        rev: Optional[str],
+        prefetch_options: PrefetchOptions,
+    ) -> PrefetchResult:
+        self.revisions.append(rev)
+        return PrefetchedRepository(
+            repository=repository,
+            rev=rev or "",
+            hash_sum="",
+            options=prefetch_options,
+            store_path="",
+        )
+
+
+class FakePresenter:
+    def __init__(self) -> None:
+        self.results: List[PrefetchResult] = []
+
+    def present(self, prefetch_result: PrefetchResult) -> None:
+        self.results.append(prefetch_result)
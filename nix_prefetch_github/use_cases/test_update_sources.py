@@ -0,0 +1,288 @@
+import logging
+from typing import List, Optional
+from unittest import TestCase
+
+from nix_prefetch_github.hash import encode_nix_base32
+from nix_prefetch_github.interfaces import (
+    GithubRepository,
+    PrefetchedRepository,
+    PrefetchFailure,
+    PrefetchOptions,
+    PrefetchResult,
+    SourceUpdate,
+)
+from nix_prefetch_github.list_remote import ListRemote
+from nix_prefetch_github.nix_source import (
+    Edit,
+    SourceFile,
+    find_fetch_from_github_calls,
+)
+from nix_prefetch_github.revision_index import RevisionIndexImpl
+from nix_prefetch_github.tests import FakeRevisionIndexFactory
+from nix_prefetch_github.use_cases.update_sources import (
+    Request,
+    UpdateSourcesUseCaseImpl,
+)
+
+OLD_COMMIT = "1" * 40
+NEW_COMMIT = "2" * 40
+OLD_HASH = "sha256-" + "A" * 43 + "="
+NEW_HASH = "sha256-" + "B" * 43 + "="
+
+
+class UpdateSourcesUseCaseTests(TestCase):
+    def setUp(self) -> None:
+        self.scanner = FakeScanner()
+        self.editor = FakeEditor()
+        self.prefetcher = FakePrefetcher()
+        self.presenter = FakeUpdatePresenter()
+        self.alerter = FakeAlerter()
+        self.revision_index_factory = FakeRevisionIndexFactory()
+        self.revision_index_factory.revision_index = RevisionIndexImpl(
+            ListRemote(
+                symrefs={"HEAD": "main"},
+                heads={"main": NEW_COMMIT},
+                tags={"v1.0": OLD_COMMIT},
+            )
+        )
+        self.use_case = UpdateSourcesUseCaseImpl(
+            presenter=self.presenter,
+            scanner=self.scanner,
+            editor=self.editor,
+            prefetcher=self.prefetcher,
+            revision_index_factory=self.revision_index_factory,
+            alerter=self.alerter,
+            logger=logging.getLogger(__name__),
+        )
+
+    def test_that_pinned_commit_is_kept_without_requested_revision(self) -> None:
+        self.add_call(rev=OLD_COMMIT)
+        self.update(revision=None)
+        self.assertEqual(
+            self.presenter.updates[0].status, SourceUpdate.Status.unchanged
+        )
+        self.assertEqual(self.presenter.updates[0].rev, OLD_COMMIT)
+        self.assertEqual(self.prefetcher.revisions, [])
+        self.assertEqual(self.editor.edits, [])
+
+    def test_that_pinned_commit_with_placeholder_hash_keeps_its_commit(
+        self,
+    ) -> None:
+        self.add_call(rev=OLD_COMMIT, hash_sum="")
+        self.update(revision=None)
+        self.assertEqual(self.prefetcher.revisions, [OLD_COMMIT])
+        self.assertEqual([edit.new for edit in self.editor.edits], [NEW_HASH.encode()])
+
+    def test_that_unexpected_errors_fail_only_the_affected_call(self) -> None:
+        self.add_call(rev="v1.0")
+        self.add_call(rev="v1.0", repo="other")
+        self.prefetcher.raise_for = "other"
+        with self.assertLogs(level="ERROR"):
+            self.update()
+        self.assertEqual(
+            [update.status for update in self.presenter.updates],
+            [SourceUpdate.Status.updated, SourceUpdate.Status.failed],
+        )
+        self.assertEqual([edit.new for edit in self.editor.edits], [NEW_HASH.encode()])
+        self.assertEqual(self.presenter.finished_after, 2)
+
+    def test_that_pinned_commit_is_moved_to_head(self) -> None:
+        self.add_call(rev=OLD_COMMIT)
+        self.update()
+        self.assertEqual(self.presenter.updates[0].status, SourceUpdate.Status.updated)
+        self.assertEqual(self.presenter.updates[0].rev, NEW_COMMIT)
+        self.assertIn(NEW_COMMIT.encode(), [edit.new for edit in self.editor.edits])
+        self.assertIn(NEW_HASH.encode(), [edit.new for edit in self.editor.edits])
+
+    def test_that_pinned_commit_is_moved_to_requested_revision(self) -> None:
+        self.revision_index_factory.revision_index = RevisionIndexImpl(
+            ListRemote(heads={"main": OLD_COMMIT, "next": NEW_COMMIT})
+        )
+        self.add_call(rev=OLD_COMMIT)
+        self.update(revision="next")
+        self.assertEqual(self.presenter.updates[0].rev, NEW_COMMIT)
+
+    def test_that_up_to_date_commit_is_not_prefetched(self) -> None:
+        self.add_call(rev=NEW_COMMIT)
+        self.update()
+        self.assertEqual(
+            self.presenter.updates[0].status, SourceUpdate.Status.unchanged
+        )
+        self.assertEqual(self.prefetcher.revisions, [])
+        self.assertEqual(self.editor.edits, [])
+
+    def test_that_up_to_date_commit_with_placeholder_hash_is_prefetched(
+        self,
+    ) -> None:
+        self.add_call(rev=NEW_COMMIT, hash_sum="")
+        self.update()
+        self.assertEqual(self.presenter.updates[0].hash_sum, NEW_HASH)
+
+    def test_that_tag_is_kept_and_only_hash_is_updated(self) -> None:
+        self.add_call(rev="v1.0")
+        self.update()
+        self.assertEqual(self.prefetcher.revisions, [OLD_COMMIT])
+        self.assertEqual(self.presenter.updates[0].rev, "v1.0")
+        self.assertEqual([edit.new for edit in self.editor.edits], [NEW_HASH.encode()])
+
+    def test_that_matching_hash_is_not_rewritten(self) -> None:
+        self.add_call(rev="v1.0", hash_sum=NEW_HASH)
+        self.update()
+        self.assertEqual(
+            self.presenter.updates[0].status, SourceUpdate.Status.unchanged
+        )
+        self.assertEqual(self.editor.edits, [])
+
+    def test_that_sha256_attribute_keeps_nix_base32_encoding(self) -> None:
+        old_hash = encode_nix_base32(b"\0" * 32)
+        self.add_call(rev=OLD_COMMIT, hash_sum=old_hash, hash_attribute="sha256")
+        self.update()
+        new_hash = self.presenter.updates[0].hash_sum
+        self.assertIsNotNone(new_hash)
+        assert new_hash
+        self.assertEqual(len(new_hash), 52)
+        self.assertFalse(new_hash.startswith("sha256-"))
+
+    def test_that_calls_with_non_literal_rev_are_skipped(self) -> None:
+        self.add_call(rev='"v${version}"', quote=False)
+        self.update()
+        self.assertEqual(self.presenter.updates[0].status, SourceUpdate.Status.skipped)
+        self.assertEqual(self.prefetcher.revisions, [])
+
+    def test_that_unknown_revision_is_a_failure(self) -> None:
+        self.add_call(rev="does-not-exist")
+        self.update()
+        self.assertEqual(self.presenter.updates[0].status, SourceUpdate.Status.failed)
+
+    def test_that_failed_prefetch_is_a_failure(self) -> None:
+        self.prefetcher.fail = True
+        self.add_call(rev=OLD_COMMIT)
+        self.update()
+        self.assertEqual(self.presenter.updates[0].status, SourceUpdate.Status.failed)
+        self.assertEqual(self.editor.edits, [])
+
+    def test_that_dry_run_does_not_edit_files(self) -> None:
+        self.add_call(rev=OLD_COMMIT)
+        self.update(dry_run=True)
+        self.assertEqual(self.presenter.updates[0].status, SourceUpdate.Status.updated)
+        self.assertEqual(self.editor.edits, [])
+
+    def test_that_updates_are_failures_if_file_changed(self) -> None:
+        self.editor.succeeds = False
+        self.add_call(rev=OLD_COMMIT)
+        self.update()
+        self.assertEqual(self.presenter.updates[0].status, SourceUpdate.Status.failed)
+
+    def test_that_all_calls_of_a_file_are_edited_at_once(self) -> None:
+        self.add_call(rev=OLD_COMMIT, repo="a", path="default.nix")
+        self.add_call(rev=OLD_COMMIT, repo="b", path="default.nix")
+        self.update()
+        self.assertEqual(self.editor.edited_paths, ["default.nix"])
+        self.assertEqual(len(self.editor.edits), 4)
+
+    def test_that_update_is_finished(self) -> None:
+        self.add_call(rev=OLD_COMMIT)
+        self.update()
+        self.assertEqual(self.presenter.finished_after, 1)
+
+    def test_that_user_is_alerted_about_unsafe_options(self) -> None:
+        self.add_call(rev=OLD_COMMIT, extra="leaveDotGit = true;")
+        self.update()
+        self.assertEqual(self.alerter.alert_count, 1)
+
+    def add_call(
+        self,
+        rev: str,
+        hash_sum: str = OLD_HASH,
+        hash_attribute: str = "hash",
+        repo: str = "repo",
+        path: str = "default.nix",
+        quote: bool = True,
+        extra: str = "",
+    ) -> None:
+        rev_text = f'"{rev}"' if quote else rev
+        source = (
+            f'fetchFromGitHub {{ owner = "owner"; repo = "{repo}"; rev = {rev_text}; '
+            f'{hash_attribute} = "{hash_sum}"; {extra} }}'
+        )
+        (call,) = find_fetch_from_github_calls(source.encode())
+        if self.scanner.source_files and self.scanner.source_files[-1].path == path:
+            self.scanner.source_files[-1].calls.append(call)
+        else:
+            self.scanner.source_files.append(SourceFile(path=path, calls=[call]))
+
+    def update(self, revision: Optional[str] = "HEAD", dry_run: bool = False) -> None:
+        self.use_case.update_sources(
+            Request(directory=".", revision=revision, jobs=2, dry_run=dry_run)
+        )
+
+
+class FakeScanner:
+    def __init__(self) -> None:
+        self.source_files: List[SourceFile] = []
+
+    def scan(self, directory: str, jobs: int) -> List[SourceFile]:
+        return self.source_files
+
+
+class FakeEditor:
+    def __init__(self) -> None:
+        self.edits: List[Edit] = []
+        self.edited_paths: List[str] = []
+        self.succeeds = True
+
+    def apply_edits(self, path: str, edits: List[Edit]) -> bool:
+        if self.succeeds:
+            self.edited_paths.append(path)
+            self.edits += edits
+        return self.succeeds
+
+
+class FakePrefetcher:
+    def __init__(self) -> None:
+        self.revisions: List[Optional[str]] = []
+        self.fail = False
+        self.raise_for: Optional[str] = None
+
+    def prefetch_github(
+        self,
+        repository: GithubRepository,
+        rev: Optional[str],
+        prefetch_options: PrefetchOptions,
+    ) -> PrefetchResult:
+        self.revisions.append(rev)
+        if repository.name == self.raise_for:
+            raise RuntimeError("broken")
+        if self.fail:
+            return PrefetchFailure(
+                reason=PrefetchFailure.Reason.unable_to_calculate_hash_sum
+            )
+        return PrefetchedRepository(
+            repository=repository,
+            rev=rev or "",
+            hash_sum=NEW_HASH,
+            options=prefetch_options,
+            store_path="",
+        )
+
+
+class FakeUpdatePresenter:
+    def __init__(self) -> None:
+        self.updates: List[SourceUpdate] = []
+        self.finished_after: Optional[int] = None
+
+    def present_source_update(self, update: SourceUpdate) -> None:
+        self.updates.append(update)
+
+    def finish_update(self) -> None:
+        self.finished_after = len(self.updates)
+
+
+class FakeAlerter:
+    def __init__(self) -> None:
+        self.alert_count = 0
+
+    def alert_user_about_unsafe_prefetch_options(
+        self, prefetch_options: PrefetchOptions
+    ) -> None:
+        self.alert_count += 1
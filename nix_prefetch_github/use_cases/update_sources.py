@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import dataclasses
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from logging import Logger
+from typing import List, Optional, Protocol, Tuple
+
+from nix_prefetch_github.hash import (
+    SriHash,
+    decode_sha256_digest,
+    encode_nix_base32,
+    is_sha1_hash,
+)
+from nix_prefetch_github.interfaces import (
+    Alerter,
+    PrefetchedRepository,
+    Prefetcher,
+    PrefetchFailure,
+    RevisionIndexFactory,
+    SourceFileEditor,
+    SourceTreeScanner,
+    SourceUpdate,
+    UpdatePresenter,
+)
+from nix_prefetch_github.nix_source import Edit, FetchFromGithubCall
+
+
+class UpdateSourcesUseCase(Protocol):
+    def update_sources(self, request: Request) -> None: ...
+
+
+@dataclass
+class Request:
+    directory: str
+    # Calls that are pinned to a commit are moved to the commit this
+    # revision points to. Without a revision they stay at their commit.
+    # Calls that reference a branch or tag keep it and only get their
+    # hash updated.
+    revision: Optional[str]
+    jobs: int
+    dry_run: bool = False
+
+
+@dataclass
+class UpdateSourcesUseCaseImpl:
+    presenter: UpdatePresenter
+    scanner: SourceTreeScanner
+    editor: SourceFileEditor
+    prefetcher: Prefetcher
+    revision_index_factory: RevisionIndexFactory
+    alerter: Alerter
+    logger: Logger
+
+    def update_sources(self, request: Request) -> None:
+        source_files = self.scanner.scan(request.directory, request.jobs)
+        with ThreadPoolExecutor(max_workers=max(request.jobs, 1)) as executor:
+            futures: List[List[Future[Tuple[SourceUpdate, List[Edit]]]]] = [
+                [
+                    executor.submit(
+                        self._update_call, source_file.path, call, request.revision
+                    )
+                    for call in source_file.calls
+                ]
+                for source_file in source_files
+            ]
+            for source_file, file_futures in zip(source_files, futures):
+                updates: List[SourceUpdate] = []
+                edits: List[Edit] = []
+                for call, future in zip(source_file.calls, file_futures):
+                    try:
+                        update, call_edits = future.result()
+                    except Exception as e:
+                        # A single broken call must not abort the update
+                        # of all other calls.
+                        self.logger.exception(
+                            "Updating %s:%s failed unexpectedly",
+                            source_file.path,
+                            call.line,
+                        )
+                        update = SourceUpdate(
+                            path=source_file.path,
+                            line=call.line,
+                            status=SourceUpdate.Status.failed,
+                            reason=f"Unexpected error: {e}",
+                        )
+                        call_edits = []
+                    updates.append(update)
+                    edits += call_edits
+                if (
+                    edits
+                    and not request.dry_run
+                    and not self.editor.apply_edits(source_file.path, edits)
+                ):
+                    updates = [self._file_changed(update) for update in updates]
+                for update in updates:
+                    self.presenter.present_source_update(update)
+        self.presenter.finish_update()
+
+    def _update_call(
+        self, path: str, call: FetchFromGithubCall, revision: Optional[str]
+    ) -> Tuple[SourceUpdate, List[Edit]]:
+        repository = call.repository()
+        update = SourceUpdate(
+            path=path,
+            line=call.line,
+            status=SourceUpdate.Status.skipped,
+            repository=repository,
+        )
+        rev = call.strings.get("rev")
+        hash_attribute = call.hash_attribute
+        hash_string = call.strings.get(hash_attribute) if hash_attribute else None
+        prefetch_options = call.prefetch_options()
+        if (
+            repository is None
+            or rev is None
+            or hash_attribute is None
+            or hash_string is None
+            or prefetch_options is None
+        ):
+            update.reason = "owner, repo, rev, hash and options must be literals"
+            return update, []
+        update.previous_rev = update.rev = rev.value
+        update.previous_hash_sum = update.hash_sum = hash_string.value
+        is_pinned = is_sha1_hash(rev.value)
+        commit: Optional[str]
+        if is_pinned and revision is None:
+            commit = rev.value
+        else:
+            target = revision if is_pinned and revision else rev.value
+            revision_index = self.revision_index_factory.get_revision_index(
+                repository, target
+            )
+            commit = (
+                revision_index.get_revision_by_name(target) if revision_index else None
+            )
+        if commit is None:
+            update.status = SourceUpdate.Status.failed
+            update.reason = str(PrefetchFailure.Reason.unable_to_locate_revision)
+            return update, []
+        if is_pinned and commit == rev.value and _digest(hash_string.value):
+            update.status = SourceUpdate.Status.unchanged
+            return update, []
+        if not prefetch_options.is_safe():
+            self.alerter.alert_user_about_unsafe_prefetch_options(prefetch_options)
+        prefetch_result = self.prefetcher.prefetch_github(
+            repository=repository, rev=commit, prefetch_options=prefetch_options
+        )
+        if not isinstance(prefetch_result, PrefetchedRepository):
+            update.status = SourceUpdate.Status.failed
+            update.reason = str(prefetch_result.reason)
+            return update, []
+        edits: List[Edit] = []
+        if is_pinned and commit != rev.value:
+            update.rev = commit
+            edits.append(
+                Edit(
+                    start=rev.start,
+                    end=rev.end,
+                    old=rev.value.encode("utf-8"),
+                    new=commit.encode("utf-8"),
+                )
+            )
+        if _digest(prefetch_result.hash_sum) != _digest(hash_string.value):
+            update.hash_sum = _format_hash(
+                prefetch_result.hash_sum, hash_attribute, hash_string.value
+            )
+            edits.append(
+                Edit(
+                    start=hash_string.start,
+                    end=hash_string.end,
+                    old=hash_string.value.encode("utf-8"),
+                    new=update.hash_sum.encode("utf-8"),
+                )
+            )
+        update.status = (
+            SourceUpdate.Status.updated if edits else SourceUpdate.Status.unchanged
+        )
+        return update, edits
+
+    def _file_changed(self, update: SourceUpdate) -> SourceUpdate:
+        if update.status != SourceUpdate.Status.updated:
+            return update
+        return dataclasses.replace(
+            update,
+            status=SourceUpdate.Status.failed,
+            reason="File was modified during the update",
+        )
+
+
+def _digest(hash_sum: str) -> Optional[bytes]:
+    if hash_sum.startswith("sha256-"):
+        hash_sum = SriHash.from_text(hash_sum).digest
+    return decode_sha256_digest(hash_sum)
+
+
+def _format_hash(hash_sum: str, attribute: str, previous_hash_sum: str) -> str:
+    # sha256 attributes traditionally hold nix base32 hashes. They are
+    # only written as SRI hashes if they already were one before.
+    if attribute == "sha256" and not previous_hash_sum.startswith("sha256-"):
+        if digest := _digest(hash_sum):
+            return encode_nix_base32(digest)
+    return hash_sum
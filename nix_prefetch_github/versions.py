@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import fnmatch
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+# Prefixes that are commonly put in front of version numbers in tag
+# names. They are tried in this order.
+DEFAULT_TAG_PREFIXES = ["release-", "release/", "version-", "rel-", "v", "V"]
+
+_PRE_RELEASE_PATTERN = re.compile(
+    r"(alpha|beta|rc|pre|preview|dev|snapshot|nightly|canary|a|b|c|m)(?![a-z])",
+    re.IGNORECASE,
+)
+_VERSION_PATTERN = re.compile(
+    # Calendar versions like 2024-05-01 use dashes between the
+    # components of the date.
+    r"(?P<release>\d{4}(?:-\d{1,2}){1,2}(?=$|[._+])|\d+(?:\.\d+)*)"
+    r"(?:[-_.]?(?P<suffix>[0-9A-Za-z][0-9A-Za-z.\-_]*?))?"
+    r"(?:\+(?P<build>[0-9A-Za-z.\-]+))?"
+)
+_CONSTRAINT_PATTERN = re.compile(
+    r"(?P<operator>~=|==|!=|>=|<=|>|<|~|\^|=)?\s*(?P<version>.+)"
+)
+_WILDCARD_PATTERN = re.compile(r"(?P<release>\d+(?:\.\d+)*)\.[*xX]")
+
+# A version is ordered by its release numbers, then by its phase and
+# then by the identifiers of its pre or post release suffix.
+_LOWEST = -1
+_PRE_RELEASE = 0
+_FINAL = 1
+_POST_RELEASE = 2
+
+SortKey = Tuple[Tuple[int, ...], int, Tuple[Tuple[int, Any], ...]]
+Predicate = Callable[[SortKey], bool]
+
+
+@dataclass(frozen=True)
+class Version:
+    tag: str
+    release: Tuple[int, ...]
+    suffix: Optional[str] = None
+
+    @classmethod
+    def from_tag(
+        cls, tag: str, prefixes: List[str] = DEFAULT_TAG_PREFIXES
+    ) -> Optional[Version]:
+        for prefix in prefixes + [""]:
+            if not tag.startswith(prefix):
+                continue
+            match = _VERSION_PATTERN.fullmatch(tag.removeprefix(prefix))
+            if match is None:
+                continue
+            return cls(
+                tag=tag,
+                release=tuple(
+                    int(component)
+                    for component in re.split(r"[.-]", match.group("release"))
+                ),
+                suffix=match.group("suffix"),
+            )
+        return None
+
+    @property
+    def is_pre_release(self) -> bool:
+        return self.suffix is not None and bool(_PRE_RELEASE_PATTERN.match(self.suffix))
+
+    def sort_key(self) -> SortKey:
+        if self.suffix is None:
+            phase = _FINAL
+        elif self.is_pre_release:
+            phase = _PRE_RELEASE
+        else:
+            phase = _POST_RELEASE
+        return (_normalize(self.release), phase, _identifiers(self.suffix or ""))
+
+
+@dataclass(frozen=True)
+class VersionConstraint:
+    # A conjunction of comparisons like >=2,<3. Bounds only match
+    # final releases, e.g. <3 excludes 3.0-rc1.
+    text: str
+    clauses: List[Predicate] = field(default_factory=list, compare=False)
+
+    @classmethod
+    def from_text(cls, text: str) -> VersionConstraint:
+        clauses: List[Predicate] = []
+        for clause_text in text.split(","):
+            if clause_text.strip():
+                clauses.append(_parse_clause(clause_text.strip()))
+        if not clauses:
+            raise ValueError(f"Empty version constraint: {text!r}")
+        return cls(text=text, clauses=clauses)
+
+    def is_satisfied_by(self, version: Version) -> bool:
+        key = version.sort_key()
+        return all(predicate(key) for predicate in self.clauses)
+
+
+@dataclass(frozen=True)
+class ReleaseSelection:
+    constraint: Optional[VersionConstraint] = None
+    pattern: Optional[str] = None
+    include_pre_releases: bool = False
+
+    def select_latest_tag(self, tags: Iterable[str]) -> Optional[str]:
+        # Looks at every tag once and returns the tag with the highest
+        # version that matches all criteria.
+        prefixes = DEFAULT_TAG_PREFIXES
+        if self.pattern is not None:
+            # The literal beginning of a pattern like release-* is a
+            # prefix of the version numbers, too.
+            literal_prefix = re.split(r"[*?\[]", self.pattern, maxsplit=1)[0]
+            if literal_prefix:
+                prefixes = [literal_prefix] + prefixes
+        latest: Optional[Tuple[SortKey, str]] = None
+        for tag in tags:
+            if tag.endswith("^{}"):
+                continue
+            if self.pattern is not None and not fnmatch.fnmatchcase(tag, self.pattern):
+                continue
+            version = Version.from_tag(tag, prefixes)
+            if version is None:
+                continue
+            if version.is_pre_release and not self.include_pre_releases:
+                continue
+            if self.constraint is not None and not self.constraint.is_satisfied_by(
+                version
+            ):
+                continue
+            key = version.sort_key()
+            if latest is None or key > latest[0]:
+                latest = (key, tag)
+        return None if latest is None else latest[1]
+
+
+def _parse_clause(text: str) -> Predicate:
+    match = _CONSTRAINT_PATTERN.fullmatch(text)
+    if match is None:
+        raise ValueError(f"Invalid version constraint: {text!r}")
+    operator = match.group("operator") or ""
+    version_text = match.group("version").strip()
+    if wildcard := _WILDCARD_PATTERN.fullmatch(version_text):
+        if operator not in ("", "=", "=="):
+            raise ValueError(f"Wildcards are only allowed with ==: {text!r}")
+        release = _parse_release(wildcard.group("release"), text)
+        return _range(release, _bump(release, len(release) - 1))
+    release = _parse_release(version_text, text)
+    if operator in ("", "="):
+        # A bare version pins every release that starts with it, e.g.
+        # 1.4 matches 1.4.0 and 1.4.7.
+        return _range(release, _bump(release, len(release) - 1))
+    elif operator == "==":
+        return lambda key: key[0] == _normalize(release)
+    elif operator == "!=":
+        return lambda key: key[0] != _normalize(release)
+    elif operator == ">=":
+        return lambda key: key >= _final_key(release)
+    elif operator == ">":
+        return lambda key: key[0] > _normalize(release)
+    elif operator == "<=":
+        return lambda key: key[0] <= _normalize(release)
+    elif operator == "<":
+        return lambda key: key < _lowest_key(release)
+    elif operator == "~":
+        # ~1.4 and ~1.4.2 allow changes of the patch level, ~1 allows
+        # changes of the minor version.
+        return _range(release, _bump(release, min(len(release) - 1, 1)))
+    elif operator == "~=":
+        if len(release) < 2:
+            raise ValueError(f"~= requires at least two components: {text!r}")
+        return _range(release, _bump(release, len(release) - 2))
+    else:
+        # ^1.2 allows every change that keeps the left most non zero
+        # component.
+        position = next(
+            (n for n, component in enumerate(release) if component != 0),
+            len(release) - 1,
+        )
+        return _range(release, _bump(release, position))
+
+
+def _range(lower: Tuple[int, ...], upper: Tuple[int, ...]) -> Predicate:
+    lower_key = _final_key(lower)
+    upper_key = _lowest_key(upper)
+    return lambda key: lower_key <= key < upper_key
+
+
+def _parse_release(text: str, constraint: str) -> Tuple[int, ...]:
+    version = Version.from_tag(text)
+    if version is None or version.suffix is not None:
+        raise ValueError(f"Invalid version in constraint: {constraint!r}")
+    return version.release
+
+
+def _bump(release: Tuple[int, ...], position: int) -> Tuple[int, ...]:
+    return release[:position] + (release[position] + 1,)
+
+
+def _final_key(release: Tuple[int, ...]) -> SortKey:
+    return (_normalize(release), _FINAL, ())
+
+
+def _lowest_key(release: Tuple[int, ...]) -> SortKey:
+    return (_normalize(release), _LOWEST, ())
+
+
+def _normalize(release: Tuple[int, ...]) -> Tuple[int, ...]:
+    # 1.2 and 1.2.0 denote the same release.
+    components = list(release)
+    while len(components) > 1 and components[-1] == 0:
+        components.pop()
+    return tuple(components)
+
+
+def _identifiers(suffix: str) -> Tuple[Tuple[int, Any], ...]:
+    # Numeric identifiers are compared numerically and have lower
+    # precedence than alphanumeric identifiers like in semantic
+    # versioning. rc10 is newer than rc9.
+    return tuple(
+        (0, int(identifier)) if identifier.isdigit() else (1, identifier.lower())
+        for identifier in re.findall(r"\d+|[A-Za-z]+", suffix)
+    )
@@ -1,4 +1,4 @@
-from sys import exit, stderr, stdout
+import sys
 
 from nix_prefetch_github.presenter import ViewModel
 
@@ -6,7 +6,7 @@ from nix_prefetch_github.presenter import ViewModel
 class CommandLineViewImpl:
     def render_view_model(self, model: ViewModel) -> None:
         for line in model.stderr_lines:
-            print(line, file=stderr)
+            print(line, file=sys.stderr)
         for line in model.stdout_lines:
-            print(line, file=stdout)
-        exit(model.exit_code)
+            print(line, file=sys.stdout)
+        sys.exit(model.exit_code)
@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+from benchmarks.refs import DEFAULT_BRANCH, branch_name, generate_git_ls_remote_output
+from benchmarks.suite import compare_results
+from nix_prefetch_github.list_remote import ListRemote
+from nix_prefetch_github.revision_index import RevisionIndexImpl
+
+
+class SyntheticRefsTests(TestCase):
+    def test_generated_output_is_deterministic(self) -> None:
+        self.assertEqual(
+            generate_git_ls_remote_output(100), generate_git_ls_remote_output(100)
+        )
+
+    def test_generated_output_can_be_parsed(self) -> None:
+        list_remote = ListRemote.from_git_ls_remote_output(
+            generate_git_ls_remote_output(10000)
+        )
+        index = RevisionIndexImpl(list_remote)
+        self.assertEqual(list_remote.symref("HEAD"), DEFAULT_BRANCH)
+        self.assertEqual(index.get_revision_by_name("HEAD"), list_remote.branch("main"))
+        self.assertIsNotNone(index.get_revision_by_name(branch_name(1000)))
+        self.assertIsNotNone(index.get_revision_by_name("v0.0.1"))
+        self.assertGreater(len(list_remote.heads) + len(list_remote.tags), 5000)
+
+
+class CompareResultsTests(TestCase):
+    def test_slowdown_above_threshold_is_a_regression(self) -> None:
+        _, regressions = compare_results(
+            self.results(a=1.0, b=1.0), self.results(a=1.5, b=1.1), threshold=0.25
+        )
+        self.assertEqual(regressions, ["a"])
+
+    def test_speedup_is_not_a_regression(self) -> None:
+        _, regressions = compare_results(
+            self.results(a=1.0), self.results(a=0.5), threshold=0.25
+        )
+        self.assertEqual(regressions, [])
+
+    def test_benchmarks_missing_from_baseline_are_ignored(self) -> None:
+        report, regressions = compare_results(
+            self.results(a=1.0), self.results(a=1.0, b=100.0), threshold=0.25
+        )
+        self.assertEqual(regressions, [])
+        self.assertEqual(len(report), 1)
+
+    def results(self, **seconds: float) -> dict:
+        return {
+            "benchmarks": {
+                name: {"seconds": value, "number": 1} for name, value in seconds.items()
+            }
+        }
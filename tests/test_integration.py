@@ -71,6 +71,9 @@ class VersionFlagTests(TestCase):
             "nix-prefetch-github",
             "nix-prefetch-github-directory",
             "nix-prefetch-github-latest-release",
+            "nix-prefetch-github-batch",
+            "nix-prefetch-github-update",
+            "nix-prefetch-github-lock",
         ]
         for command in commands:
             with self.subTest(msg=command):